@@ -2,7 +2,7 @@ import { useCallback, useEffect, useMemo, useRef, useState } from "react";
 import axios from "axios";
 import { MdClose, MdRadar, MdWarning } from "react-icons/md";
 import useStateAppStore from "@/store/useStateAppStore";
-import { Button, Card, IconButton, Badge, inputClass, cn } from "@/design";
+import { Button, Card, IconButton, Badge, inputClass, selectClass, cn } from "@/design";
 
 // Wi-Fi 2.4 GHz channel centers in MHz (US chs 1-11, EU adds 12-13).
 // Each Wi-Fi channel is ~22 MHz wide → ±11 from center hits nRF channels.
@@ -14,6 +14,23 @@ const WIFI_CHANNELS = [
 
 const NRF_BASE_MHZ = 2400;
 
+// Choices for the daemon's channel-trend window and idle background scans
+// (rf_scan_config). The daemon scores channels over every scan in the
+// window; background scans keep that window filled while nothing else is
+// using the radio.
+const TREND_WINDOWS = [
+  { s: 3600, label: "1 hour" },
+  { s: 4 * 3600, label: "4 hours" },
+  { s: 12 * 3600, label: "12 hours" },
+  { s: 24 * 3600, label: "24 hours" },
+];
+const BACKGROUND_INTERVALS = [
+  { s: 0, label: "Off" },
+  { s: 300, label: "Every 5 min" },
+  { s: 900, label: "Every 15 min" },
+  { s: 3600, label: "Every hour" },
+];
+
 // Map an nRF24 channel to its center frequency in MHz.
 const nrfFreq = (ch) => NRF_BASE_MHZ + ch;
 
@@ -46,7 +63,8 @@ export default function RFScanPanel() {
   // can detect when the daemon has published a fresh result.
   const lastKnownTsRef = useRef(0);
 
-  const currentChannel = stateData?.fw_state?.settings?.rf?.current_channel;
+  const rfSettings     = stateData?.fw_state?.settings?.rf;
+  const currentChannel = rfSettings?.current_channel;
   const isShowLoaded   = !!stateData?.fw_state?.show_loaded;
   const isArmed        = !!stateData?.fw_state?.device_is_armed;
   const blockedReason  = isShowLoaded
@@ -119,6 +137,19 @@ export default function RFScanPanel() {
     }
   }, [scan?.recommended_ch, blockedReason]);
 
+  const configureTrend = useCallback(async (change) => {
+    setError(null);
+    try {
+      await axios.post("/api/system/cmd_daemon", { type: "rf_scan_config", ...change });
+      // The daemon re-scores last_scan.json against the new window; give
+      // it a moment, then pick up the new recommendation.
+      await new Promise((r) => setTimeout(r, 600));
+      await fetchLastScan();
+    } catch (e) {
+      setError(e?.response?.data?.error || e.message);
+    }
+  }, [fetchLastScan]);
+
   // Pre-compute max hit count so the bar widths are scaled within the chart.
   const { results, maxHits } = useMemo(() => {
     const r = scan?.results || [];
@@ -173,6 +204,8 @@ export default function RFScanPanel() {
           currentChannel={currentChannel}
           results={results}
           maxHits={maxHits}
+          rfSettings={rfSettings}
+          configureTrend={configureTrend}
         />
       )}
     </div>
@@ -193,8 +226,11 @@ function ScanModal({
   currentChannel,
   results,
   maxHits,
+  rfSettings,
+  configureTrend,
 }) {
   const recommended = scan?.recommended_ch;
+  const trend = scan?.trend;
 
   return (
     <div className="fixed inset-0 z-50 flex items-center justify-center bg-black/70 backdrop-blur-sm p-4">
@@ -252,7 +288,10 @@ function ScanModal({
 
             <div className="ml-auto text-xs text-fg-muted">
               {scan?.host_ts_ms ? (
-                <>Last scan: {new Date(scan.host_ts_ms).toLocaleString()}</>
+                <>
+                  Last scan: {new Date(scan.host_ts_ms).toLocaleString()}
+                  {scan.background ? " (background)" : ""}
+                </>
               ) : loading ? (
                 "Loading last scan…"
               ) : (
@@ -261,6 +300,45 @@ function ScanModal({
             </div>
           </div>
 
+          {rfSettings?.trend_window_s != null && (
+            <div className="flex flex-wrap items-end gap-3">
+              <label className="flex flex-col gap-1">
+                <span className="eyebrow">Trend window</span>
+                <select
+                  value={rfSettings.trend_window_s}
+                  onChange={(e) => configureTrend({ window_s: parseInt(e.target.value, 10) })}
+                  className={cn(selectClass, "w-36")}
+                >
+                  {TREND_WINDOWS.some((w) => w.s === rfSettings.trend_window_s) ? null : (
+                    <option value={rfSettings.trend_window_s}>
+                      {Math.round(rfSettings.trend_window_s / 60)} min
+                    </option>
+                  )}
+                  {TREND_WINDOWS.map((w) => (
+                    <option key={w.s} value={w.s}>{w.label}</option>
+                  ))}
+                </select>
+              </label>
+              <label className="flex flex-col gap-1">
+                <span className="eyebrow">Background scans while idle</span>
+                <select
+                  value={rfSettings.background_scan_interval_s ?? 0}
+                  onChange={(e) => configureTrend({ background_interval_s: parseInt(e.target.value, 10) })}
+                  className={cn(selectClass, "w-40")}
+                >
+                  {BACKGROUND_INTERVALS.some((b) => b.s === (rfSettings.background_scan_interval_s ?? 0)) ? null : (
+                    <option value={rfSettings.background_scan_interval_s}>
+                      Every {Math.round(rfSettings.background_scan_interval_s / 60)} min
+                    </option>
+                  )}
+                  {BACKGROUND_INTERVALS.map((b) => (
+                    <option key={b.s} value={b.s}>{b.label}</option>
+                  ))}
+                </select>
+              </label>
+            </div>
+          )}
+
           {scan && (
             <div className="grid grid-cols-2 gap-3">
               <Card padding="md" tone="inset">
@@ -282,6 +360,14 @@ function ScanModal({
                   {recommended != null &&
                     `${(NRF_BASE_MHZ + recommended) / 1000} GHz`}
                 </div>
+                <div className="text-xs text-ok-fg/70 mt-1">
+                  {trend?.scans > 1
+                    ? `Trend of ${trend.scans} scans` +
+                      (scan.scan_recommended_ch != null && scan.scan_recommended_ch !== recommended
+                        ? ` · this scan alone: ch ${scan.scan_recommended_ch}`
+                        : "")
+                    : "From this scan only"}
+                </div>
                 {recommended != null && recommended !== currentChannel && (
                   <Button
                     size="sm"
@@ -300,14 +386,20 @@ function ScanModal({
           {scan?.top?.length > 0 && (
             <div>
               <div className="eyebrow mb-1.5">
-                Top candidates (lowest neighborhood-weighted score wins)
+                {trend?.scans > 1
+                  ? "Top candidates (lowest trend score wins: occupancy, peaks, variance, neighbors)"
+                  : "Top candidates (lowest neighborhood-weighted score wins)"}
               </div>
               <div className="flex gap-1.5 flex-wrap">
                 {scan.top.map((t, i) => (
                   <Badge
                     key={t.ch}
                     tone={i === 0 ? "ok" : "neutral"}
-                    title={`hits=${t.hits}, score=${t.score}`}
+                    title={
+                      t.mean != null
+                        ? `mean=${t.mean}, peak=${t.peak}, std=${t.std}, score=${t.score}`
+                        : `hits=${t.hits}, score=${t.score}`
+                    }
                   >
                     <span className="font-mono">ch {t.ch} · {t.hits}h</span>
                   </Badge>
@@ -320,6 +412,8 @@ function ScanModal({
             <ScanChart
               results={results}
               maxHits={maxHits}
+              trendMean={trend?.scans > 1 ? trend.channels?.mean : null}
+              passes={scan?.passes}
               currentChannel={currentChannel}
               recommended={recommended}
             />
@@ -337,7 +431,7 @@ function ScanModal({
   );
 }
 
-function ScanChart({ results, maxHits, currentChannel, recommended }) {
+function ScanChart({ results, maxHits, trendMean, passes, currentChannel, recommended }) {
   // Render a horizontal-channel chart: x-axis is nRF channel 0..125, y-axis
   // is hit count. We draw thin colored bars + Wi-Fi-band background swatches
   // so the operator can see at a glance where the dominant Wi-Fi APs sit.
@@ -348,6 +442,15 @@ function ScanChart({ results, maxHits, currentChannel, recommended }) {
   const innerH = H - padT - padB;
   const xs = (ch) => padL + ((ch / 125) * innerW);
   const barW = innerW / 126 * 0.9;
+  // Trend mean occupancy, drawn in this scan's hit units so it sits on the
+  // same axis as the bars.
+  const trendPoints = trendMean && passes
+    ? trendMean
+        .map((m, ch) => (m == null ? null
+          : `${xs(ch)},${padT + innerH - Math.min(1, (m * passes) / maxHits) * innerH}`))
+        .filter(Boolean)
+        .join(" ")
+    : null;
 
   return (
     <div className="bg-gray-800/40 border border-gray-700 rounded p-2">
@@ -432,6 +535,10 @@ function ScanChart({ results, maxHits, currentChannel, recommended }) {
           );
         })}
 
+        {trendPoints && (
+          <polyline points={trendPoints} fill="none" stroke="#e2e8f0" strokeWidth="1" strokeOpacity="0.7" />
+        )}
+
         {/* Current + recommended channel markers */}
         {currentChannel != null && (
           <g>
@@ -501,6 +608,11 @@ function ScanChart({ results, maxHits, currentChannel, recommended }) {
         <span className="inline-flex items-center gap-1">
           <span className="inline-block w-3 h-3 rounded-sm bg-red-500" /> loud
         </span>
+        {trendPoints && (
+          <span className="inline-flex items-center gap-1">
+            <span className="inline-block w-3 h-px bg-slate-200" /> trend mean
+          </span>
+        )}
         <span className="inline-flex items-center gap-1">
           <span className="inline-block w-3 h-1 bg-blue-500" /> current channel
         </span>
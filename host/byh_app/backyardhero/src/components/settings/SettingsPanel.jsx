@@ -20,6 +20,7 @@ import DebugModeToggle from "./DebugModeToggle";
 import GpioOverridePanel from "./GpioOverridePanel";
 import ProtocolConfig from "./ProtocolConfig";
 import RFScanPanel from "./RFScanPanel";
+import SystemMetricsPanel from "./SystemMetricsPanel";
 import OtaFlashPanel from "./OtaFlashPanel";
 import DongleFlashPanel from "./DongleFlashPanel";
 import ReceiverConfigSettings from "./ReceiverConfigSettings";
@@ -273,6 +274,14 @@ function DebugTab() {
         <DaemonSettings />
       </SettingCard>
 
+      <SettingCard
+        title="System metrics"
+        eyebrow="Host diagnostics"
+        className="lg:col-span-2"
+      >
+        <SystemMetricsPanel />
+      </SettingCard>
+
       <SettingCard
         title="OTA firmware flash"
         eyebrow="Receiver update"
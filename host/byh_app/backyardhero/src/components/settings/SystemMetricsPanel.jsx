@@ -0,0 +1,150 @@
+import { useEffect, useMemo, useState } from "react";
+import { Stat, cn } from "@/design";
+import { HARDWARE } from "@/util/clientEnv";
+import { DAEMON_WS_SUBPROTOCOL, createDaemonFrameDecoder } from "@/util/daemonWsCodec";
+
+// Live host metrics from ws_server's system sampler. The panel opens its
+// own daemon WebSocket subscribed to just the `metrics` topic: the server
+// sends the sampler's rolling window once, then `_sys` frames holding only
+// the fields that changed since the previous sample. While any client holds
+// that subscription the sampler runs at its fast rate (4 Hz by default
+// instead of 1 Hz), so it only does while this card is mounted.
+
+// Mirrors system_sampler.WINDOW_S (the server trims to its own setting; this
+// just bounds what we keep between window resends).
+const WINDOW_MS = 300_000;
+
+const PROCESS_LABELS = {
+  daemon: "Daemon",
+  bridge: "Serial bridge",
+  ws_server: "WS server",
+};
+
+// Fold one `_sys` delta into the previous sample. Per-process entries are
+// replaced whole, processes not in the delta carry over.
+const applySysDelta = (prev, delta) => {
+  if (!prev) return delta;
+  const next = { ...prev, ...delta };
+  if (delta.procs) next.procs = { ...prev.procs, ...delta.procs };
+  return next;
+};
+
+export default function SystemMetricsPanel() {
+  const [samples, setSamples] = useState([]);
+  const [connected, setConnected] = useState(false);
+
+  useEffect(() => {
+    if (!HARDWARE) return undefined;
+    const socket = new WebSocket(
+      `ws://${window.location.host.split(":")[0]}:8090/?topics=metrics`,
+      [DAEMON_WS_SUBPROTOCOL],
+    );
+    socket.binaryType = "arraybuffer";
+    const decodeFrame = createDaemonFrameDecoder();
+    socket.onopen = () => setConnected(true);
+    socket.onclose = () => setConnected(false);
+    socket.onerror = () => {};
+    socket.onmessage = (event) => {
+      const payload = decodeFrame(event.data);
+      if (!payload) return;
+      if (payload._sys_window) {
+        setSamples(payload._sys_window);
+      } else if (payload._sys) {
+        setSamples((prev) => {
+          const next = applySysDelta(prev[prev.length - 1], payload._sys);
+          const cutoff = next.t - WINDOW_MS;
+          let start = 0;
+          while (start < prev.length && prev[start].t < cutoff) start++;
+          return [...prev.slice(start), next];
+        });
+      }
+    };
+    return () => socket.close();
+  }, []);
+
+  const latest = samples[samples.length - 1];
+  const cpuSeries = useMemo(() => samples.map((s) => [s.t, s.cpu]), [samples]);
+  const memSeries = useMemo(() => samples.map((s) => [s.t, s.mem]), [samples]);
+
+  if (!HARDWARE) {
+    return (
+      <p className="text-xs text-fg-muted leading-snug">
+        System metrics are only available on the device.
+      </p>
+    );
+  }
+
+  return (
+    <div className="flex flex-col gap-3">
+      <p className="text-xs text-fg-muted leading-snug">
+        Host CPU, memory and temperature, plus per-process usage for the
+        daemon, serial bridge and WebSocket server. Sampled faster while this
+        panel is open.
+      </p>
+
+      <div className="grid grid-cols-3 gap-3">
+        <Stat label="CPU" numeric value={latest ? `${latest.cpu}%` : "—"} />
+        <Stat
+          label="Memory"
+          numeric
+          value={latest ? `${latest.mem}%` : "—"}
+          hint={latest ? `${latest.mem_used_mb} MB used` : undefined}
+        />
+        <Stat
+          label="Temp"
+          numeric
+          tone={latest?.temp >= 175 ? "danger" : latest?.temp >= 150 ? "warn" : "neutral"}
+          value={latest?.temp ? `${latest.temp}°F` : "—"}
+        />
+      </div>
+
+      <div className="grid grid-cols-2 gap-3">
+        <Sparkline label="CPU %" series={cpuSeries} />
+        <Sparkline label="Memory %" series={memSeries} />
+      </div>
+
+      <div className="flex flex-col gap-1 text-sm">
+        <span className="eyebrow">Processes</span>
+        {Object.entries(PROCESS_LABELS).map(([key, label]) => {
+          const p = latest?.procs?.[key];
+          return (
+            <div key={key} className="flex items-center gap-2">
+              <span className={cn("flex-1", p ? "text-fg-primary" : "text-fg-muted")}>{label}</span>
+              <span className="num font-mono tabular-nums text-fg-muted">
+                {p ? `${p.cpu}% · ${p.rss_mb} MB` : "not visible"}
+              </span>
+            </div>
+          );
+        })}
+      </div>
+
+      {!connected && (
+        <div className="text-xs text-fg-muted italic">Connecting to the WebSocket server…</div>
+      )}
+    </div>
+  );
+}
+
+function Sparkline({ label, series }) {
+  // 0..100 percent on a fixed scale so the two charts read the same way.
+  const W = 200;
+  const H = 40;
+  let points = "";
+  if (series.length > 1) {
+    const t0 = series[0][0];
+    const span = Math.max(1, series[series.length - 1][0] - t0);
+    points = series
+      .map(([t, v]) => `${((t - t0) / span) * W},${H - (Math.min(100, v) / 100) * H}`)
+      .join(" ");
+  }
+  return (
+    <div className="bg-gray-800/40 border border-gray-700 rounded p-2">
+      <div className="eyebrow mb-1">{label}</div>
+      <svg viewBox={`0 0 ${W} ${H}`} width="100%" height={48} preserveAspectRatio="none">
+        {points && (
+          <polyline points={points} fill="none" stroke="#60a5fa" strokeWidth="1.5" />
+        )}
+      </svg>
+    </div>
+  );
+}
@@ -1,6 +1,7 @@
 import React, { useCallback, useEffect, useMemo, useRef, useState } from "react";
 import axios from "axios";
-import useStateAppStore, { serverElapsedMs } from "@/store/useStateAppStore";
+import useStateAppStore, { serverElapsedMs, DAEMON_WS_TOPICS } from "@/store/useStateAppStore";
+import { DAEMON_WS_SUBPROTOCOL, createDaemonFrameDecoder } from "@/util/daemonWsCodec";
 import useAppStore from "@/store/useAppStore";
 import useAppMode from "@/design/useAppMode";
 import { cn, Stat, Dot, IconButton, Badge } from "@/design";
@@ -96,6 +97,8 @@ export default function StatusBar() {
   const stateData = useStateAppStore((s) => s.stateData);
   const setStateData = useStateAppStore((s) => s.setStateData);
   const patchStateData = useStateAppStore((s) => s.patchStateData);
+  const mergeStateTopics = useStateAppStore((s) => s.mergeStateTopics);
+  const applyStateEvent = useStateAppStore((s) => s.applyStateEvent);
   const {
     mode,
     daemonActive,
@@ -139,16 +142,25 @@ export default function StatusBar() {
     if (!HARDWARE) return;
     if (socketRef.current && socketRef.current.readyState <= 1) return;
     intentionalDisconnectRef.current = false;
-    const socket = new WebSocket(`ws://${window.location.host.split(":")[0]}:8090`);
+    const socket = new WebSocket(
+      `ws://${window.location.host.split(":")[0]}:8090/?topics=${DAEMON_WS_TOPICS}`,
+      [DAEMON_WS_SUBPROTOCOL],
+    );
+    socket.binaryType = "arraybuffer";
+    const decodeFrame = createDaemonFrameDecoder();
     socket.onopen = () => {
       setIsConnected(true);
       reconnectAttemptRef.current = 0;
     };
     socket.onmessage = (event) => {
-      let payload;
-      try { payload = JSON.parse(event.data); } catch { return; }
-      if (payload && payload._hb) {
+      const payload = decodeFrame(event.data);
+      if (!payload) return;
+      if (payload._hb) {
         patchStateData({ fw_last_update: payload.fw_last_update });
+      } else if (payload._ev) {
+        applyStateEvent(payload);
+      } else if (payload._topics) {
+        mergeStateTopics(payload);
       } else {
         setStateData(payload);
       }
@@ -160,7 +172,7 @@ export default function StatusBar() {
       scheduleReconnect();
     };
     socketRef.current = socket;
-  }, [setStateData, patchStateData, scheduleReconnect]);
+  }, [setStateData, patchStateData, mergeStateTopics, applyStateEvent, scheduleReconnect]);
 
   useEffect(() => { connectWebSocketRef.current = connectWebSocket; }, [connectWebSocket]);
 
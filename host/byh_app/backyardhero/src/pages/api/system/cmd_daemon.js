@@ -122,6 +122,17 @@ const VALIDATORS = {
     }
     return null;
   },
+
+  // Channel-trend window and idle background-scan interval (0 = off).
+  rf_scan_config: (b) => {
+    if (b.window_s === undefined && b.background_interval_s === undefined) {
+      return 'rf_scan_config requires "window_s" and/or "background_interval_s"';
+    }
+    for (const k of ['window_s', 'background_interval_s']) {
+      if (b[k] !== undefined && !isInt(b[k])) return `rf_scan_config "${k}" must be an integer when present`;
+    }
+    return null;
+  },
 };
 
 // Explicitly rejected command types (documented so the rejection is
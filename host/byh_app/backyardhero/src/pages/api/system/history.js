@@ -0,0 +1,53 @@
+import { ensureHardware } from '@/util/apiGuards';
+
+// ws_server serves the history store on its plain-HTTP metrics port. Same
+// container / host as this server in every deployment; overridable for dev
+// setups that run it elsewhere.
+const WS_METRICS_URL = process.env.BYH_WS_METRICS_URL || 'http://127.0.0.1:8091';
+const QUERY_TIMEOUT_MS = 10000;
+const PASSTHROUGH_PARAMS = ['series', 'from', 'to', 'points'];
+
+/**
+ * GET /api/system/history
+ *   → range query over the host's metrics history (ws_server's
+ *     metrics_store: 1 s for the last hour, 10 s for a day, 1 min for a
+ *     week). Query: series (comma-separated names or globs, e.g.
+ *     "host.*,rx.RX101.lat"), from / to (epoch ms, default the last hour),
+ *     points (max points per series, default 600).
+ *     Returns { step_s, start_ms, series: { name: [value|null, ...] } };
+ *     point i is at start_ms + i * step_s * 1000.
+ *
+ * GET /api/system/history?list=1
+ *   → { series: [name, ...] }, every series on record.
+ */
+export default async function handler(req, res) {
+  if (!ensureHardware(res)) return;
+  if (req.method !== 'GET') {
+    res.setHeader('Allow', ['GET']);
+    return res.status(405).end(`Method ${req.method} Not Allowed`);
+  }
+
+  const params = new URLSearchParams();
+  for (const key of PASSTHROUGH_PARAMS) {
+    const value = req.query[key];
+    if (value != null && value !== '') params.set(key, Array.isArray(value) ? value.join(',') : value);
+  }
+  const target = req.query.list
+    ? `${WS_METRICS_URL}/history/series`
+    : `${WS_METRICS_URL}/history?${params}`;
+
+  const controller = new AbortController();
+  const timer = setTimeout(() => controller.abort(), QUERY_TIMEOUT_MS);
+  try {
+    const resp = await fetch(target, { signal: controller.signal, cache: 'no-store' });
+    if (resp.status === 404) {
+      return res.status(503).json({ error: 'Metrics history is not enabled on this host.' });
+    }
+    return res.status(resp.status).json(await resp.json());
+  } catch (error) {
+    console.error('history query failed:', error);
+    return res.status(502).json({ error: 'WebSocket server unreachable.' });
+  } finally {
+    clearTimeout(timer);
+  }
+}
@@ -41,6 +41,11 @@ export const serverElapsedMs = (serverTs, stateData) => {
   return Date.now() - offset - serverTs;
 };
 
+// ws_server topics the console subscribes to -- all of them; what the
+// subscription buys us is that after the first frame only changed topics
+// are sent. See TOPIC_STATE_KEYS in pythings/websock_server/ws_server.py.
+export const DAEMON_WS_TOPICS = 'show,receivers,ota,device,system,errors,cursor';
+
 const useStateAppStore = create((set, get) => ({
   stateData: {},
   setStateData: (stateData) => {
@@ -69,7 +74,40 @@ const useStateAppStore = create((set, get) => ({
         ),
       },
     }));
-  }
+  },
+  // Merge a ws_server topic frame (connected with `?topics=`). Those carry
+  // only the topics that changed, and their `fw_state` only that topic's
+  // keys, so fw_state is merged one level deep instead of replaced.
+  // Frames flagged `_full` (first frame, periodic resend) replace.
+  mergeStateTopics: (frame) => {
+    if (frame._full) {
+      get().setStateData(frame);
+      return;
+    }
+    const now = Date.now();
+    set((state) => ({
+      stateData: {
+        ...state.stateData,
+        ...frame,
+        fw_state: { ...(state.stateData?.fw_state || {}), ...(frame.fw_state || {}) },
+        _clientRxAt: now,
+        _clockOffsetMs: computeClockOffset(
+          frame,
+          state.stateData?._clockOffsetMs ?? 0,
+        ),
+      },
+    }));
+  },
+
+  // Apply a ws_server cursor-stream frame (`_ev`, sent to `cursor`
+  // subscribers as the daemon publishes during a show): the new cursor
+  // and, if cues fired, the latest one as fw_firing.
+  applyStateEvent: (frame) => {
+    const partial = { fw_last_update: frame.fw_last_update };
+    if (frame.fw_cursor !== undefined) partial.fw_cursor = frame.fw_cursor;
+    if (frame.fw_fired?.length) partial.fw_firing = frame.fw_fired[frame.fw_fired.length - 1];
+    get().patchStateData(partial);
+  },
 
 }));
 
@@ -0,0 +1,119 @@
+// Decoder for the daemon WebSocket feed (pythings/websock_server).
+//
+// The console asks for the `byh.msgpack.v1` subprotocol. If ws_server has
+// msgpack installed it answers with binary MessagePack frames whose map
+// keys are small ints from a server-wide key dictionary; definitions
+// arrive ahead of use as `{"_kd": [base, [key, ...]]}` messages (see
+// ws_codec.py). Otherwise the server picks no subprotocol and frames stay
+// JSON text, so the same decoder handles both.
+//
+// Only the subset of MessagePack the server emits is decoded: nil, bool,
+// ints, floats, str, bin, array, map. No dependency, on purpose -- this is
+// the only binary format the app speaks.
+
+export const DAEMON_WS_SUBPROTOCOL = 'byh.msgpack.v1';
+
+const utf8 = typeof TextDecoder !== 'undefined' ? new TextDecoder() : null;
+
+const readMsgpack = (bytes) => {
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  let pos = 0;
+
+  const str = (n) => {
+    const out = utf8.decode(bytes.subarray(pos, pos + n));
+    pos += n;
+    return out;
+  };
+  const bin = (n) => {
+    const out = bytes.slice(pos, pos + n);
+    pos += n;
+    return out;
+  };
+  const array = (n) => {
+    const out = new Array(n);
+    for (let i = 0; i < n; i++) out[i] = value();
+    return out;
+  };
+  const map = (n) => {
+    // Int keys stay numbers here; resolveKeys() maps them to names.
+    const out = new Map();
+    for (let i = 0; i < n; i++) {
+      const k = value();
+      out.set(k, value());
+    }
+    return out;
+  };
+
+  function value() {
+    const b = view.getUint8(pos++);
+    if (b <= 0x7f) return b;
+    if (b >= 0xe0) return b - 0x100;
+    if ((b & 0xf0) === 0x80) return map(b & 0x0f);
+    if ((b & 0xf0) === 0x90) return array(b & 0x0f);
+    if ((b & 0xe0) === 0xa0) return str(b & 0x1f);
+    let v;
+    switch (b) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc4: v = view.getUint8(pos); pos += 1; return bin(v);
+      case 0xc5: v = view.getUint16(pos); pos += 2; return bin(v);
+      case 0xc6: v = view.getUint32(pos); pos += 4; return bin(v);
+      case 0xca: v = view.getFloat32(pos); pos += 4; return v;
+      case 0xcb: v = view.getFloat64(pos); pos += 8; return v;
+      case 0xcc: v = view.getUint8(pos); pos += 1; return v;
+      case 0xcd: v = view.getUint16(pos); pos += 2; return v;
+      case 0xce: v = view.getUint32(pos); pos += 4; return v;
+      case 0xcf: v = Number(view.getBigUint64(pos)); pos += 8; return v;
+      case 0xd0: v = view.getInt8(pos); pos += 1; return v;
+      case 0xd1: v = view.getInt16(pos); pos += 2; return v;
+      case 0xd2: v = view.getInt32(pos); pos += 4; return v;
+      case 0xd3: v = Number(view.getBigInt64(pos)); pos += 8; return v;
+      case 0xd9: v = view.getUint8(pos); pos += 1; return str(v);
+      case 0xda: v = view.getUint16(pos); pos += 2; return str(v);
+      case 0xdb: v = view.getUint32(pos); pos += 4; return str(v);
+      case 0xdc: v = view.getUint16(pos); pos += 2; return array(v);
+      case 0xdd: v = view.getUint32(pos); pos += 4; return array(v);
+      case 0xde: v = view.getUint16(pos); pos += 2; return map(v);
+      case 0xdf: v = view.getUint32(pos); pos += 4; return map(v);
+      default:
+        throw new Error(`msgpack: unsupported type 0x${b.toString(16)}`);
+    }
+  }
+
+  return value();
+};
+
+const resolveKeys = (v, keys) => {
+  if (v instanceof Map) {
+    const out = {};
+    v.forEach((val, k) => {
+      out[typeof k === 'number' ? keys[k] : k] = resolveKeys(val, keys);
+    });
+    return out;
+  }
+  if (Array.isArray(v)) return v.map((x) => resolveKeys(x, keys));
+  return v;
+};
+
+// One decoder per socket: it carries that connection's copy of the key
+// dictionary. Returns the payload object, or null for frames that carry
+// nothing to render (key-dictionary updates, undecodable frames).
+export const createDaemonFrameDecoder = () => {
+  const keys = [];
+  return (data) => {
+    try {
+      if (typeof data === 'string') return JSON.parse(data);
+      const msg = readMsgpack(new Uint8Array(data));
+      if (msg instanceof Map && msg.has('_kd')) {
+        const [base, added] = msg.get('_kd');
+        keys.length = base;
+        keys.push(...added);
+        return null;
+      }
+      return resolveKeys(msg, keys);
+    } catch {
+      return null;
+    }
+  };
+};
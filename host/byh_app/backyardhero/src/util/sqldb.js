@@ -216,6 +216,25 @@ function initializeDatabase(db) {
     );
   `;
 
+  // One row per run of a show, written by the daemon when the run ends
+  // (pc_daemon protocol_handler/ShowRunRecorder.py reads and writes it).
+  //   end_reason        'completed' | 'stopped' | 'aborted' | 'error'
+  //   telemetry_format  layout of `telemetry`, e.g. 'byh-run-columnar-v1'
+  //   telemetry         compressed per-run cue / receiver / queue records
+  const createShowRunTable = `
+    CREATE TABLE IF NOT EXISTS ShowRun (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      show_id INTEGER NOT NULL,
+      started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+      cursor_position_ms INTEGER NOT NULL CHECK(cursor_position_ms >= 0),
+      ended_at TIMESTAMP,
+      end_reason TEXT,
+      telemetry_format TEXT,
+      telemetry BLOB,
+      FOREIGN KEY (show_id) REFERENCES Show (id) ON DELETE CASCADE
+    );
+  `;
+
   try {
     db.exec(createShowTable);
     console.log("Checked/created Show table.");
@@ -305,6 +324,9 @@ function initializeDatabase(db) {
     db.exec(createReceiversTable);
     console.log("Checked/created Receivers table.");
 
+    db.exec(createShowRunTable);
+    console.log("Checked/created ShowRun table.");
+
     // Migrations for receiver-reported config columns (FW v22+). Wrapped in
     // individual try/catches so an existing column doesn't abort the rest.
     // Schema choices:
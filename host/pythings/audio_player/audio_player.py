@@ -9,19 +9,29 @@ does today.
 Architecture (kept deliberately decoupled from the firing daemon):
 
   * State  -> we connect to the SAME WebSocket the browser console consumes
-              (ws://127.0.0.1:8090) and watch `fw_state.proto_handler_status`,
-              `fw_state.sst`, and `fw_state.loaded_show_id`.
+              (ws://127.0.0.1:8090, subscribed to the `show` and `cursor`
+              topics) and watch `fw_state.proto_handler_status`,
+              `fw_state.sst`, `fw_state.show_paused` and
+              `fw_state.loaded_show_id`, plus the show's time cursor, which
+              pcm_engine keeps the music locked to for the whole show.
   * Tracks -> the show's track list lives in the SQLite `Show.audio_file`
               column (JSON). We read it directly, the same DB the daemon
               loads shows from.
-  * Bytes  -> each track is streamed from the app's own range-serve route
+  * Bytes  -> each track comes from the app's own range-serve route
               (/api/shows/audio/<file>), so "where does the file live on disk"
               stays the app's problem, not ours. Cloud/absolute URLs are used
-              as-is.
-  * Output -> ffplay (ffmpeg). If the host has no audio device (e.g. the dev
-              container) ffplay just exits non-zero; we log it and carry on.
-              This process never crashes on a playback failure, so supervisord
-              never sees a crash-loop.
+              as-is. Tracks are copied into a local cache (track_cache) as
+              soon as a show is loaded and played from there; a track that
+              isn't cached yet is streamed from its URL.
+  * Output -> pcm_engine: the whole soundtrack is decoded ahead during the
+              START_CONFIRMED countdown and streamed, gapless, into one aplay
+              process opened before the start, so the first sample lands on
+              `sst` instead of after a player's startup. Without aplay (or
+              with BYH_AUDIO_ENGINE=ffplay) it's one ffplay / ffmpeg per
+              track as before. If the host has no audio device (e.g. the dev
+              container) the player just fails to open it; we log it and
+              carry on. This process never crashes on a playback failure, so
+              supervisord never sees a crash-loop.
 
 Enablement + timing knobs live in systemcfg (`system.hostAudio`), edited from
 the app's Settings screen:
@@ -29,18 +39,34 @@ the app's Settings screen:
   system.hostAudio = { "enabled": bool, "deviceLatencyMs": number }
 
 `deviceLatencyMs` is a per-device trim: how many ms EARLIER than the ideal
-play instant to launch ffplay, to hide the player's own startup latency
-(analogous to the browser's per-show audio sync offset, but device-specific).
+play instant to start the audio (analogous to the browser's per-show audio
+sync offset, but device-specific). With pcm_engine that's only the sound
+card's own delay; the ffplay path also needs it to hide the player's
+startup latency.
 """
 
 import asyncio
 import json
 import os
+import shutil
 import sqlite3
 import time
 
 import websockets
 
+from pcm_engine import FINISHED, NO_DEVICE, PcmSession, ShowClock
+from track_cache import TrackCache
+
+# Optional: with msgpack installed we ask ws_server for its binary
+# `byh.msgpack.v1` encoding (see websock_server/ws_codec.py; the server's
+# key dictionary may or may not be on). Without msgpack, or against a
+# server that doesn't offer it, frames are JSON as before.
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+WS_SUBPROTOCOL_MSGPACK = "byh.msgpack.v1"
+
 # --- Paths / endpoints ------------------------------------------------------
 # Mirror the daemon's env contract (see pc_daemon.py / paths.js).
 _DATA_DIR = os.environ.get("BYH_DATA_DIR", "/data")
@@ -52,6 +78,20 @@ SYSTEM_USER_CFG_PATH = os.path.join(_CONFIG_DIR, "systemcfg.user.json")
 # The app + websocket both run on this same host under supervisord.
 APP_URL = os.environ.get("BYH_APP_URL", "http://127.0.0.1:1776").rstrip("/")
 WS_URL = os.environ.get("BYH_WS_URL", "ws://127.0.0.1:8090")
+# We only look at show state and the show's time cursor, so subscribe to
+# just those ws_server topics instead of taking every receiver / OTA /
+# system update. A BYH_WS_URL that already carries a query string is used
+# as-is (and gets no cursor events: playback then runs off sst alone).
+WS_TOPICS = "show,cursor"
+if "?" not in WS_URL:
+    WS_URL = f"{WS_URL.rstrip('/')}/?topics={WS_TOPICS}"
+
+# "pcm" (pre-buffered, see pcm_engine) or "ffplay" (a player per track).
+# pcm falls back to ffplay by itself when aplay isn't installed.
+AUDIO_ENGINE = os.environ.get("BYH_AUDIO_ENGINE", "pcm").strip().lower()
+# Head-of-show fallback (no sst): give the decoder this long before the
+# first sample is due.
+HEAD_START_LEAD_S = 1.5
 
 # proto_handler_status values during which a show is arming/counting/running.
 # Leaving this set (STOPPED / ABORTED / None / unload) tears playback down.
@@ -200,12 +240,81 @@ class AudioPlayer:
     def __init__(self):
         self._task = None            # asyncio.Task running the scheduled show
         self._proc = None            # current ffplay subprocess
+        self._session = None         # current pcm_engine.PcmSession
+        self._clock = None           # its ShowClock, fed from the ws feed
         self._scheduled_sst = None   # sst we've already armed a run for
         self._stop = asyncio.Event()
+        self._prefetch_task = None
+        self._prefetch_show = None   # show the cache was last filled for
+        try:
+            self._cache = TrackCache(log=log)
+        except OSError as e:
+            log(f"track cache unavailable ({e}); streaming tracks from the app")
+            self._cache = None
+
+    @staticmethod
+    def _use_pcm():
+        return AUDIO_ENGINE != "ffplay" and shutil.which("aplay") is not None \
+            and shutil.which("ffmpeg") is not None
 
     def is_active(self):
         return self._task is not None and not self._task.done()
 
+    def report_cursor(self, t, ts_ms):
+        if self._clock is not None:
+            self._clock.report(t, ts_ms)
+
+    def set_paused(self, paused):
+        if self._clock is not None and self._clock.paused != paused:
+            self._clock.set_paused(paused)
+
+    def prefetch(self, show_id, manifest=None):
+        """Start copying `show_id`'s tracks into the cache in the background
+        (once per show). Called when a show is loaded, well before it's
+        started."""
+        if self._cache is None or show_id == self._prefetch_show:
+            return
+        if self._prefetch_task is not None and not self._prefetch_task.done():
+            self._prefetch_task.cancel()
+        if manifest is None:
+            if not read_host_audio_config()["enabled"]:
+                return
+            manifest = load_manifest(show_id)
+            if not manifest:
+                return
+        self._prefetch_show = show_id
+        self._prefetch_task = asyncio.create_task(self._prefetch(show_id, manifest["tracks"]))
+
+    async def _prefetch(self, show_id, tracks):
+        urls = [t["url"] for t in tracks]
+        for url in urls:
+            try:
+                await asyncio.to_thread(self._cache.fetch, url, urls)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log(f"show {show_id}: could not cache {url}: {e}")
+                # Try again on the next load / arm.
+                self._prefetch_show = None
+
+    def _localize(self, show_id, manifest):
+        """The manifest with each cached track's url swapped for its local
+        file. Anything not cached yet keeps its url and gets fetched for
+        next time."""
+        if self._cache is None:
+            return manifest
+        tracks = []
+        missing = 0
+        for t in manifest["tracks"]:
+            path = self._cache.lookup(t["url"])
+            if path is None:
+                missing += 1
+            tracks.append({**t, "url": path} if path else t)
+        if missing:
+            log(f"show {show_id}: {missing} track(s) not cached yet; streaming them")
+            self.prefetch(show_id, manifest)
+        return {**manifest, "tracks": tracks}
+
     async def arm(self, sst, show_id):
         """Schedule a full-show playback keyed to `sst` (ms wall-clock)."""
         if self._scheduled_sst == sst and self.is_active():
@@ -217,6 +326,7 @@ class AudioPlayer:
         if not manifest:
             log(f"show {show_id} has no audio tracks; nothing to play")
             return
+        manifest = self._localize(show_id, manifest)
         await self.stop()  # clear any prior run before arming a fresh one
         self._scheduled_sst = sst
         self._stop.clear()
@@ -235,6 +345,7 @@ class AudioPlayer:
         manifest = load_manifest(show_id)
         if not manifest:
             return
+        manifest = self._localize(show_id, manifest)
         log(f"joining running show {show_id} mid-flight; no sst, starting from head")
         self._scheduled_sst = None
         self._stop.clear()
@@ -245,6 +356,8 @@ class AudioPlayer:
     async def stop(self):
         self._scheduled_sst = None
         self._stop.set()
+        if self._session is not None:
+            self._session.stop()
         if self._proc and self._proc.returncode is None:
             try:
                 self._proc.terminate()
@@ -258,6 +371,8 @@ class AudioPlayer:
                 pass
         self._task = None
         self._proc = None
+        self._session = None
+        self._clock = None
 
     async def _run(self, sst, manifest, device_latency_ms, device_id="default"):
         try:
@@ -271,9 +386,23 @@ class AudioPlayer:
                 base_launch_at = (
                     sst - manifest["audioOffsetMs"] - device_latency_ms
                 ) / 1000.0
+            elif self._use_pcm():
+                base_launch_at = time.time() + HEAD_START_LEAD_S
             else:
                 base_launch_at = time.time()
 
+            if self._use_pcm():
+                # Same anchor, continuously: the session follows the show
+                # cursor from sst on (drift, pauses). The head-join
+                # fallback has nothing to line up with, so it runs free.
+                clock = None
+                if sst is not None:
+                    clock = ShowClock(
+                        (manifest["audioOffsetMs"] + device_latency_ms) / 1000.0, sst
+                    )
+                await self._run_pcm(base_launch_at, tracks, device_id, clock)
+                return
+
             # Re-anchor EACH track to base + the sum of prior track durations,
             # so per-track spawn/decode latency doesn't accumulate against the
             # firing clock the way back-to-back launching does. A late track
@@ -319,6 +448,27 @@ class AudioPlayer:
         except Exception as e:  # never let a playback error kill the process
             log(f"playback error: {e}")
 
+    async def _run_pcm(self, anchor, tracks, device_id, clock=None):
+        """Play the soundtrack through pcm_engine with its first sample
+        heard at wall time `anchor`, then kept on `clock`. The session
+        blocks on its own threads (decoder + device writer); stop() reaches
+        it via session.stop()."""
+        session = PcmSession(tracks, device_id, log, clock)
+        self._session = session
+        self._clock = clock
+        log(f"{len(tracks)} track(s) armed; decoding ahead, first sample in "
+            f"{anchor - time.time():.2f}s -> {device_id}")
+        try:
+            result = await asyncio.to_thread(session.play, anchor)
+        finally:
+            session.stop()
+            if self._session is session:
+                self._session = None
+        if result == NO_DEVICE:
+            self._stop.set()
+        elif result == FINISHED:
+            log("soundtrack finished")
+
     def _spawn_args(self, url, device_id, seek_sec=0.0):
         """Command for playing one track, optionally seeking `seek_sec` in.
 
@@ -389,26 +539,85 @@ class AudioPlayer:
 
 
 # --- WebSocket state loop ---------------------------------------------------
+def _unkeyed(obj, key_dict):
+    if isinstance(obj, dict):
+        return {
+            (key_dict[k] if isinstance(k, int) else k): _unkeyed(v, key_dict)
+            for k, v in obj.items()
+        }
+    if isinstance(obj, list):
+        return [_unkeyed(v, key_dict) for v in obj]
+    return obj
+
+
+def decode_frame(frame, key_dict):
+    """One WS frame -> payload dict, or None if there's nothing to act on.
+    Binary frames are msgpack with int keys from the server's key
+    dictionary; `_kd` messages extend our copy of it (`key_dict`)."""
+    try:
+        if isinstance(frame, bytes):
+            data = msgpack.unpackb(frame, raw=False, strict_map_key=False)
+            if isinstance(data, dict) and "_kd" in data:
+                base, keys = data["_kd"]
+                del key_dict[base:]
+                key_dict.extend(keys)
+                return None
+            if key_dict:
+                data = _unkeyed(data, key_dict)
+        else:
+            data = json.loads(frame)
+    except (ValueError, TypeError, IndexError):
+        # msgpack's unpack errors are ValueErrors too.
+        return None
+    return data if isinstance(data, dict) else None
+
+
 async def consume(player):
     prev_status = None
+    prev_show_id = None
     # The reconnecting `async for connection in connect(...)` idiom re-attaches
     # automatically if the ws server bounces; we iterate each connection's
     # frames inside.
+    # max_size is the library default again: show-topic frames are a few
+    # hundred bytes, and even a full legacy payload (a WS_URL with its own
+    # query) is tens of KB. It counts decompressed bytes, so ws_server's
+    # deflate doesn't change the math.
+    subprotocols = [WS_SUBPROTOCOL_MSGPACK] if msgpack is not None else None
     async for connection in websockets.connect(
-        WS_URL, ping_interval=20, ping_timeout=20, max_size=2 ** 22,
+        WS_URL, ping_interval=20, ping_timeout=20, max_size=2 ** 20,
+        subprotocols=subprotocols,
     ):
+        key_dict = []
         async for frame in connection:
-            try:
-                data = json.loads(frame)
-            except (ValueError, TypeError):
+            data = decode_frame(frame, key_dict)
+            if data is None:
                 continue
             if data.get("_hb"):
                 continue  # heartbeat, no fw_state
+            if data.get("_ev"):
+                # cursor topic event: the show position, and the daemon
+                # time it was taken at. Only meaningful once started.
+                t, ts = data.get("fw_cursor"), data.get("fw_cursor_ts")
+                if prev_status == "STARTED" and isinstance(t, (int, float)) and t >= 0 \
+                        and isinstance(ts, (int, float)):
+                    player.report_cursor(t, ts)
+                continue
+            topics = data.get("_topics")
+            if topics is not None and "show" not in topics:
+                continue  # only the cursor snapshot moved
             fw = data.get("fw_state") or {}
             status = fw.get("proto_handler_status")
             sst = fw.get("sst")
             show_id = fw.get("loaded_show_id")
 
+            if show_id is not None and show_id != prev_show_id:
+                # Loaded (or we just connected to a loaded show): get the
+                # music onto local disk before anyone presses start.
+                player.prefetch(show_id)
+            prev_show_id = show_id
+
+            player.set_paused(bool(fw.get("show_paused")))
+
             sst_ok = isinstance(sst, (int, float)) and sst > 0
             if status == "START_CONFIRMED" and sst_ok and show_id is not None:
                 await player.arm(sst, show_id)
@@ -0,0 +1,582 @@
+"""Pre-buffered PCM playback for audio_player.
+
+The ffplay path launches a player per track at the scheduled instant, so
+every track pays for process start, the HTTP fetch, decoder warm-up and
+opening the device, and deviceLatencyMs has to guess at the total. This
+engine does the slow parts up front, during the START_CONFIRMED countdown:
+
+  * ShowDecoder -- one thread running ffmpeg over the show's tracks in
+                   order, appending raw PCM (s16le stereo at SAMPLE_RATE)
+                   to a PcmTimeline. A track with a known durationSec is
+                   padded / trimmed to exactly that many frames, so the
+                   music stays on the timeline the show was built against
+                   (the same re-anchoring the ffplay path does per track).
+                   It runs at most DECODE_AHEAD_S ahead of playback, which
+                   bounds memory (~11 MB per minute of audio).
+  * PcmOutput   -- one aplay process, opened once for the whole show and
+                   fed continuously: silence until the start, then the
+                   timeline, with nothing between tracks. Its pipe and ALSA
+                   buffer are small and fixed, so the delay from writing a
+                   frame to hearing it is a known constant that's taken
+                   off the start time, and the show's first sample goes out
+                   at the frame that lines up with `sst`.
+
+deviceLatencyMs still applies on top, but it now only has to cover the
+sound card and whatever's after it, not process and network startup.
+
+Once it's running, the stream follows the show instead of free-running
+off the start instant. A ShowClock holds the daemon's latest time cursor
+(show position, pauses excluded) and extrapolates it; before each block
+the writer compares the soundtrack position it's about to write with
+where the show will be when that block is heard:
+
+  * a small, steady error (the sound card's clock against the Pi's) is
+    walked off by playing blocks STRETCH_FRAMES longer or shorter -- a
+    resample of a fraction of a percent, which nobody hears;
+  * a big one (missed cursor jump, decoder underrun, the tail end of a
+    pause) that persists for a few blocks is fixed at once: hold with
+    silence when the music is ahead, skip when it's behind;
+  * while the show is paused the stream holds on silence, keeping the
+    device open, and picks up where it left off on resume.
+
+Needs ffmpeg and aplay (alsa-utils), both in the image; audio_player
+falls back to the ffplay path when aplay isn't there.
+"""
+
+import collections
+import os
+import subprocess
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; the pipe just keeps its default size
+    fcntl = None
+
+# Optional: smooth resampling for drift correction. Without it a stretched
+# block repeats / drops single frames instead.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SAMPLE_RATE = int(os.environ.get("BYH_AUDIO_SAMPLE_RATE", "48000"))
+CHANNELS = 2
+BYTES_PER_FRAME = 2 * CHANNELS
+BLOCK_FRAMES = 1024  # ~21 ms per write at 48 kHz
+BLOCK_BYTES = BLOCK_FRAMES * BYTES_PER_FRAME
+DECODE_AHEAD_S = float(os.environ.get("BYH_AUDIO_DECODE_AHEAD_S", "180"))
+# aplay's ALSA buffer. Smaller is a tighter start but less slack for a
+# busy Pi to keep it fed; 100 ms has been plenty with the writer on its
+# own thread.
+ALSA_BUFFER_US = int(os.environ.get("BYH_AUDIO_BUFFER_US", "100000"))
+# Shrink the pipe to aplay from the default 64 KB (~340 ms of audio) so
+# it doesn't dominate the output delay. Linux only.
+PIPE_BYTES = 16384
+F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ", 1031)
+F_GETPIPE_SZ = getattr(fcntl, "F_GETPIPE_SZ", 1032)
+DEFAULT_PIPE_BYTES = 65536
+# How long the writer waits on the decoder before covering the gap with
+# silence (and dropping as much audio later, to stay on the clock).
+UNDERRUN_WAIT_S = 0.05
+READ_CHUNK = 65536
+
+# Drift correction (see the module docstring). Errors are soundtrack
+# position minus show position, in seconds.
+DRIFT_SOFT_S = float(os.environ.get("BYH_AUDIO_DRIFT_SOFT_MS", "15")) / 1000.0
+DRIFT_HARD_S = float(os.environ.get("BYH_AUDIO_DRIFT_HARD_MS", "120")) / 1000.0
+DRIFT_EMA_ALPHA = 0.05   # per block: smooths ~1 s of cursor / scheduling jitter
+HARD_CONFIRM_BLOCKS = 8  # ~170 ms of a big error before jumping
+STRETCH_FRAMES = 2       # per 1024-frame block: 0.2%, ~2 ms/s of correction
+
+BUSY_RETRIES = 2
+BUSY_BACKOFF_S = 0.5
+NO_DEVICE_MARKERS = (
+    "audio open error", "no such file or directory", "no such device",
+    "cannot open slave", "unknown pcm", "invalid argument",
+)
+
+# PcmSession.play() outcomes.
+FINISHED = "finished"
+STOPPED = "stopped"
+NO_DEVICE = "no_device"
+
+
+def seconds_to_frames(seconds):
+    return int(round(seconds * SAMPLE_RATE))
+
+
+def stretch_block(data, out_frames):
+    """Resample one block of frames to `out_frames` frames."""
+    n = len(data) // BYTES_PER_FRAME
+    if n < 2 or out_frames == n:
+        return data
+    if np is not None:
+        src = np.frombuffer(data, dtype="<i2").reshape(n, CHANNELS).astype(np.float32)
+        x = np.linspace(0.0, n - 1, out_frames)
+        xp = np.arange(n)
+        out = np.empty((out_frames, CHANNELS), dtype=np.float32)
+        for c in range(CHANNELS):
+            out[:, c] = np.interp(x, xp, src[:, c])
+        return np.round(out).astype("<i2").tobytes()
+    frames = [data[i * BYTES_PER_FRAME:(i + 1) * BYTES_PER_FRAME] for i in range(n)]
+    return b"".join(frames[i * n // out_frames] for i in range(out_frames))
+
+
+class ShowClock:
+    """Where the soundtrack should be, from the daemon's show cursor.
+    Written from the player's event loop, read by the output thread."""
+
+    def __init__(self, lead_s, sst_ms=None):
+        # Soundtrack position = show position + lead_s (the show's audio
+        # offset plus deviceLatencyMs, same as the start anchor).
+        self.lead_s = lead_s
+        self._lock = threading.Lock()
+        self._t = 0.0
+        # Until the first cursor report the show is assumed to run from sst.
+        self._at = sst_ms / 1000.0 if sst_ms else None
+        self.paused = False
+
+    def report(self, t, ts_ms):
+        """The daemon's cursor `t` (show seconds), sampled at `ts_ms`."""
+        with self._lock:
+            self._t, self._at = float(t), ts_ms / 1000.0
+
+    def set_paused(self, paused):
+        with self._lock:
+            if paused != self.paused and self._at is not None:
+                # Pause: freeze at the extrapolated position. Resume: carry
+                # on from it. The daemon reports its own cursor at both, and
+                # that pins it exactly.
+                now = time.time()
+                if paused:
+                    self._t += max(0.0, now - self._at)
+                self._at = now
+            self.paused = paused
+
+    def target(self, at):
+        """Soundtrack seconds that should be heard at wall time `at`, or
+        None with nothing to go on."""
+        with self._lock:
+            if self._at is None:
+                return None
+            if self.paused:
+                return self._t + self.lead_s
+            return self._t + max(0.0, at - self._at) + self.lead_s
+
+
+class PcmTimeline:
+    """Decoded show audio on its way from the decoder thread to the output
+    thread: a FIFO of byte chunks, always whole frames."""
+
+    def __init__(self, ahead_frames):
+        self._chunks = collections.deque()
+        self._head = 0      # read offset into _chunks[0]
+        self._buffered = 0  # bytes
+        self._ahead = max(BLOCK_BYTES, ahead_frames * BYTES_PER_FRAME)
+        self._done = False
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def append(self, data):
+        """Decoder side. Blocks while DECODE_AHEAD_S is already buffered;
+        False once the session is closed."""
+        with self._cond:
+            while self._buffered >= self._ahead and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return False
+            self._chunks.append(data)
+            self._buffered += len(data)
+            self._cond.notify_all()
+            return True
+
+    def finish(self):
+        with self._cond:
+            self._done = True
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._chunks.clear()
+            self._buffered = 0
+            self._cond.notify_all()
+
+    def read(self, nbytes, timeout=None):
+        """Up to `nbytes` of audio. b"" at the end of the show (or once
+        closed); None if nothing turned up within `timeout`."""
+        with self._cond:
+            ready = self._cond.wait_for(
+                lambda: self._buffered or self._done or self._closed, timeout
+            )
+            if not ready:
+                return None
+            out = bytearray()
+            while self._chunks and len(out) < nbytes:
+                chunk = self._chunks[0]
+                take = chunk[self._head:self._head + nbytes - len(out)]
+                out += take
+                self._head += len(take)
+                if self._head >= len(chunk):
+                    self._chunks.popleft()
+                    self._head = 0
+            self._buffered -= len(out)
+            self._cond.notify_all()
+            return bytes(out)
+
+    def skip(self, frames, timeout=None):
+        """Drop up to `frames` frames; returns how many were dropped."""
+        dropped = 0
+        while dropped < frames:
+            want = min(READ_CHUNK, (frames - dropped) * BYTES_PER_FRAME)
+            data = self.read(want, timeout)
+            if not data:
+                break
+            dropped += len(data) // BYTES_PER_FRAME
+        return dropped
+
+
+class ShowDecoder(threading.Thread):
+    """Decodes the show's tracks, starting `start_frame` frames into the
+    soundtrack, onto a PcmTimeline."""
+
+    def __init__(self, tracks, start_frame, timeline, log):
+        super().__init__(daemon=True, name="pcm-decoder")
+        self.tracks = tracks
+        self.start_frame = start_frame
+        self.timeline = timeline
+        self.log = log
+        self._proc = None
+        self._stopped = False
+
+    def stop(self):
+        self._stopped = True
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+
+    def run(self):
+        try:
+            skip = self.start_frame
+            for idx, track in enumerate(self.tracks):
+                if self._stopped:
+                    return
+                dur = track.get("durationSec")
+                length = seconds_to_frames(dur) if dur else None
+                if length is not None:
+                    if skip >= length:
+                        skip -= length
+                        continue
+                    # Known length: seek straight to the spot, and pad or
+                    # trim the rest of the track to exactly its duration.
+                    ok = self._decode(idx, track["url"], skip, 0, length - skip) is not None
+                    skip = 0
+                else:
+                    # Unknown length: the only way to find where the skip
+                    # lands is to decode from the head and drop.
+                    decoded = self._decode(idx, track["url"], 0, skip, None)
+                    ok = decoded is not None
+                    skip -= min(skip, decoded or 0)
+                if not ok:
+                    return
+        except Exception as e:
+            self.log(f"decoder error: {e}")
+        finally:
+            self.timeline.finish()
+
+    def _decode(self, idx, source, seek_frames, drop_frames, length):
+        """Append one track: `seek_frames` in (an ffmpeg input seek, which
+        is sample-accurate when decoding), minus a further `drop_frames`,
+        then exactly `length` frames when it's known. Returns the frames
+        ffmpeg produced, or None if the session was closed under us."""
+        args = ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error"]
+        if seek_frames:
+            args += ["-ss", f"{seek_frames / SAMPLE_RATE:.6f}"]
+        args += [
+            "-i", source, "-vn", "-f", "s16le", "-acodec", "pcm_s16le",
+            "-ac", str(CHANNELS), "-ar", str(SAMPLE_RATE), "pipe:1",
+        ]
+        t0 = time.monotonic()
+        self._proc = proc = subprocess.Popen(
+            args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        produced = 0
+        emitted = 0
+        carry = b""
+        try:
+            while True:
+                data = proc.stdout.read(READ_CHUNK)
+                if not data:
+                    break
+                if carry:
+                    data = carry + data
+                whole = len(data) - len(data) % BYTES_PER_FRAME
+                data, carry = data[:whole], data[whole:]
+                frames = whole // BYTES_PER_FRAME
+                produced += frames
+                if drop_frames:
+                    cut = min(drop_frames, frames)
+                    data = data[cut * BYTES_PER_FRAME:]
+                    drop_frames -= cut
+                if length is not None:
+                    data = data[:(length - emitted) * BYTES_PER_FRAME]
+                if data:
+                    if not self.timeline.append(data):
+                        return None
+                    emitted += len(data) // BYTES_PER_FRAME
+                if length is not None and emitted >= length:
+                    break  # durationSec says the track is over
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            err = proc.stderr.read().decode(errors="replace").strip()
+            proc.wait()
+            self._proc = None
+        if self._stopped:
+            return None
+        if err and (length is None or emitted < length):
+            self.log(f"track {idx + 1} decode problem: {err[:200]}")
+        if length is not None and emitted < length:
+            # Short decode (or a failed fetch): hold the track's slot with
+            # silence so every later track still lands on time.
+            if not self._pad(length - emitted):
+                return None
+        self.log(f"track {idx + 1}/{len(self.tracks)} decoded "
+                 f"({produced / SAMPLE_RATE:.1f}s in {time.monotonic() - t0:.1f}s)")
+        return produced
+
+    def _pad(self, frames):
+        while frames > 0:
+            n = min(frames, READ_CHUNK // BYTES_PER_FRAME)
+            if not self.timeline.append(bytes(n * BYTES_PER_FRAME)):
+                return False
+            frames -= n
+        return True
+
+
+class PcmOutput:
+    """One aplay process on `device_id`, written from the calling thread."""
+
+    def __init__(self, device_id, log):
+        self.device_id = device_id or "default"
+        self.log = log
+        self._proc = None
+        self._stopped = False
+        self.latency_s = 0.0
+
+    def _args(self):
+        return [
+            "aplay", "-q", "-D", self.device_id, "-t", "raw", "-f", "S16_LE",
+            "-c", str(CHANNELS), "-r", str(SAMPLE_RATE), "-B", str(ALSA_BUFFER_US),
+        ]
+
+    def open(self):
+        self._proc = subprocess.Popen(
+            self._args(), stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE, bufsize=0,
+        )
+        pipe_bytes = DEFAULT_PIPE_BYTES
+        if fcntl is not None:
+            try:
+                fcntl.fcntl(self._proc.stdin.fileno(), F_SETPIPE_SZ, PIPE_BYTES)
+                pipe_bytes = fcntl.fcntl(self._proc.stdin.fileno(), F_GETPIPE_SZ)
+            except OSError:
+                pass
+        # Once the pipe and ALSA's buffer are full, a frame written now is
+        # heard after both have drained ahead of it.
+        self.latency_s = pipe_bytes / BYTES_PER_FRAME / SAMPLE_RATE + ALSA_BUFFER_US / 1e6
+
+    def write(self, data):
+        self._proc.stdin.write(data)
+
+    def failure(self):
+        """aplay's complaint after a broken pipe."""
+        proc = self._proc
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        return proc.stderr.read().decode(errors="replace").strip()
+
+    def drain(self):
+        """End of the show: let aplay play out what it has, then exit."""
+        proc = self._proc
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        try:
+            proc.wait(timeout=self.latency_s + 5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    def close(self):
+        self._stopped = True
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+
+class PcmSession:
+    """One show's playback: decoder + output, started by play()."""
+
+    def __init__(self, tracks, device_id, log, clock=None):
+        self.tracks = tracks
+        self.device_id = device_id or "default"
+        self.log = log
+        self.clock = clock
+        self.timeline = None
+        self.decoder = None
+        self.output = None
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Safe from any thread; play() returns STOPPED shortly after."""
+        self._stop.set()
+        if self.timeline is not None:
+            self.timeline.close()
+        if self.decoder is not None:
+            self.decoder.stop()
+        if self.output is not None:
+            self.output.close()
+
+    def play(self, anchor, preroll_s=1.0):
+        """Blocking. Plays the soundtrack so its frame 0 is heard at wall
+        time `anchor` (seconds; already shifted by the show's audio offset
+        and deviceLatencyMs). If that's already past, the decoder starts
+        `preroll_s` ahead of the current position so the stream can still
+        come in on an exact frame."""
+        late_s = time.time() - anchor
+        start_frame = seconds_to_frames(late_s + preroll_s) if late_s > 0 else 0
+        self.timeline = PcmTimeline(seconds_to_frames(DECODE_AHEAD_S))
+        self.decoder = ShowDecoder(self.tracks, start_frame, self.timeline, self.log)
+        self.decoder.start()
+        if start_frame:
+            self.log(f"late by {late_s:.2f}s; starting the stream "
+                     f"{start_frame / SAMPLE_RATE:.2f}s in")
+        # Frame 0 of the timeline is frame `start_frame` of the soundtrack.
+        first_at = anchor + start_frame / SAMPLE_RATE
+        try:
+            for attempt in range(BUSY_RETRIES + 1):
+                result = self._stream(first_at, start_frame)
+                if result != "busy":
+                    return result
+                if attempt < BUSY_RETRIES:
+                    self.log(f"audio device '{self.device_id}' busy; retry "
+                             f"{attempt + 1}/{BUSY_RETRIES} in {BUSY_BACKOFF_S}s")
+                    if self._stop.wait(BUSY_BACKOFF_S):
+                        return STOPPED
+            return NO_DEVICE
+        finally:
+            self.stop()
+
+    def _stream(self, first_at, start_frame):
+        self.output = output = PcmOutput(self.device_id, self.log)
+        if self._stop.is_set():
+            return STOPPED
+        output.open()
+        started = False
+        pos = start_frame  # soundtrack frame the next write starts with
+        debt = 0           # underrun silence to make up for, without a clock
+        hold = 0           # frames of silence still to write (music ahead)
+        ema = None
+        over = 0           # consecutive blocks with a hard-sized error
+        correcting = False
+        paused = False
+        clock = self.clock
+        silence = bytes(BLOCK_BYTES)
+        try:
+            while not self._stop.is_set():
+                if not started:
+                    # Fill the device with silence until the block about to
+                    # be written is the one the first frame belongs in.
+                    lead = seconds_to_frames(first_at - time.time() - output.latency_s)
+                    if lead >= BLOCK_FRAMES:
+                        output.write(silence)
+                        continue
+                    if lead > 0:
+                        output.write(silence[:lead * BYTES_PER_FRAME])
+                    elif lead < 0:
+                        pos += self.timeline.skip(-lead)
+                    started = True
+                    self.log(f"stream started on '{self.device_id}' "
+                             f"({output.latency_s * 1000:.0f}ms output delay"
+                             f"{f', {-lead / SAMPLE_RATE:.3f}s late' if lead < 0 else ''})")
+                    continue
+                if clock is not None and clock.paused != paused:
+                    paused = clock.paused
+                    self.log(f"show {'paused; holding' if paused else 'resumed'} "
+                             f"at {pos / SAMPLE_RATE:.2f}s")
+                    ema, over = None, 0
+                if paused or hold:
+                    n = BLOCK_FRAMES if paused else min(hold, BLOCK_FRAMES)
+                    output.write(silence[:n * BYTES_PER_FRAME])
+                    if not paused:
+                        hold -= n
+                    continue
+
+                # What's written now is heard output.latency_s from now.
+                target = clock.target(time.time() + output.latency_s) if clock else None
+                stretch = 0
+                if target is not None:
+                    err = pos / SAMPLE_RATE - target
+                    over = over + 1 if abs(err) > DRIFT_HARD_S else 0
+                    if over >= HARD_CONFIRM_BLOCKS:
+                        if err > 0:
+                            hold = seconds_to_frames(err)
+                        else:
+                            pos += self.timeline.skip(seconds_to_frames(-err))
+                        self.log(f"{'ahead of' if err > 0 else 'behind'} the show by "
+                                 f"{abs(err) * 1000:.0f}ms; {'holding' if err > 0 else 'skipping'}")
+                        ema, over, correcting = None, 0, False
+                        continue
+                    ema = err if ema is None else ema + DRIFT_EMA_ALPHA * (err - ema)
+                    if abs(ema) > DRIFT_SOFT_S:
+                        correcting = True
+                    elif abs(ema) < DRIFT_SOFT_S / 3:
+                        correcting = False
+                    if correcting:
+                        # Ahead: spread this block over more frames (play
+                        # it slower); behind: fewer.
+                        stretch = STRETCH_FRAMES if ema > 0 else -STRETCH_FRAMES
+                elif debt:
+                    skipped = self.timeline.skip(debt, UNDERRUN_WAIT_S)
+                    debt -= skipped
+                    pos += skipped
+
+                data = self.timeline.read(BLOCK_BYTES, UNDERRUN_WAIT_S)
+                if data is None:
+                    # Decoder behind: cover with silence. The clock check
+                    # catches the music up afterwards; without one, drop
+                    # the same amount once audio is back.
+                    output.write(silence)
+                    if target is None:
+                        debt += BLOCK_FRAMES
+                    continue
+                if not data:
+                    output.drain()
+                    return FINISHED
+                frames = len(data) // BYTES_PER_FRAME
+                if stretch:
+                    data = stretch_block(data, frames + stretch)
+                output.write(data)
+                pos += frames
+            return STOPPED
+        except (BrokenPipeError, ValueError):
+            # ValueError: stop() closed the pipe under a write.
+            if self._stop.is_set():
+                return STOPPED
+            detail = output.failure()
+            low = detail.lower()
+            if "busy" in low and not started:
+                return "busy"
+            if any(m in low for m in NO_DEVICE_MARKERS):
+                self.log(f"cannot open audio output '{self.device_id}' ({detail[:160]})")
+            else:
+                self.log(f"audio output stopped: {detail[:200] or '(no detail)'}")
+            return NO_DEVICE
+        finally:
+            output.close()
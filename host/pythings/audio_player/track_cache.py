@@ -0,0 +1,205 @@
+"""Local copy of show soundtracks for audio_player.
+
+Playing straight off APP_URL/api/shows/audio/<file> (or a cloud URL) means
+every run re-downloads the music, playback depends on the app server and
+the network being quick at the worst possible moment, and a seek after a
+reconnect re-opens the HTTP stream. Instead, tracks are fetched into
+TRACK_CACHE_DIR as soon as a show is loaded and played from disk, where a
+seek is just a file offset.
+
+Layout:
+
+    <TRACK_CACHE_DIR>/objects/<sha256>   track bytes, named by their hash, so
+                                         two URLs with the same file share one
+                                         copy
+    <TRACK_CACHE_DIR>/index.json         url -> {sha256, size, last_used}
+
+Entries are keyed by the URL without its query string: cloud URLs are
+signed, and the signature changes every time the app hands one out.
+Uploads get a unique (timestamped) name, so the bytes behind a URL never
+change and a cached track is used as-is, with no revalidation -- which is
+also what lets a show play with the network down.
+
+The cache is capped at TRACK_CACHE_MAX_MB; past that the least recently
+used objects go first, never one the current show needs.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+_DATA_DIR = os.environ.get("BYH_DATA_DIR", "/data")
+TRACK_CACHE_DIR = os.environ.get("BYH_AUDIO_CACHE_DIR", os.path.join(_DATA_DIR, "audio_cache"))
+TRACK_CACHE_MAX_MB = float(os.environ.get("BYH_AUDIO_CACHE_MAX_MB", "2048"))
+FETCH_TIMEOUT_S = 30
+CHUNK = 1 << 16
+
+
+def cache_key(url):
+    parts = urllib.parse.urlsplit(url)
+    return urllib.parse.urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+
+
+class TrackCache:
+    def __init__(self, root=TRACK_CACHE_DIR, max_bytes=TRACK_CACHE_MAX_MB * 1024 * 1024, log=print):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_path = os.path.join(root, "index.json")
+        self.max_bytes = max_bytes
+        self.log = log
+        self._lock = threading.Lock()        # index
+        self._fetch_lock = threading.Lock()  # one download at a time
+        self._index = {}
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._load()
+
+    # ----- index ------------------------------------------------------------
+    def _object_path(self, sha):
+        return os.path.join(self.objects_dir, sha)
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            index = {}
+        except (OSError, ValueError) as e:
+            self.log(f"track cache index unreadable ({e}); starting empty")
+            index = {}
+        # Drop entries whose object is gone, and objects (or leftover
+        # partial downloads) nothing points at.
+        self._index = {
+            k: v for k, v in index.items()
+            if isinstance(v, dict) and os.path.exists(self._object_path(v.get("sha256", "")))
+        }
+        live = {v["sha256"] for v in self._index.values()}
+        for name in os.listdir(self.objects_dir):
+            if name not in live:
+                try:
+                    os.remove(self._object_path(name))
+                except OSError:
+                    pass
+
+    def _save(self):
+        """Caller holds _lock."""
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=".index.", suffix=".tmp", dir=self.root)
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._index, f)
+            os.replace(tmp_path, self.index_path)
+            tmp_path = None
+        except OSError as e:
+            self.log(f"track cache index write failed: {e}")
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    # ----- lookups ----------------------------------------------------------
+    def lookup(self, url, touch=True):
+        """Local path for `url` if it's cached, else None."""
+        key = cache_key(url)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            path = self._object_path(entry["sha256"])
+            if not os.path.exists(path):
+                del self._index[key]
+                self._save()
+                return None
+            if touch:
+                entry["last_used"] = time.time()
+                self._save()
+            return path
+
+    def fetch(self, url, pin=()):
+        """Local path for `url`, downloading it first if needed. Raises on
+        a failed download. `pin` is urls eviction mustn't touch."""
+        path = self.lookup(url)
+        if path is not None:
+            return path
+        with self._fetch_lock:
+            path = self.lookup(url)  # another caller got there first
+            if path is not None:
+                return path
+            path = self._download(url)
+        self.evict(pin=set(pin) | {url})
+        return path
+
+    def _download(self, url):
+        t0 = time.monotonic()
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(prefix=".fetch.", suffix=".tmp", dir=self.objects_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                with urllib.request.urlopen(url, timeout=FETCH_TIMEOUT_S) as resp:
+                    while True:
+                        chunk = resp.read(CHUNK)
+                        if not chunk:
+                            break
+                        digest.update(chunk)
+                        f.write(chunk)
+                        size += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            sha = digest.hexdigest()
+            path = self._object_path(sha)
+            if os.path.exists(path):
+                os.remove(tmp_path)  # same bytes as another URL: share it
+            else:
+                os.replace(tmp_path, path)
+            tmp_path = None
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        with self._lock:
+            self._index[cache_key(url)] = {"sha256": sha, "size": size, "last_used": time.time()}
+            self._save()
+        self.log(f"cached {url.rsplit('/', 1)[-1].split('?')[0]} "
+                 f"({size / 1e6:.1f} MB in {time.monotonic() - t0:.1f}s)")
+        return path
+
+    def evict(self, pin=()):
+        """Drop least-recently-used objects until the cache fits in
+        max_bytes, keeping anything `pin` (urls) refers to."""
+        pinned = {cache_key(u) for u in pin}
+        with self._lock:
+            # Objects can be shared: an object's recency is its most
+            # recently used entry, and it's pinned if any entry is.
+            objects = {}
+            for key, entry in self._index.items():
+                obj = objects.setdefault(entry["sha256"], {"size": entry["size"], "last_used": 0, "pinned": False, "keys": []})
+                obj["last_used"] = max(obj["last_used"], entry.get("last_used", 0))
+                obj["pinned"] = obj["pinned"] or key in pinned
+                obj["keys"].append(key)
+            total = sum(o["size"] for o in objects.values())
+            if total <= self.max_bytes:
+                return
+            evicted = 0
+            for sha, obj in sorted(objects.items(), key=lambda kv: kv[1]["last_used"]):
+                if total <= self.max_bytes:
+                    break
+                if obj["pinned"]:
+                    continue
+                try:
+                    os.remove(self._object_path(sha))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    self.log(f"track cache: could not evict {sha[:12]}: {e}")
+                    continue
+                for key in obj["keys"]:
+                    del self._index[key]
+                total -= obj["size"]
+                evicted += 1
+            if evicted:
+                self._save()
+                self.log(f"track cache: evicted {evicted} track(s); "
+                         f"{total / 1e6:.0f} MB of {self.max_bytes / 1e6:.0f} MB in use")
@@ -3,6 +3,8 @@ import board
 import neopixel_spi
 import os
 import json
+import select
+import socket
 
 # LED positions
 DAEMON_ACT_POS = 0
@@ -36,8 +38,28 @@ RAINBOW_COLORS = [
     (0, 255, 0), (0, 0, 255), (75, 0, 130), (148, 0, 211)
 ]
 
+# The host side of pc_daemon's /data mount
+DATA_DIR = os.environ.get("BYH_DATA_DIR", "/home/jeezy/proj/firework/host/data")
+
 # LED state file
-LED_STATE_FILE = "/home/jeezy/proj/firework/host/data/ledstate"
+LED_STATE_FILE = os.path.join(DATA_DIR, "ledstate")
+
+# pc_daemon pushes every LED state change as a datagram to this socket
+# once we've bound it, and only rewrites LED_STATE_FILE when nobody is
+# listening (or the push couldn't be delivered). It sits in the data dir
+# because that's the one directory we share with the daemon's container.
+# Must match LED_SOCKET_PATH in pc_daemon.
+LED_SOCKET_PATH = os.path.join(DATA_DIR, "byh_led.sock")
+# How often we stat LED_STATE_FILE to catch the daemon's file fallback.
+# The file is only re-read when its mtime moves.
+FILE_CHECK_INTERVAL_S = 0.5
+
+# Animation clock. Blinks and pulses are worked out from the time, so the
+# strip only needs re-evaluating once per tick while something animates;
+# when nothing does we just sleep until the daemon sends a change.
+ANIM_TICK_S = 0.05
+PULSE_STEPS = 20      # show running: green pulse, one step per tick
+ARM_PULSE_STEPS = 40  # armed: slower red pulse
 
 # Initialize NeoPixel strip
 pixels = neopixel_spi.NeoPixel_SPI(SPI_PORT, NUM_PIXELS, pixel_order=neopixel_spi.RGB, auto_write=False)
@@ -53,11 +75,94 @@ def clear_pixels():
     pixels.fill(COLORS["off"])
     pixels.show()
 
-def run_sweep():
+def bind_led_socket():
+    """Bind LED_SOCKET_PATH for the daemon's pushes; None if we can't, in
+    which case the daemon keeps writing LED_STATE_FILE and we watch that."""
+    try:
+        if os.path.exists(LED_SOCKET_PATH):
+            os.unlink(LED_SOCKET_PATH)
+    except OSError:
+        pass
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        sock.bind(LED_SOCKET_PATH)
+        try:
+            os.chmod(LED_SOCKET_PATH, 0o666)
+        except OSError:
+            pass
+        return sock
+    except Exception as e:
+        print(f"LED socket bind failed (falling back to {LED_STATE_FILE}): {e}")
+        return None
+
+def wait_for_push(sock, timeout):
+    """Sleep up to `timeout` seconds, waking early if a push arrives."""
+    timeout = max(0.0, timeout)
+    if sock is None:
+        time.sleep(timeout)
+        return False
+    readable, _, _ = select.select([sock], [], [], timeout)
+    return bool(readable)
+
+def read_socket(sock):
+    """Newest state queued on the socket, or None. Every datagram is a
+    full snapshot, so anything older than the last one can be dropped."""
+    state = None
+    if sock is None:
+        return state
+    while True:
+        try:
+            data = sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return state
+        try:
+            state = json.loads(data)
+        except ValueError:
+            print(f"Ignoring malformed LED datagram ({len(data)} bytes)")
+
+def read_state_file(last_mtime):
+    """(state, mtime) if LED_STATE_FILE changed since `last_mtime`, else
+    (None, last_mtime)."""
+    try:
+        mtime = os.stat(LED_STATE_FILE).st_mtime_ns
+    except OSError:
+        return None, last_mtime
+    if mtime == last_mtime:
+        return None, last_mtime
+    try:
+        with open(LED_STATE_FILE, "r") as f:
+            return json.load(f), mtime
+    except (OSError, ValueError):
+        # Caught mid-write; try again on the next check.
+        return None, last_mtime
+
+def is_newer(new_state, state):
+    """Whether a snapshot from LED_STATE_FILE should replace `state`.
+
+    pc_daemon stamps each snapshot with its start time (_boot) and a
+    running count (_seq). A push that fell back to the file can be
+    overtaken by the next one over the socket, and the file must not then
+    put the older state back. Socket datagrams arrive in order and are
+    always live, so they're applied as they come."""
+    if "_seq" not in new_state:
+        return True  # unstamped (older daemon): newest read wins, as before
+    return (new_state.get("_boot", 0), new_state["_seq"]) > (state.get("_boot", 0), state.get("_seq", 0))
+
+def run_sweep(sock):
+    """Rainbow sweep until the daemon sends its first state.
+
+    Returns (state, file_mtime)."""
     direction = 1
     position = 0
     current_color_index = 0
-    while not os.path.exists(LED_STATE_FILE):
+    while True:
+        state = read_socket(sock)
+        if state is not None:
+            return state, None
+        state, file_mtime = read_state_file(None)
+        if state is not None:
+            return state, file_mtime
         pixels.fill(COLORS["off"])
         for trail in range(6):
             trail_position = position - trail * direction
@@ -69,122 +174,157 @@ def run_sweep():
             direction *= -1
             position += direction
             current_color_index = (current_color_index + 1) % len(RAINBOW_COLORS)
-        time.sleep(0.025)
+        wait_for_push(sock, 0.025)
+
+def pulse_scale(step, steps):
+    half = steps // 2
+    return step / half if step <= half else (steps - step) / half
+
+# Brightness-adjusted colors and the pulse ramps built from them. Only
+# rebuilt when led_brightness changes, not on every frame.
+palette = None
+palette_brightness = None
 
-# Timing variables for animations
-last_update_time = time.time()
-pulse_step = 0
-blink_state = False
-arm_pulse_step = 0
-arm_last_update_time = time.time()
+def get_palette(brightness):
+    global palette, palette_brightness
+    if palette is None or brightness != palette_brightness:
+        colors = {key: adjust_brightness(value, brightness) for key, value in COLORS.items()}
+        palette = {
+            "colors": colors,
+            "run_pulse": [fade_color(colors["green"], pulse_scale(i, PULSE_STEPS)) for i in range(PULSE_STEPS)],
+            "arm_pulse": [fade_color(colors["red"], pulse_scale(i, ARM_PULSE_STEPS)) for i in range(ARM_PULSE_STEPS)],
+        }
+        palette_brightness = brightness
+    return palette
 
-def apply_led_states(state, current_time):
-    global pulse_step, blink_state, last_update_time, arm_pulse_step, arm_last_update_time
+def blink(current_time, period):
+    """Toggles every `period` seconds."""
+    return int(current_time / period) % 2 == 1
 
-    brightness = state.get("led_brightness", 100)
+def render_frame(state, current_time):
+    """What every pixel should show right now.
 
-    # Create a brightness-adjusted copy of COLORS
-    adjusted_colors = {key: adjust_brightness(value, brightness) for key, value in COLORS.items()}
+    Returns (frame, animating): `animating` says whether the frame will
+    change with time alone, i.e. whether the animation clock has to keep
+    ticking."""
+    p = get_palette(state.get("led_brightness", 100))
+    adjusted_colors = p["colors"]
+    tick = int(current_time / ANIM_TICK_S)
+    frame = [adjusted_colors["off"]] * NUM_PIXELS
+    animating = False
 
-    pixels[DAEMON_ACT_POS] = adjusted_colors["green"] if state.get("daemon_act") == 1 else adjusted_colors["off"]
+    frame[DAEMON_ACT_POS] = adjusted_colors["green"] if state.get("daemon_act") == 1 else adjusted_colors["off"]
 
-    web_act_state = state.get("web_act_state", 0) 
-    pixels[WEB_ACT_POS] = adjusted_colors["green"] if web_act_state == 1 else \
-                          adjusted_colors["yellow"] if web_act_state == 2 else \
-                          adjusted_colors["red"] if web_act_state == 3 else \
-                          adjusted_colors["off"]
+    web_act_state = state.get("web_act_state", 0)
+    frame[WEB_ACT_POS] = adjusted_colors["green"] if web_act_state == 1 else \
+                         adjusted_colors["yellow"] if web_act_state == 2 else \
+                         adjusted_colors["red"] if web_act_state == 3 else \
+                         adjusted_colors["off"]
 
-    pixels[TX_ACTIVE_POS] = adjusted_colors["yellow"] if state.get("tx_active") == 1 else \
-                          adjusted_colors["green"] if state.get("tx_active") == 2 else \
-                          adjusted_colors["red"] if state.get("tx_active") == 3 else \
-                          adjusted_colors["off"]
+    frame[TX_ACTIVE_POS] = adjusted_colors["yellow"] if state.get("tx_active") == 1 else \
+                           adjusted_colors["green"] if state.get("tx_active") == 2 else \
+                           adjusted_colors["red"] if state.get("tx_active") == 3 else \
+                           adjusted_colors["off"]
 
     show_load_state = state.get("show_load_state", 0)
-    pixels[SHOW_LOADED_POS] = adjusted_colors["green"] if show_load_state == 1 else \
-                               adjusted_colors["yellow"] if show_load_state == 2 else \
-                               adjusted_colors["red"] if show_load_state == 3 else \
-                               adjusted_colors["off"]
+    frame[SHOW_LOADED_POS] = adjusted_colors["green"] if show_load_state == 1 else \
+                             adjusted_colors["yellow"] if show_load_state == 2 else \
+                             adjusted_colors["red"] if show_load_state == 3 else \
+                             adjusted_colors["off"]
 
     show_run_state = state.get("show_run_state", 0)
     if show_run_state == 1:  # Pulsing green - running
-        time_since_last_update = current_time - last_update_time
-        if time_since_last_update > 0.05:  # Adjust timing for smooth animation
-            pulse_step = (pulse_step + 1) % 20  # Pulse cycle length
-            scale = pulse_step / 10 if pulse_step <= 10 else (20 - pulse_step) / 10
-            pixels[SHOW_RUNNING_POS] = fade_color(adjusted_colors["green"], scale)
-            last_update_time = current_time
-
+        frame[SHOW_RUNNING_POS] = p["run_pulse"][tick % PULSE_STEPS]
+        animating = True
     elif show_run_state == 2:  # Manual Fire
-        time_since_last_update = current_time - last_update_time
-        if time_since_last_update > 0.5:  # Toggle every 0.5 seconds
-            blink_state = not blink_state
-            pixels[SHOW_RUNNING_POS] = adjusted_colors["yellow"] if blink_state else adjusted_colors["off"]
-            last_update_time = current_time
+        frame[SHOW_RUNNING_POS] = adjusted_colors["yellow"] if blink(current_time, 0.5) else adjusted_colors["off"]
+        animating = True
     elif show_run_state == 3:  # Stopped
-        pixels[SHOW_RUNNING_POS] = adjusted_colors["red"]
+        frame[SHOW_RUNNING_POS] = adjusted_colors["red"]
     elif show_run_state == 4:  # Paused
-        pixels[SHOW_RUNNING_POS] = adjusted_colors["purple"]
+        frame[SHOW_RUNNING_POS] = adjusted_colors["purple"]
     elif show_run_state == 5:  # Armed
-        pixels[SHOW_RUNNING_POS] = adjusted_colors["white"]
+        frame[SHOW_RUNNING_POS] = adjusted_colors["white"]
     elif show_run_state == 6:  # Waiting for delegated start
-        pixels[SHOW_RUNNING_POS] = adjusted_colors["blue"]
+        frame[SHOW_RUNNING_POS] = adjusted_colors["blue"]
     elif show_run_state == 7:  # PreChecking
-        time_since_last_update = current_time - last_update_time
-        if time_since_last_update > 0.35:  # Toggle every 0.5 seconds
-            blink_state = not blink_state
-            pixels[SHOW_RUNNING_POS] = adjusted_colors["cyan"] if blink_state else adjusted_colors["purple"]
-            last_update_time = current_time
+        frame[SHOW_RUNNING_POS] = adjusted_colors["cyan"] if blink(current_time, 0.35) else adjusted_colors["purple"]
+        animating = True
     elif show_run_state == 8:  # Countdown
-        time_since_last_update = current_time - last_update_time
-        if time_since_last_update > 0.25:  # Toggle every 0.5 seconds
-            blink_state = not blink_state
-            pixels[SHOW_RUNNING_POS] = adjusted_colors["green"] if blink_state else adjusted_colors["off"]
-            last_update_time = current_time
-    else:
-        pixels[SHOW_RUNNING_POS] = adjusted_colors["off"]
+        frame[SHOW_RUNNING_POS] = adjusted_colors["green"] if blink(current_time, 0.25) else adjusted_colors["off"]
+        animating = True
 
     error_state = state.get("error_state", 0) #Red-Daemon #Yellow-RF Frontend #purple Sockets
-    pixels[ERROR_POS] = adjusted_colors["red"] if error_state == 1 else \
-                        adjusted_colors["yellow"] if error_state == 2 else \
-                        adjusted_colors["purple"] if error_state == 3 else \
-                        adjusted_colors["off"]
+    frame[ERROR_POS] = adjusted_colors["red"] if error_state == 1 else \
+                       adjusted_colors["yellow"] if error_state == 2 else \
+                       adjusted_colors["purple"] if error_state == 3 else \
+                       adjusted_colors["off"]
 
     # ARM_STATE: position 6
     arm_state = state.get("arm_state", 0)
     if arm_state == 1:  # ARMED - slowly fade-pulsing red
-        time_since_last_update = current_time - arm_last_update_time
-        if time_since_last_update > 0.05:  # Adjust timing for smooth animation
-            arm_pulse_step = (arm_pulse_step + 1) % 40  # Slower pulse cycle (40 steps instead of 20)
-            scale = arm_pulse_step / 20 if arm_pulse_step <= 20 else (40 - arm_pulse_step) / 20
-            pixels[ARM_STATE_POS] = fade_color(adjusted_colors["red"], scale)
-            arm_last_update_time = current_time
+        frame[ARM_STATE_POS] = p["arm_pulse"][tick % ARM_PULSE_STEPS]
+        animating = True
     else:  # DISARMED - just blue
-        pixels[ARM_STATE_POS] = adjusted_colors["blue"]
+        frame[ARM_STATE_POS] = adjusted_colors["blue"]
+
+    return frame, animating
+
+# What's on the strip right now; None means unknown (after the sweep).
+shown_frame = [None] * NUM_PIXELS
 
+def show_frame(frame):
+    """Update only the pixels that differ from what's on the strip, and
+    skip the SPI write entirely when none do."""
+    changed = [i for i in range(NUM_PIXELS) if frame[i] != shown_frame[i]]
+    if not changed:
+        return
+    for i in changed:
+        pixels[i] = frame[i]
+        shown_frame[i] = frame[i]
     pixels.show()
 
-try:
-    # Remove the LED state file on startup
-    if os.path.exists(LED_STATE_FILE):
-        os.remove(LED_STATE_FILE)
+def run():
+    sock = bind_led_socket()
+    try:
+        # Remove the LED state file on startup
+        if os.path.exists(LED_STATE_FILE):
+            os.remove(LED_STATE_FILE)
 
-    # Run the sweep until the file appears
-    run_sweep()
+        # Run the sweep until the daemon speaks
+        state, file_mtime = run_sweep(sock)
+        next_file_check = time.monotonic() + FILE_CHECK_INTERVAL_S
 
-    while True:
-        current_time = time.time()  # Get the current time once per loop
+        while True:
+            current_time = time.monotonic()
 
-        if os.path.exists(LED_STATE_FILE):
-            with open(LED_STATE_FILE, "r") as f:
-                try:
-                    state = json.load(f)
-                except json.JSONDecodeError:
-                    continue
+            if current_time >= next_file_check:
+                new_state, file_mtime = read_state_file(file_mtime)
+                if new_state is not None and is_newer(new_state, state):
+                    state = new_state
+                next_file_check = current_time + FILE_CHECK_INTERVAL_S
 
-            # Apply the LED states (non-blocking animations)
-            apply_led_states(state, current_time)
+            frame, animating = render_frame(state, current_time)
+            show_frame(frame)
 
-        time.sleep(0.01)  # Small sleep to avoid high CPU usage
+            # Sleep until the next animation tick (if anything animates),
+            # the next file check, or a push from the daemon.
+            timeout = next_file_check - current_time
+            if animating:
+                timeout = min(timeout, ANIM_TICK_S - current_time % ANIM_TICK_S)
+            if wait_for_push(sock, timeout):
+                new_state = read_socket(sock)
+                if new_state is not None:
+                    state = new_state
+    finally:
+        if sock is not None:
+            sock.close()
+            try:
+                os.unlink(LED_SOCKET_PATH)
+            except OSError:
+                pass
 
+try:
+    run()
 except KeyboardInterrupt:
     clear_pixels()
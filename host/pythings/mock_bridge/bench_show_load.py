@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""bench_show_load.py -- time show loads against a simulated dongle.
+
+Runs the real FireworkDaemon (pc_daemon.py, unmodified) against the
+mock bridge's simulated dongle + receiver fleet (mock_bridge.SimDongle)
+and measures how long a show load takes to go from `load_show` to the
+daemon's "loaded" signal, for a grid of fleet sizes and show sizes.
+
+Each case gets its own scratch BYH_DATA_DIR / BYH_RUN_DIR / BYH_CONFIG_DIR
+with a fresh backyardhero.db (one Receivers row per simulated receiver,
+one zone per receiver, and a generated Show). The simulated dongle runs
+in this process; the daemon runs in a child process so its CPU time is
+its own. Per case it reports:
+
+  load_s     wall time from load_show to signal_show_loaded
+  cmds       serial commands the dongle received during the load
+  showloadn  of which showloadn frames
+  retries    showloadn / startload frames beyond the minimum the show
+             needs (i.e. the async-load retry path re-sending)
+  q_full     commands the dongle rejected with "queue full"
+  rf_lost    RF attempts lost (MOCK_RF_LOSS-style loss)
+  cpu_s      daemon process CPU seconds during the load
+  pubs       state snapshots pushed to the WS socket during the load
+
+A receiver has 128 cue positions, so a show with more cues than
+receivers x 128 loads only the first 128 distinct positions per receiver
+(the daemon de-dupes the rest and logs it); `loaded` is what actually
+went over the air.
+
+Usage:
+    bench_show_load.py                              # 1/10/40 rx x 100/1k/10k cues
+    bench_show_load.py --receivers 10 --cues 1000 --rf-loss 0.05
+    bench_show_load.py --queue-capacity 32 --json out.json
+
+Needs the daemon's own dependencies (pyserial) importable by the Python
+running this script.
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PC_DAEMON_DIR = os.path.join(HERE, "..", "pc_daemon")
+SYSTEMCFG_PATH = os.path.join(HERE, "..", "..", "config", "systemcfg.json")
+
+sys.path.insert(0, HERE)
+from mock_bridge import (  # noqa: E402
+    LOAD_POSITIONS, SimDongle, SimReceiver, serve_forever,
+)
+
+PROTOCOL = "BKYD_TS_HYBRID"
+RECEIVER_TYPE = "BKYD_TS_24_1"
+SHOW_LOADN_MAX_CUES = 6
+CUE_SPACING_S = 0.05
+
+# Child -> parent markers on the daemon's stdout.
+MARK_LOAD_START = "@@bench load-start"
+MARK_LOAD_END = "@@bench load-end"
+# Lets the parent snapshot the dongle's counters before the load starts.
+MARK_SETTLE_S = 0.3
+
+RECEIVERS_DDL = """
+CREATE TABLE IF NOT EXISTS Receivers (
+  id TEXT PRIMARY KEY NOT NULL,
+  label TEXT NOT NULL,
+  type TEXT NOT NULL,
+  cues_data TEXT NOT NULL DEFAULT '{}',
+  enabled INTEGER NOT NULL DEFAULT 1 CHECK(enabled IN (0,1)),
+  metadata TEXT NOT NULL DEFAULT '{}',
+  configuration_version INTEGER NOT NULL DEFAULT 1,
+  fw_version INTEGER,
+  board_version INTEGER,
+  cues_available INTEGER,
+  config_data TEXT NOT NULL DEFAULT '{}',
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+)
+"""
+
+SHOW_DDL = """
+CREATE TABLE IF NOT EXISTS Show (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name TEXT NOT NULL,
+  duration INTEGER NOT NULL CHECK(duration >= 0),
+  version TEXT NOT NULL,
+  runtime_version TEXT NOT NULL,
+  display_payload TEXT NOT NULL,
+  runtime_payload TEXT NOT NULL,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+  authorization_code TEXT NOT NULL,
+  protocol TEXT,
+  audio_file TEXT,
+  receiver_locations TEXT,
+  receiver_labels TEXT,
+  show_receivers TEXT
+)
+"""
+
+
+def _idents(n):
+    return [f"BENCH{i:03d}" for i in range(1, n + 1)]
+
+
+def build_db(db_path, idents, cue_count):
+    """Write the Receivers + Show rows for one case. Returns (show_id,
+    loaded_per_receiver)."""
+    payload = []
+    loaded = {ident: set() for ident in idents}
+    for i in range(cue_count):
+        ident = idents[i % len(idents)]
+        target = (i // len(idents)) % LOAD_POSITIONS + 1
+        loaded[ident].add(target)
+        payload.append({
+            "id": i + 1,
+            "zone": ident,
+            "target": target,
+            "startTime": round(1 + i * CUE_SPACING_S, 3),
+            "delay": 0,
+            "duration": 0,
+        })
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(RECEIVERS_DDL)
+        conn.execute(SHOW_DDL)
+        for ident in idents:
+            conn.execute(
+                "INSERT INTO Receivers (id, label, type, cues_data) VALUES (?, ?, ?, ?)",
+                (ident, ident, RECEIVER_TYPE,
+                 json.dumps({ident: list(range(1, LOAD_POSITIONS + 1))})),
+            )
+        duration = int(payload[-1]["startTime"]) + 1 if payload else 0
+        cur = conn.execute(
+            "INSERT INTO Show (name, duration, version, runtime_version, display_payload, "
+            "runtime_payload, authorization_code, protocol) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (f"bench {len(idents)}x{cue_count}", duration, "1", "1",
+             json.dumps(payload), "[]", "bench", PROTOCOL),
+        )
+        conn.commit()
+        show_id = cur.lastrowid
+    finally:
+        conn.close()
+    return show_id, {ident: len(pos) for ident, pos in loaded.items()}
+
+
+def _stat_delta(after, before):
+    return {k: after.get(k, 0) - before.get(k, 0) for k in set(after) | set(before)}
+
+
+def run_case(n_receivers, cue_count, args):
+    workdir = tempfile.mkdtemp(prefix="byhb")
+    dirs = {name: os.path.join(workdir, name) for name in ("data", "run", "config")}
+    for path in dirs.values():
+        os.makedirs(path)
+    os.makedirs(os.path.join(dirs["data"], "log"))
+    shutil.copy(SYSTEMCFG_PATH, os.path.join(dirs["config"], "systemcfg.json"))
+
+    idents = _idents(n_receivers)
+    show_id, loaded = build_db(os.path.join(dirs["data"], "backyardhero.db"), idents, cue_count)
+    dongle = SimDongle(
+        [SimReceiver(ident, n) for n, ident in enumerate(idents, start=1)],
+        queue_capacity=args.queue_capacity,
+        rf_latency_ms=args.rf_latency_ms,
+        rf_jitter_ms=args.rf_jitter_ms,
+        rf_loss=args.rf_loss,
+        rf_fail_ms=args.rf_fail_ms,
+        seed=args.seed,
+    )
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    port = server.getsockname()[1]
+
+    def _serve():
+        try:
+            serve_forever(server, dongle)
+        except OSError:
+            pass  # listener closed at the end of the case
+
+    threading.Thread(target=_serve, daemon=True).start()
+
+    env = dict(os.environ)
+    env.update({
+        "BYH_DATA_DIR": dirs["data"],
+        "BYH_RUN_DIR": dirs["run"],
+        "BYH_CONFIG_DIR": dirs["config"],
+        "BYH_BRIDGE_HOST": "127.0.0.1",
+        "BYH_BRIDGE_PORT": str(port),
+        "PYTHONUNBUFFERED": "1",
+    })
+    if args.async_core:
+        env["BYH_ASYNC_CORE"] = "1"
+    result_path = os.path.join(workdir, "result.json")
+    log_path = os.path.join(workdir, "daemon.log")
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", result_path,
+           str(show_id), ",".join(idents), str(args.timeout)]
+
+    before = after = None
+    with open(log_path, "w") as log:
+        child = subprocess.Popen(cmd, cwd=PC_DAEMON_DIR, env=env, stdout=subprocess.PIPE,
+                                 stderr=subprocess.STDOUT, text=True)
+        for line in child.stdout:
+            log.write(line)
+            if line.startswith(MARK_LOAD_START):
+                before = dict(dongle.stats)
+            elif line.startswith(MARK_LOAD_END):
+                after = dict(dongle.stats)
+        child.wait()
+    server.close()
+    dongle.close()
+
+    try:
+        with open(result_path) as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        result = {"ok": False, "error": f"daemon exited {child.returncode}; see {log_path}"}
+
+    row = {
+        "receivers": n_receivers,
+        "cues": cue_count,
+        "loaded": sum(loaded.values()),
+    }
+    row.update(result)
+    if before is not None and after is not None:
+        stats = _stat_delta(after, before)
+        min_chunks = sum(-(-count // SHOW_LOADN_MAX_CUES) for count in loaded.values())
+        row.update({
+            "cmds": stats.get("rx_total", 0),
+            "showloadn": stats.get("rx:showloadn", 0),
+            "retries": max(0, stats.get("rx:showloadn", 0) - min_chunks)
+                       + max(0, stats.get("rx:startload", 0) - n_receivers),
+            "q_full": stats.get("queue_full", 0),
+            "q_peak": after.get("queue_peak", 0),
+            "rf_lost": stats.get("rf_lost", 0),
+        })
+    if args.keep or not row.get("ok"):
+        row["workdir"] = workdir
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return row
+
+
+# ----- child: the daemon under test -----------------------------------------
+
+def _count_state_publishes(path, counter):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(path)
+    while True:
+        sock.recv(1 << 20)
+        counter[0] += 1
+
+
+def child_main(result_path, show_id, idents, timeout_s):
+    sys.path.insert(0, PC_DAEMON_DIR)
+    import pc_daemon
+
+    result = {"ok": False}
+    publishes = [0]
+    threading.Thread(
+        target=_count_state_publishes,
+        args=(pc_daemon.STATE_SOCKET_PATH, publishes),
+        daemon=True,
+    ).start()
+
+    daemon = pc_daemon.FireworkDaemon()
+    threading.Thread(target=daemon.run, daemon=True).start()
+    try:
+        deadline = time.monotonic() + timeout_s
+        if not daemon.startup.wait("ready", timeout_s):
+            result["error"] = f"daemon not ready: {daemon.startup.snapshot()}"
+            return result
+        # Re-read the handler each pass: the bridge's config ack replaces
+        # the one built from the first dongle line.
+        while not all(daemon.protocol_handler.receiver_is_connected(i) for i in idents):
+            if time.monotonic() > deadline:
+                result["error"] = "receivers never reported connected"
+                return result
+            time.sleep(0.05)
+        result["ready_ms"] = daemon.startup.snapshot()["ready_ms"]
+
+        print(MARK_LOAD_START, flush=True)
+        time.sleep(MARK_SETTLE_S)
+        publishes[0] = 0
+        usage0 = resource.getrusage(resource.RUSAGE_SELF)
+        t0 = time.perf_counter()
+        loader = threading.Thread(target=daemon.load_show, args=(show_id,), daemon=True)
+        loader.start()
+        while time.perf_counter() - t0 < timeout_s:
+            if daemon.loaded_show_id == show_id:
+                result["ok"] = True
+                break
+            if not loader.is_alive() and not daemon.protocol_handler.load_waiting:
+                result["error"] = "load failed; see daemon log"
+                break
+            time.sleep(0.02)
+        else:
+            result["error"] = f"no load after {timeout_s}s"
+        elapsed = time.perf_counter() - t0
+        usage1 = resource.getrusage(resource.RUSAGE_SELF)
+        cpu_s = (usage1.ru_utime - usage0.ru_utime) + (usage1.ru_stime - usage0.ru_stime)
+        result.update({
+            "load_s": round(elapsed, 3),
+            "cpu_s": round(cpu_s, 3),
+            "cpu_pct": round(100 * cpu_s / elapsed, 1) if elapsed else 0.0,
+            "pubs": publishes[0],
+        })
+        print(MARK_LOAD_END, flush=True)
+        return result
+    finally:
+        daemon.stop()
+
+
+def _child_entry(argv):
+    result_path, show_id, idents, timeout_s = argv
+    try:
+        result = child_main(result_path, int(show_id), idents.split(","), float(timeout_s))
+    except Exception as e:
+        result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    with open(result_path, "w") as f:
+        json.dump(result, f)
+    sys.stdout.flush()
+    # The daemon's worker threads aren't daemonic; don't wait them out.
+    os._exit(0)
+
+
+# ----- report ----------------------------------------------------------------
+
+COLUMNS = (
+    ("receivers", "rx"), ("cues", "cues"), ("loaded", "loaded"), ("load_s", "load_s"),
+    ("cmds", "cmds"), ("showloadn", "showloadn"), ("retries", "retries"),
+    ("q_full", "q_full"), ("q_peak", "q_peak"), ("rf_lost", "rf_lost"),
+    ("cpu_s", "cpu_s"), ("cpu_pct", "cpu%"), ("pubs", "pubs"),
+)
+
+
+def print_table(rows):
+    header = [label for _key, label in COLUMNS] + ["result"]
+    table = [header]
+    for row in rows:
+        cells = ["-" if row.get(key) is None else str(row.get(key)) for key, _label in COLUMNS]
+        cells.append("ok" if row.get("ok") else f"FAIL: {row.get('error')}")
+        table.append(cells)
+    widths = [max(len(r[i]) for r in table) for i in range(len(header) - 1)]
+    for r in table:
+        print("  ".join(c.rjust(w) for c, w in zip(r, widths)) + "  " + r[-1])
+
+
+def _int_list(text):
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        _child_entry(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark show loads of the real daemon against a simulated dongle."
+    )
+    parser.add_argument("--receivers", type=_int_list, default=[1, 10, 40],
+                        help="comma-separated fleet sizes (default 1,10,40)")
+    parser.add_argument("--cues", type=_int_list, default=[100, 1000, 10000],
+                        help="comma-separated show sizes (default 100,1000,10000)")
+    parser.add_argument("--rf-latency-ms", type=float, default=4.0)
+    parser.add_argument("--rf-jitter-ms", type=float, default=2.0)
+    parser.add_argument("--rf-loss", type=float, default=0.0,
+                        help="chance each RF attempt is lost (0..1)")
+    parser.add_argument("--rf-fail-ms", type=float, default=22.0,
+                        help="time a lost attempt costs the dongle")
+    parser.add_argument("--queue-capacity", type=int, default=128)
+    parser.add_argument("--async-core", action="store_true",
+                        help="run the daemon with BYH_ASYNC_CORE=1")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=120.0,
+                        help="per-case limit in seconds")
+    parser.add_argument("--keep", action="store_true", help="keep every case's scratch dir")
+    parser.add_argument("--json", help="also write the rows to this file")
+    args = parser.parse_args()
+
+    rows = []
+    for n_receivers in args.receivers:
+        for cue_count in args.cues:
+            print(f"-- {n_receivers} receiver(s) x {cue_count} cues", flush=True)
+            rows.append(run_case(n_receivers, cue_count, args))
+    print()
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,24 @@ development without hardware:
     ...) like a dongle with no receivers -- so firing "succeeds" on the wire
     but nothing physically fires.
 
+Set MOCK_RECEIVERS=N to put N simulated receivers "in the air" instead
+(SIM001..SIMnnn by default), or MOCK_FLEET to define the fleet: `db` for
+the Receivers table in BYH_DATA_DIR/backyardhero.db (or a path to some
+other .db), anything else is a JSON fleet spec -- see fleet_from_spec()
+for the format. The mock then models the dongle itself: a bounded command
+queue that rejects overflow with the firmware's "ERR: Command queue full"
+line (manual fires jump it), a single dispatch loop that spends RF latency
+(or a lost-frame timeout) per attempt, TDMA polling of its poll table with
+the automatic config query for new receivers, msync/forget, and the
+receiver side of os4_receiver.ino: load (startload / showloadn /
+showstart), play / pause / stop / reset against each receiver's own clock,
+manual fire, rxcfg, battery drift and a continuity bitmask that opens as
+cues fire. Receivers answer with the same throttled `rxupd` pushes,
+`rxcfg` replies and per-second `status` aggregate the real dongle prints,
+so shows actually load and run. Commands for idents that aren't in the
+fleet are still swallowed. bench_show_load.py drives this against the
+real daemon.
+
 It has NO third-party dependencies (stdlib socket/json/threading/time only),
 so it runs under the container's plain python3 with no venv. It is wired into
 supervisord.devcontainer.conf ONLY -- production (supervisord.conf) and the
@@ -43,13 +61,28 @@ Env config (all optional):
   MOCK_START             start switch engaged    (default 0 -> off)
   MOCK_MANFIRE           manual-fire engaged     (default 0 -> off)
   MOCK_DEBUG             log inbound commands     (default 0)
+
+Simulated fleet (only used when MOCK_FLEET or MOCK_RECEIVERS is set):
+  MOCK_FLEET             `db`, a .db path, or a JSON fleet spec path
+  MOCK_RECEIVERS         number of receivers     (default 0 -> none)
+  MOCK_RX_PREFIX         ident prefix            (default SIM)
+  MOCK_RF_LATENCY_MS     per-attempt RF round trip (default 4)
+  MOCK_RF_JITTER_MS      +/- uniform jitter on that (default 2)
+  MOCK_RF_LOSS           chance an attempt is lost, 0..1 (default 0)
+  MOCK_RF_FAIL_MS        time burnt on a lost attempt (default 22, the
+                         nRF24's exhausted auto-retry)
+  MOCK_QUEUE_CAPACITY    dongle command queue depth (default 128)
+  MOCK_FIRE_LOG          append every cue the fleet fires here as JSONL
 """
 
 import json
 import os
+import random
 import socket
+import sqlite3
 import threading
 import time
+from collections import Counter, deque
 
 BIND_HOST = os.environ.get("BYH_BRIDGE_BIND", "127.0.0.1")
 BIND_PORT = int(os.environ.get("BYH_BRIDGE_PORT", "9000"))
@@ -59,6 +92,26 @@ RF_CHANNEL = int(os.environ.get("MOCK_RF_CHANNEL", "1"))
 STATUS_INTERVAL_S = float(os.environ.get("MOCK_STATUS_INTERVAL_S", "1.0"))
 DEBUG = os.environ.get("MOCK_DEBUG", "0") not in ("0", "", "false", "False")
 
+SIM_RECEIVERS = int(os.environ.get("MOCK_RECEIVERS", "0"))
+SIM_IDENT_PREFIX = os.environ.get("MOCK_RX_PREFIX", "SIM")
+RF_LATENCY_MS = float(os.environ.get("MOCK_RF_LATENCY_MS", "4"))
+RF_JITTER_MS = float(os.environ.get("MOCK_RF_JITTER_MS", "2"))
+RF_LOSS = float(os.environ.get("MOCK_RF_LOSS", "0"))
+RF_FAIL_MS = float(os.environ.get("MOCK_RF_FAIL_MS", "22"))
+QUEUE_CAPACITY = int(os.environ.get("MOCK_QUEUE_CAPACITY", "128"))
+
+# Mirrors of the firmware constants the simulation leans on.
+CLOCK_SYNC_INTERVAL_MS = 1000   # dongle clockSyncIntervalMs default
+MIN_POLL_SPACING_MS = 5         # maybePollNextReceiver's floor
+RXUPD_MIN_INTERVAL_MS = 100     # dongle RXUPD_MIN_INTERVAL_MS
+LATENCY_SAMPLES = 10            # per-receiver RTT window
+SUCCESS_WINDOW = 20             # attempts behind `sp`
+LOAD_POSITIONS = 128            # receiver targetLoaded[] slots
+RECEIVER_FW = 25                # os4_receiver FW_VERSION
+CONTINUITY_WORDS = 2            # 2x64-bit continuity bitmap
+FIRE_LOG_MAX = 4096             # fired cues kept per simulated receiver
+FLEET_TICK_S = 0.01             # receiver play-loop resolution
+
 # The three physical switches are active-low (INPUT_PULLUP): engaged == LOW(0),
 # released == HIGH(1). See GPIOHandler in pc_daemon.py. We take human-facing
 # "engaged" booleans from the env and translate to the level the daemon's gpio
@@ -79,10 +132,653 @@ def _now_ms():
     return int(time.time() * 1000)
 
 
+def _bitmap(positions):
+    """Pack an iterable of zero-indexed positions into the firmware's
+    2x64-bit word layout (same as `c` continuity)."""
+    words = [0] * CONTINUITY_WORDS
+    for pos in positions:
+        idx, bit = divmod(int(pos), 64)
+        if 0 <= idx < CONTINUITY_WORDS:
+            words[idx] |= 1 << bit
+    return words
+
+
+def _node_from_ident(ident):
+    """RX146 -> 146, the dongle's bootstrap nodeID for an ident. 0 (not
+    addressable until heard from) when there's no usable number."""
+    digits = "".join(ch for ch in ident if ch.isdigit())
+    node = int(digits) if digits else 0
+    return node if 0 < node < 256 else 0
+
+
+class SimReceiver:
+    """One simulated receiver.
+
+    Holds the receiver-side state the dongle relays back to the host plus
+    the show state machine from os4_receiver.ino: startload resets the cue
+    table and records the show id and expected count, showloadn fills
+    positions (t=0 and out-of-range positions are ignored just like
+    loadOneCue), loadComplete latches once the table holds `expected`
+    cues, showstart only goes startReady for the loaded show, and
+    play/pause/stop/reset drive runPlayLoop -- which `tick()` runs against
+    the receiver's own clock, i.e. the dongle's synced clock plus
+    `clock_offset_ms` of residual error. Every cue that goes off (show or
+    manual `fire`) lands in `fire_log` and, with `fire_opens_continuity`,
+    clears its continuity bit the way a spent e-match does.
+
+    Battery is given in percent and reported as the firmware's raw byte
+    (5..253, which the UI divides by 256); `battery_drift_pct_per_min`
+    moves it over time (negative drains). An `online=False` receiver never
+    answers. `rf_loss` / `rf_latency_ms` override the dongle-wide values.
+    """
+
+    def __init__(self, ident, node, positions=LOAD_POSITIONS, battery_pct=95.0,
+                 battery_drift_pct_per_min=0.0, continuity=None, clock_offset_ms=0,
+                 fw=RECEIVER_FW, bv=1, fire_duration_ms=500, online=True,
+                 rf_loss=None, rf_latency_ms=None, fire_opens_continuity=True):
+        self.ident = ident
+        self.node = node
+        self.positions = min(int(positions), LOAD_POSITIONS)
+        self.battery_pct = float(battery_pct)
+        self.battery_drift_pct_per_min = float(battery_drift_pct_per_min)
+        if continuity is None or continuity == "all":
+            connected = range(self.positions)
+        else:
+            # 1-indexed cue numbers, like the show's targets.
+            connected = [int(c) - 1 for c in continuity]
+        self.continuity = _bitmap(p for p in connected if 0 <= p < self.positions)
+        self.clock_offset_ms = int(clock_offset_ms)
+        self.fw = fw
+        self.bv = bv
+        self.fire_duration_ms = int(fire_duration_ms)
+        self.online = online
+        self.rf_loss = rf_loss
+        self.rf_latency_ms = rf_latency_ms
+        self.fire_opens_continuity = fire_opens_continuity
+        self._born = time.monotonic()
+        # Receiver firmware state.
+        self.show_id = 0
+        self.expected = 0
+        self.targets = {}
+        self.fired = set()
+        self.load_complete = False
+        self.start_ready = False
+        self.start_time = 0
+        self.playing = False
+        self.paused = False
+        self.pause_acc_ms = 0
+        self.time_paused = 0
+        self.fire_log = deque(maxlen=FIRE_LOG_MAX)
+        self._lock = threading.Lock()
+        # Dongle-side bookkeeping for this receiver (ReceiverInfo).
+        self.config_valid = False
+        self.config_pending = False
+        self.last_message_ms = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.outcomes = deque(maxlen=SUCCESS_WINDOW)
+        self.last_rxupd_ms = None
+        self.last_emitted = None
+
+    # ----- receiver firmware ----------------------------------------------
+    def local_ms(self, synced_ms):
+        return synced_ms + self.clock_offset_ms
+
+    def battery(self):
+        minutes = (time.monotonic() - self._born) / 60.0
+        pct = self.battery_pct + self.battery_drift_pct_per_min * minutes
+        return max(5, min(253, round(pct * 256 / 100)))
+
+    def reset_system(self):
+        self.expected = 0
+        self.show_id = 0
+        self.load_complete = False
+        self.start_ready = False
+        self.start_time = 0
+        self.targets = {}
+        self.fired = set()
+
+    def apply(self, verb, args, synced_ms):
+        """Handle one RF frame that made it to the receiver. Returns the
+        fire-log entries it produced (manual fire only)."""
+        local = self.local_ms(synced_ms)
+        with self._lock:
+            if verb == "startload":
+                self.reset_system()
+                self.expected, self.show_id = args
+            elif verb == "showloadn":
+                for t, pos in args:
+                    if t and 0 <= pos < self.positions:
+                        self.targets[pos] = t
+                if len(self.targets) >= self.expected:
+                    self.load_complete = True
+            elif verb == "showstart":
+                start_time, show_id = args
+                if show_id == self.show_id and self.load_complete:
+                    self.start_ready = True
+                    self.start_time = start_time
+            elif verb == "play":
+                if not self.playing:
+                    self.playing = True
+                    if self.paused:
+                        self.pause_acc_ms += local - self.time_paused
+                        self.time_paused = 0
+                    self.paused = False
+            elif verb == "stop":
+                self.playing = False
+            elif verb == "pause":
+                self.playing = False
+                self.paused = True
+                self.time_paused = local
+            elif verb == "reset":
+                self.reset_system()
+            elif verb == "fire":
+                if 0 <= args < self.positions:
+                    return [self._fire(args, synced_ms, "manual")]
+            elif verb == "rxcfg":
+                if args is not None:
+                    self.fire_duration_ms = args
+        return []
+
+    def tick(self, synced_ms):
+        """runPlayLoop: fire every loaded cue whose time has come."""
+        with self._lock:
+            if not self.playing or self.paused:
+                return []
+            now = self.local_ms(synced_ms) - self.pause_acc_ms
+            if now <= self.start_time:
+                return []
+            elapsed = now - self.start_time
+            due = [pos for pos, t in self.targets.items()
+                   if pos not in self.fired and elapsed >= t]
+            fired = [self._fire(pos, synced_ms, "show", elapsed) for pos in sorted(due)]
+            if len(self.fired) >= len(self.targets):
+                # "Show complete."
+                self.playing = False
+                self.start_ready = False
+                self.show_id = 0
+            return fired
+
+    def _fire(self, pos, synced_ms, source, elapsed=None):
+        self.fired.add(pos)
+        if self.fire_opens_continuity:
+            idx, bit = divmod(pos, 64)
+            self.continuity[idx] &= ~(1 << bit)
+        entry = {
+            "i": self.ident,
+            "cue": pos + 1,
+            "source": source,
+            "show_id": self.show_id,
+            "at_ms": synced_ms,
+        }
+        if elapsed is not None:
+            entry["late_ms"] = elapsed - self.targets[pos]
+        self.fire_log.append(entry)
+        return entry
+
+    # ----- what the dongle reports ----------------------------------------
+    def success_percent(self):
+        if not self.outcomes:
+            return 100
+        return round(100 * sum(self.outcomes) / len(self.outcomes))
+
+    def material(self):
+        """Fields whose change makes the dongle push an rxupd right away
+        instead of waiting out RXUPD_MIN_INTERVAL_MS."""
+        return (self.load_complete, self.start_ready, self.show_id,
+                self.battery(), tuple(self.continuity))
+
+    def abbr(self, latency=None, with_config=False):
+        d = {
+            "i": self.ident,
+            "n": self.node,
+            "b": self.battery(),
+            "s": self.show_id,
+            "l": 1 if self.load_complete else 0,
+            "r": 1 if self.start_ready else 0,
+            "t": self.last_message_ms,
+        }
+        if latency is not None:
+            d["x"] = latency
+        d["sp"] = self.success_percent()
+        if with_config and self.config_valid:
+            d.update(self.config_fields())
+        d["c"] = list(self.continuity)
+        return d
+
+    def config_fields(self):
+        return {
+            "fw": self.fw,
+            "bv": self.bv,
+            "nb": self.positions // 8,
+            "nbd": 0,
+            "ca": self.positions,
+            "fd": self.fire_duration_ms,
+        }
+
+
+class SimDongle:
+    """The dongle's command queue, dispatcher and TDMA poller in front of a
+    fleet of SimReceivers.
+
+    `intake()` runs on the bridge's reader thread and parses one serial
+    line the way processSerialCommand does, replying with the same text
+    lines (C+ / CV / ERR). `run()` is the firmware's main loop: it drains
+    the queue one command at a time (manual fires jump it), spending RF
+    time per attempt, and polls the next receiver whenever the queue is
+    idle. A newly registered receiver gets a config query on its next
+    contact, which comes back as an `rxcfg` line. Everything the host
+    would see comes out through the `send` callback; `status_frame()`
+    builds the per-second aggregate.
+
+    The receivers themselves keep running between daemon connections: a
+    fleet clock thread ticks every receiver's play loop and hands each
+    cue that fires to `on_fire`, until `close()`.
+
+    `stats` counts inbound commands per verb plus RF attempts, losses and
+    queue-full drops, for the benchmark harness.
+    """
+
+    # Verbs that target one receiver and go through the queue.
+    QUEUED_VERBS = ("sync", "startload", "showloadn", "showstart",
+                    "play", "pause", "stop", "reset", "fire", "rxcfg")
+
+    def __init__(self, fleet=(), queue_capacity=QUEUE_CAPACITY,
+                 rf_latency_ms=RF_LATENCY_MS, rf_jitter_ms=RF_JITTER_MS,
+                 rf_loss=RF_LOSS, rf_fail_ms=RF_FAIL_MS,
+                 seed=None, on_fire=None):
+        self.fleet = {r.ident: r for r in fleet}
+        self.queue_capacity = queue_capacity
+        self.rf_latency_ms = rf_latency_ms
+        self.rf_jitter_ms = rf_jitter_ms
+        self.rf_loss = rf_loss
+        self.rf_fail_ms = rf_fail_ms
+        self.on_fire = on_fire
+        self.rng = random.Random(seed)
+        self.stats = Counter()
+        self.debug_mode = 0
+        self.clock_sync_interval_ms = CLOCK_SYNC_INTERVAL_MS
+        # Poll table: receivers the host has registered (or addressed).
+        self._table = {}
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._poll_idx = 0
+        self._last_poll_ms = 0
+        self._t0 = time.monotonic()
+        # millis() + tsOffset; msync moves it onto the host's epoch.
+        self._ts_offset = 0
+        self._clock_thread = None
+        self._closed = threading.Event()
+
+    @classmethod
+    def from_env(cls, fleet):
+        fire_log_path = os.environ.get("MOCK_FIRE_LOG")
+
+        def on_fire(entry):
+            if DEBUG:
+                print(f"[mock-bridge] FIRE {entry}")
+            if fire_log_path:
+                with open(fire_log_path, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+
+        return cls(fleet, on_fire=on_fire)
+
+    def millis(self):
+        return int((time.monotonic() - self._t0) * 1000)
+
+    def now_ms(self):
+        return self.millis() + self._ts_offset
+
+    def fire_log(self):
+        """Every receiver's fire log, oldest first."""
+        entries = [e for r in self.fleet.values() for e in list(r.fire_log)]
+        return sorted(entries, key=lambda e: e["at_ms"])
+
+    # ----- serial intake (reader thread) ----------------------------------
+    def apply_settings(self, obj):
+        """The subset of the LED/settings JSON frame the simulation uses."""
+        if "debug_mode" in obj:
+            self.debug_mode = int(obj["debug_mode"] or 0)
+        if "clock_sync_interval_ms" in obj:
+            self.clock_sync_interval_ms = max(MIN_POLL_SPACING_MS, int(obj["clock_sync_interval_ms"]))
+            self._last_poll_ms = 0
+
+    def intake(self, text):
+        """Parse one command line. Returns the reply lines to print."""
+        parts = text.split()
+        if not parts:
+            return []
+        verb = parts[0]
+        self.stats["rx_total"] += 1
+        self.stats["rx:" + verb] += 1
+        if verb == "msync" and len(parts) >= 2:
+            # `msync 0 <epoch_ms>`
+            self._ts_offset = int(parts[-1]) - self.millis()
+            return ["C+ msync"]
+        if verb == "forget" and len(parts) >= 2:
+            return self._forget(parts[1])
+        if verb not in self.QUEUED_VERBS or len(parts) < 2:
+            return []
+        receiver = self.fleet.get(parts[1])
+        if receiver is None:
+            return []
+        parsed = self._parse(verb, parts[2:])
+        if parsed is None:
+            return [f"CV {verb}"]
+        args, repeat = parsed
+        if receiver.node == 0:
+            # No nodeID from the ident and never heard from: the dongle
+            # refuses to guess an address (and can't poll it either).
+            return [f"CV NID0 {receiver.ident}"]
+        with self._cond:
+            if receiver.ident not in self._table:
+                self._table[receiver.ident] = receiver
+                receiver.config_pending = True
+            if len(self._queue) >= self.queue_capacity:
+                self.stats["queue_full"] += 1
+                if verb == "fire":
+                    return ["ERR: Command queue full. Priority command dropped."]
+                return ["ERR: Command queue full. Command dropped."]
+            if verb == "fire":
+                self._queue.appendleft((receiver, verb, args, repeat))
+            else:
+                self._queue.append((receiver, verb, args, repeat))
+            self.stats["queue_peak"] = max(self.stats["queue_peak"], len(self._queue))
+            self._cond.notify()
+        if self.debug_mode > 0:
+            return [f"C+ Q (repeat={repeat})"]
+        return []
+
+    def _forget(self, ident):
+        with self._cond:
+            receiver = self._table.pop(ident, None)
+            if receiver is not None:
+                # v16: pending commands for a forgotten receiver go too.
+                self._queue = deque(item for item in self._queue if item[0] is not receiver)
+        if receiver is None:
+            return [f"CV forget RNF {ident}"]
+        return [f"C+ forget {ident}"]
+
+    @staticmethod
+    def _parse(verb, params):
+        """(args, repeat) for `verb`'s grammar, or None if it's malformed."""
+        try:
+            if verb in ("sync", "fire"):
+                repeat = int(params[-1]) if len(params) > 1 else 1
+                return int(params[0]), max(1, repeat)
+            if verb == "startload":
+                # No repeat suffix (see the v21 note in os4_dongle.ino).
+                return (int(params[0]), int(params[1])), 1
+            if verb == "showloadn":
+                count = int(params[0])
+                flat = [int(v) for v in params[1:1 + 2 * count]]
+                if count < 1 or len(flat) != 2 * count:
+                    return None
+                repeat = int(params[1 + 2 * count]) if len(params) > 1 + 2 * count else 1
+                return list(zip(flat[0::2], flat[1::2])), max(1, repeat)
+            if verb == "showstart":
+                # showstart <start_ms> <numTargets> <showId> [repeat]
+                repeat = int(params[3]) if len(params) > 3 else 1
+                return (int(params[0]), int(params[2])), max(1, repeat)
+            if verb in ("play", "pause", "stop", "reset"):
+                repeat = int(params[-1]) if len(params) > 1 else 1
+                return None, max(1, repeat)
+            if verb == "rxcfg":
+                # rxcfg IDENT [fd <ms>]
+                if not params:
+                    return None, 1
+                if len(params) != 2 or params[0] != "fd":
+                    return None
+                fd = int(params[1])
+                if fd <= 0 or fd > 65535:
+                    return None
+                return fd, 1
+        except (IndexError, ValueError):
+            return None
+        return None
+
+    # ----- firmware main loop ---------------------------------------------
+    def run(self, send, alive):
+        """Dispatch + poll until `alive()` goes false. `send(obj)` writes
+        one JSON line to the host."""
+        self._start_fleet_clock()
+        while alive() and not self._closed.is_set():
+            with self._cond:
+                if not self._queue:
+                    self._cond.wait(self._poll_wait_s())
+                item = self._queue.popleft() if self._queue else None
+            if item is not None:
+                self._dispatch(item, send)
+            else:
+                self._maybe_poll(send)
+
+    def _start_fleet_clock(self):
+        with self._cond:
+            if self._clock_thread is not None:
+                return
+            self._clock_thread = threading.Thread(target=self._fleet_clock, daemon=True)
+        self._clock_thread.start()
+
+    def _fleet_clock(self):
+        while not self._closed.is_set():
+            now = self.now_ms()
+            for receiver in list(self.fleet.values()):
+                for entry in receiver.tick(now):
+                    self._note_fire(entry)
+            self._closed.wait(FLEET_TICK_S)
+
+    def close(self):
+        """Stop the fleet clock (and any run() loop). The dongle can't be
+        started again afterwards."""
+        self._closed.set()
+        with self._cond:
+            self._cond.notify_all()
+            thread = self._clock_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _note_fire(self, entry):
+        self.stats["fired"] += 1
+        if self.on_fire is not None:
+            self.on_fire(entry)
+
+    def _poll_wait_s(self):
+        spacing = self._poll_spacing_ms()
+        if spacing is None:
+            return 0.25
+        return max(0.0, (self._last_poll_ms + spacing - self.millis()) / 1000.0)
+
+    def _poll_spacing_ms(self):
+        if not self._table:
+            return None
+        return max(MIN_POLL_SPACING_MS, self.clock_sync_interval_ms // len(self._table))
+
+    def _maybe_poll(self, send):
+        spacing = self._poll_spacing_ms()
+        if spacing is None or self.millis() - self._last_poll_ms < spacing:
+            return
+        self._last_poll_ms = self.millis()
+        with self._cond:
+            receivers = list(self._table.values())
+        if not receivers:
+            return
+        receiver = receivers[self._poll_idx % len(receivers)]
+        self._poll_idx += 1
+        self.stats["polls"] += 1
+        # A poll is a CLOCK_SYNC whose ACK payload carries status (or the
+        # auto config query for a freshly registered receiver).
+        self._transmit(receiver, None, None, 1, send)
+
+    def _dispatch(self, item, send):
+        receiver, verb, args, repeat = item
+        self.stats["dispatched"] += 1
+        self._transmit(receiver, verb, args, repeat, send)
+
+    def _transmit(self, receiver, verb, args, repeat, send):
+        """Up to `repeat` RF attempts, stopping at the first ACK."""
+        loss = self.rf_loss if receiver.rf_loss is None else receiver.rf_loss
+        base_ms = self.rf_latency_ms if receiver.rf_latency_ms is None else receiver.rf_latency_ms
+        for _ in range(repeat):
+            self.stats["rf_attempts"] += 1
+            if not receiver.online or self.rng.random() < loss:
+                self.stats["rf_lost"] += 1
+                receiver.outcomes.append(0)
+                time.sleep(self.rf_fail_ms / 1000.0)
+                continue
+            latency = max(1, round(base_ms + self.rng.uniform(
+                -self.rf_jitter_ms, self.rf_jitter_ms)))
+            time.sleep(latency / 1000.0)
+            if verb is not None:
+                for entry in receiver.apply(verb, args, self.now_ms()):
+                    self._note_fire(entry)
+            receiver.outcomes.append(1)
+            receiver.latencies.append(latency)
+            receiver.last_message_ms = self.now_ms()
+            self._push_rxupd(receiver, send, latency)
+            if verb == "rxcfg" or receiver.config_pending:
+                receiver.config_pending = False
+                receiver.config_valid = True
+                frame = {"type": "rxcfg", "i": receiver.ident, "n": receiver.node}
+                frame.update(receiver.config_fields())
+                frame["t"] = receiver.last_message_ms
+                send(frame)
+            return True
+        self._push_rxupd(receiver, send, None)
+        return False
+
+    def _push_rxupd(self, receiver, send, latency):
+        now = self.millis()
+        material = receiver.material()
+        if (material == receiver.last_emitted and receiver.last_rxupd_ms is not None
+                and now - receiver.last_rxupd_ms < RXUPD_MIN_INTERVAL_MS):
+            return
+        receiver.last_emitted = material
+        receiver.last_rxupd_ms = now
+        frame = {"type": "rxupd"}
+        frame.update(receiver.abbr(latency))
+        self.stats["rxupd"] += 1
+        send(frame)
+
+    def status_frame(self):
+        """The per-second `status` aggregate."""
+        with self._cond:
+            depth = len(self._queue)
+            receivers = list(self._table.values())
+        entries = []
+        all_lat = []
+        for r in receivers:
+            lat = round(sum(r.latencies) / len(r.latencies)) if r.latencies else 0
+            all_lat.extend(r.latencies)
+            entries.append(r.abbr(lat, with_config=True))
+        return {
+            "type": "status",
+            "timestamp": self.now_ms(),
+            "fw": DONGLE_FW,
+            "ch": RF_CHANNEL,
+            "q": depth,
+            "qmax": self.queue_capacity,
+            "csim": self.clock_sync_interval_ms,
+            "l": round(sum(all_lat) / len(all_lat)) if all_lat else 0,
+            "receivers": entries,
+        }
+
+
+# ----- fleet definitions -------------------------------------------------------
+
+def fleet_from_db(db_path):
+    """One SimReceiver per native (non-433) row of the Receivers table,
+    sized from its reported cues_available (or highest configured cue)
+    and fire duration."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            "SELECT id, type, cues_data, cues_available, config_data FROM Receivers"
+        ).fetchall()
+    finally:
+        conn.close()
+    fleet = []
+    for row in rows:
+        if row["type"] == "BILUSOCN_433_TX_ONLY":
+            continue
+        positions = row["cues_available"]
+        if not positions:
+            try:
+                cues = json.loads(row["cues_data"] or "{}")
+                highest = max((int(c) for targets in cues.values() for c in targets), default=0)
+            except (TypeError, ValueError):
+                highest = 0
+            # Whole 8-cue boards.
+            positions = -(-highest // 8) * 8 or LOAD_POSITIONS
+        try:
+            fire_duration = int(json.loads(row["config_data"] or "{}").get("fire_duration_ms") or 500)
+        except (TypeError, ValueError, AttributeError):
+            fire_duration = 500
+        fleet.append(SimReceiver(
+            row["id"], _node_from_ident(row["id"]),
+            positions=positions, fire_duration_ms=fire_duration,
+        ))
+    return fleet
+
+
+def fleet_from_spec(path):
+    """Build a fleet from a JSON spec:
+
+        {"defaults": {"battery_pct": 90, "rf_loss": 0.02},
+         "receivers": [
+            {"ident": "RX146", "positions": 64, "clock_offset_ms": 12},
+            {"ident": "RX147", "continuity": [1, 2, 3], "online": false},
+            {"prefix": "SIM", "count": 120, "battery_drift_pct_per_min": -0.5}
+         ]}
+
+    A bare list is taken as the receivers array. Entries take any
+    SimReceiver keyword; a `count` entry stamps out `count` receivers
+    named <prefix><NNN> starting at `start` (default 1).
+    """
+    with open(path) as f:
+        spec = json.load(f)
+    if isinstance(spec, list):
+        spec = {"receivers": spec}
+    defaults = spec.get("defaults", {})
+    fleet = []
+    for entry in spec.get("receivers", []):
+        opts = dict(defaults)
+        opts.update(entry)
+        try:
+            count = opts.pop("count", None)
+            if count:
+                prefix = opts.pop("prefix", SIM_IDENT_PREFIX)
+                start = int(opts.pop("start", 1))
+                for n in range(start, start + int(count)):
+                    fleet.append(SimReceiver(f"{prefix}{n:03d}", (n - 1) % 255 + 1, **opts))
+            else:
+                ident = opts.pop("ident")
+                node = opts.pop("node", None) or _node_from_ident(ident)
+                fleet.append(SimReceiver(ident, node, **opts))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"bad fleet spec entry {entry!r}: {e}") from e
+    return fleet
+
+
+def load_fleet():
+    """The fleet MOCK_FLEET / MOCK_RECEIVERS ask for (possibly empty)."""
+    source = os.environ.get("MOCK_FLEET", "").strip()
+    if source == "db":
+        return fleet_from_db(os.path.join(os.environ.get("BYH_DATA_DIR", "/data"), "backyardhero.db"))
+    if source.endswith(".db"):
+        return fleet_from_db(source)
+    if source:
+        return fleet_from_spec(source)
+    return [
+        SimReceiver(f"{SIM_IDENT_PREFIX}{n:03d}", (n - 1) % 255 + 1)
+        for n in range(1, SIM_RECEIVERS + 1)
+    ]
+
+
 class MockBridge:
-    def __init__(self, conn, addr):
+    def __init__(self, conn, addr, dongle=None):
         self.conn = conn
         self.addr = addr
+        self.dongle = dongle
         self.running = True
         # Serialize sends: the reader (config acks) and the heartbeat writer
         # both sendall() on this socket. A lock keeps whole newline-delimited
@@ -90,7 +786,10 @@ class MockBridge:
         self._send_lock = threading.Lock()
 
     def _send(self, obj):
-        line = (json.dumps(obj) + "\n").encode("utf-8")
+        self._send_line(json.dumps(obj))
+
+    def _send_line(self, text):
+        line = (text + "\n").encode("utf-8")
         with self._send_lock:
             self.conn.sendall(line)
 
@@ -122,17 +821,29 @@ class MockBridge:
                     "connected": True,
                     "config": {"port": "/dev/ttyMOCK0", "baud": 115200},
                 })
+            elif ctype is None and self.dongle is not None:
+                # The daemon's LED/settings frame (no `type`): the dongle
+                # picks debug_mode and clock_sync_interval_ms out of it.
+                self.dongle.apply_settings(cmd)
             # Any other JSON control message: silently ignore.
             return
 
         # Otherwise it's a serial command destined for the dongle (msync,
         # sync/register, 433fire, forget, ...). A real dongle with no
-        # receivers would accept it and (mostly) stay quiet, so we drop it.
+        # receivers would accept it and (mostly) stay quiet, so without a
+        # simulated fleet we drop it.
+        text = line.decode("utf-8", "replace").strip()
         if DEBUG:
-            try:
-                print(f"[mock-bridge] serial<- {line.decode('utf-8', 'replace').strip()}")
-            except Exception:
-                pass
+            print(f"[mock-bridge] serial<- {text}")
+        if self.dongle is not None:
+            for reply in self.dongle.intake(text):
+                self._send_line(reply)
+
+    def _send_safe(self, obj):
+        try:
+            self._send(obj)
+        except OSError:
+            self.running = False
 
     def reader_loop(self):
         buffer = b""
@@ -168,17 +879,21 @@ class MockBridge:
             while self.running:
                 # Switch state (drives arm/start/manfire in the UI + daemon).
                 self._send(gpio_frame)
-                # Dongle heartbeat. `receivers` is empty -- no RF hardware.
-                self._send({
-                    "type": "status",
-                    "timestamp": _now_ms(),
-                    "fw": DONGLE_FW,
-                    "ch": RF_CHANNEL,
-                    "q": 0,
-                    "qmax": 32,
-                    "csim": 1000,
-                    "receivers": [],
-                })
+                if self.dongle is not None:
+                    self._send(self.dongle.status_frame())
+                else:
+                    # Dongle heartbeat. `receivers` is empty -- no RF
+                    # hardware.
+                    self._send({
+                        "type": "status",
+                        "timestamp": _now_ms(),
+                        "fw": DONGLE_FW,
+                        "ch": RF_CHANNEL,
+                        "q": 0,
+                        "qmax": 32,
+                        "csim": 1000,
+                        "receivers": [],
+                    })
                 time.sleep(STATUS_INTERVAL_S)
         except OSError as e:
             if DEBUG:
@@ -191,6 +906,12 @@ class MockBridge:
         print(f"[mock-bridge] daemon connected from {self.addr}")
         writer = threading.Thread(target=self.heartbeat_loop, daemon=True)
         writer.start()
+        if self.dongle is not None:
+            threading.Thread(
+                target=self.dongle.run,
+                args=(self._send_safe, lambda: self.running),
+                daemon=True,
+            ).start()
         self.reader_loop()  # blocks until the daemon disconnects
         try:
             self.conn.close()
@@ -199,26 +920,37 @@ class MockBridge:
         print("[mock-bridge] daemon disconnected")
 
 
+def serve_forever(server, dongle=None):
+    """Accept loop on an already-listening socket. The dongle (and its
+    fleet) outlives individual daemon connections, like the hardware."""
+    while True:
+        conn, addr = server.accept()
+        # The daemon holds a single long-lived connection and reconnects
+        # on drop, so serving one client at a time (like the real bridge's
+        # listen(1)) is sufficient.
+        MockBridge(conn, addr, dongle).serve()
+
+
 def main():
     server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     server.bind((BIND_HOST, BIND_PORT))
     server.listen(1)
+    fleet = load_fleet()
+    dongle = SimDongle.from_env(fleet) if fleet else None
     print(f"[mock-bridge] listening on {BIND_HOST}:{BIND_PORT} "
           f"(fw={DONGLE_FW}, ch={RF_CHANNEL}, "
           f"armed={_engaged('MOCK_ARMED')}, start={_engaged('MOCK_START')}, "
-          f"manfire={_engaged('MOCK_MANFIRE')})")
+          f"manfire={_engaged('MOCK_MANFIRE')}, "
+          f"receivers={len(fleet)})")
     try:
-        while True:
-            conn, addr = server.accept()
-            # The daemon holds a single long-lived connection and reconnects
-            # on drop, so serving one client at a time (like the real bridge's
-            # listen(1)) is sufficient.
-            MockBridge(conn, addr).serve()
+        serve_forever(server, dongle)
     except KeyboardInterrupt:
         print("[mock-bridge] shutting down")
     finally:
         server.close()
+        if dongle is not None:
+            dongle.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,244 @@
+"""Optional asyncio I/O core for the firework daemon.
+
+Enabled with BYH_ASYNC_CORE=1; the threaded core in FireworkDaemon.run()
+stays the default while this rolls out. It replaces the three poll-driven
+threads with one event loop that sleeps until there is real work:
+
+  bridge     asyncio StreamReader on the tcp_serial_bridge session instead
+             of read_from_tcp's 50ms select() loop. Complete lines are
+             handed, in order, to a single-thread "bridge" executor that
+             runs the same FireworkDaemon._process_bridge_line the threaded
+             core uses (the protocol handler may block on SQLite / pacing
+             sleeps, so it never runs on the loop itself). Writes from any
+             thread run as a coroutine on the loop that writes and awaits
+             drain(); the calling thread waits on its future, so a burst
+             (an OTA transfer) is paced by the socket exactly like the
+             threaded core's sendall, and a dead session is reported.
+  commands   /tmp/d_cmd is watched with watchfiles (inotify / FSEvents)
+             when installed, else polled at COMMAND_POLL_INTERVAL_S. It
+             feeds a single-thread "command" executor, so commands stay
+             strictly serialized exactly like the old poller.
+  publisher  async debounced flush of the state snapshot; the snapshot is
+             built on the bounded default executor.
+
+Left on their own threads on purpose: monitor_switch, led_flusher and
+webact_listener already block on events (no idle wakeups), and run_show's
+firing loop must keep its own monotonic timer rather than share a loop with
+I/O callbacks.
+
+Blocking one-offs (SQLite, OTA image staging) happen inside command
+handlers, i.e. on the command executor; the loop's default executor is
+bounded at AIO_EXECUTOR_WORKERS.
+"""
+
+import asyncio
+import json
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+from led_control import TX_ACTIVE_STATE
+
+AIO_EXECUTOR_WORKERS = 4
+STATE_DEBOUNCE_S = 0.01
+STATE_HEARTBEAT_S = 1.0
+BRIDGE_READ_BYTES = 4096
+# How long a writer thread waits for the bridge to drain before the write
+# is reported as failed.
+BRIDGE_WRITE_TIMEOUT_S = 5.0
+
+
+class AsyncDaemonCore:
+    def __init__(self, daemon, bridge_host, bridge_port, command_dir,
+                 command_poll_interval_s):
+        self.daemon = daemon
+        self.bridge_host = bridge_host
+        self.bridge_port = bridge_port
+        self.command_dir = command_dir
+        self.command_poll_interval_s = command_poll_interval_s
+        self.loop = None
+        self._writer = None
+        self._write_lock = None
+        self._dirty = None
+        self._dirty_pending = False
+        self._stop = None
+        self._bridge_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="byh-bridge")
+        self._command_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="byh-cmd")
+
+    # ----- thread-safe entry points (called from any thread) -------------
+    def write(self, data):
+        """Write bytes to the bridge and wait until they have drained.
+
+        Blocks the calling thread (never the loop) for as long as the
+        socket applies backpressure. Returns False if there is no live
+        bridge session, the write fails, or it has not drained within
+        BRIDGE_WRITE_TIMEOUT_S.
+        """
+        writer = self._writer
+        loop = self.loop
+        if writer is None or loop is None or writer.is_closing():
+            return False
+        try:
+            future = asyncio.run_coroutine_threadsafe(self._write(writer, data), loop)
+        except RuntimeError:
+            return False  # loop already closed during shutdown
+        try:
+            future.result(timeout=BRIDGE_WRITE_TIMEOUT_S)
+        except Exception as e:
+            future.cancel()
+            print(f"Error sending to bridge: {e!r}")
+            return False
+        return True
+
+    async def _write(self, writer, data):
+        # One writer at a time: concurrent drain() on the same transport is
+        # not allowed on older Pythons, and this keeps batches contiguous.
+        async with self._write_lock:
+            if writer.is_closing():
+                raise ConnectionResetError("bridge session closed")
+            writer.write(data)
+            await writer.drain()
+
+    def mark_dirty(self):
+        # Only hop onto the loop once per pending flush; mark_state_dirty
+        # is called far more often than we publish.
+        if self._dirty_pending or self.loop is None:
+            return
+        self._dirty_pending = True
+        try:
+            self.loop.call_soon_threadsafe(self._dirty.set)
+        except RuntimeError:
+            pass  # loop already closed during shutdown
+
+    def shutdown(self):
+        if self.loop is not None:
+            try:
+                self.loop.call_soon_threadsafe(self._stop.set)
+            except RuntimeError:
+                pass
+
+    # ----- loop side -------------------------------------------------------
+    def run(self):
+        asyncio.run(self._main())
+        self._bridge_executor.shutdown(wait=False)
+        self._command_executor.shutdown(wait=False)
+
+    async def _main(self):
+        self.loop = asyncio.get_running_loop()
+        self.loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=AIO_EXECUTOR_WORKERS, thread_name_prefix="byh-aio")
+        )
+        self._dirty = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        tasks = [
+            asyncio.create_task(self._bridge_task()),
+            asyncio.create_task(self._command_dir_task()),
+            asyncio.create_task(self._publisher_task()),
+        ]
+        await self._stop.wait()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._writer is not None:
+            self._writer.close()
+
+    async def _bridge_task(self):
+        d = self.daemon
+        backoff = 1.0
+        while d.running:
+            try:
+                reader, writer = await asyncio.open_connection(self.bridge_host, self.bridge_port)
+            except OSError as e:
+                print(f"Error setting up TCP connection to serial bridge: {e}")
+                d.led_handler.update("tx_active", TX_ACTIVE_STATE.DEVICE_ERROR.value)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 5.0)
+                continue
+            backoff = 1.0
+            sock = writer.get_extra_info('socket')
+            if sock is not None:
+                try:
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                except OSError:
+                    pass
+            writer.write((json.dumps({
+                'type': 'config_serial',
+                'port': d.serial_addr,
+                'baud': d.serial_baud,
+            }) + '\n').encode('utf-8'))
+            self._writer = writer
+            d.startup.mark("bridge_connected")
+            d.led_handler.update("tx_active", TX_ACTIVE_STATE.CONNECTED.value)
+            print("Connected to serial bridge (asyncio core).")
+            try:
+                await self._read_bridge(reader)
+                print("Bridge closed the connection (EOF). Reconnecting...")
+            except (ConnectionResetError, BrokenPipeError, OSError) as e:
+                print(f"Bridge socket error: {e}. Reconnecting...")
+            finally:
+                self._writer = None
+                writer.close()
+                # A partial JSON fragment from the dead session must not be
+                # glued onto the new one.
+                d.tcp_buffer = ""
+            d.led_handler.update("tx_active", TX_ACTIVE_STATE.DEVICE_ERROR.value)
+
+    async def _read_bridge(self, reader):
+        buf = bytearray()
+        while self.daemon.running:
+            data = await reader.read(BRIDGE_READ_BYTES)
+            if not data:
+                return
+            buf.extend(data)
+            last_nl = buf.rfind(b"\n")
+            if last_nl < 0:
+                continue
+            complete = bytes(buf[: last_nl + 1])
+            del buf[: last_nl + 1]
+            lines = complete.decode("utf-8", errors="replace").splitlines()
+            # Awaiting keeps chunks strictly ordered on the one-thread
+            # executor and applies natural backpressure to the socket.
+            await self.loop.run_in_executor(self._bridge_executor, self._process_lines, lines)
+
+    def _process_lines(self, lines):
+        d = self.daemon
+        for line in lines:
+            try:
+                d._process_bridge_line(line)
+            except Exception as e:
+                d._note_bridge_line_error(e)
+
+    async def _command_dir_task(self):
+        d = self.daemon
+        await self.loop.run_in_executor(self._command_executor, d._drain_command_dir)
+        try:
+            from watchfiles import awatch
+        except ImportError:
+            awatch = None
+        if awatch is not None:
+            try:
+                os.makedirs(self.command_dir, exist_ok=True)
+                async for _changes in awatch(self.command_dir, stop_event=self._stop):
+                    await self.loop.run_in_executor(self._command_executor, d._drain_command_dir)
+                return
+            except Exception as e:
+                print(f"Command dir watch failed, falling back to polling: {e}")
+        while d.running:
+            await asyncio.sleep(self.command_poll_interval_s)
+            await self.loop.run_in_executor(self._command_executor, d._drain_command_dir)
+
+    async def _publisher_task(self):
+        d = self.daemon
+        while d.running:
+            try:
+                await asyncio.wait_for(self._dirty.wait(), timeout=STATE_HEARTBEAT_S)
+                await asyncio.sleep(STATE_DEBOUNCE_S)
+            except asyncio.TimeoutError:
+                pass  # heartbeat snapshot, same as the threaded flusher
+            self._dirty.clear()
+            self._dirty_pending = False
+            try:
+                await self.loop.run_in_executor(None, d.update_state_file)
+            except Exception as e:
+                print(f"state publisher write error: {e}")
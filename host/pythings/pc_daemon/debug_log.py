@@ -0,0 +1,164 @@
+"""Category-based debug logging for the daemon hot paths.
+
+The serial read loop, the async-load status checks and the show-load /
+precheck paths used to `print()` every line and every status tick. On the Pi
+that is a lot of stdout -> docker log driver traffic, and a slow log driver
+back-pressures the read loop. This module replaces those prints with:
+
+  * categories (`serial_rx`, `serial_tx`, `load`, `show`, `precheck`, `gpio`,
+    `bridge`) that are individually switchable at runtime via the daemon's
+    `set_debug_mode` command, all off by default;
+  * levels -- WARN and ERROR always reach stdout, DEBUG / INFO only when the
+    category is enabled;
+  * lazy formatting -- callers pass a %-format string plus args and nothing is
+    formatted unless the line is actually printed or the ring is dumped;
+  * a per-category token bucket so an enabled category can't flood stdout
+    (suppressed lines are counted and reported once the bucket refills);
+  * an in-memory ring that records every call regardless of whether the
+    category is enabled, so production runs silent but a `dump_debug_log`
+    command can still recover the recent history after something goes wrong.
+
+The ring is a bounded deque; `append` is atomic under the GIL so producers on
+the read / command / show threads never take a lock. The rate-limiter state is
+likewise updated without a lock -- a race between two threads can at worst
+let one extra line through or miscount a suppression, which is fine for a
+debug log.
+
+Args are stored by reference, so a ring entry for a mutable object (e.g. the
+firing array) reflects its state at dump time, not at log time.
+"""
+
+import os
+import time
+import threading
+from collections import deque
+
+DEBUG = 10
+INFO = 20
+WARN = 30
+ERROR = 40
+
+_LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARN: "WARN", ERROR: "ERROR"}
+
+CATEGORIES = (
+    "serial_rx",   # every line read from the bridge
+    "serial_tx",   # every command written to the bridge
+    "load",        # show load + async-load status checks
+    "show",        # show run / broadcast commands
+    "precheck",    # pre-show battery / continuity checks
+    "gpio",        # switch + GPIO events from the bridge
+    "bridge",      # TCP reassembly / bridge control messages
+)
+
+RING_SIZE = 4096
+# Per-category stdout budget once a category is enabled: sustained lines/sec
+# and the burst allowed on top of it.
+RATE_PER_S = 50.0
+RATE_BURST = 200
+
+# Seed enabled categories from the environment so a debug session can start
+# verbose without a UI round-trip. Comma separated, or "all".
+_ENV_CATEGORIES = os.environ.get("BYH_DEBUG_CATEGORIES", "")
+
+
+class DebugLog:
+    def __init__(self, ring_size=RING_SIZE, rate_per_s=RATE_PER_S, burst=RATE_BURST):
+        self.ring = deque(maxlen=ring_size)
+        self.rate_per_s = float(rate_per_s)
+        self.burst = float(burst)
+        # Replaced wholesale (never mutated) so readers need no lock.
+        self._enabled = frozenset()
+        # category -> [tokens, last_refill_monotonic, suppressed_count]
+        self._buckets = {}
+        self.set_categories(_ENV_CATEGORIES)
+
+    def set_categories(self, categories):
+        """Enable exactly `categories` for stdout.
+
+        Accepts an iterable of names, a comma-separated string, "all", or a
+        falsy value (everything off). Unknown names are ignored.
+        """
+        if isinstance(categories, str):
+            categories = [c.strip() for c in categories.split(",") if c.strip()]
+        names = set(categories or ())
+        if "all" in names:
+            names = set(CATEGORIES)
+        self._enabled = frozenset(n for n in names if n in CATEGORIES)
+
+    def enabled_categories(self):
+        return sorted(self._enabled)
+
+    def enabled(self, category):
+        return category in self._enabled
+
+    def log(self, category, level, fmt, *args):
+        self.ring.append((time.time(), category, level, fmt, args))
+        if level < WARN and category not in self._enabled:
+            return
+        if not self._take_token(category, level):
+            return
+        print(self._format(category, level, fmt, args))
+
+    def debug(self, category, fmt, *args):
+        self.log(category, DEBUG, fmt, *args)
+
+    def info(self, category, fmt, *args):
+        self.log(category, INFO, fmt, *args)
+
+    def warn(self, category, fmt, *args):
+        self.log(category, WARN, fmt, *args)
+
+    def error(self, category, fmt, *args):
+        self.log(category, ERROR, fmt, *args)
+
+    def _take_token(self, category, level):
+        now = time.monotonic()
+        bucket = self._buckets.get(category)
+        if bucket is None:
+            bucket = [self.burst, now, 0]
+            self._buckets[category] = bucket
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate_per_s)
+        bucket[1] = now
+        # Errors always go out; they still spend a token so a storm of them
+        # throttles the debug chatter in the same category.
+        if bucket[0] < 1.0 and level < ERROR:
+            bucket[2] += 1
+            return False
+        bucket[0] -= 1.0
+        if bucket[2]:
+            print(f"[{category}] ... {bucket[2]} lines suppressed by rate limit")
+            bucket[2] = 0
+        return True
+
+    @staticmethod
+    def _format(category, level, fmt, args, ts=None):
+        try:
+            msg = fmt % args if args else fmt
+        except Exception:
+            msg = f"{fmt} {args!r}"
+        prefix = f"[{category}]" if level < WARN else f"[{category}] {_LEVEL_NAMES.get(level, level)}:"
+        if ts is None:
+            return f"{prefix} {msg}"
+        return f"{time.strftime('%H:%M:%S', time.localtime(ts))}.{int((ts % 1) * 1000):03d} {prefix} {msg}"
+
+    def dump(self, path, categories=None):
+        """Write the ring (oldest first) to `path`, formatting lazily now.
+
+        Returns the number of lines written. `categories` optionally filters.
+        """
+        entries = list(self.ring)
+        wanted = set(categories) if categories else None
+        count = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.{threading.get_ident()}"
+        with open(tmp_path, "w") as f:
+            for ts, category, level, fmt, args in entries:
+                if wanted and category not in wanted:
+                    continue
+                f.write(self._format(category, level, fmt, args, ts) + "\n")
+                count += 1
+        os.replace(tmp_path, path)
+        return count
+
+
+dlog = DebugLog()
@@ -0,0 +1,175 @@
+"""Per-hop latency tracing for manual fire commands.
+
+A UI fire button click crosses a lot of hops before anything leaves the
+antenna, and until now none of them were timed:
+
+  queue     cmd_daemon.js wrote /tmp/d_cmd/<ms>-<uuid>.json  ->  the daemon
+            picked it up (the filename's ms prefix is the write time; same
+            host clock, so wall-clock subtraction is fine)
+  dispatch  picked up -> handle_manual_fire passed its arm/switch guards
+  resolve   -> protocol handler resolved (zone, target) to a device / wire
+            packet
+  write     -> bytes handed to (and, on the asyncio core, drained by)
+            the bridge socket
+  total     file written (or picked up, for commands without a filename
+            stamp) -> write
+
+Traces are keyed by the command's `cmd_id`. The command thread owns the
+trace while it's being handled (thread-local `current`), so the protocol
+handler and the send path can mark stages without threading the id
+through every signature.
+
+Nothing past the bridge write is timed. The dongle's `C+` lines only
+appear with debug_mode > 0, are printed for every queued command (not just
+fires) and carry no id, so they can't be matched back to a fire.
+
+Each stage feeds a LatencyHistogram: fixed Prometheus-style cumulative
+buckets for the /metrics endpoint plus a bounded window of raw samples
+for p50/p95/p99. Everything is in milliseconds.
+"""
+
+import threading
+import time
+from collections import deque
+
+STAGES = ("queue", "dispatch", "resolve", "write", "total")
+
+# Upper bounds (ms) of the cumulative histogram buckets; +Inf is implied.
+BUCKETS_MS = (0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Raw samples kept per stage for the percentile estimates.
+WINDOW_SAMPLES = 1024
+
+
+class LatencyHistogram:
+    def __init__(self, buckets_ms=BUCKETS_MS, window=WINDOW_SAMPLES):
+        self.buckets_ms = tuple(buckets_ms)
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets_ms) + 1)
+        self._window = deque(maxlen=window)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        if ms < 0:
+            ms = 0.0
+        idx = len(self.buckets_ms)
+        for i, bound in enumerate(self.buckets_ms):
+            if ms <= bound:
+                idx = i
+                break
+        with self._lock:
+            self._counts[idx] += 1
+            self._window.append(ms)
+            self.count += 1
+            self.sum_ms += ms
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self._window)
+            counts = list(self._counts)
+            count, sum_ms, max_ms = self.count, self.sum_ms, self.max_ms
+
+        def pct(p):
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 3)
+
+        cumulative = []
+        running = 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return {
+            "count": count,
+            "sum_ms": round(sum_ms, 3),
+            "max_ms": round(max_ms, 3),
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99),
+            # Cumulative, one per BUCKETS_MS bound plus the trailing +Inf.
+            "buckets": cumulative,
+        }
+
+
+class FireTrace:
+    __slots__ = ("cmd_id", "marks", "queue_ms", "written_at")
+
+    def __init__(self, cmd_id, queue_ms=None):
+        self.cmd_id = cmd_id
+        self.queue_ms = queue_ms
+        self.marks = {"pickup": time.monotonic()}
+        self.written_at = None
+
+
+class FireLatencyTracer:
+    def __init__(self):
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self._local = threading.local()
+
+    # ----- command thread ---------------------------------------------------
+    def begin(self, cmd_id, queued_wall_ms=None):
+        """Start a trace on this thread. `queued_wall_ms` is the epoch-ms the
+        command was written by the UI, when known."""
+        queue_ms = None
+        if queued_wall_ms is not None:
+            queue_ms = max(0.0, time.time() * 1000 - queued_wall_ms)
+        trace = FireTrace(cmd_id, queue_ms)
+        self._local.current = trace
+        return trace
+
+    def mark(self, stage):
+        """Record `stage` on this thread's trace (no-op without one)."""
+        trace = getattr(self._local, "current", None)
+        if trace is not None and stage not in trace.marks:
+            trace.marks[stage] = time.monotonic()
+
+    def mark_written(self):
+        """Called from the send path once bytes reached the bridge socket."""
+        trace = getattr(self._local, "current", None)
+        if trace is None or trace.written_at is not None:
+            return
+        trace.written_at = time.monotonic()
+
+    def end(self):
+        """Close this thread's trace and fold its hops into the histograms."""
+        trace = getattr(self._local, "current", None)
+        self._local.current = None
+        if trace is None or trace.written_at is None:
+            # Guard refused the fire / nothing was sent: not a fire-path
+            # sample, just drop it.
+            return
+        marks = trace.marks
+        if trace.queue_ms is not None:
+            self.histograms["queue"].observe(trace.queue_ms)
+        prev = marks["pickup"]
+        for stage in ("dispatch", "resolve"):
+            at = marks.get(stage)
+            if at is not None:
+                self.histograms[stage].observe((at - prev) * 1000)
+                prev = at
+        self.histograms["write"].observe((trace.written_at - prev) * 1000)
+        self.histograms["total"].observe(
+            (trace.queue_ms or 0.0) + (trace.written_at - marks["pickup"]) * 1000
+        )
+
+    def snapshot(self):
+        return {
+            "buckets_ms": list(BUCKETS_MS),
+            "stages": {stage: h.snapshot() for stage, h in self.histograms.items()},
+        }
+
+
+def queued_ms_from_filename(filename):
+    """cmd_daemon.js names files `<Date.now()>-<uuid>.json`; pull the ms."""
+    head = filename.split("-", 1)[0].split(".", 1)[0]
+    try:
+        return int(head)
+    except ValueError:
+        return None
+
+
+fire_tracer = FireLatencyTracer()
@@ -11,8 +11,14 @@ from enum import Enum
 from led_control import *
 import socket
 import select
+from collections import deque
 
 from config_loader import load_system_config
+from debug_log import dlog
+from aio_core import AsyncDaemonCore
+from startup import StartupSequence
+from latency_trace import fire_tracer, queued_ms_from_filename
+from rf_scan_history import RFScanHistory, BACKGROUND_PASSES
 from protocol_handler.BYHProtocolHandler import BYHProtocolHandler
 
 # Configuration
@@ -29,7 +35,18 @@ LED_FILE_PATH = os.path.join(_DATA_DIR, "ledstate")
 LED_FILE_PATH_WEB = os.path.join(_DATA_DIR, "webactstate")
 COMMAND_DIR = os.path.join(_RUN_DIR, "d_cmd")
 COMMAND_POLL_INTERVAL_S = 0.05
+# Opt into the asyncio I/O core (aio_core.py) instead of the polling
+# threads. Off by default while it rolls out.
+ASYNC_CORE = os.environ.get("BYH_ASYNC_CORE", "0") == "1"
 CURSOR_FILE = os.path.join(_RUN_DIR, "fw_cursor")
+# While a show runs, the time cursor and each fired cue go to the WS server
+# as small typed datagrams on STATE_SOCKET_PATH ({"_event": "cursor", ...})
+# so the UI timeline can animate at this rate instead of stepping once a
+# second off CURSOR_FILE. The file is still written on load / unload and
+# once a second mid-show (diagnostics and the system_state API read it).
+# 0 turns the datagrams off (file-only, the old 1 Hz behaviour).
+CURSOR_PUBLISH_HZ = float(os.environ.get("BYH_CURSOR_PUBLISH_HZ", "20"))
+CURSOR_FILE_INTERVAL_S = 1.0
 SERIAL_PORT = os.environ.get("SERIAL_PORT", "/dev/ttyACM0")
 BAUD_RATE = int(os.environ.get("SERIAL_BAUD", "115200"))
 # Collapse bursts of bridge "serial reopened" events (a flapping USB link can
@@ -47,6 +64,12 @@ DONGLE_RESYNC_DEBOUNCE_S = 2.0
 BRIDGE_HOST = os.environ.get("BYH_BRIDGE_HOST", "host.docker.internal")
 BRIDGE_PORT = int(os.environ.get("BYH_BRIDGE_PORT", "9000"))
 DB_PATH = os.path.join(_DATA_DIR, "backyardhero.db")
+# Startup readiness gates (see startup.py). These replace the fixed 5s
+# boot sleep and the 1s load_show sleep; each is only the worst case when
+# the dependency genuinely isn't there yet.
+DB_READY_TIMEOUT_S = 5.0
+DB_READY_POLL_S = 0.1
+HANDLER_READY_TIMEOUT_S = 5.0
 STATE_FILE_PATH = os.path.join(_DATA_DIR, "state")
 # M1: minimum wall-clock interval between /data/state FILE writes. The
 # in-RAM unix-socket push to the WS server is unthrottled (sub-ms, no SD
@@ -70,11 +93,35 @@ SHOW_STATE_MARKER_PATH = os.path.join(_DATA_DIR, "byh_show_state")
 # wait for inotify on the state file. Falls back silently to file-based
 # delivery if no listener is bound.
 STATE_SOCKET_PATH = os.path.join(_RUN_DIR, "byh_state.sock")
+# Datagram socket we bind for web-activity pushes from the WS server (it
+# still writes LED_FILE_PATH_WEB too, which we read once at startup).
+WEBACT_SOCKET_PATH = os.path.join(_RUN_DIR, "byh_webact.sock")
+WEBACT_FALLBACK_POLL_S = 0.5
+# Datagram socket the light daemon binds for LED state pushes. When
+# nobody is listening we fall back to rewriting LED_FILE_PATH. It lives
+# next to that file rather than in _RUN_DIR: the light daemon runs on the
+# host, outside the container, and the data dir is the mount both see.
+LED_SOCKET_PATH = os.path.join(_DATA_DIR, "byh_led.sock")
+# LEDHandler batches updates over this window before sending a delta frame
+# to the dongle, and rewrites leddata at most this often.
+LED_COALESCE_S = 0.05
+LED_PERSIST_INTERVAL_S = 5.0
 LAST_SCAN_FILE_PATH = os.path.join(_DATA_DIR, "last_scan.json")
+# Per-channel history of every scan (rf_scan_history.py) and its settings:
+# trend window and background-scan interval.
+RF_SCAN_HISTORY_PATH = os.path.join(_DATA_DIR, "rf_scan_history.npz")
+RF_SCAN_CONFIG_PATH = os.path.join(_DATA_DIR, "rf_scan_config.json")
+# rf_background_scanner re-checks at least this often whether a scan is
+# due and the system is idle; a scan still counts as in flight for
+# RF_SCAN_STUCK_S after it was sent.
+RF_BG_SCAN_CHECK_S = 30.0
+RF_SCAN_STUCK_S = 10.0
 # Base config path (kept for reference). The daemon reads config via
 # load_system_config(), which overlays systemcfg.user.json on top of this.
 CONFIG_PATH = os.path.join(_CONFIG_DIR, "systemcfg.json")
 ERR_LOG_PATH = os.path.join(_DATA_DIR, "log", "daemon.err")
+# Where `dump_debug_log` writes the in-memory debug ring (see debug_log.py).
+DEBUG_LOG_DUMP_PATH = os.path.join(_DATA_DIR, "log", "daemon.debug")
 LED_DATA_PATH = os.path.join(_DATA_DIR, "leddata")  # Path for persisting LED states
 SWITCH_GPIO_PIN = 20  # GPIO pin for the start/stop switch
 ARMING_GPIO_PIN = 21  # GPIO pin for the arming switch
@@ -83,20 +130,28 @@ MAN_FIRE_GPIO_PIN = 12  # GPIO pin for the arming switch
 SWITCH_GPIO_KEY = 'switch'
 ARMING_GPIO_KEY = 'arm'
 MAN_FIRE_GPIO_KEY = 'manfire' 
+# monitor_switch blocks on GPIOHandler edge events; the timeout only bounds
+# how long shutdown waits. Queue length caps edges held while it's busy.
+GPIO_EVENT_WAIT_S = 1.0
+GPIO_EVENT_QUEUE_LEN = 64
 
 BAD_TX_THRESHOLD = 10 #its broken then
+# Minimum spacing between tx-activity marks (last_serial_sent refresh + tx
+# LED update). Bursts of sends inside this window cost one monotonic read.
+TX_ACTIVITY_DEBOUNCE_S = 0.25
+SENDMSG_MAX_BUFFERS = 512
 
 FUCKED_UP_SERIAL_TOKEN = "invalid start byte"
 
-DEBUG=True
-
-
 HIGH=1
 LOW=0
 
+# Sentinel for "never sent to the dongle" in LEDHandler's delta tracking.
+_UNSENT = object()
+
 
 def get_handler_cls_for_msg(line_token):
-    print(line_token)
+    dlog.debug("bridge", "handler token: %s", line_token)
     token_to_handler = {
         "{": BYHProtocolHandler
     }
@@ -126,7 +181,21 @@ class LEDHandler:
             "debug_mode": 0
         }
         self.parent = parent
+        # Coalescing state for update()/led_flusher. `_last_sent` is what
+        # the dongle is believed to hold; empty means "send everything".
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._pending_keys = set()
+        self._last_sent = {}
+        self._persist_due = False
+        self._last_persist_ts = 0.0
+        self._led_pub_sock = None
+        # Stamped on every snapshot sent to the light daemon, so it can
+        # tell a stale ledstate file from a newer socket push.
+        self._led_boot = int(time.time() * 1000)
+        self._led_seq = 0
         self._load_persisted_states()
+        self.resync()
 
     def debug_enabled(self):
         return self.led_states.get("debug_mode", 0) == 1
@@ -155,29 +224,128 @@ class LEDHandler:
 
 
     def _persist_led_states(self):
+        # Atomic (tmp + os.replace) so a power cut mid-write can't leave a
+        # truncated leddata that fails to parse on the next boot.
+        tmp_path = None
         try:
-            with open(LED_DATA_PATH, 'w') as f:
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(LED_DATA_PATH) or ".", prefix=".leddata."
+            )
+            with os.fdopen(fd, 'w') as f:
                 json.dump(self.led_states, f, indent=4)
+            os.replace(tmp_path, LED_DATA_PATH)
+            tmp_path = None
         except Exception as e:
             print(f"Error persisting LED states to {LED_DATA_PATH}: {e}")
             # Optionally, you could add an error state to the LED itself here
             # self.parent.write_error(f"Failed to persist LED state: {e}")
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except Exception:
+                    pass
 
     def update(self, key, value):
+        """Record an LED / dongle-setting change; delivery is coalesced.
+
+        Nothing is sent or written here. The key is queued and
+        led_flusher picks it up after LED_COALESCE_S, so a burst of
+        updates (e.g. tx_active flapping through a show load) collapses
+        into at most one frame per window -- and none at all if the value
+        ends up back where the dongle already has it.
+        """
         if key in self.led_states:
-            if self.led_states[key] is not value:
-                self.led_states[key] = value
-                self.parent.send_serial_command(json.dumps(self.led_states))
-                self._persist_led_states()
-                # Write to LED state file for light daemon
-                try:
-                    with open(LED_FILE_PATH, 'w') as f:
-                        json.dump(self.led_states, f, indent=4)
-                except Exception as e:
-                    print(f"Error writing LED state to {LED_FILE_PATH}: {e}")
+            if self.led_states[key] != value:
+                with self._lock:
+                    self.led_states[key] = value
+                    self._pending_keys.add(key)
+                self._dirty.set()
         else:
             print(f"Warning: Attempted to update non-existent LED state key '{key}'")
 
+    def resync(self):
+        """Queue a full frame to the dongle on the next flush.
+
+        Needed after the dongle reboots or the handler is (re)assigned:
+        the delta frames assume the dongle still holds what we last sent.
+        """
+        with self._lock:
+            self._last_sent = {}
+            self._pending_keys.update(self.led_states.keys())
+        self._dirty.set()
+
+    def led_flusher(self):
+        """Coalesce queued LED updates into dongle / light-daemon / disk I/O."""
+        while self.parent.running:
+            self._dirty.wait(timeout=LED_PERSIST_INTERVAL_S)
+            if not self.parent.running:
+                break
+            if self._dirty.is_set():
+                # Let the rest of the burst land before we look.
+                time.sleep(LED_COALESCE_S)
+            self.flush()
+        self.flush(force_persist=True)
+
+    def flush(self, force_persist=False):
+        with self._lock:
+            self._dirty.clear()
+            keys = self._pending_keys
+            self._pending_keys = set()
+            delta = {
+                k: v for k, v in self.led_states.items()
+                if k in keys and self._last_sent.get(k, _UNSENT) != v
+            }
+            snapshot = dict(self.led_states)
+            if delta:
+                self._led_seq += 1
+                snapshot["_boot"] = self._led_boot
+                snapshot["_seq"] = self._led_seq
+        if delta:
+            # Compact delta frame: the dongle's parseLedJSON applies each
+            # key independently, so unchanged keys needn't ride along.
+            frame = json.dumps(delta, separators=(',', ':'))
+            if self.parent.send_serial_command(frame):
+                self._last_sent.update(delta)
+            else:
+                # Not delivered (no bridge yet); keep it queued.
+                with self._lock:
+                    self._pending_keys.update(delta.keys())
+            self._notify_light_daemon(snapshot)
+            self._persist_due = True
+        now = time.monotonic()
+        if self._persist_due and (force_persist or now - self._last_persist_ts >= LED_PERSIST_INTERVAL_S):
+            self._persist_due = False
+            self._last_persist_ts = now
+            self._persist_led_states()
+
+    def _notify_light_daemon(self, snapshot):
+        """Push the full LED state to the light daemon.
+
+        Same scheme as the WS state push: a datagram to LED_SOCKET_PATH if
+        the light daemon has bound it, otherwise fall back to an atomic
+        rewrite of the ledstate file it watches. `snapshot` carries
+        _boot/_seq so the light daemon can order the two paths.
+        """
+        payload = json.dumps(snapshot, separators=(',', ':')).encode('utf-8')
+        try:
+            if self._led_pub_sock is None:
+                self._led_pub_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                self._led_pub_sock.setblocking(False)
+            self._led_pub_sock.sendto(payload, LED_SOCKET_PATH)
+            return
+        except (FileNotFoundError, ConnectionRefusedError, BlockingIOError):
+            pass
+        except Exception as e:
+            print(f"LED socket publish failed, using file: {e}")
+        tmp_path = f"{LED_FILE_PATH}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, LED_FILE_PATH)
+        except Exception as e:
+            print(f"Error writing LED state to {LED_FILE_PATH}: {e}")
+
 class GPIOHandler:
     def __init__(self, chip_name="/dev/gpiochip0"):
         # self.chip = gpiod.Chip(chip_name)
@@ -206,7 +374,13 @@ class GPIOHandler:
             'switch': None,
             'manfire': None
         }
-        pass
+        # Edge events for monitor_switch. Every change to the EFFECTIVE
+        # (post-override) level of any switch appends a snapshot of all
+        # three levels and notifies the condition, so the state machine
+        # wakes on the edge instead of polling, and sees every edge in
+        # order even if two land before it runs.
+        self._cond = threading.Condition()
+        self._events = deque(maxlen=GPIO_EVENT_QUEUE_LEN)
     def setup_line(self, pin, consumer="pull_up_input"):
         pass
     def read_line(self, pin):
@@ -228,7 +402,35 @@ class GPIOHandler:
         return self.sgpio.get(key)
 
     def set_gpio(self, gpio_dict):
-        self.sgpio = gpio_dict
+        with self._cond:
+            before = self.effective_levels()
+            self.sgpio = gpio_dict
+            self._emit_if_changed(before)
+
+    def effective_levels(self):
+        return {key: self.read_key(key) for key in self.sgpio}
+
+    def _emit_if_changed(self, before):
+        # Caller holds self._cond.
+        after = self.effective_levels()
+        if after != before:
+            self._events.append(after)
+            self._cond.notify_all()
+
+    def wait_events(self, timeout):
+        """Block until at least one edge event is queued (or `timeout`
+        elapses) and return all queued events, oldest first."""
+        with self._cond:
+            if not self._events:
+                self._cond.wait(timeout=timeout)
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def wake(self):
+        """Release any wait_events() caller (used on shutdown)."""
+        with self._cond:
+            self._cond.notify_all()
 
     def set_override(self, key, active, on):
         """Force (or release) a switch input. `on` is the human-facing
@@ -238,10 +440,13 @@ class GPIOHandler:
         if key not in self.overrides:
             print(f"Unknown override key '{key}'")
             return False
-        if active:
-            self.overrides[key] = LOW if on else HIGH
-        else:
-            self.overrides[key] = None
+        with self._cond:
+            before = self.effective_levels()
+            if active:
+                self.overrides[key] = LOW if on else HIGH
+            else:
+                self.overrides[key] = None
+            self._emit_if_changed(before)
         return True
 
     def override_snapshot(self):
@@ -264,6 +469,7 @@ gpio_handler=GPIOHandler()
 
 class FireworkDaemon:
     def __init__(self):
+        self.startup = StartupSequence()
         self.serial_connection = None
         self.running = True
         self.running_show = False
@@ -277,6 +483,12 @@ class FireworkDaemon:
         self.current_schedule = None
         self.last_serial_received = None
         self.last_serial_sent = None
+        # Serializes writers (read loop, command poller, show thread, OTA)
+        # so batched sendmsg() calls can't interleave on the socket.
+        self._tx_lock = threading.Lock()
+        self._last_tx_activity_mark = 0.0
+        # Set by run() when the asyncio core is in charge of bridge I/O.
+        self._aio_core = None
         self.is_armed = False
         self.start_sw_active = False
         self.fire_repetition = 6
@@ -337,8 +549,18 @@ class FireworkDaemon:
         # When set, /data/last_scan.json holds the full per-channel result
         # from the most recent scan_result we've received from the dongle.
         self.rf_scan_pending_since_ms = None
+        # True while the scan in flight is one rf_background_scanner
+        # started (so the result can say so).
+        self.rf_scan_background = False
+        self.rf_scan_history = RFScanHistory(RF_SCAN_HISTORY_PATH, RF_SCAN_CONFIG_PATH)
+        self._rf_bg_wake = threading.Event()
 
         self.led_handler = LEDHandler(self)
+        # A persisted dongle debug_mode used to turn on all the host-side
+        # debug prints too; keep that behaviour unless BYH_DEBUG_CATEGORIES
+        # already picked a narrower set.
+        if self.debug_enabled() and not dlog.enabled_categories():
+            dlog.set_categories("all")
 
         # State-publish plumbing. `_state_dirty` is a threading.Event the
         # state flusher coalesces on -- any code path that mutates state
@@ -350,6 +572,9 @@ class FireworkDaemon:
         self._state_dirty = threading.Event()
         self._state_pub_sock = None
         self._state_pub_warned = False
+        self._cursor_pub_interval = 1.0 / CURSOR_PUBLISH_HZ if CURSOR_PUBLISH_HZ > 0 else None
+        self._cursor_pub_ts = 0.0
+        self._cursor_file_ts = 0.0
         # Last value we stamped into /data/byh_show_state. Cached so
         # update_state_file() only writes the marker file when the
         # high-level show state actually transitions, not on every tick.
@@ -363,6 +588,7 @@ class FireworkDaemon:
         self._last_state_file_show_state = None
 
         self.load_config()
+        self.startup.mark("config_loaded")
 
         self.clear_states()
 
@@ -374,6 +600,8 @@ class FireworkDaemon:
         protocol handler callbacks).
         """
         self._state_dirty.set()
+        if self._aio_core is not None:
+            self._aio_core.mark_dirty()
 
     def _publish_state_to_socket(self, state_json_bytes):
         """Best-effort fire-and-forget push to the WS server.
@@ -385,6 +613,8 @@ class FireworkDaemon:
         The state file write still happens, so the WS server will pick
         up the next snapshot via its inotify fallback the moment it
         reconnects.
+
+        Returns True if the datagram was handed to a listener.
         """
         try:
             if self._state_pub_sock is None:
@@ -396,6 +626,7 @@ class FireworkDaemon:
                 self._state_pub_sock.setblocking(False)
             self._state_pub_sock.sendto(state_json_bytes, STATE_SOCKET_PATH)
             self._state_pub_warned = False
+            return True
         except (FileNotFoundError, ConnectionRefusedError, BlockingIOError):
             # Most common case: WS server hasn't bound yet. The file
             # write is the fallback; don't spam the log.
@@ -404,6 +635,16 @@ class FireworkDaemon:
             if not self._state_pub_warned:
                 print(f"State socket publish failed (will keep trying): {e}")
                 self._state_pub_warned = True
+        return False
+
+    def _publish_event(self, event):
+        """Send one typed event datagram (see CURSOR_PUBLISH_HZ) down the
+        state socket. The WS server tells them from fw_state snapshots by
+        the `_event` key."""
+        if self._cursor_pub_interval is None:
+            return False
+        event["ts"] = int(time.time() * 1000)
+        return self._publish_state_to_socket(json.dumps(event, separators=(",", ":")).encode("utf-8"))
 
     def _publish_show_state_marker(self, show_loaded, show_running):
         """Write /data/byh_show_state when the high-level show state changes.
@@ -488,6 +729,33 @@ class FireworkDaemon:
         else:
             print("No system config.")
 
+    def wait_for_db(self):
+        """Readiness gate for the show DB, replacing the old blind boot sleep.
+
+        Opens read-only (mode=ro) so a probe during first boot can't create
+        an empty file ahead of the web app's migrations. Returns as soon as
+        a query succeeds; after DB_READY_TIMEOUT_S we carry on anyway -- the
+        protocol handler reports an empty Receivers table on its own.
+        """
+        deadline = time.monotonic() + DB_READY_TIMEOUT_S
+        last_err = None
+        while self.running:
+            try:
+                conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, timeout=1.0)
+                try:
+                    conn.execute("SELECT count(*) FROM sqlite_master").fetchone()
+                finally:
+                    conn.close()
+                self.startup.mark("db_ready")
+                return True
+            except sqlite3.Error as e:
+                last_err = e
+            if time.monotonic() >= deadline:
+                print(f"WARN: DB not ready after {DB_READY_TIMEOUT_S:.0f}s ({last_err}); starting anyway.")
+                return False
+            time.sleep(DB_READY_POLL_S)
+        return False
+
     def _init_blank_webact_file(self):
         with open(LED_FILE_PATH_WEB, 'w') as file:
             file.write('0')
@@ -556,6 +824,7 @@ class FireworkDaemon:
 
             sock.sendall((json.dumps(config_cmd) + '\n').encode('utf-8'))
             self.tcp_socket = sock
+            self.startup.mark("bridge_connected")
             return True
 
         except Exception as e:
@@ -650,11 +919,87 @@ class FireworkDaemon:
         ).start()
 
     def _dongle_resync_worker(self, handler):
+        # A rebooted dongle forgot the LED/settings frame we delta against.
+        self.led_handler.resync()
         try:
             handler.on_dongle_reconnected()
         except Exception as e:
             print(f"WARN: dongle resync after serial reopen failed: {e}")
 
+    def _process_bridge_line(self, line):
+        """Handle one complete line from the bridge: bridge control
+        messages (tcpstatus / serial_event / gpio), JSON fragment
+        reassembly, then hand-off to the protocol handler. Shared by the
+        threaded read_from_tcp loop and the asyncio core."""
+        if not line:
+            return
+        dlog.debug("serial_rx", "%s", line)
+        bypass=False
+        if line[0] == '{':
+            try:
+                tcpsrvmsg = json.loads(line)
+                if('tcpstatus' in tcpsrvmsg):
+                    bypass = True
+                    dlog.debug("bridge", "Special TCPserv Message")
+                    if('error' in tcpsrvmsg):
+                        self.write_error(tcpsrvmsg.get('error'))
+                    if('serial_config' in tcpsrvmsg and tcpsrvmsg['tcpstatus']):
+                        dlog.debug("bridge", "Acked serial set")
+                        self.serial_addr = tcpsrvmsg['serial_config'].get('port')
+                        self.serial_baud = tcpsrvmsg['serial_config'].get('baud')
+                        # Replacing the handler abandons
+                        # the events any in-flight run_show
+                        # thread is watching. Signal the old
+                        # one to stop first so a stale show
+                        # thread can't keep "running" (and
+                        # writing) against the dead handler.
+                        self._halt_show_for_handler_swap()
+                        self.protocol_handler = BYHProtocolHandler(self)
+                        self.startup.mark("handler_ready")
+                elif(tcpsrvmsg.get('type') == 'serial_event'):
+                    # The bridge transparently reopened
+                    # the dongle's USB serial (hot-replug,
+                    # sleep-resume, WDT reboot) without our
+                    # TCP session dropping. A rebooted
+                    # dongle comes up with a boot-relative
+                    # clock and an empty receiver poll
+                    # table, so a loaded show would still
+                    # appear loaded but never fire. Re-sync
+                    # + re-register so firing self-heals.
+                    bypass = True
+                    self._handle_serial_reopened(tcpsrvmsg)
+                elif('gpio' in tcpsrvmsg):
+                    dlog.debug("gpio", "GPIO set: %r", tcpsrvmsg)
+                    gpio_handler.set_gpio({
+                        'arm': int(tcpsrvmsg.get('armed')),
+                        'switch':  int(tcpsrvmsg.get('start_stop')),
+                        'manfire': int(tcpsrvmsg.get('man_fire')),
+                    })
+                else:
+                    bypass = False
+
+            except Exception as e:
+                dlog.debug("bridge", "Could not process assumedly TCP. Building backup buffer")
+                self.tcp_buffer = (self.tcp_buffer or "") + line
+        elif line[-1] == '}' and self.tcp_buffer:
+            line = self.tcp_buffer + line 
+            dlog.debug("bridge", "End fragment detected - reassembling JSON message from buffer. Line: '%s'", line)
+            self.tcp_buffer = "" 
+        elif self.tcp_buffer:
+            dlog.debug("bridge", "TCP buffer set but no end fragment. Clearing buffer. Line was '%s'", line)
+            self.tcp_buffer = "" 
+        if not bypass:
+            if not self.protocol_handler:
+                if line[0] == '{' or line[0] == 'O':
+                    self.bad_serial_ct = 0
+                    self.led_handler.update("tx_active", TX_ACTIVE_STATE.CONNECTED.value)
+                    print("Got a state but no protocol handler. Attempting to assign")
+                    self.assign_handler_class(line)
+            else:
+                if not self.protocol_handler.process_serial_in(line):
+                    self.bad_serial_ct = self.bad_serial_ct + 1
+        self.last_serial_received = datetime.now()
+
     def read_from_tcp(self):
         """Read data from the TCP socket and process it like serial data."""
         while self.running:
@@ -692,81 +1037,7 @@ class FireworkDaemon:
                         # splitlines() now sees only complete lines.
                         lines = complete.decode("utf-8", errors="replace").splitlines()
                         for line in lines:
-                            if line:
-                                if DEBUG:
-                                    print(line)
-                                bypass=False
-                                if line[0] == '{':
-                                    try:
-                                        tcpsrvmsg = json.loads(line)
-                                        if('tcpstatus' in tcpsrvmsg):
-                                            bypass = True
-                                            print("Special TCPserv Message")
-                                            if('error' in tcpsrvmsg):
-                                                self.write_error(tcpsrvmsg.get('error'))
-                                            if('serial_config' in tcpsrvmsg and tcpsrvmsg['tcpstatus']):
-                                                if(self.debug_enabled()):
-                                                    print("Acked serial set")
-                                                self.serial_addr = tcpsrvmsg['serial_config'].get('port')
-                                                self.serial_baud = tcpsrvmsg['serial_config'].get('baud')
-                                                # Replacing the handler abandons
-                                                # the events any in-flight run_show
-                                                # thread is watching. Signal the old
-                                                # one to stop first so a stale show
-                                                # thread can't keep "running" (and
-                                                # writing) against the dead handler.
-                                                self._halt_show_for_handler_swap()
-                                                self.protocol_handler = BYHProtocolHandler(self)
-                                        elif(tcpsrvmsg.get('type') == 'serial_event'):
-                                            # The bridge transparently reopened
-                                            # the dongle's USB serial (hot-replug,
-                                            # sleep-resume, WDT reboot) without our
-                                            # TCP session dropping. A rebooted
-                                            # dongle comes up with a boot-relative
-                                            # clock and an empty receiver poll
-                                            # table, so a loaded show would still
-                                            # appear loaded but never fire. Re-sync
-                                            # + re-register so firing self-heals.
-                                            bypass = True
-                                            self._handle_serial_reopened(tcpsrvmsg)
-                                        elif('gpio' in tcpsrvmsg):
-                                            if(self.debug_enabled()):
-                                                print("GPIO set")
-                                                print(tcpsrvmsg)
-                                            gpio_handler.set_gpio({
-                                                'arm': int(tcpsrvmsg.get('armed')),
-                                                'switch':  int(tcpsrvmsg.get('start_stop')),
-                                                'manfire': int(tcpsrvmsg.get('man_fire')),
-                                            })
-                                        else:
-                                            bypass = False
-
-                                    except Exception as e:
-                                        if(self.debug_enabled()):
-                                            print("Could not process assumedly TCP. Building backup buffer")
-                                        self.tcp_buffer = (self.tcp_buffer or "") + line
-                                elif line[-1] == '}' and self.tcp_buffer:
-                                    line = self.tcp_buffer + line 
-                                    if(self.debug_enabled()):
-                                        print("End fragment detected - reassembling JSON message from buffer")
-                                        print(f"Line: '{line}'")
-                                    self.tcp_buffer = "" 
-                                elif self.tcp_buffer:
-                                    if(self.debug_enabled()):
-                                        print("TCP buffer set but no end fragment. Clearing buffer")
-                                        print(f"Line was '{line}'")
-                                    self.tcp_buffer = "" 
-                                if not bypass:
-                                    if not self.protocol_handler:
-                                        if line[0] == '{' or line[0] == 'O':
-                                            self.bad_serial_ct = 0
-                                            self.led_handler.update("tx_active", TX_ACTIVE_STATE.CONNECTED.value)
-                                            print("Got a state but no protocol handler. Attempting to assign")
-                                            self.assign_handler_class(line)
-                                    else:
-                                        if not self.protocol_handler.process_serial_in(line):
-                                            self.bad_serial_ct = self.bad_serial_ct + 1
-                                self.last_serial_received = datetime.now()
+                            self._process_bridge_line(line)
                 else:
                     # No live socket: the initial connect failed or the
                     # bridge dropped us. Reconnect with backoff instead of
@@ -780,37 +1051,119 @@ class FireworkDaemon:
                 self._close_tcp_socket()
                 self._reconnect_bridge()
             except Exception as e:
-                self.bad_serial_ct = self.bad_serial_ct + 1
-                if self.bad_serial_ct > BAD_TX_THRESHOLD:
-                    self.write_error(f"Error reading from TCP socket: {e}")
-                    self.led_handler.update("tx_active", TX_ACTIVE_STATE.DEVICE_ERROR.value)
-                print(f"Error reading from TCP socket: {e}")
+                self._note_bridge_line_error(e)
                 time.sleep(0.25)  # Avoid tight loop on error
 
-    # Replace send_serial_command as well:
+    def _note_bridge_line_error(self, e):
+        self.bad_serial_ct = self.bad_serial_ct + 1
+        if self.bad_serial_ct > BAD_TX_THRESHOLD:
+            self.write_error(f"Error reading from TCP socket: {e}")
+            self.led_handler.update("tx_active", TX_ACTIVE_STATE.DEVICE_ERROR.value)
+        print(f"Error reading from TCP socket: {e}")
+
     def send_serial_command(self, data):
         """Send a command over the TCP connection."""
-        if hasattr(self, 'tcp_socket') and self.tcp_socket:
-            try:
-                wd=(data + '\n').encode('utf-8')
-                self.tcp_socket.sendall((data + '\n').encode('utf-8'))
-                if(self.debug_enabled()):
-                    # Skip echoing OTA chunk bodies to stdout -- a single
-                    # transfer is 13K+ lines of opaque hex which buries
-                    # the rest of the log and (depending on the docker
-                    # log driver) backpressures the daemon's read loop
-                    # enough to wedge serial flow control. The OTA
-                    # driver already emits structured progress events.
-                    if not data.startswith("flash_data "):
-                        print(f"Sent to serial via TCP: '{wd}'")
-                self.last_serial_sent = datetime.now()
-                self.led_handler.update("tx_active", TX_ACTIVE_STATE.TRANSMITTING.value)
-            except Exception as e:
-                # A half-dead socket can wedge writes too. Drop it so the
-                # read loop's reconnect path re-establishes the session
-                # rather than every subsequent send silently failing (C3).
-                print(f"Error sending to TCP socket: {e}")
-                self._close_tcp_socket()
+        return self.send_serial_commands([data])
+
+    def send_serial_bytes(self, wire):
+        """Write an already-encoded, newline-terminated command.
+
+        Used by the show fire path, whose 433 packets are compiled to bytes
+        at load time. Returns True if the bytes were handed to the socket.
+        """
+        return self.send_serial_commands([wire])
+
+    def send_serial_commands(self, commands):
+        """Send a batch of commands in a single socket write.
+
+        `commands` may mix str (newline appended, encoded once) and
+        already-encoded bytes (sent as-is). The whole batch goes out in one
+        sendmsg() -- a writev under the hood -- instead of a sendall per
+        line, and the tx LED is marked once via _note_tx_activity rather
+        than per command. Returns True if every byte was written.
+        """
+        if not commands:
+            return True
+        buffers = [
+            c if isinstance(c, (bytes, bytearray)) else (c + '\n').encode('utf-8')
+            for c in commands
+        ]
+        if self._aio_core is not None:
+            # The asyncio core owns the socket; hand the batch to its
+            # StreamWriter (one write per batch). This returns once the
+            # bytes have drained, so mark_written below is accurate.
+            if not self._aio_core.write(b"".join(buffers)):
+                return False
+            fire_tracer.mark_written()
+            self._log_sent(commands)
+            self._note_tx_activity()
+            return True
+        sock = getattr(self, 'tcp_socket', None)
+        if not sock:
+            return False
+        try:
+            with self._tx_lock:
+                self._write_buffers(sock, buffers)
+        except Exception as e:
+            # A half-dead socket can wedge writes too. Drop it so the
+            # read loop's reconnect path re-establishes the session
+            # rather than every subsequent send silently failing (C3).
+            print(f"Error sending to TCP socket: {e}")
+            self._close_tcp_socket()
+            return False
+        fire_tracer.mark_written()
+        self._log_sent(commands)
+        self._note_tx_activity()
+        return True
+
+    @staticmethod
+    def _log_sent(commands):
+        for c in commands:
+            # Skip OTA chunk bodies entirely -- a single transfer is
+            # 13K+ lines of opaque hex which would flush everything
+            # else out of the debug ring. The OTA driver already emits
+            # structured progress events.
+            if isinstance(c, str) and c.startswith("flash_data "):
+                continue
+            dlog.debug("serial_tx", "Sent to serial via TCP: %r", c)
+
+    @staticmethod
+    def _write_buffers(sock, buffers):
+        if len(buffers) == 1 or not hasattr(sock, 'sendmsg'):
+            # No sendmsg on Windows (desktop bundle); one join + sendall is
+            # still a single syscall in the common case.
+            sock.sendall(buffers[0] if len(buffers) == 1 else b"".join(buffers))
+            return
+        pending = [memoryview(b) for b in buffers]
+        while pending:
+            # Stay under IOV_MAX (1024 on Linux) or sendmsg fails EMSGSIZE.
+            sent = sock.sendmsg(pending[:SENDMSG_MAX_BUFFERS])
+            # Drop fully-written buffers, trim a partially-written one.
+            while pending and sent >= len(pending[0]):
+                sent -= len(pending[0])
+                pending.pop(0)
+            if pending and sent:
+                pending[0] = pending[0][sent:]
+
+    def _note_tx_activity(self):
+        """Cheap, debounced "we just transmitted" mark.
+
+        The tx LED only needs to know that traffic is flowing, not about
+        every line. Within TX_ACTIVITY_DEBOUNCE_S of the last mark this is
+        a single monotonic read; otherwise it refreshes last_serial_sent
+        and, only if the LED isn't already showing TRANSMITTING, pushes
+        the LED update (which sends + persists LED state).
+        """
+        now = time.monotonic()
+        if now - self._last_tx_activity_mark < TX_ACTIVITY_DEBOUNCE_S:
+            return
+        # Set before the LED update: that update itself sends a command
+        # and re-enters here, where the fresh mark short-circuits it.
+        self._last_tx_activity_mark = now
+        self.last_serial_sent = datetime.now()
+        led_handler = getattr(self, 'led_handler', None)
+        if led_handler and led_handler.led_states.get("tx_active") != TX_ACTIVE_STATE.TRANSMITTING.value:
+            led_handler.update("tx_active", TX_ACTIVE_STATE.TRANSMITTING.value)
 
     def setup_gpio(self):
         """Set up the GPIO pins for the switches."""
@@ -821,148 +1174,246 @@ class FireworkDaemon:
         self.led_handler.update("error_state", ERR_STATE.OFF.value)
 
     def monitor_switch(self):
-        """Monitor the GPIO switches for state changes."""
+        """Drive the arm / start-stop / manual-fire state machine from
+        GPIOHandler edge events.
+
+        Wakes only when a switch's effective level changes (dongle `gpio`
+        frame or software override), so reaction latency is the event
+        hand-off rather than up to a 100ms poll, and the state is only
+        marked dirty on a real transition.
+        """
 
         # Wait for protocol handler to be assigned. Poll instead of spinning so
         # this thread doesn't peg a CPU core during the dongle handshake.
         while self.running and not self.protocol_handler:
             time.sleep(0.05)
 
+        # Edges queued during the handshake are stale; evaluate the current
+        # levels once (against the HIGH defaults, as the first poll used to)
+        # so a switch already thrown at startup still takes effect.
+        gpio_handler.wait_events(timeout=0)
+        pending = [gpio_handler.effective_levels()]
+
         while self.running:
-            try:
-                self.load_webact_state_and_settings()
-                switch_state = gpio_handler.read_key(SWITCH_GPIO_KEY)
-                arming_state = gpio_handler.read_key(ARMING_GPIO_KEY)
-                man_fire_state = gpio_handler.read_key(MAN_FIRE_GPIO_KEY)
+            for levels in pending:
+                try:
+                    self._handle_switch_levels(levels)
+                except Exception as e:
+                    # Never swallow silently: a broad except here is exactly
+                    # what let the pause AttributeError (C2) ship unnoticed.
+                    tb = traceback.format_exc()
+                    print(f"Error monitoring switches: {e}\n{tb}")
+                    self.write_error(f"Error monitoring switches: {e}\n{tb}")
+            pending = gpio_handler.wait_events(timeout=GPIO_EVENT_WAIT_S)
+
+    def _handle_switch_levels(self, levels):
+        switch_state = levels.get(SWITCH_GPIO_KEY)
+        arming_state = levels.get(ARMING_GPIO_KEY)
+        man_fire_state = levels.get(MAN_FIRE_GPIO_KEY)
+        if (switch_state == self.last_switch_state
+                and arming_state == self.last_arming_state
+                and man_fire_state == self.last_man_fire_state):
+            return
 
+        if self.last_man_fire_state == LOW and man_fire_state == HIGH:
+            print("Manual Fire Disabled.")
+            if self.protocol_handler.show_loaded:
+                self.led_handler.update("show_run_state", RUN_STATE.STOPPED.value)
+            else:
+                self.led_handler.update("show_run_state", RUN_STATE.OFF.value)
+            self.man_fire_enabled=False
 
-                if self.last_man_fire_state == LOW and man_fire_state == HIGH:
-                    print("Manual Fire Disabled.")
+        elif self.last_man_fire_state == HIGH and man_fire_state == LOW:
+            
+            print("Manual Fire Enabled. Schedule Stopped")
+            self.stop_schedule(False)
+            self.man_fire_enabled=True
+            self.led_handler.update("show_run_state",RUN_STATE.MANUAL_FIRE.value)
+
+        # Arming switch logic
+        if self.last_arming_state == LOW and arming_state == HIGH:
+            print("Arming switch deactivated. Disarming the system.")
+            self.stop_schedule()
+            self.is_armed=False
+            self.led_handler.update("arm_state", ARM_STATE.DISARMED.value)
+        elif self.last_arming_state == HIGH and arming_state == LOW:
+            print("Arming switch activated. System is armed.")
+            if self.protocol_handler:
+                if self.protocol_handler.show_loaded:
+                    self.led_handler.update("show_run_state", RUN_STATE.ARMED.value)
+            self.is_armed=True
+            self.led_handler.update("arm_state", ARM_STATE.ARMED.value)
+
+        # Start/stop switch logic
+        if arming_state == LOW:  # Only allow actions if the system is armed
+            if self.last_switch_state == HIGH and switch_state == LOW:
+                print("Start/stop switch transitioned from HIGH to LOW")
+                if not self.protocol_handler:
+                    pass
+                else:
                     if self.protocol_handler.show_loaded:
-                        self.led_handler.update("show_run_state", RUN_STATE.STOPPED.value)
-                    else:
-                        self.led_handler.update("show_run_state", RUN_STATE.OFF.value)
-                    self.man_fire_enabled=False
-
-                elif self.last_man_fire_state == HIGH and man_fire_state == LOW:
-                    
-                    print("Manual Fire Enabled. Schedule Stopped")
-                    self.stop_schedule(False)
-                    self.man_fire_enabled=True
-                    self.led_handler.update("show_run_state",RUN_STATE.MANUAL_FIRE.value)
-
-                # Arming switch logic
-                if self.last_arming_state == LOW and arming_state == HIGH:
-                    print("Arming switch deactivated. Disarming the system.")
-                    self.stop_schedule()
-                    self.is_armed=False
-                    self.led_handler.update("arm_state", ARM_STATE.DISARMED.value)
-                elif self.last_arming_state == HIGH and arming_state == LOW:
-                    print("Arming switch activated. System is armed.")
-                    if self.protocol_handler:
-                        if self.protocol_handler.show_loaded:
-                            self.led_handler.update("show_run_state", RUN_STATE.ARMED.value)
-                    self.is_armed=True
-                    self.led_handler.update("arm_state", ARM_STATE.ARMED.value)
-
-                # Start/stop switch logic
-                if arming_state == LOW:  # Only allow actions if the system is armed
-                    if self.last_switch_state == HIGH and switch_state == LOW:
-                        print("Start/stop switch transitioned from HIGH to LOW")
-                        if not self.protocol_handler:
-                            pass
+                        print("Schedule found")
+                        if(not self.man_fire_enabled):
+                            self.start_schedule()
                         else:
-                            if self.protocol_handler.show_loaded:
-                                print("Schedule found")
-                                if(not self.man_fire_enabled):
-                                    self.start_schedule()
-                                else:
-                                    self.write_error(f"Cannot start a show when manual fire is enabled. Hit Stop, disengage manual fire, then try again.")
-                                    self.led_handler.update("error_state", ERR_STATE.DAEMON.value)
-                            elif(self.man_fire_enabled):
-                                self.led_handler.update("show_run_state",RUN_STATE.MANUAL_FIRE.value)
-                            else:
-                                self.write_error(f"Tried to start show but no show loaded and manual fire is off.")
-
-                    elif self.last_switch_state == LOW and switch_state == HIGH:
-                        print("Start/stop switch transitioned from LOW to HIGH. Stopping schedule...")
-                        if not self.protocol_handler:
-                            pass
+                            self.write_error(f"Cannot start a show when manual fire is enabled. Hit Stop, disengage manual fire, then try again.")
+                            self.led_handler.update("error_state", ERR_STATE.DAEMON.value)
+                    elif(self.man_fire_enabled):
+                        self.led_handler.update("show_run_state",RUN_STATE.MANUAL_FIRE.value)
+                    else:
+                        self.write_error(f"Tried to start show but no show loaded and manual fire is off.")
+
+            elif self.last_switch_state == LOW and switch_state == HIGH:
+                print("Start/stop switch transitioned from LOW to HIGH. Stopping schedule...")
+                if not self.protocol_handler:
+                    pass
+                else:
+                    self.protocol_handler.bounce()
+                    self.waiting_for_client_start = False
+    
+                    if(self.running_show):
+                        self.pause_schedule()
+                    else:
+                        if(not self.protocol_handler.show_loaded):
+                            print("Stopped, but not even a show loaded.. so nothing to do.")
+                            self.led_handler.update("show_run_state", RUN_STATE.OFF.value)
                         else:
-                            self.protocol_handler.bounce()
-                            self.waiting_for_client_start = False
-            
-                            if(self.running_show):
-                                self.pause_schedule()
-                            else:
-                                if(not self.protocol_handler.show_loaded):
-                                    print("Stopped, but not even a show loaded.. so nothing to do.")
-                                    self.led_handler.update("show_run_state", RUN_STATE.OFF.value)
-                                else:
-                                    self.stop_schedule(False)
-                                    self.led_handler.update("show_run_state", RUN_STATE.ARMED.value)
-                elif self.last_switch_state is not switch_state:
-                    self.write_error("Start/Stop switch changed while system was not armed. This is not allowed.")
-
-                # `start_sw_active` gates show loading and is read by the UI
-                # to render "Start switch is ON". It must mirror the actual
-                # (effective, post-override) switch level on every poll, not
-                # just edges seen while armed. Previously it was only set on
-                # armed edges, so toggling the start switch off while disarmed
-                # (e.g. the post-show unstage flow) left it stuck True, and the
-                # operator had to cycle the switch on/off again before a reload
-                # was allowed. Derive it from the live reading instead.
-                self.start_sw_active = (switch_state == LOW)
-
-                self.last_switch_state = switch_state
-                self.last_arming_state = arming_state
-                self.last_man_fire_state = man_fire_state
-                # The flusher will coalesce this with any other dirty
-                # signal that arrived in the last debounce window.
-                self.mark_state_dirty()
-                time.sleep(0.1)  # Check every 100ms
-            except Exception as e:
-                # Never swallow silently: a broad except here is exactly
-                # what let the pause AttributeError (C2) ship unnoticed.
-                tb = traceback.format_exc()
-                print(f"Error monitoring switches: {e}\n{tb}")
-                self.write_error(f"Error monitoring switches: {e}\n{tb}")
+                            self.stop_schedule(False)
+                            self.led_handler.update("show_run_state", RUN_STATE.ARMED.value)
+        elif self.last_switch_state is not switch_state:
+            self.write_error("Start/Stop switch changed while system was not armed. This is not allowed.")
+
+        # `start_sw_active` gates show loading and is read by the UI
+        # to render "Start switch is ON". It must mirror the actual
+        # (effective, post-override) switch level on every event, not
+        # just edges seen while armed. Previously it was only set on
+        # armed edges, so toggling the start switch off while disarmed
+        # (e.g. the post-show unstage flow) left it stuck True, and the
+        # operator had to cycle the switch on/off again before a reload
+        # was allowed. Derive it from the live reading instead.
+        self.start_sw_active = (switch_state == LOW)
+
+        self.last_switch_state = switch_state
+        self.last_arming_state = arming_state
+        self.last_man_fire_state = man_fire_state
+        # The flusher will coalesce this with any other dirty
+        # signal that arrived in the last debounce window.
+        self.mark_state_dirty()
+
+    def webact_listener(self):
+        """Track the WS server's activity state for the web LED.
+
+        ws_server pushes each new value as a datagram to
+        WEBACT_SOCKET_PATH (and still writes the webactstate file). We
+        read the file once at startup to catch up, then block on the
+        socket. If the socket can't be bound (e.g. no AF_UNIX datagrams on
+        Windows) we fall back to re-reading the file only when its mtime
+        changes.
+        """
+        self.load_webact_state_and_settings()
+        sock = self._bind_webact_socket()
+        if sock is None:
+            last_mtime = None
+            while self.running:
+                try:
+                    mtime = os.stat(LED_FILE_PATH_WEB).st_mtime_ns
+                except OSError:
+                    mtime = None
+                if mtime != last_mtime:
+                    last_mtime = mtime
+                    self.load_webact_state_and_settings()
+                time.sleep(WEBACT_FALLBACK_POLL_S)
+            return
+        try:
+            while self.running:
+                try:
+                    data = sock.recv(64)
+                except socket.timeout:
+                    continue
+                try:
+                    self.led_handler.update('web_act_state', int(data.decode('utf-8').strip()))
+                except ValueError:
+                    print(f"Error: webact datagram {data!r} is not a valid integer")
+        finally:
+            sock.close()
+            try:
+                os.unlink(WEBACT_SOCKET_PATH)
+            except OSError:
+                pass
+
+    def _bind_webact_socket(self):
+        try:
+            if os.path.exists(WEBACT_SOCKET_PATH):
+                os.unlink(WEBACT_SOCKET_PATH)
+        except OSError:
+            pass
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.bind(WEBACT_SOCKET_PATH)
+            try:
+                os.chmod(WEBACT_SOCKET_PATH, 0o666)
+            except OSError:
+                pass
+            # Short timeout so the loop notices self.running going False.
+            sock.settimeout(1.0)
+            return sock
+        except Exception as e:
+            print(f"Webact socket bind failed (falling back to file): {e}")
+            return None
 
     def poll_command_dir(self):
         """Poll the /tmp/d_cmd directory for command files."""
         while self.running:
-            handled_command = False
-            try:
-                if not os.path.exists(COMMAND_DIR):
-                    os.makedirs(COMMAND_DIR)
-
-                for filename in sorted(os.listdir(COMMAND_DIR)):
-                    file_path = os.path.join(COMMAND_DIR, filename)
-                    if os.path.isfile(file_path):
-                        with open(file_path, 'r') as file:
-                            command = json.load(file)
-                            print(f"Loaded command from file: {command}")
-                            self.handle_command(command)
-                            handled_command = True
-                            # W5(perf): record the correlation id so the UI
-                            # can confirm this specific command was consumed.
-                            self.last_command_ack = {
-                                "cmd_id": command.get("cmd_id"),
-                                "type": command.get("type"),
-                                "ts": int(datetime.now().timestamp() * 1000),
-                            }
-
-                        os.remove(file_path)
-                        print(f"Deleted command file: {file_path}")
+            self._drain_command_dir()
+            time.sleep(COMMAND_POLL_INTERVAL_S)
 
-            except Exception as e:
-                tb = traceback.format_exc()
-                print(f"Error polling command directory: {e}\n{tb}")
-                self.write_error(f"Error polling command directory: {e}\n{tb}")
+    def _drain_command_dir(self):
+        """Consume every queued command file in name order. Returns True
+        if at least one command was handled."""
+        handled_command = False
+        try:
+            if not os.path.exists(COMMAND_DIR):
+                os.makedirs(COMMAND_DIR)
 
-            if handled_command:
-                self.mark_state_dirty()
-            time.sleep(COMMAND_POLL_INTERVAL_S)
+            for filename in sorted(os.listdir(COMMAND_DIR)):
+                file_path = os.path.join(COMMAND_DIR, filename)
+                if os.path.isfile(file_path):
+                    with open(file_path, 'r') as file:
+                        command = json.load(file)
+                        print(f"Loaded command from file: {command}")
+                        self._consume_command(command, queued_ms_from_filename(filename))
+                        handled_command = True
+
+                    os.remove(file_path)
+                    print(f"Deleted command file: {file_path}")
+
+        except Exception as e:
+            tb = traceback.format_exc()
+            print(f"Error polling command directory: {e}\n{tb}")
+            self.write_error(f"Error polling command directory: {e}\n{tb}")
+
+        if handled_command:
+            self.mark_state_dirty()
+        return handled_command
+
+    def _consume_command(self, command, queued_ms=None):
+        if command.get("type") == "manual_fire":
+            # Hop timing for the fire path; see latency_trace.
+            fire_tracer.begin(command.get("cmd_id"), queued_ms)
+            try:
+                self.handle_command(command)
+            finally:
+                fire_tracer.end()
+        else:
+            self.handle_command(command)
+        # W5(perf): record the correlation id so the UI
+        # can confirm this specific command was consumed.
+        self.last_command_ack = {
+            "cmd_id": command.get("cmd_id"),
+            "type": command.get("type"),
+            "ts": int(datetime.now().timestamp() * 1000),
+        }
+        return self.last_command_ack
 
     def write_error(self, err_msg):
         """Appends a line to a file with a timestamp prepended in square brackets."""
@@ -1004,6 +1455,7 @@ class FireworkDaemon:
         elif(self.last_man_fire_state != LOW):
             self.write_error(f"Cannot manually fire zone:{zone} target:{target} if system is not in manual fire mode.")
         else:
+            fire_tracer.mark("dispatch")
             self.protocol_handler.handle_manual_fire(zone, target, kind=kind)
 
     def handle_command(self, command):
@@ -1096,8 +1548,22 @@ class FireworkDaemon:
             elif command['type'] == 'set_clock_sync_interval':
                 self.led_handler.update("clock_sync_interval_ms", int(command.get('interval_ms', 2000)))
             elif command['type'] == 'set_debug_mode':
+                # `debug_mode` still toggles the dongle's own debug output.
+                # `debug_categories` (list, comma string or "all") picks
+                # which host log categories reach stdout; without it the
+                # flag switches all of them on or off together.
                 self.led_handler.update("debug_mode", int(command.get('debug_mode', 0)))
                 self.debug_mode = int(command.get('debug_mode', 0))
+                categories = command.get('debug_categories')
+                if categories is None:
+                    categories = "all" if self.debug_mode else None
+                dlog.set_categories(categories)
+            elif command['type'] == 'dump_debug_log':
+                try:
+                    count = dlog.dump(DEBUG_LOG_DUMP_PATH, command.get('categories'))
+                    print(f"Dumped {count} debug log lines to {DEBUG_LOG_DUMP_PATH}")
+                except Exception as e:
+                    self.write_error(f"Could not dump debug log: {e}")
             elif command['type'] == 'set_fire_repeat':
                 repeat_ct = int(command.get('repeat_ct', 6))
                 if(repeat_ct==0):
@@ -1317,21 +1783,111 @@ class FireworkDaemon:
                         )
                     except Exception as e:
                         self.write_error(f"scan_radio failed: {e}")
+            elif command['type'] == 'rf_scan_config':
+                # Trend window and background-scan interval (0 = off).
+                # Re-scores the last scan so the recommendation follows a
+                # window change right away.
+                try:
+                    self.rf_scan_history.configure(
+                        window_s=command.get('window_s'),
+                        background_interval_s=command.get('background_interval_s'),
+                    )
+                except (TypeError, ValueError) as e:
+                    self.write_error(f"rf_scan_config failed: {e}")
+                else:
+                    if self.protocol_handler and hasattr(self.protocol_handler, 'refresh_rf_scan_trend'):
+                        self.protocol_handler.refresh_rf_scan_trend()
+                    self._rf_bg_wake.set()
+                    self.mark_state_dirty()
             else:
                 print(f"Unknown command type: {command['type']}")
         else:
             print("Invalid command format.")
 
+    def _rf_scan_idle(self):
+        """True when a background scan can't get in anyone's way: dongle
+        talking to us, no show loaded, not armed, no flash job, no scan
+        already in flight."""
+        handler = self.protocol_handler
+        if not (handler and hasattr(handler, 'start_rf_scan')):
+            return False
+        if handler.show_loaded or self.is_armed:
+            return False
+        for driver in ('ota_driver', 'dongle_flash_driver'):
+            job = getattr(handler, driver, None)
+            if job is not None and job.is_busy():
+                return False
+        pending = self.rf_scan_pending_since_ms
+        if pending and time.time() * 1000 - pending < RF_SCAN_STUCK_S * 1000:
+            return False
+        last_rx = self.last_serial_received
+        return last_rx is not None and (datetime.now() - last_rx).total_seconds() <= 10
+
+    def rf_background_scanner(self):
+        """Run a short RF scan every `background_interval_s` while the
+        system is idle, so the channel trend keeps filling in between the
+        operator's own scans. Sleeps until the next one is due (or
+        rf_scan_config / stop wakes it); the scan itself is just a serial
+        command -- the result comes back through the bridge like any
+        other."""
+        while self.running:
+            wait_s = RF_BG_SCAN_CHECK_S
+            interval = self.rf_scan_history.background_interval_s
+            if interval > 0:
+                last_ms = self.rf_scan_history.last_scan_ms() or 0
+                due_in = last_ms / 1000.0 + interval - time.time()
+                if due_in > 0:
+                    wait_s = min(wait_s, due_in)
+                elif self._rf_scan_idle():
+                    try:
+                        self.protocol_handler.start_rf_scan(passes=BACKGROUND_PASSES, background=True)
+                    except Exception as e:
+                        print(f"background rf scan failed: {e}")
+            self._rf_bg_wake.wait(wait_s)
+            self._rf_bg_wake.clear()
+
     def assign_handler_class(self, token_line):
         handler_cls = get_handler_cls_for_msg(token_line)
         if(handler_cls):
             self.protocol_handler = handler_cls(self)
+            self.startup.mark("handler_ready")
+            self.led_handler.resync()
         else:
             print("Cannot identify protocol handler class")
 
 
     def write_time_cursor(self, tc):
+        """Set the cursor on a show transition (load, unload, start):
+        published immediately and always written to CURSOR_FILE."""
+        self.time_cursor = tc
+        self._publish_event({"_event": "cursor", "t": tc})
+        self._write_cursor_file(tc)
+
+    def update_time_cursor(self, tc):
+        """run_show's per-tick cursor update (~every 10 ms). Publishes at
+        most CURSOR_PUBLISH_HZ, and rewrites the file once a second for
+        its readers that aren't on the event stream."""
         self.time_cursor = tc
+        now = time.monotonic()
+        if self._cursor_pub_interval is not None and now - self._cursor_pub_ts >= self._cursor_pub_interval:
+            self._cursor_pub_ts = now
+            self._publish_event({"_event": "cursor", "t": tc})
+        if now - self._cursor_file_ts >= CURSOR_FILE_INTERVAL_S:
+            self._cursor_file_ts = now
+            self._write_cursor_file(tc)
+
+    def publish_fired_cue(self, item, tc):
+        """Tell the UI a scheduled cue just came due (host-fired or not)."""
+        self._publish_event({
+            "_event": "fired",
+            "id": item.get("id"),
+            "zone": item.get("zone"),
+            "target": item.get("target"),
+            "at": item.get("startTime"),
+            "t": tc,
+        })
+
+    def _write_cursor_file(self, tc):
         with open(CURSOR_FILE, "w") as f:
             f.write(f"{tc:.6f}")
 
@@ -1383,7 +1939,10 @@ class FireworkDaemon:
         """Load a show from the database, process it, and save the runtime payload."""
         self.led_handler.update("show_load_state", LOAD_STATE.LOADING.value)
         self.led_handler.update("error_state", ERR_STATE.OFF.value)
-        time.sleep(1)
+        # A load queued right after boot can beat the dongle's first line;
+        # wait for the handler rather than failing (or sleeping blind).
+        if not self.protocol_handler:
+            self.startup.wait("handler_ready", HANDLER_READY_TIMEOUT_S)
         if(not self.protocol_handler):
             self.write_error("Cannot load a show as there is no available protocol to run")
             self.led_handler.update("show_load_state", LOAD_STATE.LOAD_ERROR.value)
@@ -1564,6 +2123,7 @@ class FireworkDaemon:
             self.led_handler.update("show_run_state", RUN_STATE.PAUSED.value)
         if(self.protocol_handler):
             self.protocol_handler.schedule_pause_event.set()  # Signal all schedules to pause
+        self.mark_state_dirty()
 
     def stop_schedule(self, update_led=True):
         """Stop all running schedules."""
@@ -1609,6 +2169,7 @@ class FireworkDaemon:
             "loaded_show_name": self.loaded_show_name,
             "loaded_show_id": self.loaded_show_id,
             "show_running": any(thread.is_alive() for thread in self.command_timer_threads),
+            "show_paused": self.protocol_handler is not None and self.protocol_handler.schedule_pause_event.is_set(),
             "device_is_transmitting": self.last_serial_sent is not None and (datetime.now() - self.last_serial_sent).total_seconds() <= 10,
             # Dongle command-queue saturation, fed from the per-second
             # status frame. `capacity` is None until a v8+ dongle reports
@@ -1657,8 +2218,33 @@ class FireworkDaemon:
             # "pending" spinner / fall back to a timeout warning.
             "last_command_ack": self.last_command_ack,
             "sst": self.protocol_handler is not None and self.protocol_handler.show_start_time,
-            "receivers": self.protocol_handler is not None and self.protocol_handler.receivers,
+            "receivers": self.protocol_handler is not None and self.protocol_handler.receivers.snapshot(),
             "waiting_for_client_start": self.waiting_for_client_start,
+            # Per-receiver async show-load progress (None unless a load is
+            # waiting on loadComplete): chunk count, per-chunk send attempts
+            # and the device's current retry backoff.
+            "show_load_progress": (
+                self.protocol_handler.get_load_progress()
+                if self.protocol_handler is not None
+                and hasattr(self.protocol_handler, 'get_load_progress')
+                else None
+            ),
+            # Per-hop manual fire latency (p50/p95/p99 + cumulative
+            # buckets for ws_server's /metrics); see latency_trace.
+            "fire_latency": fire_tracer.snapshot(),
+            # Cold-start phase timings (ms since process start) and the
+            # overall readiness flag; see startup.py.
+            "startup": self.startup.snapshot(),
+            # ShowRun row the last run's telemetry was saved to (see
+            # protocol_handler/ShowRunRecorder.py for the query API).
+            "last_show_run_id": getattr(self.protocol_handler, 'last_show_run_id', None),
+            # Planned-vs-actual send lag for host-fired 433 cues.
+            "host_fire_jitter": (
+                self.protocol_handler.get_fire_jitter_stats()
+                if self.protocol_handler is not None
+                and hasattr(self.protocol_handler, 'get_fire_jitter_stats')
+                else None
+            ),
             # OTA flash mode state (None when no job has ever run).
             # Mirrors the OtaState snapshot from OtaFlashDriver so the
             # UI can render a progress bar without a separate fetch.
@@ -1690,6 +2276,7 @@ class FireworkDaemon:
                 "command_response_timeout_ms": self.led_handler.led_states.get("command_response_timeout_ms", 100),
                 "clock_sync_interval_ms": self.led_handler.led_states.get("clock_sync_interval_ms", 2000),
                 "debug_mode": self.led_handler.led_states.get("debug_mode", 0),
+                "debug_categories": dlog.enabled_categories(),
                 "rf": {
                     "addr": self.serial_addr,
                     "baud": self.serial_baud,
@@ -1702,6 +2289,10 @@ class FireworkDaemon:
                     # Compact last-scan summary; the full per-channel
                     # bins live in /data/last_scan.json.
                     "last_scan": self.last_rf_scan_summary,
+                    # Trend scoring / background scan settings
+                    # (rf_scan_config); None if numpy is missing.
+                    "trend_window_s": self.rf_scan_history.window_s if self.rf_scan_history.available else None,
+                    "background_scan_interval_s": self.rf_scan_history.background_interval_s,
                 }
             }
         }
@@ -1724,7 +2315,9 @@ class FireworkDaemon:
         # datagram socket (for sub-millisecond delivery to the WS server
         # when it's bound).
         try:
-            state_bytes = json.dumps(state, indent=4).encode("utf-8")
+            # sort_keys: equal state is equal bytes, which ws_server's
+            # msgpack encoding relies on to spot what changed (ws_codec).
+            state_bytes = json.dumps(state, indent=4, sort_keys=True).encode("utf-8")
         except Exception as e:
             print(f"Error serializing daemon state: {e}")
             return
@@ -1807,12 +2400,20 @@ class FireworkDaemon:
     def stop(self):
         """Stop the daemon."""
         self.running = False
+        gpio_handler.wake()
+        self._rf_bg_wake.set()
+        if self._aio_core is not None:
+            self._aio_core.shutdown()
         # Wake the flusher if it's parked on the dirty event so it can
         # exit cleanly instead of waiting out its 1s heartbeat timeout.
         try:
             self._state_dirty.set()
         except Exception:
             pass
+        try:
+            self.led_handler.flush(force_persist=True)
+        except Exception:
+            pass
         if self._state_pub_sock is not None:
             try:
                 self._state_pub_sock.close()
@@ -1823,8 +2424,43 @@ class FireworkDaemon:
         #GPIO.cleanup()  # Clean up GPIO resources
         print("Daemon stopped.")
 
+    def run_async(self):
+        """Run the daemon on the asyncio I/O core (BYH_ASYNC_CORE=1).
+
+        Bridge I/O, command intake and state publishing move onto one event
+        loop (see aio_core.py); the event-blocked helper threads and the
+        show thread are unchanged.
+        """
+        self.wait_for_db()
+        self.setup_gpio()
+        self.setup_settings()
+        self._aio_core = AsyncDaemonCore(
+            self, BRIDGE_HOST, BRIDGE_PORT, COMMAND_DIR,
+            COMMAND_POLL_INTERVAL_S,
+        )
+        threads = [
+            threading.Thread(target=self.monitor_switch, daemon=True),
+            threading.Thread(target=self.led_handler.led_flusher, daemon=True),
+            threading.Thread(target=self.webact_listener, daemon=True),
+            threading.Thread(target=self.rf_background_scanner, daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            self._aio_core.run()
+        except KeyboardInterrupt:
+            print("Daemon interrupted.")
+        finally:
+            if self.running:
+                self.stop()
+        for timer_thread in self.command_timer_threads:
+            timer_thread.join()
+
     def run(self):
         """Run the daemon."""
+        if ASYNC_CORE:
+            return self.run_async()
+        self.wait_for_db()
         self.setup_serial()
         self.setup_gpio()
         self.setup_settings()
@@ -1840,6 +2476,9 @@ class FireworkDaemon:
             # in monitor_switch/poll_command_dir and adds an immediate
             # path for dongle status updates.
             threading.Thread(target=self.state_flusher, daemon=True),
+            threading.Thread(target=self.led_handler.led_flusher, daemon=True),
+            threading.Thread(target=self.webact_listener, daemon=True),
+            threading.Thread(target=self.rf_background_scanner, daemon=True),
         ]
 
         for thread in threads:
@@ -1863,6 +2502,4 @@ class FireworkDaemon:
 
 if __name__ == "__main__":
     daemon = FireworkDaemon()
-    print("Waiting 10 seconds to start.. just to give everyone time to take their places.")
-    time.sleep(5)
     daemon.run()
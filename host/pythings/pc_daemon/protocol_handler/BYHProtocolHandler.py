@@ -10,9 +10,16 @@ import json
 from enum import Enum
 from led_control import *
 from config_loader import load_system_config
+from debug_log import dlog
+from latency_trace import fire_tracer
 
 from .OtaFlashDriver import OtaFlashDriver
 from .DongleFlashDriver import DongleFlashDriver
+from .ReceiverRegistry import ReceiverRegistry
+from .ShowRunRecorder import (
+    ShowRunRecorder, save_show_run,
+    EV_FIRING, EV_PAUSE, EV_RESUME, EV_STOP, EV_ERROR,
+)
 
 # Base dirs are env-overridable (defaults reproduce the original container
 # paths so Docker/Pi are unchanged; the desktop supervisor sets them to
@@ -25,7 +32,20 @@ _CONFIG_DIR = os.environ.get("BYH_CONFIG_DIR", "/config")
 # updated on operator-initiated scans).
 LAST_SCAN_FILE_PATH = os.path.join(_DATA_DIR, 'last_scan.json')
 
-DEBUG = False
+# How many host-fired cue timings to keep for the jitter stats in state.
+FIRE_TIMING_SAMPLES = 512
+
+# Receiver registration (`sync` / `forget`) is paced by dongle queue credit
+# instead of a fixed 30ms per receiver. The dongle drops commands once its
+# queue is full, so each batch is sized to the free slots it last reported
+# (`qmax` - `q`, FW v8+) minus headroom kept for show / fire traffic. Depth
+# is only reported in the 1Hz status frame, so after a batch we wait for a
+# fresh frame before spending more credit; with no frame inside
+# REGISTER_CREDIT_WAIT_S we fall back to a small blind batch.
+REGISTER_DEFAULT_QUEUE_CAPACITY = 128  # dongle MAX_COMMANDS_IN_QUEUE
+REGISTER_QUEUE_HEADROOM = 32
+REGISTER_CREDIT_WAIT_S = 1.5
+REGISTER_BLIND_BATCH = 8
 
 #T- to show start when signaled to start.
 SHOW_START_TIME_SECONDS = 25
@@ -48,6 +68,15 @@ ASYNC_LOAD_TIMEOUT_MS = 5000
 # (abort_show_load) before this fires.
 LOAD_TIMEOUT_SECONDS = 60
 
+# Per-device backoff for re-sending a receiver's showloadn chunks while an
+# async load is still waiting on loadComplete. The first retry lands
+# LOAD_RETRY_INITIAL_S after the last send for that device, then doubles
+# up to LOAD_RETRY_MAX_S. LOAD_TIMEOUT_SECONDS still bounds the whole
+# wait, so this only shapes how much airtime a marginal receiver costs
+# before we give up on it.
+LOAD_RETRY_INITIAL_S = 2.0
+LOAD_RETRY_MAX_S = 16.0
+
 def chunk_list(lst, n):
     """Yield successive n-sized chunks from lst."""
     for i in range(0, len(lst), n):
@@ -77,10 +106,20 @@ class BSCFireTranslator:
         zone = adj_zone << (2*4)
         safebit = 7 << 4
         targetbit = adj_target
-        rtn_str = str(bin(dev_preamble | zone | safebit | targetbit)).split("b")[1]
+        rtn_str = format(dev_preamble | zone | safebit | targetbit, 'b')
 
         return f">>{rtn_str}:{repetition}<<"
 
+    def compile_fire_wire(zone, target, repetition=8):
+        """Full `433fire` command line, newline-terminated and utf-8 encoded.
+
+        Built once per Bilusocn cue at show load so the run_show timing loop
+        only has to hand ready bytes to the socket. Raises ValueError /
+        TypeError for an unparseable zone, same as the translator.
+        """
+        msg = BSCFireTranslator.translate_zone_target_to_tx_pkg(zone, target, repetition)
+        return f"433fire {msg}\n".encode('utf-8')
+
 class BYHProtocolHandler:
     def __init__(self, parent):
         self.token = "{"
@@ -96,14 +135,28 @@ class BYHProtocolHandler:
         self.show_id=0
         self.load_waiting = False
         self.load_start_ts = 0
-        self.async_retry_ct = 0
         self.status = START_SEQUENCE_STEPS.STANDBY
         self.config = {}
 
         self.firing_array = []
-        self.receivers = {}
+        # Copy-on-write: readers (state flusher, precheck, show thread) get
+        # a consistent snapshot without locking; see ReceiverRegistry.
+        self.receivers = ReceiverRegistry()
         self.types = {}
         self.async_load_targets = {}
+        # Per-device chunk bookkeeping for the in-flight async load, keyed
+        # by device id. Each entry holds the exact showloadn chunks we
+        # sent, how many times each went out, and the device's retry
+        # backoff, so updateRelevantStates re-sends that device's chunks
+        # on its own schedule instead of re-blasting the whole fleet.
+        self.load_progress = {}
+        # (cue id, planned monotonic, actual monotonic) for every
+        # host-fired 433 cue of the current run. Cleared at show start.
+        self.fire_timing = deque(maxlen=FIRE_TIMING_SAMPLES)
+        # Telemetry recorder for the run in progress (None outside
+        # run_show) and the ShowRun row the last run was saved to.
+        self.run_recorder = None
+        self.last_show_run_id = None
         self.show_start_time = 0
         # Idents of receiver rows that exist only in self.receivers
         # because the currently-loaded show owns a Bilusocn 433MHz zone
@@ -130,6 +183,10 @@ class BYHProtocolHandler:
         # fw_state.dongle_ota for the UI.
         self.dongle_flash_driver = DongleFlashDriver(parent)
 
+        # Set whenever a dongle status frame reports its queue depth; the
+        # registration pacer waits on it between batches.
+        self._queue_report = threading.Event()
+
         self.load_initial_receiver_cfg()
         print(f"Initialized Protocol {self.protocol}")
         self.sync_tx_clock()
@@ -137,7 +194,22 @@ class BYHProtocolHandler:
         # the dongle only learns about a receiver after we send it a command.
         # Pre-register every receiver from config so the dongle's TDMA poller
         # starts pinging them immediately, even before the first show traffic.
-        self._register_all_receivers_with_dongle()
+        # This runs on its own thread: __init__ is called from the bridge
+        # read path, which must keep draining serial meanwhile.
+        threading.Thread(
+            target=self._initial_registration_worker,
+            daemon=True,
+        ).start()
+
+    def _initial_registration_worker(self):
+        try:
+            self._register_all_receivers_with_dongle()
+        except Exception as e:
+            print(f"WARN: receiver registration failed: {e}")
+            return
+        startup = getattr(self.parent, 'startup', None)
+        if startup is not None:
+            startup.mark("receivers_registered")
 
     def _register_receiver_with_dongle(self, rcv_ident, rcv_cfg):
         """Send a no-op sync to a single nRF24 receiver so the dongle adds it
@@ -155,19 +227,49 @@ class BYHProtocolHandler:
     def _register_all_receivers_with_dongle(self):
         """Pre-register every (enabled) receiver from config so the dongle's
         TDMA poller starts pinging them immediately, even before any show
-        traffic. Spaced lightly to avoid bursting the queue."""
-        for rcv_ident, rcv_cfg in self.receivers.items():
-            if self._register_receiver_with_dongle(rcv_ident, rcv_cfg):
-                time.sleep(0.03)
-
-    def _forget_receiver_on_dongle(self, rcv_ident):
-        """Tell the dongle to drop a receiver from its poll table immediately,
-        regardless of whether it's "online". Paired with the dongle's
-        `forget IDENT` serial command."""
-        try:
-            self.parent.send_serial_command(f"forget {rcv_ident}")
-        except Exception as e:
-            print(f"WARN: could not forget {rcv_ident}: {e}")
+        traffic. Paced by dongle queue credit (see _send_paced)."""
+        self._send_paced([
+            f"sync {rcv_ident} 0 1"
+            for rcv_ident, rcv_cfg in self.receivers.items()
+            if rcv_cfg.get("type") != "BILUSOCN_433_TX_ONLY"
+        ])
+
+    def note_dongle_queue_report(self):
+        """Called when a status frame refreshed the dongle's `q` / `qmax`."""
+        self._queue_report.set()
+
+    def _queue_credit(self):
+        capacity = getattr(self.parent, 'dongle_cmd_queue_capacity', None) or REGISTER_DEFAULT_QUEUE_CAPACITY
+        depth = getattr(self.parent, 'dongle_cmd_queue_depth', 0) or 0
+        return max(0, capacity - REGISTER_QUEUE_HEADROOM - depth)
+
+    def _send_paced(self, commands):
+        """Send `commands` in batches no larger than the dongle's free queue
+        slots. Blocks between batches until the next status frame, so call
+        it off the bridge read thread. Returns the number sent."""
+        pending = list(commands)
+        sent = 0
+        credit = self._queue_credit()
+        while pending and getattr(self.parent, 'running', True):
+            if credit <= 0:
+                self._queue_report.clear()
+                if self._queue_report.wait(REGISTER_CREDIT_WAIT_S):
+                    credit = self._queue_credit()
+                else:
+                    credit = REGISTER_BLIND_BATCH
+                continue
+            batch, pending = pending[:credit], pending[credit:]
+            try:
+                if not self.parent.send_serial_commands(batch):
+                    print(f"WARN: could not send {len(batch)} registration command(s)")
+                    return sent
+            except Exception as e:
+                print(f"WARN: registration send failed: {e}")
+                return sent
+            sent += len(batch)
+            # The depth we computed credit from predates this batch.
+            credit = 0
+        return sent
 
     #Just something that runs periodically to then invoke housekeeping things
     def bounce(self):
@@ -249,7 +351,7 @@ class BYHProtocolHandler:
     def load_initial_receiver_cfg(self):
         # Receivers come from the SQL Receivers table (DB is source of truth).
         # Protocols / types / system block still come from systemcfg.json.
-        self.receivers = self._load_receivers_from_db()
+        self.receivers.replace_all(self._load_receivers_from_db())
         try:
             # Merged base systemcfg.json + operator systemcfg.user.json.
             data = load_system_config()
@@ -275,18 +377,9 @@ class BYHProtocolHandler:
         Existing `status` substructures are preserved across the reload so
         the live state broadcast doesn't blink for unaffected receivers.
         """
-        old_map = self.receivers or {}
+        old_map = self.receivers.snapshot()
         new_map = self._load_receivers_from_db()
 
-        # Carry over live status / drift / latency for receivers that survive.
-        for ident, def_ in new_map.items():
-            prev = old_map.get(ident)
-            if prev:
-                if 'status' in prev:
-                    def_['status'] = prev['status']
-                if 'drift' in prev:
-                    def_['drift'] = prev['drift']
-
         # Forget anyone that was previously registered but is no longer in
         # the new map (deleted or disabled).
         forgotten = []
@@ -303,19 +396,19 @@ class BYHProtocolHandler:
             # forget AND keep them in self.receivers below.
             if prev.get('__ephemeral'):
                 continue
-            self._forget_receiver_on_dongle(ident)
             forgotten.append(ident)
-            time.sleep(0.03)
 
         # Register anyone new (or re-enabled). Always re-issuing sync for
         # already-known receivers is harmless — the dongle's TDMA poller will
         # absorb the no-op.
-        registered = []
-        for ident, def_ in new_map.items():
-            if ident not in old_map:
-                if self._register_receiver_with_dongle(ident, def_):
-                    registered.append(ident)
-                    time.sleep(0.03)
+        registered = [
+            ident for ident, def_ in new_map.items()
+            if ident not in old_map and def_.get('type') != 'BILUSOCN_433_TX_ONLY'
+        ]
+        self._send_paced(
+            [f"forget {ident}" for ident in forgotten]
+            + [f"sync {ident} 0 1" for ident in registered]
+        )
 
         # Drop dropped latency sample buffers so memory doesn't grow forever
         # across many enable/disable cycles.
@@ -323,16 +416,32 @@ class BYHProtocolHandler:
             if ident not in new_map:
                 self.latency_samples.pop(ident, None)
 
-        # Carry forward any ephemeral rows the currently-loaded show
-        # synthesized for its Bilusocn zones. They live solely on the
-        # protocol handler (no DB row) and would otherwise be wiped by
-        # this DB-driven rebuild, breaking fire resolution mid-show.
-        for ident in self.ephemeral_receiver_idents:
-            prev = old_map.get(ident)
-            if prev is not None:
-                new_map[ident] = prev
-
-        self.receivers = new_map
+        def merge(current):
+            # Runs under the registry's writer lock against the LATEST
+            # map, so status merged by the read thread while we were
+            # syncing / forgetting above isn't lost.
+            merged = {}
+            for ident, def_ in new_map.items():
+                # Carry over live status / drift for receivers that survive.
+                prev = current.get(ident)
+                if prev:
+                    def_ = dict(def_)
+                    if 'status' in prev:
+                        def_['status'] = prev['status']
+                    if 'drift' in prev:
+                        def_['drift'] = prev['drift']
+                merged[ident] = def_
+            # Carry forward any ephemeral rows the currently-loaded show
+            # synthesized for its Bilusocn zones. They live solely on the
+            # protocol handler (no DB row) and would otherwise be wiped by
+            # this DB-driven rebuild, breaking fire resolution mid-show.
+            for ident in self.ephemeral_receiver_idents:
+                prev = current.get(ident)
+                if prev is not None:
+                    merged[ident] = prev
+            return merged
+
+        self.receivers.transform(merge)
         print(
             f"Reloaded receivers from DB: total={len(new_map)} "
             f"registered={registered} forgotten={forgotten}"
@@ -450,11 +559,12 @@ class BYHProtocolHandler:
         return ok
 
     # ----- RF spectrum scan ---------------------------------------------
-    def start_rf_scan(self, passes=10, ch_start=0, ch_end=125):
+    def start_rf_scan(self, passes=10, ch_start=0, ch_end=125, background=False):
         """Issue the dongle's `scan` serial command. The dongle blocks
         polling for ~passes * (ch_end-ch_start+1) * 0.18ms while it sweeps,
         then emits a single `scan_result` JSON line that's picked up in
-        `process_serial_in -> _handle_scan_result`.
+        `process_serial_in -> _handle_scan_result`. `background` marks
+        scans the daemon started itself (rf_background_scanner).
         """
         passes   = max(1, min(50, int(passes)))
         ch_start = max(0, min(125, int(ch_start)))
@@ -464,6 +574,7 @@ class BYHProtocolHandler:
         # in _handle_scan_result. We also stamp this so a stuck scan can
         # be detected (timeout in the UI / state file).
         self.parent.rf_scan_pending_since_ms = int(time.time() * 1000)
+        self.parent.rf_scan_background = background
         # Route through the flusher so all state writes share the same
         # debounce + unix-socket publish path.
         self.parent.mark_state_dirty()
@@ -476,6 +587,8 @@ class BYHProtocolHandler:
     def _handle_scan_result(self, msg_obj):
         """Persist the dongle's scan_result frame to LAST_SCAN_FILE_PATH and
         publish a small summary on self.parent for inclusion in /data/state.
+        The scan also goes into the daemon's RFScanHistory, and the
+        recommendation comes from its trend over the configured window.
         """
         try:
             results = msg_obj.get('results', []) or []
@@ -510,7 +623,7 @@ class BYHProtocolHandler:
                 score = r['hits'] + 0.5 * neigh
                 scored.append((score, -ch, ch, r['hits']))
             scored.sort()
-            recommended_ch = scored[0][2] if scored else None
+            scan_recommended_ch = scored[0][2] if scored else None
             top5 = [
                 {'ch': s[2], 'hits': s[3], 'score': round(s[0], 2)}
                 for s in scored[:5]
@@ -524,34 +637,81 @@ class BYHProtocolHandler:
                 'ch_end':       int(msg_obj.get('ch_end', 125)),
                 'current_ch':   current_ch,
                 'duration_ms':  duration,
-                'recommended_ch': recommended_ch,
+                'background':   bool(self.parent.rf_scan_background),
+                # What this scan alone would pick; `recommended_ch` /
+                # `top` come from the trend when there is one.
+                'scan_recommended_ch': scan_recommended_ch,
+                'scan_top':     top5,
+                'recommended_ch': scan_recommended_ch,
                 'top':          top5,
                 'results':      cleaned,
             }
 
+            history = self.parent.rf_scan_history
+            history.add(host_ts_ms, cleaned, passes)
+            self._apply_rf_trend(full_payload, history.trend())
             self._write_last_scan_atomic(full_payload)
-
-            # Compact summary for /data/state. Don't include the full
-            # 126-bin array here — clients who want the chart fetch
-            # /api/system/rf_scan.
-            self.parent.last_rf_scan_summary = {
-                'host_ts_ms':     host_ts_ms,
-                'passes':         passes,
-                'duration_ms':    duration,
-                'current_ch':     current_ch,
-                'recommended_ch': recommended_ch,
-                'top':            top5,
-            }
+            self._publish_rf_scan_summary(full_payload)
             self.parent.rf_scan_pending_since_ms = None
+            self.parent.rf_scan_background = False
             self.parent.mark_state_dirty()
+            trend = full_payload['trend'] or {}
             print(
-                f"scan_result: {len(cleaned)} bins, "
-                f"current_ch={current_ch}, recommended_ch={recommended_ch}"
+                f"scan_result: {len(cleaned)} bins, current_ch={current_ch}, "
+                f"recommended_ch={full_payload['recommended_ch']} "
+                f"(this scan: {scan_recommended_ch}, trend over {trend.get('scans', 0)} scans)"
             )
         except Exception as e:
             print(f"scan_result handling failed: {e}")
             self.parent.rf_scan_pending_since_ms = None
 
+    @staticmethod
+    def _apply_rf_trend(payload, trend):
+        """Fold the scan history's trend into a last_scan payload: the
+        trend's pick becomes `recommended_ch`, and its top channels (with
+        this scan's hits alongside, for the UI's badges) become `top`."""
+        payload['trend'] = trend
+        if not trend or trend.get('recommended_ch') is None:
+            payload['recommended_ch'] = payload.get('scan_recommended_ch')
+            payload['top'] = payload.get('scan_top') or []
+            return
+        hits = {r['ch']: r['hits'] for r in payload.get('results') or []}
+        payload['recommended_ch'] = trend['recommended_ch']
+        payload['top'] = [dict(t, hits=hits.get(t['ch'])) for t in trend['top']]
+
+    def _publish_rf_scan_summary(self, payload):
+        # Compact summary for /data/state. Don't include the full
+        # 126-bin array (or the trend's per-channel stats) here —
+        # clients who want the chart fetch /api/system/rf_scan.
+        trend = payload.get('trend') or {}
+        self.parent.last_rf_scan_summary = {
+            'host_ts_ms':     payload['host_ts_ms'],
+            'passes':         payload.get('passes'),
+            'duration_ms':    payload.get('duration_ms'),
+            'current_ch':     payload.get('current_ch'),
+            'background':     payload.get('background', False),
+            'recommended_ch': payload.get('recommended_ch'),
+            'scan_recommended_ch': payload.get('scan_recommended_ch'),
+            'trend_scans':    trend.get('scans', 0),
+            'trend_window_s': trend.get('window_s'),
+            'top':            payload.get('top'),
+        }
+
+    def refresh_rf_scan_trend(self):
+        """Re-score last_scan.json against the scan history, e.g. after
+        the trend window changed. No-op before the first scan."""
+        try:
+            with open(LAST_SCAN_FILE_PATH, 'r') as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return
+        payload.setdefault('scan_recommended_ch', payload.get('recommended_ch'))
+        payload.setdefault('scan_top', payload.get('top') or [])
+        self._apply_rf_trend(payload, self.parent.rf_scan_history.trend())
+        self._write_last_scan_atomic(payload)
+        self._publish_rf_scan_summary(payload)
+        self.parent.mark_state_dirty()
+
     @staticmethod
     def _write_last_scan_atomic(payload):
         """Atomic write to LAST_SCAN_FILE_PATH so HTTP readers never see a
@@ -576,13 +736,14 @@ class BYHProtocolHandler:
 
     def updateRelevantStates(self):
         if self.load_waiting and self.show_id and not self.show_loaded:
-            print("Detected async load wait state. Checking statuses")
+            dlog.debug("load", "Detected async load wait state. Checking statuses")
             incomplete_devices = self.get_async_load_targets_not_with_status('loadComplete', True)
             if not incomplete_devices:
                 print("No more devices to wait on. calling it loaded.")
                 self.show_loaded = True
                 self.load_waiting = False
                 self.load_start_ts = 0
+                self.load_progress = {}
                 self.status = START_SEQUENCE_STEPS.LOADED
                 self.parent.signal_show_loaded(self.show_id)
             else:
@@ -601,15 +762,69 @@ class BYHProtocolHandler:
                         f"Receivers still not loaded: {incomplete}"
                     )
                     return
-                print("Waiting on targets to load:", incomplete_devices)
-                self.async_retry_ct += 1
-                if self.async_retry_ct > 10:
-                    print(f"Retrying show load for incomplete devices: {incomplete_devices}")
-                    # Retry only for devices that haven't completed loading
-                    # Skip START_LOAD on retry to avoid resetting receivers that are already loading
-                    incomplete_targets = {dev: self.async_load_targets[dev] for dev in incomplete_devices}
-                    self.load_async_fire_targets(incomplete_targets, self.show_id, False, skip_startload=True)
-                    self.async_retry_ct = 0
+                dlog.debug("load", "Waiting on targets to load: %s", incomplete_devices)
+                self._retry_incomplete_load_chunks(incomplete_devices)
+
+    def _retry_incomplete_load_chunks(self, incomplete_devices):
+        """Re-send the showloadn chunks of devices still not loadComplete.
+
+        Each device carries its own exponential backoff (LOAD_RETRY_INITIAL_S
+        doubling to LOAD_RETRY_MAX_S) so a single marginal receiver doesn't
+        make us re-blast the whole fleet, and a healthy-but-slow one isn't
+        hammered every status tick. Receivers only report the loadComplete
+        bit, not which cues landed, so a retry re-sends all of that
+        device's chunks; cues that already landed are simply overwritten.
+        """
+        now = time.monotonic()
+        for dev in incomplete_devices:
+            progress = self.load_progress.get(dev)
+            if progress is None or now < progress['next_retry_at']:
+                continue
+
+            # Skip START_LOAD unless the receiver has lost the show id (e.g.
+            # it rebooted mid-load); re-issuing it would wipe whatever cues
+            # already landed.
+            receiver_status = self.receivers.get(dev, {}).get('status') or {}
+            if receiver_status.get('showId') != self.show_id:
+                print(f"{dev} lost show {self.show_id}; restarting its load")
+                self.parent.send_serial_command(
+                    f"startload {dev} {progress['expected']} {self.show_id}"
+                )
+                time.sleep(0.05)
+
+            print(
+                f"Re-sending {len(progress['chunks'])} load chunk(s) to {dev} "
+                f"(backoff {progress['backoff_s']:.1f}s)"
+            )
+            for chunk in progress['chunks']:
+                self.send_load_chunk_to_dev(dev, chunk['cues'], repeat=2)
+                chunk['attempts'] += 1
+                progress['resent'] += 1
+                time.sleep(0.03)
+            progress['backoff_s'] = min(progress['backoff_s'] * 2, LOAD_RETRY_MAX_S)
+            progress['next_retry_at'] = time.monotonic() + progress['backoff_s']
+        self.parent.mark_state_dirty()
+
+    def get_load_progress(self):
+        """Serializable per-device view of the in-flight async load for the
+        state file. None when no load is waiting."""
+        if not self.load_progress:
+            return None
+        now = time.monotonic()
+        out = {}
+        for dev, progress in self.load_progress.items():
+            status = self.receivers.get(dev, {}).get('status') or {}
+            chunks = progress['chunks']
+            out[dev] = {
+                'expected': progress['expected'],
+                'load_complete': bool(status.get('loadComplete')) and status.get('showId') == self.show_id,
+                'chunks_total': len(chunks),
+                'chunk_attempts': [c['attempts'] for c in chunks],
+                'chunks_resent': progress['resent'],
+                'retry_backoff_s': progress['backoff_s'],
+                'next_retry_in_ms': max(0, int((progress['next_retry_at'] - now) * 1000)),
+            }
+        return out
 
     def get_async_load_targets_not_with_status(self, key, state):
         false_device_ids = []
@@ -621,18 +836,17 @@ class BYHProtocolHandler:
             # handler (M3).
             status = self.receivers.get(device_id, {}).get('status')
             if not status:
-                print(f"{device_id}: no status yet; treating as not loaded")
+                dlog.debug("load", "%s: no status yet; treating as not loaded", device_id)
                 false_device_ids.append(device_id)
                 continue
             if(status.get('showId') == self.show_id):
                 if(status.get(key)):
-                    print(f"{device_id}:{key} is TRUE as '{status.get(key)}'")
-                    pass
+                    dlog.debug("load", "%s:%s is TRUE as '%s'", device_id, key, status.get(key))
                 else:
-                    print(f"{device_id}:{key} is FALSE as '{status.get(key)}'")
+                    dlog.debug("load", "%s:%s is FALSE as '%s'", device_id, key, status.get(key))
                     false_device_ids.append(device_id)
             else:
-                print(f"Show {self.show_id} not correct for {device_id}({status.get('showId')})")
+                dlog.debug("load", "Show %s not correct for %s(%s)", self.show_id, device_id, status.get('showId'))
                 false_device_ids.append(device_id)
         return false_device_ids
 
@@ -648,10 +862,14 @@ class BYHProtocolHandler:
         right after a replug. Forcing the flag back to False makes the gate
         wait for a fresh startReady reported in response to the showstart we're
         about to send."""
+        def clear(receiver):
+            if 'startReady' in receiver['status']:
+                receiver['status']['startReady'] = False
+
         for device_id in self.async_load_targets:
             status = self.receivers.get(device_id, {}).get('status')
             if status and 'startReady' in status:
-                status['startReady'] = False
+                self.receivers.update(device_id, clear)
 
 
     # Mapping from the dongle's abbreviated keys to the full-name dict
@@ -695,7 +913,7 @@ class BYHProtocolHandler:
         if ident not in self.receivers:
             return False
 
-        full_receiver = dict(self.receivers[ident].get('status') or {})
+        updates = {}
         for abbr_key, full_key in self._ABBR_KEY_MAP.items():
             if abbr_key not in abbr_dict:
                 continue
@@ -711,10 +929,23 @@ class BYHProtocolHandler:
                     self.latency_samples[ident] = samples
                 samples.append(value)
                 value = round(sum(samples) / len(samples))
-            full_receiver[full_key] = value
-        self.receivers[ident]['drift'] = lmtoffset
-        self.receivers[ident]['status'] = full_receiver
-        return True
+            updates[full_key] = value
+
+        def apply(receiver):
+            status = receiver.get('status') or {}
+            status.update(updates)
+            receiver['status'] = status
+            receiver['drift'] = lmtoffset
+
+        recorder = self.run_recorder
+        if recorder is not None and ('x' in abbr_dict or 'b' in abbr_dict or 'sp' in abbr_dict):
+            # `x` is the dongle's latency figure: the latest RTT sample on
+            # an rxupd, its per-receiver average on the status aggregate.
+            recorder.receiver_sample(
+                ident, abbr_dict.get('x'), abbr_dict.get('b'), abbr_dict.get('sp')
+            )
+
+        return self.receivers.update(ident, apply)
 
     def process_status_msg(self, msg_obj):
         # Slow-path tick from the dongle: full per-receiver array. Used
@@ -908,7 +1139,7 @@ class BYHProtocolHandler:
                 # re-issue sync/forget needlessly).
                 if cues_data_param is not None and ident in self.receivers:
                     try:
-                        self.receivers[ident]['cues'] = json.loads(cues_data_param)
+                        self.receivers.set_fields(ident, cues=json.loads(cues_data_param))
                     except (json.JSONDecodeError, TypeError):
                         pass
             finally:
@@ -934,8 +1165,14 @@ class BYHProtocolHandler:
             # Stamp lmt with host-now: the rxcfg arrived via the same
             # USB-CDC path as rxupd does for successful TX, so host time
             # is the most accurate "last contact" we have.
-            self.receivers[ident].setdefault('status', {})
-            self.receivers[ident]['status']['lmt'] = int(time.time() * 1000)
+            lmt = int(time.time() * 1000)
+
+            def stamp(receiver):
+                status = receiver.get('status') or {}
+                status['lmt'] = lmt
+                receiver['status'] = status
+
+            self.receivers.update(ident, stamp)
         else:
             print(f"rxcfg from unknown ident {ident}; ignoring")
 
@@ -993,7 +1230,7 @@ class BYHProtocolHandler:
         of ident -> bool results so the caller can surface partial
         failures."""
         results = {}
-        for ident in list(self.receivers.keys()):
+        for ident in self.receivers.keys():
             if not self.receiver_is_connected(ident):
                 results[ident] = False
                 continue
@@ -1007,11 +1244,10 @@ class BYHProtocolHandler:
         return results
 
     def process_serial_in(self, msg):
-        if(self.parent.debug_mode):
+        if dlog.enabled("serial_rx"):
             if not (msg.startswith('OA ') or msg.startswith('ON ')
                     or msg.startswith('OS ') or msg.startswith('OP ')):
-                print("BYH handler got message to look at")
-                print(msg)
+                dlog.debug("serial_rx", "BYH handler got message to look at: %s", msg)
         if msg.startswith('OA '):
             # Compact OTA ACK from dongle hot path:
             #   OA <idx> <state> <bytes> <attempts>
@@ -1157,6 +1393,14 @@ class BYHProtocolHandler:
                             self.parent.dongle_cmd_queue_capacity = int(msg_obj['qmax'])
                         except (TypeError, ValueError):
                             pass
+                    if 'q' in msg_obj:
+                        self.note_dongle_queue_report()
+                        recorder = self.run_recorder
+                        if recorder is not None:
+                            recorder.queue_depth(
+                                self.parent.dongle_cmd_queue_depth,
+                                self.parent.dongle_cmd_queue_capacity,
+                            )
                     # FW v9+: the dongle echoes its post-clamp clock-sync
                     # interval. Surface it so the UI can confirm the
                     # actually-applied value (e.g. flag clamped settings
@@ -1212,10 +1456,16 @@ class BYHProtocolHandler:
 
         return False
 
-    def fire_item(self, item):
-        print(f"Issuing fire command for {item['id']} at {item['startTime']} with async_fire:{item['async_fire']}")
+    def fire_item(self, item, planned_monotonic=None):
         if(item['async_fire']):
+            self._record_cue(item, planned_monotonic, False)
             print("Ignoring async fire item. It'll take care of it.")
+            return
+        wire = item.get('_wire')
+        if wire:
+            # Pre-encoded at load (compile_fire_wire): one socket write, no
+            # bit twiddling or string building between the timer and the TX.
+            self.parent.send_serial_bytes(wire)
         else:
             msg = BSCFireTranslator.translate_zone_target_to_tx_pkg(item['zone'], item['target'])
             # NB: no trailing " x" — the dongle's isValidMessage requires the
@@ -1223,6 +1473,41 @@ class BYHProtocolHandler:
             # with "<< x" and the dongle silently rejects it (replies "CV 433").
             # Must match the manual-fire path (handle_manual_fire) exactly.
             self.parent.send_serial_command(f"433fire {msg}")
+        if planned_monotonic is not None:
+            actual = time.monotonic()
+            self.fire_timing.append((item.get('id'), planned_monotonic, actual))
+            self._record_cue(item, planned_monotonic, True, actual)
+        print(f"Issued fire command for {item['id']} at {item['startTime']}")
+
+    def _record_cue(self, item, planned_monotonic, host_fired, actual=None):
+        recorder = self.run_recorder
+        if recorder is None or planned_monotonic is None:
+            return
+        recorder.cue(
+            item.get('id'), item.get('startTime'), planned_monotonic,
+            time.monotonic() if actual is None else actual, host_fired,
+        )
+
+    def _record_event(self, ev):
+        recorder = self.run_recorder
+        if recorder is not None:
+            recorder.event(ev)
+
+    def get_fire_jitter_stats(self):
+        """Planned-vs-actual send lag for host-fired (433) cues of the
+        current / last run, in ms. None until a host-fired cue has gone out.
+        """
+        samples = list(self.fire_timing)
+        if not samples:
+            return None
+        lags = [(actual - planned) * 1000.0 for _, planned, actual in samples]
+        return {
+            'count': len(lags),
+            'last_ms': round(lags[-1], 3),
+            'mean_ms': round(sum(lags) / len(lags), 3),
+            'max_ms': round(max(lags), 3),
+            'min_ms': round(min(lags), 3),
+        }
 
     def handle_manual_fire(self, zone, target, kind=None):
         # Bilusocn manual fire is a direct broadcast: there is no DB
@@ -1236,6 +1521,7 @@ class BYHProtocolHandler:
             except (TypeError, ValueError):
                 msg = None
             if msg:
+                fire_tracer.mark("resolve")
                 print(f"Manual Bilusocn fire {zone}:{target}")
                 self.parent.send_serial_command(f"433fire {msg}")
                 return True
@@ -1247,6 +1533,7 @@ class BYHProtocolHandler:
 
         dev_id = self.resolve_zone_target_to_device_id(zone, target)
         if(dev_id):
+            fire_tracer.mark("resolve")
             print(f"Firing {zone}:{target} on {dev_id}")
             if(self.receivers[dev_id]['type'] == "BILUSOCN_433_TX_ONLY"):
                 print("Firing instant 433")
@@ -1356,6 +1643,7 @@ class BYHProtocolHandler:
     def load_async_fire_targets(self, async_fire_targets, showId, setLoadTargets=True, skip_startload=False):
         if(setLoadTargets):
             self.async_load_targets = async_fire_targets
+            self.load_progress = {}
 
         self.status = START_SEQUENCE_STEPS.LOADING
 
@@ -1387,20 +1675,43 @@ class BYHProtocolHandler:
 
             # Pack cues SHOW_LOADN_MAX_CUES at a time into single RF frames.
             # With 6 cues per frame, a 30-cue receiver loads in ~5 frames
-            # instead of 15 — roughly 3x fewer round-trips.
-            chunk_size = self.SHOW_LOADN_MAX_CUES
-            for i in range(0, len(fire_targets), chunk_size):
-                chunk = fire_targets[i:i + chunk_size]
-                # Convert to (time_ms, zero_indexed_pos) tuples. Clamp a
-                # t=0 cue to 1ms: the receiver's loadOneCue silently
-                # ignores time==0, so the cue never sets targetLoaded and
-                # the load never completes (H4). One ms is inaudible in pyro.
-                packed = [(max(1, round(item["startTime"] * 1000)), item["target"] - 1) for item in chunk]
-                self.send_load_chunk_to_dev(target_key, packed, repeat=2)
+            # instead of 15 — roughly 3x fewer round-trips. The chunks are
+            # kept on load_progress so a retry re-sends exactly the same
+            # frames.
+            chunks = self._pack_load_chunks(fire_targets)
+            self.load_progress[target_key] = {
+                'expected': len(fire_targets),
+                'chunks': chunks,
+                'resent': 0,
+                'backoff_s': LOAD_RETRY_INITIAL_S,
+                'next_retry_at': 0.0,
+            }
+            for chunk in chunks:
+                self.send_load_chunk_to_dev(target_key, chunk['cues'], repeat=2)
+                chunk['attempts'] += 1
                 # Light spacing so we don't outrun the dongle's 128-deep queue
                 # when loading huge shows. Dongle dispatch is ~3-5ms/cmd, so
                 # 30ms per host send leaves ~6x headroom.
                 time.sleep(0.03)
+            self.load_progress[target_key]['next_retry_at'] = (
+                time.monotonic() + LOAD_RETRY_INITIAL_S
+            )
+
+    def _pack_load_chunks(self, fire_targets):
+        """Split a device's (deduped, time-sorted) cues into showloadn-sized
+        chunks of (time_ms, zero_indexed_pos) tuples."""
+        chunks = []
+        chunk_size = self.SHOW_LOADN_MAX_CUES
+        for i in range(0, len(fire_targets), chunk_size):
+            # Clamp a t=0 cue to 1ms: the receiver's loadOneCue silently
+            # ignores time==0, so the cue never sets targetLoaded and the
+            # load never completes (H4). One ms is inaudible in pyro.
+            packed = [
+                (max(1, round(item["startTime"] * 1000)), item["target"] - 1)
+                for item in fire_targets[i:i + chunk_size]
+            ]
+            chunks.append({'cues': packed, 'attempts': 0})
+        return chunks
 
     #Figure out which ones we need to preload (native) and which we fire via. daemon (433 Bilusocn).. or if we have zones+targets that we cant fire. Annotates firing array.
     def load_targets_to_devices(self, firing_array, showId):
@@ -1413,6 +1724,18 @@ class BYHProtocolHandler:
             fire_entry = self.resolve_fire_target_to_entry(target)
             #Returns error as string if fucked up
             if(fire_entry):
+                if(not fire_entry["async_fire"]):
+                    # Host-fired 433 cue: compile the wire bytes now so a
+                    # bad zone fails the load instead of the show.
+                    try:
+                        fire_entry['_wire'] = BSCFireTranslator.compile_fire_wire(
+                            fire_entry['zone'], fire_entry['target']
+                        )
+                    except (TypeError, ValueError):
+                        self.errors.append(
+                            f"Load: Could not translate Bilusocn cue {fire_entry['zone']}:{fire_entry['target']} into a TX packet."
+                        )
+                        continue
                 if(fire_entry["async_fire"]):
                     if(not (fire_entry['device_id'] in async_device_load_dict)):
                         async_device_load_dict[fire_entry['device_id']] = [fire_entry]
@@ -1457,7 +1780,7 @@ class BYHProtocolHandler:
             return False
 
         print(f"Loaded firing array for Show {show_id}")
-        print( self.firing_array)
+        dlog.debug("load", "Firing array: %r", self.firing_array)
 
         if(self.async_load_targets):
             self.load_waiting = True
@@ -1484,8 +1807,8 @@ class BYHProtocolHandler:
             self.send_to_active_nodes("reset", " 0", rcv_dict_override=targets)
         self.load_waiting = False
         self.load_start_ts = 0
-        self.async_retry_ct = 0
         self.async_load_targets = {}
+        self.load_progress = {}
         self.show_loaded = False
 
     def abort_show_load(self):
@@ -1509,8 +1832,7 @@ class BYHProtocolHandler:
 
     def send_to_active_nodes(self, cmdpre, cmdpost="", repeat=1, rcv_dict_override=None):
         receiver_dict = self.receivers.items()
-        print("STAN")
-        print(rcv_dict_override)
+        dlog.debug("show", "send_to_active_nodes %s override=%r", cmdpre, rcv_dict_override)
         if(rcv_dict_override):
             receiver_dict = rcv_dict_override.items()
 
@@ -1518,14 +1840,14 @@ class BYHProtocolHandler:
             if self.receiver_is_connected(rcv):
                 # Include repeat count in the command itself
                 cmd = f"{cmdpre} {rcv}{cmdpost} {repeat}"
-                print(f"Sending cmd: {cmd} (repeat={repeat})")
+                dlog.debug("show", "Sending cmd: %s (repeat=%s)", cmd, repeat)
                 self.parent.send_serial_command(cmd)
                 # Dongle now dispatches each cmd in ~3-5ms (down from ~30ms).
                 # 30ms host spacing keeps the dongle queue comfortably below
                 # its 128-deep limit even when broadcasting to 32 receivers.
                 time.sleep(0.03)
             else:
-                print(f"Not sendinf to {rcv} as not connected.")
+                dlog.debug("show", "Not sending to %s as not connected.", rcv)
         
 
 
@@ -1534,6 +1856,7 @@ class BYHProtocolHandler:
         self.firing_array = []
         self.errors = []
         self.async_load_targets = {}
+        self.load_progress = {}
         self.show_id=0
         self.load_waiting = False
         self.show_loaded = False
@@ -1596,7 +1919,7 @@ class BYHProtocolHandler:
                 # Last-write-wins if the operator double-added a zone
                 # somehow; the React side enforces zone uniqueness on
                 # save so this is defensive.
-                self.receivers[ident] = {
+                self.receivers.put(ident, {
                     "type": "BILUSOCN_433_TX_ONLY",
                     "label": label,
                     "enabled": True,
@@ -1606,7 +1929,7 @@ class BYHProtocolHandler:
                         ],
                     },
                     "__ephemeral": True,
-                }
+                })
                 self.ephemeral_receiver_idents.add(ident)
 
     def _clear_ephemeral_receivers(self):
@@ -1662,7 +1985,7 @@ class BYHProtocolHandler:
             # --- Continuity check (only if async and required) ---
             if require_cont and entry.get('async_fire'):
                 cont_arr = status.get('continuity', [])
-                print(cont_arr)
+                dlog.debug("precheck", "%s continuity: %r", dev_id, cont_arr)
                 # continuity is a 4-item array of 64-bit bitmasks
                 if not isinstance(cont_arr, (list, tuple)) or len(cont_arr) != 2:
                     errors.append(
@@ -1700,6 +2023,41 @@ class BYHProtocolHandler:
 
 
     def run_show(self):
+        """Run the loaded show with a ShowRunRecorder attached, then save
+        the run (and its telemetry) to the ShowRun table."""
+        recorder = ShowRunRecorder(self.show_id)
+        self.run_recorder = recorder
+        reason = None
+        try:
+            self._run_show()
+        except Exception:
+            recorder.event(EV_ERROR)
+            reason = "error"
+            raise
+        finally:
+            self.run_recorder = None
+            if reason is None:
+                if self.schedule_stop_event.is_set():
+                    recorder.event(EV_STOP)
+                    reason = "stopped"
+                elif self.status == START_SEQUENCE_STEPS.LOADED:
+                    reason = "completed"
+                elif self.status == START_SEQUENCE_STEPS.ABORTED:
+                    reason = "aborted"
+                else:
+                    reason = "error"
+            self._save_show_run(recorder, reason)
+
+    def _save_show_run(self, recorder, reason):
+        try:
+            blob = recorder.finish(reason)
+            cursor = self.time_cursor if self.time_cursor and self.time_cursor > 0 else 0
+            self.last_show_run_id = save_show_run(db_filepath, recorder, blob, cursor)
+            print(f"Saved show run {self.last_show_run_id} ({reason}, {len(blob)} bytes telemetry)")
+        except Exception as e:
+            print(f"WARN: could not save show run telemetry: {e}")
+
+    def _run_show(self):
         self.schedule_stop_event.clear()  # Reset the stop event
         self.schedule_pause_event.clear()  # Reset the stop event
         self.parent.led_handler.update("show_run_state", RUN_STATE.RUNNING.value)
@@ -1805,7 +2163,10 @@ class BYHProtocolHandler:
             # meantime.
             while(time.monotonic() < show_start_monotonic):
                 self.send_to_active_nodes("play", " 0", 5, self.async_load_targets)
-                time.sleep(3)
+                # Re-send every 3 s, but wake AT the start: t=0 of the
+                # cursor (and the host audio tracking it) is sst, not the
+                # next 3 s tick after it.
+                time.sleep(max(0.0, min(3.0, show_start_monotonic - time.monotonic())))
                 if self.schedule_stop_event.is_set():
                     print("Schedule stopped signaling nodes.")
                     self.running_show = False
@@ -1817,14 +2178,16 @@ class BYHProtocolHandler:
             self.parent.led_handler.update("show_run_state", RUN_STATE.RUNNING.value)
             print("Started show!")
             self.running_show = True  # Set running state
-            print(self.firing_array)
+            dlog.debug("show", "Firing array: %r", self.firing_array)
+            self.fire_timing.clear()
+            self._record_event(EV_FIRING)
             pause_start = 0
             pause_offset = 0
             # All in-show timing is on the monotonic clock. firing_array
             # items carry RELATIVE offsets from t=0 so the wall clock
             # never enters the calculation again until the show ends.
             start_time_monotonic = time.monotonic()
-            last_write_time = start_time_monotonic  # Track last file write time
+            self.parent.write_time_cursor(0)
 
             for item in self.firing_array:
                 delay = item['startTime']  # Convert to MS
@@ -1838,7 +2201,11 @@ class BYHProtocolHandler:
                         return
                     if self.schedule_pause_event.is_set():
                         print("Schedule paused.")
+                        self._record_event(EV_PAUSE)
                         pause_start = time.monotonic()
+                        # Publish the position we stopped at right away (the cursor
+                        # ticks stop while paused); host audio holds on it.
+                        self.parent.write_time_cursor(self.time_cursor)
                         self.send_to_active_nodes("pause", " 0", 5)
                         while self.schedule_pause_event.is_set():  # Stay in paused state
                             time.sleep(0.1)
@@ -1858,19 +2225,21 @@ class BYHProtocolHandler:
                             pause_start = 0
 
                         print("Schedule resumed.")
+                        self.time_cursor = round((time.monotonic() - start_time_monotonic - pause_offset), 2)
+                        self.parent.write_time_cursor(self.time_cursor)
+                        self._record_event(EV_RESUME)
                         self.parent.led_handler.update("show_run_state", RUN_STATE.RUNNING.value)
                         self.send_to_active_nodes("play", " 0", 5)
 
                     time.sleep(0.01)  # Check stop event frequently
-                    self.time_cursor = round((time.monotonic() - start_time_monotonic + pause_offset),2)
-
-                    # Overwrite file every second
-                    if time.monotonic() - last_write_time >= 1:
-                        self.parent.write_time_cursor(self.time_cursor)
-                        last_write_time = time.monotonic()
-
-                self.fire_item(item)
-                print(f"Executing scheduled command: {item}")
+                    # Show position: time since t=0, less time spent paused.
+                    self.time_cursor = round((time.monotonic() - start_time_monotonic - pause_offset),2)
+                    # Rate-limited by the daemon (BYH_CURSOR_PUBLISH_HZ).
+                    self.parent.update_time_cursor(self.time_cursor)
+
+                self.fire_item(item, start_time_monotonic + delay + pause_offset)
+                self.parent.publish_fired_cue(item, self.time_cursor)
+                dlog.debug("show", "Executed scheduled command: %r", item)
             print("All commands fired.")
 
             # The last cue FIRING is not the end of the show. Each cue keeps
@@ -1908,7 +2277,11 @@ class BYHProtocolHandler:
                     return
                 if self.schedule_pause_event.is_set():
                     print("Schedule paused during post-show grace.")
+                    self._record_event(EV_PAUSE)
                     pause_start = time.monotonic()
+                    # Publish the position we stopped at right away (the cursor
+                    # ticks stop while paused); host audio holds on it.
+                    self.parent.write_time_cursor(self.time_cursor)
                     self.send_to_active_nodes("pause", " 0", 5)
                     while self.schedule_pause_event.is_set():
                         time.sleep(0.1)
@@ -1923,14 +2296,15 @@ class BYHProtocolHandler:
                         pause_offset += (time.monotonic() - pause_start)
                         pause_start = 0
                     print("Schedule resumed.")
+                    self.time_cursor = round((time.monotonic() - start_time_monotonic - pause_offset), 2)
+                    self.parent.write_time_cursor(self.time_cursor)
+                    self._record_event(EV_RESUME)
                     self.parent.led_handler.update("show_run_state", RUN_STATE.RUNNING.value)
                     self.send_to_active_nodes("play", " 0", 5)
 
                 time.sleep(0.01)
-                self.time_cursor = round((time.monotonic() - start_time_monotonic + pause_offset), 2)
-                if time.monotonic() - last_write_time >= 1:
-                    self.parent.write_time_cursor(self.time_cursor)
-                    last_write_time = time.monotonic()
+                self.time_cursor = round((time.monotonic() - start_time_monotonic - pause_offset), 2)
+                self.parent.update_time_cursor(self.time_cursor)
 
             print("Show grace period complete.")
             self.running_show = False
@@ -0,0 +1,205 @@
+"""Copy-on-write receiver registry shared across the daemon's threads.
+
+`BYHProtocolHandler.receivers` is written from the TCP read thread
+(status / rxupd / rxcfg merges), the command thread (DB reloads, show-zone
+materialization) and read from the show thread, the precheck and the
+state flusher. A plain dict shared between them only worked by luck: an
+`.items()` walk on one thread could trip "dictionary changed size during
+iteration" the moment another thread added a row, and nested `status`
+dicts were mutated in place while json.dumps was serializing them.
+
+The registry keeps one top-level dict that is NEVER mutated once
+published. Every write builds a new dict (and a new per-receiver dict for
+the receiver it touches) under a writer-only lock, then swaps the
+reference. Readers just grab the current reference -- no lock, no copy --
+and can iterate it for as long as they like; they see a consistent
+snapshot even if writers swap a newer one in underneath them. Writers
+only contend with other writers, and each critical section is a
+shallow copy of a ~32-entry dict, so the serial reader never stalls
+behind a slow reader.
+
+Convention: receiver dicts handed out by readers are shared snapshots and
+must be treated as read-only. Use `update()` / `set_fields()` to change
+a receiver.
+
+Run `python -m protocol_handler.ReceiverRegistry` from the pc_daemon dir
+for a concurrent writer/reader stress check.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, Optional
+
+
+class ReceiverRegistry:
+    def __init__(self, initial: Optional[Dict[str, dict]] = None):
+        self._lock = threading.Lock()
+        self._map: Dict[str, dict] = dict(initial or {})
+
+    # ----- readers (lock-free) ------------------------------------------
+    def snapshot(self) -> Dict[str, dict]:
+        """The current immutable map. Safe to iterate / json.dumps."""
+        return self._map
+
+    def get(self, ident, default=None):
+        return self._map.get(ident, default)
+
+    def __getitem__(self, ident):
+        return self._map[ident]
+
+    def __contains__(self, ident):
+        return ident in self._map
+
+    def __iter__(self):
+        return iter(self._map)
+
+    def __len__(self):
+        return len(self._map)
+
+    def __bool__(self):
+        return bool(self._map)
+
+    def keys(self):
+        return self._map.keys()
+
+    def values(self):
+        return self._map.values()
+
+    def items(self):
+        return self._map.items()
+
+    # ----- writers (copy-on-write) --------------------------------------
+    def replace_all(self, receivers: Dict[str, dict]):
+        new_map = dict(receivers)
+        with self._lock:
+            self._map = new_map
+
+    def transform(self, fn: Callable[[Dict[str, dict]], Dict[str, dict]]):
+        """Swap in `fn(current_map)`. `fn` runs under the writer lock so it
+        sees the latest map; it must return a new dict, not mutate its
+        argument."""
+        with self._lock:
+            self._map = dict(fn(self._map))
+
+    def put(self, ident, receiver: dict):
+        with self._lock:
+            new_map = dict(self._map)
+            new_map[ident] = receiver
+            self._map = new_map
+
+    def pop(self, ident, default=None):
+        with self._lock:
+            if ident not in self._map:
+                return default
+            new_map = dict(self._map)
+            removed = new_map.pop(ident)
+            self._map = new_map
+            return removed
+
+    def update(self, ident, fn: Callable[[dict], None]) -> bool:
+        """Apply `fn` to a private copy of one receiver and publish it.
+
+        The copy is shallow except for `status`, which is copied too since
+        that's the sub-dict the merge paths edit. Anything else nested
+        must be replaced, not mutated. Returns False if `ident` is unknown.
+        """
+        with self._lock:
+            current = self._map.get(ident)
+            if current is None:
+                return False
+            receiver = dict(current)
+            if isinstance(receiver.get('status'), dict):
+                receiver['status'] = dict(receiver['status'])
+            fn(receiver)
+            new_map = dict(self._map)
+            new_map[ident] = receiver
+            self._map = new_map
+        return True
+
+    def set_fields(self, ident, **fields) -> bool:
+        return self.update(ident, lambda receiver: receiver.update(fields))
+
+
+def _stress(duration_s=3.0, n_receivers=32, n_writers=4, n_readers=4):
+    """Hammer the registry with concurrent writers and readers.
+
+    Writers merge status fields, add/remove ephemeral rows and swap the
+    whole map; readers iterate and json-serialize snapshots and check
+    each one is internally consistent. Any exception fails the run.
+    """
+    import json
+    import random
+    import time
+
+    reg = ReceiverRegistry({
+        f"rx{i}": {'label': f"rx{i}", 'status': {'seq': 0}} for i in range(n_receivers)
+    })
+    stop = threading.Event()
+    failures = []
+    bumps = [0] * n_writers
+    reads = [0] * n_readers
+
+    def writer(wid):
+        rng = random.Random(wid)
+        try:
+            while not stop.is_set():
+                op = rng.random()
+                ident = f"rx{rng.randrange(n_receivers)}"
+                if op < 0.8:
+                    def bump(receiver):
+                        status = receiver['status']
+                        status['seq'] = status.get('seq', 0) + 1
+                        status['lmt'] = time.time()
+                    if reg.update(ident, bump):
+                        bumps[wid] += 1
+                elif op < 0.95:
+                    eph = f"__eph{wid}_{rng.randrange(8)}"
+                    if rng.random() < 0.5:
+                        reg.put(eph, {'label': eph, '__ephemeral': True})
+                    else:
+                        reg.pop(eph)
+                else:
+                    reg.transform(lambda cur: {k: v for k, v in cur.items()})
+        except Exception as e:
+            failures.append(f"writer {wid}: {e!r}")
+
+    def reader(rid):
+        try:
+            while not stop.is_set():
+                snap = reg.snapshot()
+                n = 0
+                for ident, receiver in snap.items():
+                    n += 1
+                    if not ident.startswith('__eph') and 'seq' not in receiver.get('status', {}):
+                        failures.append(f"reader {rid}: {ident} missing status")
+                if n != len(snap):
+                    failures.append(f"reader {rid}: snapshot changed under iteration")
+                json.dumps(snap)
+                reads[rid] += 1
+        except Exception as e:
+            failures.append(f"reader {rid}: {e!r}")
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(n_writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(n_readers)]
+    for t in threads:
+        t.start()
+    time.sleep(duration_s)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    # The seq counters must add up to the number of successful bumps,
+    # i.e. no update was lost to a racing writer.
+    total_seq = sum(reg[f"rx{i}"]['status']['seq'] for i in range(n_receivers))
+    if total_seq != sum(bumps):
+        failures.append(f"lost updates: seq total {total_seq} != bumps {sum(bumps)}")
+    print(f"bumps={sum(bumps)} snapshot_reads={sum(reads)} failures={len(failures)}")
+    for f in failures[:10]:
+        print("  " + f)
+    return not failures
+
+
+if __name__ == "__main__":
+    import sys
+    sys.exit(0 if _stress() else 1)
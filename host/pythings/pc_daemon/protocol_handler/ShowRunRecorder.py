@@ -0,0 +1,399 @@
+"""Per-show run telemetry, recorded during run_show and kept in ShowRun.
+
+Each run of a show gets a ShowRun row: when it started and ended, why it
+ended, where the cursor got to, and a telemetry blob with which cues went
+out late, which receivers dropped off the air and how deep the dongle's
+command queue got. The recorder captures all that while the show runs.
+The table itself is part of the app's schema (sqldb.js); the daemon only
+reads and inserts rows.
+
+Recording (hot path):
+  Every event is one fixed 24-byte record packed straight into a
+  preallocated bytearray ring with struct.pack_into -- no per-event
+  objects, no lock. Slots are claimed from an itertools.count, whose
+  next() is atomic under the GIL, so the show thread (cues, pause /
+  resume) and the bridge read thread (receiver samples, queue depth)
+  can both append without contending. If a run outlives the ring the
+  oldest records are overwritten and counted in `dropped`.
+
+  record = kind:u8  pad:u8  key:u16  aux:u32  t:f64  v1:f32  v2:f32
+    t    seconds since the recorder started (monotonic)
+    key  index into the interned-string table (cue id / receiver ident)
+
+    CUE      aux=1 host-fired (433) / 0 receiver-fired, t=sent (or
+             reached, for receiver-fired cues), v1=lag ms vs schedule,
+             v2=cue startTime (s)
+    RX       key=ident, v1=lat ms, v2=battery, aux=success % (NO_VALUE
+             if absent); NaN for absent floats
+    QUEUE    aux=dongle q depth, v1=qmax
+    EVENT    aux=EV_* (start / pause / resume / stop / end / error)
+
+Storage (show end):
+  The ring is unrolled into columns (one array per field) and written as
+  a compact blob: MAGIC, a u32-length JSON header (string table, column
+  layout, run metadata), then the zlib-compressed column bytes. It goes
+  into ShowRun.telemetry with the run's end time / reason.
+
+Query (post-show):
+  load_show_run() / list_show_runs() read it back as a ShowRunTelemetry
+  with helpers for late cues, receiver dropouts, queue depth and events.
+  `python -m protocol_handler.ShowRunRecorder [run_id]` from the pc_daemon
+  dir prints a summary of a stored run (the latest by default).
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import math
+import os
+import sqlite3
+import struct
+import sys
+import time
+import zlib
+from array import array
+from typing import Dict, List, Optional
+
+MAGIC = b"BYHRUN1\n"
+TELEMETRY_FORMAT = "byh-run-columnar-v1"
+
+RECORD = struct.Struct("<BxHIdff")
+RING_RECORDS = 1 << 16  # 1.5 MB; ~20 min of 40 receivers at 1 Hz + rxupd
+NO_VALUE = 0xFFFFFFFF
+
+KIND_CUE = 1
+KIND_RX = 2
+KIND_QUEUE = 3
+KIND_EVENT = 4
+
+EV_START = 1    # run_show entered (precheck begins)
+EV_FIRING = 2   # countdown over, firing loop t=0
+EV_PAUSE = 3
+EV_RESUME = 4
+EV_STOP = 5
+EV_END = 6
+EV_ERROR = 7
+
+EVENT_NAMES = {
+    EV_START: "start", EV_FIRING: "firing", EV_PAUSE: "pause",
+    EV_RESUME: "resume", EV_STOP: "stop", EV_END: "end", EV_ERROR: "error",
+}
+
+# (name, array typecode) per column, in record field order.
+_COLUMNS = (("kind", "B"), ("key", "H"), ("aux", "I"), ("t", "d"), ("v1", "f"), ("v2", "f"))
+
+_NAN = float("nan")
+
+
+class ShowRunRecorder:
+    def __init__(self, show_id, capacity=RING_RECORDS):
+        self.show_id = show_id
+        self.capacity = capacity
+        self._ring = bytearray(RECORD.size * capacity)
+        self._seq = itertools.count()
+        self._keys: Dict[str, int] = {}
+        self._key_list: List[str] = []
+        self.started_wall = time.time()
+        self.t0 = time.monotonic()
+        self.firing_t0 = None
+        self.active = True
+        self.event(EV_START)
+
+    # ----- hot path -------------------------------------------------------
+    def _key(self, name):
+        idx = self._keys.get(name)
+        if idx is None:
+            # Two threads racing on a brand new name can at worst intern it
+            # twice; both indices resolve to the same string on read.
+            idx = len(self._key_list)
+            self._key_list.append(name)
+            self._keys[name] = idx
+        return idx
+
+    def _append(self, kind, key, aux, t, v1, v2):
+        if not self.active:
+            return
+        n = next(self._seq)
+        RECORD.pack_into(self._ring, (n % self.capacity) * RECORD.size,
+                         kind, key, aux, t, v1, v2)
+
+    def now(self):
+        return time.monotonic() - self.t0
+
+    def cue(self, cue_id, start_time_s, planned_monotonic, actual_monotonic, host_fired):
+        self._append(
+            KIND_CUE, self._key(str(cue_id)), 1 if host_fired else 0,
+            actual_monotonic - self.t0,
+            (actual_monotonic - planned_monotonic) * 1000.0,
+            float(start_time_s or 0.0),
+        )
+
+    def receiver_sample(self, ident, lat=None, battery=None, success_pct=None):
+        self._append(
+            KIND_RX, self._key(ident),
+            NO_VALUE if success_pct is None else int(success_pct) & 0xFFFFFFFF,
+            self.now(),
+            _NAN if lat is None else float(lat),
+            _NAN if battery is None else float(battery),
+        )
+
+    def queue_depth(self, depth, capacity=None):
+        self._append(KIND_QUEUE, 0, int(depth) & 0xFFFFFFFF, self.now(),
+                     _NAN if capacity is None else float(capacity), _NAN)
+
+    def event(self, ev):
+        if ev == EV_FIRING:
+            self.firing_t0 = self.now()
+        self._append(KIND_EVENT, 0, ev, self.now(), _NAN, _NAN)
+
+    # ----- show end -------------------------------------------------------
+    def finish(self, end_reason):
+        """Stop recording and return the telemetry blob."""
+        self.event(EV_END)
+        self.active = False
+        self.end_reason = end_reason
+        self.ended_wall = time.time()
+        return self.to_blob()
+
+    def _records(self, total):
+        start = max(0, total - self.capacity)
+        for n in range(start, total):
+            yield RECORD.unpack_from(self._ring, (n % self.capacity) * RECORD.size)
+
+    def to_blob(self):
+        # Slot numbers handed out so far == records written (recording is
+        # already stopped, so nothing races this).
+        total = next(self._seq)
+        cols = [array(code) for _, code in _COLUMNS]
+        for rec in self._records(total):
+            for col, value in zip(cols, rec):
+                col.append(value)
+        payload = b"".join(col.tobytes() for col in cols)
+        header = {
+            "format": TELEMETRY_FORMAT,
+            "show_id": self.show_id,
+            "started_at": self.started_wall,
+            "ended_at": getattr(self, "ended_wall", None),
+            "end_reason": getattr(self, "end_reason", None),
+            "firing_t0": self.firing_t0,
+            "records": len(cols[0]),
+            "dropped": max(0, total - self.capacity),
+            "keys": list(self._key_list),
+            "columns": [[name, code] for name, code in _COLUMNS],
+            # array.tobytes() is native-endian; readers swap if needed.
+            "byteorder": sys.byteorder,
+        }
+        header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        return MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes + zlib.compress(payload, 6)
+
+
+class ShowRunTelemetry:
+    """Read side of a stored run. Columns are plain `array`s."""
+
+    def __init__(self, header, columns, run_id=None):
+        self.header = header
+        self.columns = columns
+        self.run_id = run_id
+        self.keys = header.get("keys", [])
+
+    @classmethod
+    def from_blob(cls, blob, run_id=None):
+        blob = bytes(blob)
+        if not blob.startswith(MAGIC):
+            raise ValueError("not a show run telemetry blob")
+        off = len(MAGIC)
+        (hlen,) = struct.unpack_from("<I", blob, off)
+        off += 4
+        header = json.loads(blob[off:off + hlen].decode("utf-8"))
+        raw = zlib.decompress(blob[off + hlen:])
+        n = header["records"]
+        columns = {}
+        pos = 0
+        for name, code in header["columns"]:
+            col = array(code)
+            size = col.itemsize * n
+            col.frombytes(raw[pos:pos + size])
+            if header.get("byteorder", "little") != sys.byteorder:
+                col.byteswap()
+            columns[name] = col
+            pos += size
+        return cls(header, columns, run_id)
+
+    def _rows(self, kind):
+        c = self.columns
+        for i in range(len(c["kind"])):
+            if c["kind"][i] == kind:
+                yield i
+
+    def cues(self):
+        c = self.columns
+        out = []
+        for i in self._rows(KIND_CUE):
+            lag = c["v1"][i]
+            out.append({
+                "id": self.keys[c["key"][i]],
+                "start_time_s": c["v2"][i],
+                "host_fired": bool(c["aux"][i]),
+                "sent_s": c["t"][i],
+                "scheduled_s": c["t"][i] - lag / 1000.0,
+                "lag_ms": lag,
+            })
+        return out
+
+    def late_cues(self, threshold_ms=20.0, host_only=True):
+        """Cues sent more than `threshold_ms` after schedule. Receiver-fired
+        cues fire on the receiver's own clock, so their lag only says how
+        late the host loop reached them; they're excluded by default."""
+        return [
+            cue for cue in self.cues()
+            if cue["lag_ms"] > threshold_ms and (cue["host_fired"] or not host_only)
+        ]
+
+    def receiver_series(self, ident=None):
+        """{ident: [(t, lat, battery, success_pct), ...]}; None for absent."""
+        c = self.columns
+        out: Dict[str, list] = {}
+        for i in self._rows(KIND_RX):
+            name = self.keys[c["key"][i]]
+            if ident is not None and name != ident:
+                continue
+            out.setdefault(name, []).append((
+                c["t"][i],
+                _none_if_nan(c["v1"][i]),
+                _none_if_nan(c["v2"][i]),
+                None if c["aux"][i] == NO_VALUE else c["aux"][i],
+            ))
+        return out
+
+    def receiver_dropouts(self, gap_s=3.0):
+        """Silences longer than `gap_s` between consecutive samples (and up
+        to the end of the run), per receiver: {ident: [(from_t, to_t)]}."""
+        events = self.events()
+        end_t = events[-1][0] if events else None
+        out = {}
+        for ident, samples in self.receiver_series().items():
+            gaps = []
+            prev = samples[0][0]
+            for t, *_ in samples[1:]:
+                if t - prev > gap_s:
+                    gaps.append((prev, t))
+                prev = t
+            if end_t is not None and end_t - prev > gap_s:
+                gaps.append((prev, end_t))
+            if gaps:
+                out[ident] = gaps
+        return out
+
+    def queue_depth(self):
+        c = self.columns
+        return [(c["t"][i], c["aux"][i]) for i in self._rows(KIND_QUEUE)]
+
+    def events(self):
+        c = self.columns
+        return [(c["t"][i], EVENT_NAMES.get(c["aux"][i], str(c["aux"][i])))
+                for i in self._rows(KIND_EVENT)]
+
+    def summary(self, late_ms=20.0, gap_s=3.0):
+        cues = self.cues()
+        host = [cue["lag_ms"] for cue in cues if cue["host_fired"]]
+        depth = [q for _, q in self.queue_depth()]
+        return {
+            "run_id": self.run_id,
+            "show_id": self.header.get("show_id"),
+            "end_reason": self.header.get("end_reason"),
+            "records": self.header.get("records"),
+            "dropped_records": self.header.get("dropped"),
+            "cues": len(cues),
+            "host_fired": len(host),
+            "late_cues": len([lag for lag in host if lag > late_ms]),
+            "max_lag_ms": round(max(host), 3) if host else None,
+            "receivers_sampled": len(self.receiver_series()),
+            "receiver_dropouts": {k: len(v) for k, v in self.receiver_dropouts(gap_s).items()},
+            "queue_depth_max": max(depth) if depth else None,
+            "events": self.events(),
+        }
+
+
+def _none_if_nan(v):
+    return None if math.isnan(v) else v
+
+
+# ----- ShowRun table ------------------------------------------------------
+# Created by the app (sqldb.js initializeDatabase); keep the two in step.
+
+
+def _ts(epoch):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(epoch)) if epoch else None
+
+
+def save_show_run(db_path, recorder, blob, cursor_position_s=0):
+    """Insert a finished run; returns the new ShowRun id."""
+    conn = sqlite3.connect(db_path, timeout=5.0)
+    try:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ShowRun'").fetchone() is None:
+            raise RuntimeError("no ShowRun table yet; the app creates it when it opens the DB")
+        cur = conn.execute(
+            "INSERT INTO ShowRun (show_id, started_at, cursor_position_ms,"
+            " ended_at, end_reason, telemetry_format, telemetry)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                recorder.show_id,
+                _ts(recorder.started_wall),
+                max(0, int((cursor_position_s or 0) * 1000)),
+                _ts(getattr(recorder, "ended_wall", None)),
+                getattr(recorder, "end_reason", None),
+                TELEMETRY_FORMAT,
+                sqlite3.Binary(blob),
+            ),
+        )
+        conn.commit()
+        return cur.lastrowid
+    finally:
+        conn.close()
+
+
+def list_show_runs(db_path, show_id=None):
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        sql = ("SELECT id, show_id, started_at, cursor_position_ms, ended_at, end_reason,"
+               " telemetry IS NOT NULL FROM ShowRun")
+        args = ()
+        if show_id is not None:
+            sql += " WHERE show_id = ?"
+            args = (show_id,)
+        sql += " ORDER BY id DESC"
+        return [
+            {"id": r[0], "show_id": r[1], "started_at": r[2], "cursor_position_ms": r[3],
+             "ended_at": r[4], "end_reason": r[5], "has_telemetry": bool(r[6])}
+            for r in conn.execute(sql, args)
+        ]
+    finally:
+        conn.close()
+
+
+def load_show_run(db_path, run_id=None) -> Optional[ShowRunTelemetry]:
+    """Telemetry for ShowRun `run_id` (latest run with telemetry if None)."""
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        if run_id is None:
+            row = conn.execute(
+                "SELECT id, telemetry FROM ShowRun WHERE telemetry IS NOT NULL ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+        else:
+            row = conn.execute("SELECT id, telemetry FROM ShowRun WHERE id = ?", (run_id,)).fetchone()
+    finally:
+        conn.close()
+    if not row or row[1] is None:
+        return None
+    return ShowRunTelemetry.from_blob(row[1], run_id=row[0])
+
+
+if __name__ == "__main__":
+    _db = os.path.join(os.environ.get("BYH_DATA_DIR", "/data"), "backyardhero.db")
+    _run = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    _tel = load_show_run(_db, _run)
+    if _tel is None:
+        print("No show run telemetry found.")
+        sys.exit(1)
+    print(json.dumps(_tel.summary(), indent=2))
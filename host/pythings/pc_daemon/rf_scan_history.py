@@ -0,0 +1,259 @@
+"""Rolling RF scan history and channel-quality trend scoring.
+
+A single scan is a ~1 s sample of the band: one microwave burst or a
+Wi-Fi AP that happened to be idle and it recommends the wrong channel.
+Every scan_result the dongle sends is kept here as one row of per-channel
+hit counts, in a fixed ring of HISTORY_CAPACITY rows that's persisted to
+RF_SCAN_HISTORY_PATH (a small .npz, ~70 KB), and the recommendation comes
+from all scans in the trend window instead of the last one.
+
+Per channel, over the scans in the window (occupancy = hits / passes, so
+scans with different pass counts compare; channels a partial scan didn't
+cover simply don't count):
+
+    mean    average occupancy
+    peak    worst occupancy seen
+    std     how much it moves around
+    bleed   summed mean occupancy of the channels within +-2 (a busy
+            neighbour leaks into the receiver's filter)
+
+    score = mean + PEAK_WEIGHT * peak + STD_WEIGHT * std + BLEED_WEIGHT * bleed
+
+Lowest score wins; ties go to the higher channel, like the single-scan
+heuristic this replaces (which is this with one scan and only the bleed
+term). Everything is vectorized over the window; scoring the full ring
+costs about a millisecond, most of it building the JSON-ready lists.
+
+Needs NumPy (already in pythings/requirements.txt for fp_gen). Without it
+`available` is False and the daemon keeps recommending from the last scan
+alone.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import warnings
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+N_CHANNELS = 126
+HISTORY_CAPACITY = 512
+# 255 in the hits array marks a channel the scan didn't cover (the dongle
+# caps passes at 50, so real counts never get near it).
+NOT_SCANNED = 255
+
+DEFAULT_WINDOW_S = int(os.environ.get("BYH_RF_TREND_WINDOW_S", str(4 * 3600)))
+# 0 = no background scans. See FireworkDaemon.rf_background_scanner.
+DEFAULT_BACKGROUND_INTERVAL_S = int(os.environ.get("BYH_RF_BG_SCAN_INTERVAL_S", "0"))
+BACKGROUND_PASSES = int(os.environ.get("BYH_RF_BG_SCAN_PASSES", "5"))
+MIN_WINDOW_S = 60
+MIN_BACKGROUND_INTERVAL_S = 60
+
+PEAK_WEIGHT = 0.25
+STD_WEIGHT = 0.5
+BLEED_WEIGHT = 0.5
+BLEED_KERNEL = (1.0, 1.0, 0.0, 1.0, 1.0)  # channels -2..+2
+TOP_N = 5
+
+
+class RFScanHistory:
+    def __init__(self, history_path, config_path, capacity=HISTORY_CAPACITY):
+        self.history_path = history_path
+        self.config_path = config_path
+        self.capacity = capacity
+        self.window_s = DEFAULT_WINDOW_S
+        self.background_interval_s = DEFAULT_BACKGROUND_INTERVAL_S
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save_seq = 0
+        self._saved_seq = 0
+        self._load_config()
+        if np is None:
+            print("rf_scan_history: numpy not installed; recommending from the last scan only")
+            return
+        self._ts = np.zeros(capacity, dtype=np.int64)  # ms; 0 = empty row
+        self._passes = np.zeros(capacity, dtype=np.uint8)
+        self._hits = np.full((capacity, N_CHANNELS), NOT_SCANNED, dtype=np.uint8)
+        self._head = 0
+        self._load()
+
+    @property
+    def available(self):
+        return np is not None
+
+    # ----- persistence ----------------------------------------------------
+    def _load(self):
+        try:
+            with np.load(self.history_path) as data:
+                ts, passes, hits = data["ts"], data["passes"], data["hits"]
+                head = int(data["head"])
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"rf_scan_history: ignoring unreadable {self.history_path}: {e}")
+            return
+        if hits.shape != (self.capacity, N_CHANNELS) or len(ts) != self.capacity:
+            print(f"rf_scan_history: {self.history_path} has a different capacity; starting over")
+            return
+        self._ts[:], self._passes[:], self._hits[:] = ts, passes, hits
+        self._head = head % self.capacity
+
+    def _save_async(self):
+        """Write the ring out on a short-lived thread -- an fsync'd write
+        on an SD card can take a while and this is called from the bridge
+        thread. Takes a copy under the lock so the writer sees one scan's
+        worth of consistent state."""
+        with self._lock:
+            self._save_seq += 1
+            snapshot = (self._save_seq, self._ts.copy(), self._passes.copy(),
+                        self._hits.copy(), self._head)
+        threading.Thread(target=self._save, args=snapshot, daemon=True).start()
+
+    def _save(self, seq, ts, passes, hits, head):
+        with self._save_lock:
+            # Two scans close together: don't let the older write land last.
+            if seq < self._saved_seq:
+                return
+            self._saved_seq = seq
+            self._write(ts, passes, hits, head)
+
+    def _write(self, ts, passes, hits, head):
+        d = os.path.dirname(self.history_path) or "."
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=".rf_scan_history.", suffix=".tmp", dir=d)
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, ts=ts, passes=passes, hits=hits, head=np.int64(head))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.history_path)
+            tmp_path = None
+        except Exception as e:
+            print(f"rf_scan_history: save failed: {e}")
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except Exception:
+                    pass
+
+    def _load_config(self):
+        try:
+            with open(self.config_path, "r") as f:
+                cfg = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.configure(cfg.get("window_s"), cfg.get("background_interval_s"), persist=False)
+
+    def configure(self, window_s=None, background_interval_s=None, persist=True):
+        """Set the trend window and/or background scan interval (0 = off).
+        Persisted to RF_SCAN_CONFIG_PATH so a restart keeps them."""
+        if window_s is not None:
+            self.window_s = max(MIN_WINDOW_S, int(window_s))
+        if background_interval_s is not None:
+            interval = int(background_interval_s)
+            self.background_interval_s = 0 if interval <= 0 else max(MIN_BACKGROUND_INTERVAL_S, interval)
+        if not persist:
+            return
+        try:
+            with open(self.config_path, "w") as f:
+                json.dump({
+                    "window_s": self.window_s,
+                    "background_interval_s": self.background_interval_s,
+                }, f)
+        except OSError as e:
+            print(f"rf_scan_history: could not persist config: {e}")
+
+    # ----- recording / scoring ----------------------------------------------
+    def add(self, ts_ms, results, passes):
+        """Record one scan: `results` is the cleaned [{ch, hits}] list."""
+        if np is None or not results or passes <= 0:
+            return
+        chs = np.fromiter((r["ch"] for r in results), dtype=np.int64, count=len(results))
+        hits = np.fromiter((r["hits"] for r in results), dtype=np.int64, count=len(results))
+        keep = (chs >= 0) & (chs < N_CHANNELS)
+        with self._lock:
+            row = self._head
+            self._ts[row] = ts_ms
+            self._passes[row] = min(int(passes), NOT_SCANNED - 1)
+            self._hits[row, :] = NOT_SCANNED
+            self._hits[row, chs[keep]] = np.clip(hits[keep], 0, NOT_SCANNED - 1)
+            self._head = (row + 1) % self.capacity
+        self._save_async()
+
+    def last_scan_ms(self):
+        if np is None:
+            return None
+        with self._lock:
+            latest = int(self._ts.max())
+        return latest or None
+
+    def trend(self, window_s=None, now_ms=None):
+        """Score every channel over the scans of the last `window_s`
+        (default: the configured window). None if there are no scans in
+        it."""
+        if np is None:
+            return None
+        window_s = self.window_s if window_s is None else max(MIN_WINDOW_S, int(window_s))
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        with self._lock:
+            rows = (self._ts > 0) & (self._ts >= now_ms - window_s * 1000)
+            hits = self._hits[rows].astype(np.float32)
+            passes = self._passes[rows].astype(np.float32)
+            since_ms = int(self._ts[rows].min()) if rows.any() else None
+        n_scans = len(passes)
+        if not n_scans:
+            return None
+
+        scanned = hits != NOT_SCANNED
+        occ = np.where(scanned, hits / passes[:, None], np.nan)
+        samples = scanned.sum(axis=0)
+        covered = samples > 0
+        # Uncovered channels are all-NaN columns; nanmean & co. warn about
+        # those and return NaN, which `covered` masks out below.
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            mean = np.nanmean(occ, axis=0)
+            peak = np.nanmax(occ, axis=0)
+            std = np.nanstd(occ, axis=0)
+        bleed = np.convolve(np.nan_to_num(mean), BLEED_KERNEL, mode="same")
+        score = mean + PEAK_WEIGHT * peak + STD_WEIGHT * std + BLEED_WEIGHT * bleed
+        score = np.where(covered, score, np.inf)
+
+        channels = np.arange(N_CHANNELS)
+        # lexsort: last key is primary -> score ascending, then higher channel.
+        order = np.lexsort((-channels, score))
+        order = order[covered[order]]
+        top = [
+            {
+                "ch": int(ch),
+                "score": round(float(score[ch]), 3),
+                "mean": round(float(mean[ch]), 3),
+                "peak": round(float(peak[ch]), 3),
+                "std": round(float(std[ch]), 3),
+            }
+            for ch in order[:TOP_N]
+        ]
+
+        def per_channel(values):
+            return [round(float(v), 3) if ok else None for v, ok in zip(values, covered)]
+
+        return {
+            "window_s": window_s,
+            "scans": n_scans,
+            "since_ms": since_ms,
+            "recommended_ch": top[0]["ch"] if top else None,
+            "top": top,
+            "channels": {
+                "mean": per_channel(mean),
+                "peak": per_channel(peak),
+                "std": per_channel(std),
+                "bleed": per_channel(bleed),
+                "samples": samples.tolist(),
+            },
+        }
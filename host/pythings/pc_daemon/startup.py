@@ -0,0 +1,80 @@
+"""Staged startup sequence for the firework daemon.
+
+Cold start used to be a pile of fixed sleeps: 5s in __main__ "to give
+everyone time to take their places", 1s at the top of every load_show, and
+a 30ms-per-receiver registration loop on the read thread. None of them
+waited on the thing they were actually waiting for, and together they put
+cold start -> ready well past 6s.
+
+Instead each real dependency is a named gate (a threading.Event) that the
+code satisfying it marks, and anything that depends on it waits on the
+gate with a bounded timeout:
+
+  config_loaded         systemcfg merged in FireworkDaemon.__init__
+  db_ready              backyardhero.db opens and answers a query
+  bridge_connected      TCP session to tcp_serial_bridge is up
+  handler_ready         first dongle line arrived and a protocol
+                        handler was built for it
+  receivers_registered  every receiver was `sync`ed into the dongle's
+                        poll table (paced by queue credit, off the
+                        read thread)
+
+`ready` is marked once all of them are. Each phase records the
+milliseconds since process start the FIRST time it's reached, so a
+bridge reconnect later on doesn't rewrite the cold-start numbers; the
+timings are printed as they land and published in /data/state under
+`startup`.
+"""
+
+import threading
+import time
+
+PHASES = (
+    "config_loaded",
+    "db_ready",
+    "bridge_connected",
+    "handler_ready",
+    "receivers_registered",
+)
+
+# Import time of this module is close enough to process start for the
+# daemon -- it's pulled in by pc_daemon's own imports.
+_PROCESS_T0 = time.monotonic()
+
+
+class StartupSequence:
+    def __init__(self, t0=None):
+        self.t0 = _PROCESS_T0 if t0 is None else t0
+        self._gates = {name: threading.Event() for name in PHASES + ("ready",)}
+        self._phase_ms = {}
+        self._lock = threading.Lock()
+
+    def mark(self, phase):
+        """Record `phase` as reached. Only the first call per phase counts."""
+        with self._lock:
+            if phase in self._phase_ms:
+                return
+            elapsed_ms = int((time.monotonic() - self.t0) * 1000)
+            self._phase_ms[phase] = elapsed_ms
+            all_done = phase != "ready" and all(p in self._phase_ms for p in PHASES)
+        print(f"Startup: {phase} at {elapsed_ms} ms")
+        gate = self._gates.get(phase)
+        if gate is not None:
+            gate.set()
+        if all_done:
+            self.mark("ready")
+
+    def reached(self, phase):
+        return phase in self._phase_ms
+
+    def wait(self, phase, timeout=None):
+        """Block until `phase` is reached. Returns False on timeout."""
+        return self._gates[phase].wait(timeout)
+
+    def snapshot(self):
+        phases = dict(self._phase_ms)
+        return {
+            "ready": "ready" in phases,
+            "phases_ms": {p: phases.get(p) for p in PHASES},
+            "ready_ms": phases.get("ready"),
+        }
@@ -0,0 +1,173 @@
+"""Encode-time and frame-size benchmark for the ws_server wire encodings.
+
+Builds a daemon-shaped fw_state with N receivers (40 by default, each
+with a full status block and loaded cue map), plus the aux keys, and for
+each encoding measures:
+
+  * frame bytes for the full payload,
+  * encode time per frame (the per-client cost of a legacy full send),
+  * decode time per frame (what the audio player / console pay),
+  * frame bytes for a receivers-topic update, the common steady-state
+    frame for a topic subscriber.
+
+Encodings: JSON (the default) and ws_codec's `byh.msgpack.v1` encoding,
+both as served by default (string keys) and with
+BYH_WS_MSGPACK_KEY_DICT=1 (int keys from the key dictionary). Needs
+msgpack for the last two.
+
+    python bench_ws_encoding.py [--receivers 40] [--iterations 500] [--json]
+"""
+
+import argparse
+import json
+import random
+import time
+
+import ws_codec
+from ws_codec import JSON_CODEC, MsgpackCodec, decode_msgpack
+
+
+def build_state(n_receivers, seed=1):
+    rng = random.Random(seed)
+    now_ms = int(time.time() * 1000)
+    receivers = {}
+    for n in range(1, n_receivers + 1):
+        ident = f"RX{100 + n}"
+        receivers[ident] = {
+            "type": "BYH_RX_V3",
+            "label": f"Rack {n}",
+            "cues": {f"Z{z}": list(range(1, 17)) for z in range(1, 3)},
+            "status": {
+                "lmt": now_ms - rng.randint(0, 900),
+                "batt": rng.randint(180, 250),
+                "showId": 12,
+                "loadComplete": True,
+                "startReady": n % 3 == 0,
+                "latency": rng.randint(2, 9),
+                "successPercent": rng.randint(90, 100),
+                "continuity": [rng.getrandbits(63), rng.getrandbits(63)],
+                "node": n,
+                "fw": 25,
+                "bv": 1,
+                "cues_available": 128,
+                "fire_duration_ms": 500,
+            },
+        }
+    fw_state = {
+        "device_running": True,
+        "device_found": True,
+        "device_address": "/dev/ttyACM0",
+        "daemon_lup": now_ms,
+        "daemon_active": True,
+        "show_loaded": True,
+        "loaded_show_name": "Fourth of July",
+        "loaded_show_id": 12,
+        "show_running": False,
+        "device_is_transmitting": True,
+        "dongle_cmd_queue": {"depth": 0, "capacity": 128},
+        "dongle_clock_sync_interval_ms": 2000,
+        "device_is_armed": False,
+        "manual_fire_active": False,
+        "start_sw_active": False,
+        "fire_check_failures": [],
+        "proto_handler_errors": [],
+        "proto_handler_status": "LOADED",
+        "active_protocol": "BKYD_TS_HYBRID",
+        "sst": 0,
+        "receivers": receivers,
+        "ota": None,
+        "dongle_ota": None,
+        "dongle_fw_version": 16,
+        "settings": {"led_brightness": 10, "fire_repeat_ct": 3, "debug_mode": 0},
+    }
+    return {
+        "fw_cursor": 12.345678,
+        "fw_firing": {},
+        "fw_system": {"temp": 131, "usage": {"cpu_percent": 12.5, "memory_percent": 41.2}},
+        "fw_error": [],
+        "fw_d_error": [],
+        "fw_state": fw_state,
+        "fw_last_update": now_ms,
+    }
+
+
+def _time_per_call(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def run(n_receivers, iterations):
+    payload = build_state(n_receivers)
+    topic_update = {
+        "_topics": ["receivers"],
+        "fw_last_update": payload["fw_last_update"],
+        "fw_state": {"receivers": payload["fw_state"]["receivers"]},
+    }
+    rows = []
+
+    encoded = JSON_CODEC.encode(payload)
+    rows.append({
+        "encoding": "json",
+        "bytes": len(encoded.encode("utf-8")),
+        "topic_bytes": len(JSON_CODEC.encode(topic_update).encode("utf-8")),
+        "encode_us": _time_per_call(lambda: JSON_CODEC.encode(payload), iterations) * 1e6,
+        "decode_us": _time_per_call(lambda: json.loads(encoded), iterations) * 1e6,
+    })
+
+    if ws_codec.MSGPACK_AVAILABLE:
+        codec = MsgpackCodec(max_keys=0)
+        encoded = codec.encode(payload)
+        assert decode_msgpack(encoded, []) == json.loads(json.dumps(payload))
+        rows.append({
+            "encoding": "msgpack (default)",
+            "bytes": len(encoded),
+            "topic_bytes": len(codec.encode(topic_update)),
+            "encode_us": _time_per_call(lambda: codec.encode(payload), iterations) * 1e6,
+            "decode_us": _time_per_call(lambda: decode_msgpack(encoded, []), iterations) * 1e6,
+        })
+
+        codec = MsgpackCodec()
+        encoded = codec.encode(payload)
+        defs, _ = codec.pending_key_defs(0)
+        key_dict = []
+        decode_msgpack(defs, key_dict)
+        assert decode_msgpack(encoded, key_dict) == json.loads(json.dumps(payload))
+        rows.append({
+            "encoding": "msgpack + key dict",
+            "bytes": len(encoded),
+            "topic_bytes": len(codec.encode(topic_update)),
+            "encode_us": _time_per_call(lambda: codec.encode(payload), iterations) * 1e6,
+            "decode_us": _time_per_call(lambda: decode_msgpack(encoded, key_dict), iterations) * 1e6,
+            "dict_bytes": len(defs),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--receivers", type=int, default=40)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--json", action="store_true", help="print rows as JSON")
+    args = parser.parse_args()
+
+    rows = run(args.receivers, args.iterations)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"{args.receivers} receivers, {args.iterations} iterations")
+    print(f"{'encoding':<24}{'bytes':>9}{'topic B':>9}{'enc us':>9}{'dec us':>9}")
+    base = rows[0]["bytes"]
+    for r in rows:
+        print(f"{r['encoding']:<24}{r['bytes']:>9}{r['topic_bytes']:>9}"
+              f"{r['encode_us']:>9.0f}{r['decode_us']:>9.0f}"
+              f"   {100 * r['bytes'] / base:.0f}% of json")
+    if not ws_codec.MSGPACK_AVAILABLE:
+        print("msgpack not installed; only JSON measured")
+    elif "dict_bytes" in rows[-1]:
+        print(f"key dictionary: {rows[-1]['dict_bytes']} B, sent once per connection")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""Fixed-size time-series store for host history (a small RRD).
+
+One memory-mapped file holds up to MAX_SERIES named series at three
+resolutions (TIERS): 1 s for the last hour, 10 s for the last day, 1 min
+for the last week. Each tier is a ring of rows indexed by time bucket
+(bucket = t // step, row = bucket % rows); a row holds one float32 per
+series -- the average of what was recorded in that bucket, NaN where a
+series got nothing. Every row also records its bucket number, so a query
+can tell a current row from one left over from a previous lap.
+
+The file is sized once from the configuration and never grows: with the
+defaults it's ~22k rows x 256 series x 4 bytes, about 22 MB. Rows are laid
+out series-minor, so recording one second touches one page per tier and
+the kernel's writeback flushes a few KB per interval -- easy on an SD card.
+A layout change (different MAX_SERIES or TIERS) starts a fresh file.
+
+Series names are free-form (`host.cpu`, `rx.RX101.lat`, ...) and get a
+slot the first time they're recorded. When the slot table is full, the
+slot of a series that hasn't been recorded for the longest tier's span is
+reused; if none has gone that quiet, the new series is dropped.
+
+record() and query() may be called from different threads; one lock
+covers the slot table, the accumulators and the rows, so a query never
+sees a series half-added or a bucket half-averaged.
+
+    store = MetricsStore(path)
+    store.record({"host.cpu": 12.0, "host.temp": 131})
+    store.query(["host.*"], start_ms, end_ms, max_points=300)
+"""
+
+import fnmatch
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+
+MAGIC = b"BYHRRD1\0"
+PAGE = 4096
+NAME_BYTES = 56
+SLOT_BYTES = NAME_BYTES + 8  # name + last-recorded bucket (1 s)
+MAX_SERIES = int(os.environ.get("BYH_HISTORY_MAX_SERIES", "256"))
+# (step seconds, rows) per tier, finest first.
+TIERS = ((1, 3600), (10, 8640), (60, 10080))
+
+_HEADER = struct.Struct("<8sII")  # magic, max_series, tier count
+_TIER = struct.Struct("<II")      # step, rows
+_NAN = float("nan")
+
+
+def _round_up(n):
+    return (n + PAGE - 1) // PAGE * PAGE
+
+
+class _Tier:
+    def __init__(self, step, rows, ts_view, values_view, max_series):
+        self.step = step
+        self.rows = rows
+        self.ts = ts_view          # int64 per row: bucket number, 0 = empty
+        self.values = values_view  # float32 rows x max_series
+        self.max_series = max_series
+        self.bucket = None
+        self.sums = {}
+        self.counts = {}
+
+    def _claim(self, bucket):
+        """Start a new bucket: reset the accumulators and, unless the row
+        already holds this bucket (restart within it), blank it."""
+        self.bucket = bucket
+        self.sums = {}
+        self.counts = {}
+        row = bucket % self.rows
+        if self.ts[row] != bucket:
+            base = row * self.max_series
+            for i in range(base, base + self.max_series):
+                self.values[i] = _NAN
+            self.ts[row] = bucket
+
+    def add(self, t, slot, value):
+        bucket = int(t // self.step)
+        if bucket != self.bucket:
+            if self.bucket is not None and bucket < self.bucket:
+                return  # clock stepped back; don't scribble over newer rows
+            self._claim(bucket)
+        self.sums[slot] = self.sums.get(slot, 0.0) + value
+        self.counts[slot] = self.counts.get(slot, 0) + 1
+        row = bucket % self.rows
+        self.values[row * self.max_series + slot] = self.sums[slot] / self.counts[slot]
+
+    def span_s(self):
+        return self.step * self.rows
+
+
+class MetricsStore:
+    def __init__(self, path, max_series=MAX_SERIES, tiers=TIERS):
+        self.path = path
+        self.max_series = max_series
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._slots = {}   # name -> slot
+        self._names = {}   # slot -> name
+        self._last = {}    # slot -> last recorded 1 s bucket
+
+        header_size = _round_up(_HEADER.size + _TIER.size * len(tiers))
+        slots_size = _round_up(SLOT_BYTES * max_series)
+        layout = []
+        offset = header_size + slots_size
+        for step, rows in tiers:
+            ts_size = _round_up(8 * rows)
+            values_size = _round_up(4 * rows * max_series)
+            layout.append((step, rows, offset, offset + ts_size))
+            offset += ts_size + values_size
+        self.size = offset
+
+        header = _HEADER.pack(MAGIC, max_series, len(tiers)) + b"".join(
+            _TIER.pack(step, rows) for step, rows in tiers
+        )
+        self._fd = self._open(header)
+        self._mm = mmap.mmap(self._fd, self.size)
+        self._view = view = memoryview(self._mm)
+        self._slot_view = view[header_size:header_size + slots_size]
+        self.tiers = [
+            _Tier(
+                step, rows,
+                view[ts_off:ts_off + 8 * rows].cast("q"),
+                view[val_off:val_off + 4 * rows * max_series].cast("f"),
+                max_series,
+            )
+            for step, rows, ts_off, val_off in layout
+        ]
+        self._load_slots()
+
+    def _open(self, header):
+        """Open the file, starting it over if it isn't ours or was written
+        with a different layout. A fresh file is sparse; ftruncate zeroes
+        it, and a zero row timestamp reads as empty."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        existing = os.pread(fd, len(header), 0)
+        if existing != header or os.fstat(fd).st_size != self.size:
+            if existing[:len(MAGIC)] == MAGIC:
+                print(f"metrics_store: layout changed, starting {self.path} over")
+            os.ftruncate(fd, 0)
+            os.ftruncate(fd, self.size)
+            os.pwrite(fd, header, 0)
+        return fd
+
+    def _load_slots(self):
+        for slot in range(self.max_series):
+            entry = self._slot_view[slot * SLOT_BYTES:(slot + 1) * SLOT_BYTES]
+            name = bytes(entry[:NAME_BYTES]).rstrip(b"\0").decode("utf-8", "replace")
+            if name:
+                self._slots[name] = slot
+                self._names[slot] = name
+                self._last[slot] = struct.unpack_from("<q", entry, NAME_BYTES)[0]
+
+    def _write_slot(self, slot, name, bucket):
+        entry = name.encode("utf-8")[:NAME_BYTES].ljust(NAME_BYTES, b"\0")
+        start = slot * SLOT_BYTES
+        self._slot_view[start:start + NAME_BYTES] = entry
+        struct.pack_into("<q", self._slot_view, start + NAME_BYTES, bucket)
+
+    def _slot_for(self, name, bucket):
+        slot = self._slots.get(name)
+        if slot is not None:
+            return slot
+        if len(name.encode("utf-8")) > NAME_BYTES:
+            self.dropped += 1
+            return None
+        if len(self._slots) < self.max_series:
+            slot = next(s for s in range(self.max_series) if s not in self._names)
+        else:
+            # Reuse the quietest series, if it's aged out of every tier.
+            slot = min(self._last, key=self._last.get)
+            if bucket - self._last[slot] < self.tiers[-1].span_s():
+                self.dropped += 1
+                return None
+            del self._slots[self._names[slot]]
+            self._blank_slot(slot)
+        self._slots[name] = slot
+        self._names[slot] = name
+        self._write_slot(slot, name, bucket)
+        return slot
+
+    def _blank_slot(self, slot):
+        for tier in self.tiers:
+            for row in range(tier.rows):
+                tier.values[row * tier.max_series + slot] = _NAN
+
+    def record(self, values, t=None):
+        """Record {name: number} at time t (seconds, default now). None and
+        non-finite values are skipped."""
+        t = time.time() if t is None else t
+        with self._lock:
+            self._record(values, t)
+
+    def _record(self, values, t):
+        bucket = int(t)
+        for name, value in values.items():
+            if value is None:
+                continue
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            if not math.isfinite(value):
+                continue
+            slot = self._slot_for(name, bucket)
+            if slot is None:
+                continue
+            if self._last.get(slot) != bucket:
+                self._last[slot] = bucket
+                struct.pack_into("<q", self._slot_view, slot * SLOT_BYTES + NAME_BYTES, bucket)
+            for tier in self.tiers:
+                tier.add(t, slot, value)
+
+    def series(self):
+        with self._lock:
+            return sorted(self._slots)
+
+    def _pick_tier(self, start_s, end_s, max_points):
+        """The tier that still covers start_s and, once averaged down to
+        max_points, gives the finest step; a tie goes to the coarser tier
+        (fewer rows to read). Buckets are counted the way query() counts
+        them, end bucket included. Nothing covers it: the coarsest."""
+        now = time.time()
+        best, best_step = None, None
+        for tier in self.tiers:
+            if now - tier.span_s() > start_s:
+                continue
+            n_buckets = int(end_s // tier.step) - int(start_s // tier.step) + 1
+            step = tier.step * (max(1, math.ceil(n_buckets / max_points)) if max_points else 1)
+            if best is None or step <= best_step:
+                best, best_step = tier, step
+        return best if best is not None else self.tiers[-1]
+
+    def query(self, patterns, start_ms, end_ms, max_points=600):
+        """Series matching any of `patterns` (fnmatch globs) between
+        start_ms and end_ms, from the finest tier that fits. Returns
+        {"step_s", "start_ms", "series": {name: [value | None, ...]}};
+        point i is at start_ms + i * step_s * 1000. Longer ranges than
+        max_points at the chosen step are averaged down to fit."""
+        with self._lock:
+            return self._query(patterns, start_ms, end_ms, max_points)
+
+    def _query(self, patterns, start_ms, end_ms, max_points):
+        names = [n for n in sorted(self._slots) if any(fnmatch.fnmatchcase(n, p) for p in patterns)]
+        start_s, end_s = start_ms / 1000.0, end_ms / 1000.0
+        tier = self._pick_tier(start_s, end_s, max_points)
+        first = int(start_s // tier.step)
+        last = int(end_s // tier.step)
+        if last - first + 1 > tier.rows:
+            first = last - tier.rows + 1
+        n_buckets = max(0, last - first + 1)
+        group = max(1, math.ceil(n_buckets / max_points)) if max_points else 1
+
+        rows = []
+        for bucket in range(first, last + 1):
+            row = bucket % tier.rows
+            rows.append(row * tier.max_series if tier.ts[row] == bucket else None)
+
+        out = {}
+        values = tier.values
+        for name in names:
+            slot = self._slots[name]
+            points = []
+            for i in range(0, n_buckets, group):
+                total, count = 0.0, 0
+                for base in rows[i:i + group]:
+                    if base is None:
+                        continue
+                    v = values[base + slot]
+                    if v == v:  # not NaN
+                        total += v
+                        count += 1
+                points.append(round(total / count, 3) if count else None)
+            out[name] = points
+        return {
+            "step_s": tier.step * group,
+            "start_ms": first * tier.step * 1000,
+            "series": out,
+        }
+
+    def flush(self):
+        with self._lock:
+            self._mm.flush()
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        try:
+            self._mm.flush()
+        finally:
+            # Views into the map have to go before it can close.
+            self._slot_view.release()
+            for tier in self.tiers:
+                tier.ts.release()
+                tier.values.release()
+            self._view.release()
+            self._mm.close()
+            os.close(self._fd)
+
+
+if __name__ == "__main__":
+    # Self-check of tier picking at the max_points boundary:
+    #   python metrics_store.py
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MetricsStore(os.path.join(tmp, "check.rrd"), max_series=4)
+        end = (int(time.time()) // 60 - 1) * 60  # a whole minute, in the past
+        for t in range(end - 600, end + 1):
+            store.record({"x": t % 100}, t=t)
+
+        # 90 s on 10 s buckets is exactly 10 buckets, end included: the
+        # 10 s tier fits 10 points as-is.
+        r = store.query(["x"], (end - 90) * 1000, end * 1000, max_points=10)
+        assert r["step_s"] == 10 and len(r["series"]["x"]) == 10, r
+
+        # 100 s is 11 such buckets, one too many: 11 s steps off the 1 s
+        # tier beat 20 s off the 10 s tier or 60 s off the 1 min tier.
+        r = store.query(["x"], (end - 100) * 1000, end * 1000, max_points=10)
+        assert r["step_s"] == 11 and len(r["series"]["x"]) == 10, r
+
+        # Never more than max_points.
+        for points in (1, 7, 60, 600):
+            r = store.query(["x"], (end - 600) * 1000, end * 1000, max_points=points)
+            assert len(r["series"]["x"]) <= points, (points, r["step_s"])
+        store.close()
+    print("metrics_store: ok")
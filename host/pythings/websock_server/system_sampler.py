@@ -0,0 +1,179 @@
+"""System metrics sampler for ws_server.
+
+fw_system used to be re-sampled on every aux refresh -- psutil CPU and
+memory plus a thermal zone read, every 200 ms while anyone was connected,
+in a to_thread hop. None of it moves that fast. SystemSampler takes one
+sample per tick from a single task (SAMPLE_INTERVAL_S, 1 s by default, or
+FAST_SAMPLE_INTERVAL_S while a diagnostics client is watching) and keeps
+the last WINDOW_S seconds of them.
+
+A sample is a flat, rounded dict so consecutive ones compare cheaply:
+
+    {"t": ms, "cpu": %, "mem": %, "mem_used_mb": .., "mem_avail_mb": ..,
+     "temp": F, "procs": {"daemon": {"cpu": %, "rss_mb": ..} | None, ...}}
+
+Per-process numbers cover the daemon, the serial bridge and this server,
+found by script name. A process that isn't running (or isn't visible --
+on the Pi/OSX setups the bridge runs outside the container) reports None;
+missing ones are looked for again every PROCESS_RESCAN_S.
+
+`sample_delta(prev, cur)` gives just what changed between two samples,
+which is what the `metrics` topic streams.
+"""
+
+import collections
+import os
+import time
+
+import psutil
+
+SAMPLE_INTERVAL_S = float(os.environ.get("BYH_METRICS_SAMPLE_S", "1.0"))
+FAST_SAMPLE_INTERVAL_S = float(os.environ.get("BYH_METRICS_FAST_SAMPLE_S", "0.25"))
+WINDOW_S = float(os.environ.get("BYH_METRICS_WINDOW_S", "300"))
+PROCESS_RESCAN_S = 10.0
+THERMAL_PATH = "/sys/class/thermal/thermal_zone0/temp"
+
+# name -> script the process runs (matched against its cmdline). None is
+# this process.
+TRACKED_PROCESSES = {
+    "daemon": "pc_daemon.py",
+    "bridge": "tcp_serial_bridge.py",
+    "ws_server": None,
+}
+
+_MB = 1024 ** 2
+
+
+def read_cpu_temperature():
+    """CPU temperature in whole degrees F, or 0 without a thermal zone."""
+    try:
+        with open(THERMAL_PATH, "r") as file:
+            temp_c = int(file.read().strip()) / 1000.0
+            return round((temp_c * 9 / 5) + 32)
+    except (OSError, ValueError):
+        return 0
+
+
+def sample_delta(prev, cur):
+    """The keys of `cur` that differ from `prev` (always including "t");
+    per-process entries are compared one process at a time."""
+    if prev is None:
+        return dict(cur)
+    delta = {"t": cur["t"]}
+    for key, value in cur.items():
+        if key == "procs":
+            prev_procs = prev.get("procs") or {}
+            procs = {name: p for name, p in value.items() if prev_procs.get(name, 0) != p}
+            if procs:
+                delta["procs"] = procs
+        elif prev.get(key) != value:
+            delta[key] = value
+    return delta
+
+
+class SystemSampler:
+    def __init__(self, window_s=WINDOW_S):
+        self.window_s = window_s
+        self.samples = collections.deque()
+        self.latest = None
+        self.total_memory_mb = round(psutil.virtual_memory().total / _MB)
+        self._procs = {}
+        self._last_scan = 0.0
+        self._fw_system = None
+        # Prime the CPU counters so the first real sample is a delta over
+        # one interval rather than 0.
+        psutil.cpu_percent(interval=None)
+
+    def needs_scan(self):
+        """True when a tracked process is missing and it's been long enough
+        to look again. Scanning walks every process's cmdline, so callers
+        run scan() off the event loop."""
+        missing = len(self._procs) < len(TRACKED_PROCESSES)
+        return missing and time.monotonic() - self._last_scan >= PROCESS_RESCAN_S
+
+    def scan(self):
+        self._last_scan = time.monotonic()
+        wanted = {
+            script: name for name, script in TRACKED_PROCESSES.items()
+            if script is not None and name not in self._procs
+        }
+        if "ws_server" not in self._procs:
+            self._track("ws_server", psutil.Process())
+        if not wanted:
+            return
+        for proc in psutil.process_iter(["cmdline"]):
+            cmdline = proc.info.get("cmdline") or ()
+            for arg in cmdline[1:3]:
+                name = wanted.get(os.path.basename(arg))
+                if name is not None and name not in self._procs:
+                    self._track(name, proc)
+
+    def _track(self, name, proc):
+        try:
+            proc.cpu_percent(interval=None)
+        except psutil.Error:
+            return
+        self._procs[name] = proc
+
+    def _proc_stats(self):
+        stats = {}
+        for name in TRACKED_PROCESSES:
+            proc = self._procs.get(name)
+            if proc is None:
+                stats[name] = None
+                continue
+            try:
+                with proc.oneshot():
+                    stats[name] = {
+                        "cpu": round(proc.cpu_percent(interval=None)),
+                        "rss_mb": round(proc.memory_info().rss / _MB, 1),
+                    }
+            except psutil.Error:
+                # Gone (restarted under supervisord, most likely); the
+                # next scan picks up its replacement.
+                del self._procs[name]
+                stats[name] = None
+        return stats
+
+    def sample(self):
+        """Take one sample, add it to the window and return it."""
+        memory = psutil.virtual_memory()
+        sample = {
+            "t": int(time.time() * 1000),
+            "cpu": round(psutil.cpu_percent(interval=None)),
+            "mem": round(memory.percent, 1),
+            "mem_used_mb": round(memory.used / _MB),
+            "mem_avail_mb": round(memory.available / _MB),
+            "temp": read_cpu_temperature(),
+            "procs": self._proc_stats(),
+        }
+        self.samples.append(sample)
+        cutoff = sample["t"] - self.window_s * 1000
+        while self.samples and self.samples[0]["t"] < cutoff:
+            self.samples.popleft()
+        self.latest = sample
+        self._fw_system = None
+        return sample
+
+    def window(self):
+        return list(self.samples)
+
+    def fw_system(self):
+        """The latest sample in the legacy fw_system shape (temp + usage),
+        plus per-process stats. Built once per sample."""
+        if self._fw_system is None:
+            s = self.latest
+            if s is None:
+                return {}
+            self._fw_system = {
+                "temp": s["temp"],
+                "usage": {
+                    "cpu_percent": s["cpu"],
+                    "total_memory_mb": self.total_memory_mb,
+                    "available_memory_mb": s["mem_avail_mb"],
+                    "used_memory_mb": s["mem_used_mb"],
+                    "memory_percent": s["mem"],
+                },
+                "procs": s["procs"],
+            }
+        return self._fw_system
@@ -0,0 +1,204 @@
+"""Wire encodings for the ws_server feed.
+
+JSON text frames stay the default. A client that offers the
+`byh.msgpack.v1` WebSocket subprotocol gets binary MessagePack frames
+instead: about 56% of the JSON bytes, and a fraction of JSON's cost to
+encode and to decode (bench_ws_encoding.py). Maps go to msgpack's C
+packer as they are, in the order they were built. ws_server compares
+encoded pieces to decide what changed, so that order has to be stable:
+the daemon serializes its state with sort_keys, and what ws_server adds
+itself is built the same way every time.
+
+With BYH_WS_MSGPACK_KEY_DICT=1 map keys are also swapped for small
+integers from a key dictionary: the same few dozen keys (`fw_state`,
+`receivers`, every receiver's `lmt`, `batt`, ...) repeat in every frame,
+and an int key is one byte where the JSON spelling is the key plus
+quotes. That takes frames down to about 26% of JSON, but costs CPU at
+both ends: every map is rebuilt in Python (in sorted key order, so the
+pieces stay stable whatever order the input had), which puts encoding
+a bit above JSON's cost, and decoding -- mapping the keys back -- at
+about twice JSON's. It's off by default; turn it on where link
+bandwidth matters more than the Pi's CPU.
+
+The dictionary is server-wide and append-only. A key gets the next code
+the first time anything encodes it (up to KEY_DICT_MAX codes; keys past
+that stay strings), so pre-encoded pieces stay valid for every client.
+Each client is sent the definitions it hasn't seen yet, as a plain
+`{"_kd": [base, [key, ...]]}` message, before the first frame that could
+use them. Decoders map int keys back through their copy and leave string
+keys alone; with the dictionary off no `_kd` ever comes and there's
+nothing to map.
+
+Both codecs expose the same piecewise interface so ws_server can encode a
+topic's members once and splice them into any number of client frames:
+`member(key, value)` encodes one map entry, `join(members)` wraps entries
+into a map, and `raw_member(key, encoded)` makes an entry out of an
+already-encoded value.
+
+msgpack is optional; without it MSGPACK_AVAILABLE is False and the
+subprotocol is simply not offered.
+"""
+
+import json
+import os
+import struct
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+SUBPROTOCOL_MSGPACK = "byh.msgpack.v1"
+KEY_DICT_MAX = 4096
+KEY_DICT_ENABLED = os.environ.get("BYH_WS_MSGPACK_KEY_DICT", "0") == "1"
+# Distinct dict shapes MsgpackCodec remembers key plans for; the cache is
+# simply dropped if something unusual (e.g. churning receiver sets) fills it.
+PLAN_CACHE_MAX = 1024
+
+_CONTAINERS = (dict, list, tuple)
+
+
+class JsonCodec:
+    name = "json"
+    subprotocol = None
+
+    def encode(self, obj):
+        return json.dumps(obj, default=str)
+
+    def member(self, key, value):
+        # sort_keys so equal content always encodes to the same piece --
+        # ws_server compares pieces to decide what changed.
+        return f"{json.dumps(key)}: {json.dumps(value, sort_keys=True, default=str)}"
+
+    def raw_member(self, key, encoded):
+        return f"{json.dumps(key)}: {encoded}"
+
+    def join(self, members):
+        return "{" + ", ".join(members) + "}"
+
+    def pending_key_defs(self, known):
+        return None, known
+
+
+class MsgpackCodec:
+    name = "msgpack"
+    subprotocol = SUBPROTOCOL_MSGPACK
+
+    def __init__(self, max_keys=KEY_DICT_MAX):
+        self.max_keys = max_keys
+        self.keys = []
+        self._codes = {}
+        self._plans = {}  # dict keys, as ordered -> _plan()
+
+    def _code(self, key):
+        code = self._codes.get(key)
+        if code is None:
+            if len(self.keys) >= self.max_keys or not isinstance(key, str):
+                return key
+            code = len(self.keys)
+            self.keys.append(key)
+            self._codes[key] = code
+        return code
+
+    def _plan(self, keys):
+        """(key, code) pairs for a dict with these keys, in sorted key
+        order: like JsonCodec's sort_keys, equal content has to encode to
+        equal bytes, whatever order the dict was built in."""
+        try:
+            order = sorted(keys)
+        except TypeError:
+            order = sorted(keys, key=str)
+        return [(k, self._code(k)) for k in order]
+
+    def _keyed(self, obj):
+        if not self.max_keys:
+            return obj  # no key dictionary: nothing to swap
+        plans = self._plans
+        if len(plans) > PLAN_CACHE_MAX:
+            plans.clear()
+
+        # Hot path (every receiver's status block, every frame). The
+        # state is built from the same few dict shapes over and over, so
+        # the sort and key lookups are done once per shape (keyed by the
+        # dict's keys in their original order) and only containers are
+        # recursed into. That keeps this at about json.dumps' cost.
+        def walk(o):
+            if type(o) is dict:
+                keys = tuple(o)
+                plan = plans.get(keys)
+                if plan is None:
+                    plan = plans[keys] = self._plan(keys)
+                out = {}
+                for k, code in plan:
+                    v = o[k]
+                    out[code] = walk(v) if type(v) in _CONTAINERS else v
+                return out
+            if type(o) is list or type(o) is tuple:
+                for v in o:
+                    if type(v) in _CONTAINERS:
+                        return [walk(x) if type(x) in _CONTAINERS else x for x in o]
+            return o
+
+        return walk(obj)
+
+    def _pack(self, obj):
+        return msgpack.packb(obj, default=str)
+
+    def encode(self, obj):
+        return self._pack(self._keyed(obj))
+
+    def member(self, key, value):
+        return self._pack(self._code(key)) + self._pack(self._keyed(value))
+
+    def raw_member(self, key, encoded):
+        return self._pack(self._code(key)) + encoded
+
+    def join(self, members):
+        n = len(members)
+        if n < 16:
+            header = bytes((0x80 | n,))
+        elif n < 0x10000:
+            header = b"\xde" + struct.pack(">H", n)
+        else:
+            header = b"\xdf" + struct.pack(">I", n)
+        return header + b"".join(members)
+
+    def pending_key_defs(self, known):
+        """(message, new_known): the `_kd` message a client that has seen
+        `known` definitions needs, or None if it's up to date."""
+        if len(self.keys) <= known:
+            return None, known
+        message = self._pack({"_kd": [known, self.keys[known:]]})
+        return message, len(self.keys)
+
+
+def decode_msgpack(data, key_dict):
+    """Reference decoder (used by the benchmark): returns the payload with
+    string keys, or None for a `_kd` message, which extends `key_dict`."""
+    obj = msgpack.unpackb(data, raw=False, strict_map_key=False)
+    if isinstance(obj, dict) and "_kd" in obj:
+        base, keys = obj["_kd"]
+        del key_dict[base:]
+        key_dict.extend(keys)
+        return None
+    return _unkeyed(obj, key_dict) if key_dict else obj
+
+
+def _unkeyed(obj, key_dict):
+    if isinstance(obj, dict):
+        return {
+            (key_dict[k] if isinstance(k, int) else k): _unkeyed(v, key_dict)
+            for k, v in obj.items()
+        }
+    if isinstance(obj, list):
+        return [_unkeyed(v, key_dict) for v in obj]
+    return obj
+
+
+JSON_CODEC = JsonCodec()
+MSGPACK_CODEC = (
+    MsgpackCodec(max_keys=KEY_DICT_MAX if KEY_DICT_ENABLED else 0)
+    if MSGPACK_AVAILABLE else None
+)
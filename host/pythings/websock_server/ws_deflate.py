@@ -0,0 +1,95 @@
+"""permessage-deflate for the ws_server feed, with a size threshold.
+
+websockets compresses every data frame once deflate is negotiated, so a
+40-byte `_hb` costs a zlib sync flush and ends up no smaller. RFC 7692
+lets the sender choose per message: a message sent with RSV1 clear is
+plain, and the peer's inflate window only ever sees compressed messages,
+so skipping one never desyncs the shared context. DeflateThreshold wraps
+the negotiated extension and sends messages under `min_bytes` as-is.
+
+It also keeps running byte counts (raw in / wire out for the messages it
+compresses, plus the ones it skipped) for ws_server's /metrics.
+
+Needs websockets' extension API (>= 10, which requirements.txt already
+pins); `server_factory()` returns None otherwise and the caller falls back
+to the library's default compression.
+"""
+
+try:
+    from websockets.extensions.base import Extension, ServerExtensionFactory
+    from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+    from websockets.frames import Opcode
+    DEFLATE_AVAILABLE = True
+except ImportError:
+    Extension = ServerExtensionFactory = object
+    ServerPerMessageDeflateFactory = None
+    DEFLATE_AVAILABLE = False
+
+DEFLATE_STATS = {
+    "compressed_messages": 0,
+    "compressed_raw_bytes": 0,
+    "compressed_wire_bytes": 0,
+    "plain_messages": 0,
+    "plain_bytes": 0,
+}
+
+
+class DeflateThreshold(Extension):
+    def __init__(self, inner, min_bytes):
+        self.inner = inner
+        self.name = inner.name
+        self.min_bytes = min_bytes
+        # True while a fragmented message that we're compressing is going
+        # out, so its continuation frames get compressed too.
+        self._compressing = False
+
+    def decode(self, frame, *, max_size=None):
+        return self.inner.decode(frame, max_size=max_size)
+
+    def encode(self, frame):
+        if frame.opcode in (Opcode.TEXT, Opcode.BINARY):
+            self._compressing = not (frame.fin and len(frame.data) < self.min_bytes)
+            if not self._compressing:
+                DEFLATE_STATS["plain_messages"] += 1
+                DEFLATE_STATS["plain_bytes"] += len(frame.data)
+                return frame
+        elif frame.opcode is not Opcode.CONT or not self._compressing:
+            # Control frame, or a continuation of a message sent plain.
+            return frame
+        encoded = self.inner.encode(frame)
+        if frame.fin:
+            DEFLATE_STATS["compressed_messages"] += 1
+        DEFLATE_STATS["compressed_raw_bytes"] += len(frame.data)
+        DEFLATE_STATS["compressed_wire_bytes"] += len(encoded.data)
+        return encoded
+
+    def __repr__(self):
+        return f"DeflateThreshold({self.inner!r}, min_bytes={self.min_bytes})"
+
+
+class ThresholdDeflateFactory(ServerExtensionFactory):
+    """Negotiates exactly like websockets' own deflate factory, then wraps
+    the resulting extension in DeflateThreshold."""
+
+    def __init__(self, min_bytes, **deflate_kwargs):
+        self.inner = ServerPerMessageDeflateFactory(**deflate_kwargs)
+        self.name = self.inner.name
+        self.min_bytes = min_bytes
+
+    def process_request_params(self, params, accepted_extensions):
+        response_params, extension = self.inner.process_request_params(params, accepted_extensions)
+        return response_params, DeflateThreshold(extension, self.min_bytes)
+
+
+def server_factory(min_bytes, level=6, window_bits=12, mem_level=5):
+    """Extension factory for websockets.serve(extensions=[...]), or None if
+    this websockets has no extension API. window_bits/mem_level default to
+    what websockets itself uses; level is zlib's 1 (fast) .. 9 (small)."""
+    if not DEFLATE_AVAILABLE:
+        return None
+    return ThresholdDeflateFactory(
+        min_bytes,
+        server_max_window_bits=window_bits,
+        client_max_window_bits=window_bits,
+        compress_settings={"level": level, "memLevel": mem_level},
+    )
@@ -0,0 +1,232 @@
+"""Multi-client load test for ws_server.
+
+Publishes daemon-shaped snapshots (bench_ws_encoding.build_state) to the
+state socket at a fixed rate and connects a mix of clients to the WS feed:
+
+  * fast clients connect directly (the console on a laptop),
+  * slow clients connect through a local proxy that passes the server's
+    bytes on at `--slow-kbps` (a phone on bad WiFi).
+
+For each group it reports frames, decoded bytes and staleness -- how old
+the state in each received frame was (receive time minus the snapshot's
+daemon_lup). With send-queue limits on, a slow client's staleness stays
+around what one frame takes to cross its link; without them it grows for
+the whole run as stale frames queue up in front of it. The server's
+/metrics counters (wire bytes after compression, stalls, coalesced
+updates) are diffed over the run.
+
+Run it against a ws_server pointed at a scratch run dir, e.g.:
+
+    BYH_RUN_DIR=/tmp/byh BYH_DATA_DIR=/tmp/byh python ws_server.py
+    python ws_load_test.py --state-socket /tmp/byh/byh_state.sock \\
+        --fast 4 --slow 4 --rate 20 --duration 20
+
+Set BYH_WS_SEND_QUEUE_BYTES / BYH_WS_COMPRESSION on the server side to
+compare configurations.
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import time
+import urllib.parse
+import urllib.request
+
+import websockets
+
+from bench_ws_encoding import build_state
+from ws_codec import MSGPACK_AVAILABLE, SUBPROTOCOL_MSGPACK, decode_msgpack
+
+
+PROXY_CHUNK = 1024
+
+
+class ThrottledProxy:
+    """TCP proxy that forwards client->server untouched and server->client
+    at `kbps` KiB/s, reading from the server only as fast as it forwards
+    so the backlog builds up on the server's side of the link."""
+
+    def __init__(self, target_host, target_port, kbps):
+        self.target = (target_host, target_port)
+        self.rate = kbps * 1024
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def _handle(self, client_reader, client_writer):
+        upstream = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        upstream.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8192)
+        upstream.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(upstream, self.target)
+        server_reader, server_writer = await asyncio.open_connection(sock=upstream, limit=PROXY_CHUNK)
+
+        async def pipe(reader, writer, throttle):
+            try:
+                while True:
+                    data = await reader.read(PROXY_CHUNK)
+                    if not data:
+                        break
+                    writer.write(data)
+                    await writer.drain()
+                    if throttle:
+                        await asyncio.sleep(len(data) / self.rate)
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                writer.close()
+
+        try:
+            await asyncio.gather(
+                pipe(client_reader, server_writer, False),
+                pipe(server_reader, client_writer, True),
+            )
+        except asyncio.CancelledError:
+            # Run over; asyncio.run is tearing down what's still open.
+            pass
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+
+
+class ClientStats:
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+        self.ages_ms = []
+
+
+async def run_client(url, stats, duration, msgpack=False):
+    kwargs = {"max_size": 2 ** 22}
+    if msgpack:
+        kwargs["subprotocols"] = [SUBPROTOCOL_MSGPACK]
+    key_dict = []
+    deadline = time.time() + duration
+    async with websockets.connect(url, **kwargs) as ws:
+        while time.time() < deadline:
+            try:
+                frame = await asyncio.wait_for(ws.recv(), timeout=max(0.1, deadline - time.time()))
+            except asyncio.TimeoutError:
+                break
+            now_ms = time.time() * 1000
+            stats.frames += 1
+            stats.bytes += len(frame)
+            msg = decode_msgpack(frame, key_dict) if isinstance(frame, bytes) else json.loads(frame)
+            lup = ((msg or {}).get("fw_state") or {}).get("daemon_lup")
+            if lup:
+                stats.ages_ms.append(now_ms - lup)
+
+
+async def publish(path, rate, duration, receivers):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    period = 1.0 / rate
+    deadline = time.time() + duration
+    n = failed = 0
+    while time.time() < deadline:
+        fw_state = build_state(receivers, seed=n)["fw_state"]
+        fw_state["daemon_lup"] = int(time.time() * 1000)
+        try:
+            sock.sendto(json.dumps(fw_state).encode("utf-8"), path)
+        except OSError as e:
+            if not failed:
+                print(f"[load] publish to {path} failed: {e}")
+            failed += 1
+        n += 1
+        await asyncio.sleep(period)
+    sock.close()
+    return n - failed
+
+
+def scrape_metrics(url):
+    if not url:
+        return {}
+    try:
+        text = urllib.request.urlopen(url, timeout=2).read().decode("utf-8")
+    except OSError:
+        return {}
+    values = {}
+    for line in text.splitlines():
+        if line.startswith("byh_ws_"):
+            name, _, value = line.rpartition(" ")
+            values[name] = float(value)
+    return values
+
+
+def _summary(label, group):
+    frames = sum(s.frames for s in group)
+    total = sum(s.bytes for s in group)
+    ages = sorted(a for s in group for a in s.ages_ms)
+    if not ages:
+        print(f"{label:<6} {len(group)} clients: no state frames")
+        return
+    p95 = ages[min(len(ages) - 1, int(len(ages) * 0.95))]
+    print(f"{label:<6} {len(group)} clients: {frames / len(group):.0f} frames/client, "
+          f"{total / len(group) / 1024:.0f} KiB/client decoded, staleness ms "
+          f"median {statistics.median(ages):.0f} p95 {p95:.0f} max {ages[-1]:.0f}")
+
+
+async def main_async(args):
+    before = scrape_metrics(args.metrics_url)
+    fast = [ClientStats() for _ in range(args.fast)]
+    slow = [ClientStats() for _ in range(args.slow)]
+    parts = urllib.parse.urlsplit(args.url)
+    proxy = ThrottledProxy(parts.hostname, parts.port or 80, args.slow_kbps)
+    await proxy.start()
+    slow_url = parts._replace(netloc=f"127.0.0.1:{proxy.port}").geturl()
+    tasks = [run_client(args.url, s, args.duration, args.msgpack) for s in fast]
+    tasks += [run_client(slow_url, s, args.duration, args.msgpack) for s in slow]
+    tasks.append(publish(args.state_socket, args.rate, args.duration, args.receivers))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    proxy.close()
+    for r in results[:-1]:
+        if isinstance(r, Exception):
+            print(f"[load] client failed: {r!r}")
+    after = scrape_metrics(args.metrics_url)
+
+    print(f"published {results[-1]} snapshots ({args.receivers} receivers) at {args.rate} Hz "
+          f"over {args.duration:.0f}s")
+    if fast:
+        _summary("fast", fast)
+    if slow:
+        _summary("slow", slow)
+    if after:
+        delta = {k: after[k] - before.get(k, 0) for k in after}
+        raw = delta.get('byh_ws_deflate_bytes_total{side="raw"}', 0)
+        wire = delta.get('byh_ws_deflate_bytes_total{side="wire"}', 0)
+        print(f"server: {delta.get('byh_ws_frames_total', 0):.0f} frames, "
+              f"{delta.get('byh_ws_payload_bytes_total', 0) / 1024:.0f} KiB payload, "
+              f"deflate {raw / 1024:.0f} -> {wire / 1024:.0f} KiB"
+              + (f" ({100 * wire / raw:.0f}%)" if raw else "")
+              + f", {delta.get('byh_ws_uncompressed_messages_total', 0):.0f} sent plain, "
+              f"{delta.get('byh_ws_send_stalls_total', 0):.0f} stalls, "
+              f"{delta.get('byh_ws_coalesced_updates_total', 0):.0f} updates coalesced")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-client load test for ws_server.")
+    parser.add_argument("--url", default="ws://127.0.0.1:8090")
+    parser.add_argument("--state-socket", default="/tmp/byh_state.sock")
+    parser.add_argument("--metrics-url", default="http://127.0.0.1:8091/metrics",
+                        help="ws_server /metrics to diff ('' to skip)")
+    parser.add_argument("--fast", type=int, default=4)
+    parser.add_argument("--slow", type=int, default=2)
+    parser.add_argument("--slow-kbps", type=float, default=32.0,
+                        help="link speed for slow clients, KiB/s")
+    parser.add_argument("--rate", type=float, default=20.0, help="snapshots per second")
+    parser.add_argument("--receivers", type=int, default=40)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--msgpack", action="store_true",
+                        help="clients ask for the byh.msgpack.v1 encoding")
+    args = parser.parse_args()
+    if args.msgpack and not MSGPACK_AVAILABLE:
+        parser.error("--msgpack needs the msgpack package")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,27 @@ import websockets
 import json
 import time
 import hashlib
-import psutil
+import urllib.parse
+import struct
 from datetime import datetime
 
+try:
+    import fcntl
+    import termios
+    _TIOCOUTQ = termios.TIOCOUTQ
+except (ImportError, AttributeError):
+    # Not Linux: the send backlog is just what asyncio is holding.
+    _TIOCOUTQ = None
+
 from enum import Enum
 
+from ws_codec import JSON_CODEC, MSGPACK_CODEC, SUBPROTOCOL_MSGPACK
+import ws_deflate
+from metrics_store import MetricsStore
+from system_sampler import (
+    FAST_SAMPLE_INTERVAL_S, SAMPLE_INTERVAL_S, SystemSampler, sample_delta,
+)
+
 # Base dirs are env-overridable (see pc_daemon.py for the rationale); the
 # defaults reproduce the original container paths so Docker/Pi are unchanged.
 _DATA_DIR = os.environ.get("BYH_DATA_DIR", "/data")
@@ -21,6 +37,16 @@ STATE_FILE_PATH = os.path.join(_DATA_DIR, "state")
 CURSOR_FILE_PATH = os.path.join(_RUN_DIR, "fw_cursor")
 FIRING_FILE_PATH = os.path.join(_RUN_DIR, "fw_firing")
 ERR_LOG_PATH = os.path.join(_DATA_DIR, "log", "daemon.err")
+LAST_SCAN_FILE_PATH = os.path.join(_DATA_DIR, "last_scan.json")
+# Round-robin history of host metrics, receiver link quality, dongle queue
+# depth and RF scans (metrics_store.py; fixed size, ~22 MB). Queried over
+# GET /history on METRICS_PORT. BYH_HISTORY=0 turns recording off.
+HISTORY_FILE_PATH = os.path.join(_DATA_DIR, "metrics.rrd")
+HISTORY_ENABLED = os.environ.get("BYH_HISTORY", "1") not in ("0", "false", "no", "off")
+HISTORY_INTERVAL_S = 1.0
+# Receivers we haven't heard from for this long keep their last status in
+# fw_state; don't record those stale values as if they were new.
+HISTORY_RX_STALE_MS = 5000
 
 # Unix datagram socket path the daemon publishes state snapshots to. We
 # bind it; the daemon does fire-and-forget sendto(). Lets us push state
@@ -28,12 +54,12 @@ ERR_LOG_PATH = os.path.join(_DATA_DIR, "log", "daemon.err")
 # "browser sees the new value" -- much faster than the previous
 # polling-on-a-500ms-sleep loop.
 STATE_SOCKET_PATH = os.path.join(_RUN_DIR, "byh_state.sock")
-
-# Prime psutil.cpu_percent so subsequent non-blocking calls return a real
-# delta-since-last-call instead of 0.0. Without this we'd either have to
-# block (interval=1) every read or always get 0 on the first call.
-psutil.cpu_percent(interval=None)
-
+# The daemon binds this one; we push web-activity changes to it.
+WEBACT_SOCKET_PATH = os.path.join(_RUN_DIR, "byh_webact.sock")
+# Plain-HTTP Prometheus-style text endpoint (GET /metrics), rendered from
+# the latest daemon snapshot. Separate port so it doesn't depend on which
+# websockets release's process_request hook is installed.
+METRICS_PORT = int(os.environ.get("BYH_METRICS_PORT", "8091"))
 
 class WEB_ACT_STATE(Enum):
     OFF = 0
@@ -49,6 +75,17 @@ def updateWebLEDState(value):
             file.write(str(value))
     except (FileNotFoundError, json.JSONDecodeError):
         pass
+    # Push it to the daemon too so it doesn't have to poll the file. Fire
+    # and forget: if the daemon isn't up it reads the file on start.
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            sock.setblocking(False)
+            sock.sendto(str(value).encode("utf-8"), WEBACT_SOCKET_PATH)
+        finally:
+            sock.close()
+    except (OSError, AttributeError):
+        pass
 
 
 DAEMON_INAC_SECONDS = 10
@@ -61,36 +98,38 @@ HEARTBEAT_FORCE_SECONDS = 5
 # saturating the WS.
 MIN_SEND_INTERVAL_S = 1.0 / 30.0
 
+# Per-message compression (permessage-deflate, negotiated by browsers and
+# the websockets client automatically). Only messages of at least
+# WS_COMPRESS_MIN_BYTES are compressed: full snapshots shrink ~10x, a
+# heartbeat or a one-topic delta would only pay the zlib flush. Level 1..9
+# trades Pi CPU for bytes; set BYH_WS_COMPRESSION=0 to turn it off.
+WS_COMPRESSION = os.environ.get("BYH_WS_COMPRESSION", "1") not in ("0", "false", "no", "off")
+WS_COMPRESS_MIN_BYTES = int(os.environ.get("BYH_WS_COMPRESS_MIN_BYTES", "512"))
+WS_COMPRESS_LEVEL = int(os.environ.get("BYH_WS_COMPRESS_LEVEL", "6"))
+# Per-client send backlog. A phone on bad WiFi drains slower than we
+# publish; rather than queue every snapshot behind it (and show the
+# operator a console that's seconds stale), a client whose unsent bytes
+# pass WS_SEND_QUEUE_BYTES gets nothing new until it's back under half
+# that, then the latest state. Updates in between are coalesced, not
+# queued. "Unsent" counts the kernel's socket queue as well as ours:
+# the kernel autotunes its send buffer to hundreds of KB, which at a
+# phone's drain rate is tens of seconds of stale frames on its own.
+WS_SEND_QUEUE_BYTES = int(os.environ.get("BYH_WS_SEND_QUEUE_BYTES", str(32 * 1024)))
+WS_BACKLOG_POLL_S = 0.05
+# Clients never send us more than a close frame; don't let one make us
+# buffer a megabyte (the library default) of whatever it likes.
+WS_MAX_INCOMING_BYTES = 64 * 1024
+
+# Counters for /metrics. Frame/byte counts are pre-compression; ws_deflate
+# tracks what compression did to them.
+WS_STATS = {
+    "clients": 0,
+    "frames": 0,
+    "bytes": 0,
+    "stalls": 0,
+    "coalesced_updates": 0,
+}
 
-def get_system_usage():
-    # Non-blocking sample: returns the % CPU used since the previous call.
-    # The first call after import is primed above so we always have a baseline.
-    cpu_percent = psutil.cpu_percent(interval=None)
-
-    # Memory usage
-    memory = psutil.virtual_memory()
-    total_memory = memory.total / (1024 ** 2)  # Convert bytes to MB
-    available_memory = memory.available / (1024 ** 2)  # Convert bytes to MB
-    used_memory = memory.used / (1024 ** 2)  # Convert bytes to MB
-    memory_percent = memory.percent
-
-    return {
-        "cpu_percent": cpu_percent,
-        "total_memory_mb": total_memory,
-        "available_memory_mb": available_memory,
-        "used_memory_mb": used_memory,
-        "memory_percent": memory_percent,
-    }
-
-def get_cpu_temperature():
-    try:
-        # Open the thermal zone file to read CPU temperature
-        with open("/sys/class/thermal/thermal_zone0/temp", "r") as file:
-            temp_c = int(file.read().strip()) / 1000.0  # Convert from millidegrees to Celsius
-            temp_f = (temp_c * 9/5) + 32  # Convert Celsius to Fahrenheit
-            return round(temp_f)
-    except FileNotFoundError:
-        return 0
 
 def get_last_n_lines(file_path, n, chunk_size=4096):
     """Efficiently read the last n lines of a file by walking backwards in
@@ -169,24 +208,94 @@ LATEST_FW_STATE_TS = 0.0
 STATE_VERSION = 0
 STATE_COND = None  # populated in main() once the loop is running
 
-
-def _gather_aux_blocking():
-    """Read the small auxiliary inputs that aren't carried on the
-    unix-socket fast path: timeline cursor, last-fired marker, daemon
-    error log tail, system stats. Synchronous so it lives in
-    asyncio.to_thread.
+# Show cursor / fired-cue events. The daemon sends these down the state
+# socket as small `{"_event": "cursor" | "fired", ...}` datagrams at up
+# to BYH_CURSOR_PUBLISH_HZ while a show runs. Clients subscribed to the
+# `cursor` topic get each one forwarded as a tiny `_ev` frame
+# (_event_stream_loop); everything else sees the latest values in
+# fw_cursor / fw_firing the next time it gets a payload. While events
+# keep arriving we don't read the cursor/firing files; once none has come
+# for EVENT_STALE_S (show over, daemon restarted with events off, ...)
+# the files are the source again.
+LATEST_CURSOR = None
+LATEST_CURSOR_TS = None  # daemon wall-clock ms the cursor was sampled at
+LATEST_FIRED = None
+LAST_EVENT_TS = None  # monotonic time of the last event
+# A few of the daemon's once-a-second cursor file writes.
+EVENT_STALE_S = 3.0
+# Links of connected clients that take the event stream, by id(link).
+EVENT_LINKS = {}
+# Per-client cap on fired events held while it's stalled; beyond it the
+# oldest go (the timeline only needs the recent ones to flash).
+EVENT_FIRED_BACKLOG = 64
+# Events also bump STATE_VERSION -- so legacy clients keep the cursor
+# ticking -- but no more often than this; a fired cue always does.
+EVENT_STATE_BUMP_S = 1.0
+_LAST_EVENT_BUMP = 0.0
+
+# System metrics (system_sampler.py). One task samples at
+# SAMPLE_INTERVAL_S -- FAST_SAMPLE_INTERVAL_S while any client is
+# subscribed to the `metrics` topic (the diagnostics panel) -- and the
+# latest sample is what fw_system reports. `metrics` clients get the
+# sampler's window once, then `_sys` frames holding only what changed
+# (_metrics_stream_loop).
+SAMPLER = None  # SystemSampler, created in main()
+# Links of connected `metrics` clients, by id(link).
+METRICS_LINKS = {}
+METRICS_WAKE = None  # asyncio.Event, set when the first one connects
+
+
+def _gather_aux():
+    """Assemble the small auxiliary inputs that aren't carried on the
+    unix-socket fast path: daemon error log tail, system stats (the
+    sampler's latest, see system_sampler_loop) and -- from an older
+    daemon that doesn't send cursor events -- the timeline cursor and
+    last-fired marker files. Nothing here is slower than a stat() in the
+    steady state, so it runs on the loop.
     """
     aux = {
         "fw_cursor": None,
         "fw_firing": None,
-        "fw_system": {},
+        "fw_system": SAMPLER.fw_system() if SAMPLER is not None else {},
         "fw_error": [],
         "fw_d_error": [],
     }
 
-    aux["fw_system"]["temp"] = get_cpu_temperature()
-    aux["fw_system"]["usage"] = get_system_usage()
+    if _events_live():
+        aux["fw_cursor"] = -1 if LATEST_CURSOR is None else LATEST_CURSOR
+        aux["fw_firing"] = LATEST_FIRED or {}
+    else:
+        _read_cursor_files(aux)
 
+    try:
+        aux["fw_d_error"] = _error_log_tail()
+    except Exception as e:
+        aux["fw_error"] = {"err": str(e)}
+
+    return aux
+
+
+# (mtime_ns, size) of the daemon error log when it was last read, and the
+# tail it had then. The log only changes when the daemon logs an error, so
+# a stat() per refresh replaces reading it.
+_ERR_TAIL_CACHE = (None, [])
+
+
+def _error_log_tail():
+    global _ERR_TAIL_CACHE
+    try:
+        st = os.stat(ERR_LOG_PATH)
+    except FileNotFoundError:
+        _ERR_TAIL_CACHE = (None, [])
+        return []
+    key = (st.st_mtime_ns, st.st_size)
+    if _ERR_TAIL_CACHE[0] != key:
+        tail = get_last_n_lines(ERR_LOG_PATH, 5)
+        _ERR_TAIL_CACHE = (key, tail if isinstance(tail, list) else [])
+    return _ERR_TAIL_CACHE[1]
+
+
+def _read_cursor_files(aux):
     try:
         if os.path.exists(CURSOR_FILE_PATH):
             with open(CURSOR_FILE_PATH, "r") as cursor_file:
@@ -205,17 +314,6 @@ def _gather_aux_blocking():
     except Exception as e:
         aux["fw_firing"] = {"err": str(e)}
 
-    try:
-        if os.path.exists(ERR_LOG_PATH):
-            tail = get_last_n_lines(ERR_LOG_PATH, 5)
-            aux["fw_d_error"] = tail if isinstance(tail, list) else []
-        else:
-            aux["fw_d_error"] = []
-    except Exception as e:
-        aux["fw_error"] = {"err": str(e)}
-
-    return aux
-
 
 async def _bind_state_socket():
     """Bind the unix datagram socket the daemon publishes to.
@@ -252,6 +350,43 @@ async def _bind_state_socket():
         return None
 
 
+def _events_live():
+    """True while the daemon's event datagrams are current enough to stand
+    in for the cursor/firing files."""
+    return LAST_EVENT_TS is not None and time.monotonic() - LAST_EVENT_TS < EVENT_STALE_S
+
+
+def _ingest_event(event):
+    """Adopt one cursor / fired event and hand it to every stream client.
+    Returns True if STATE_VERSION moved (the caller notifies)."""
+    global LATEST_CURSOR, LATEST_CURSOR_TS, LATEST_FIRED, LAST_EVENT_TS, STATE_VERSION, _LAST_EVENT_BUMP
+    kind = event.pop("_event", None)
+    if kind == "cursor":
+        LATEST_CURSOR = event.get("t")
+        LATEST_CURSOR_TS = event.get("ts")
+    elif kind == "fired":
+        LATEST_FIRED = event
+    else:
+        return False
+    now = time.monotonic()
+    LAST_EVENT_TS = now
+    for link in EVENT_LINKS.values():
+        if kind == "cursor":
+            link["ev_cursor"] = LATEST_CURSOR
+            link["ev_cursor_ts"] = LATEST_CURSOR_TS
+        else:
+            fired = link["ev_fired"]
+            fired.append(event)
+            if len(fired) > EVENT_FIRED_BACKLOG:
+                del fired[0]
+        link["ev_flag"].set()
+    if kind == "fired" or now - _LAST_EVENT_BUMP >= EVENT_STATE_BUMP_S:
+        _LAST_EVENT_BUMP = now
+        STATE_VERSION += 1
+        return True
+    return False
+
+
 def _ingest_state_datagram(data):
     """Synchronous helper that parses one daemon-published snapshot and
     bumps STATE_VERSION. Pulled out so the add_reader callback (which
@@ -294,9 +429,12 @@ async def state_socket_consumer():
 
     def on_readable():
         # Coalesce a burst of datagrams: drain everything currently
-        # queued and publish only the most recent. This is what gives
-        # us "one notify per dongle ack burst" rather than 16.
+        # queued and publish only the most recent snapshot. This is what
+        # gives us "one notify per dongle ack burst" rather than 16.
+        # Cursor/fired events are small and each one counts, so they're
+        # all ingested as they come.
         latest = None
+        bumped = False
         while True:
             try:
                 data, _addr = sock.recvfrom(1 << 20)
@@ -307,10 +445,17 @@ async def state_socket_consumer():
                     break
                 print(f"state_socket_consumer recv error: {e}")
                 return
+            if data.startswith(b'{"_event"'):
+                try:
+                    bumped = _ingest_event(json.loads(data)) or bumped
+                except ValueError as e:
+                    print(f"event datagram json error: {e}")
+                continue
             latest = data
-        if latest is None:
+        if latest is not None:
+            _ingest_state_datagram(latest)
+        elif not bumped:
             return
-        _ingest_state_datagram(latest)
         # add_reader's callback runs synchronously on the loop thread,
         # so we can't `await` here. Schedule the notify_all in a task.
         asyncio.create_task(_notify())
@@ -385,7 +530,9 @@ async def aux_watcher():
     """Inotify watch for /tmp/fw_cursor and /tmp/fw_firing, the auxiliary
     files the daemon updates during show playback. Notifying STATE_COND
     on changes triggers an immediate WS push that includes the fresh
-    cursor / firing values along with the latest fw_state.
+    cursor / firing values along with the latest fw_state. Only matters
+    while the daemon isn't sending cursor events; changes that land while
+    events are live (see _events_live) are ignored.
     """
     global STATE_VERSION
     try:
@@ -408,11 +555,129 @@ async def aux_watcher():
     async for _changes in awatch(
         "/tmp", debounce=10, recursive=False, watch_filter=_aux_filter
     ):
+        if _events_live():
+            continue
         STATE_VERSION += 1
         async with STATE_COND:
             STATE_COND.notify_all()
 
 
+async def system_sampler_loop():
+    """Sample system metrics on a fixed cadence and wake `metrics`
+    clients. Sampling is a handful of /proc reads, so it runs on the
+    loop; only the occasional process scan goes to a thread."""
+    while True:
+        if SAMPLER.needs_scan():
+            await asyncio.to_thread(SAMPLER.scan)
+        SAMPLER.sample()
+        for link in METRICS_LINKS.values():
+            link["sys_flag"].set()
+        interval = FAST_SAMPLE_INTERVAL_S if METRICS_LINKS else SAMPLE_INTERVAL_S
+        METRICS_WAKE.clear()
+        try:
+            await asyncio.wait_for(METRICS_WAKE.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+HISTORY = None  # MetricsStore, opened in main()
+
+
+def _history_values(fw_state, sample, now_ms):
+    """The series recorded each HISTORY_INTERVAL_S, by name."""
+    values = {}
+    if sample is not None:
+        values["host.cpu"] = sample["cpu"]
+        values["host.mem"] = sample["mem"]
+        if sample["temp"]:
+            values["host.temp"] = sample["temp"]
+        for name, proc in sample["procs"].items():
+            if proc:
+                values[f"proc.{name}.cpu"] = proc["cpu"]
+                values[f"proc.{name}.rss_mb"] = proc["rss_mb"]
+    queue = fw_state.get("dongle_cmd_queue") or {}
+    values["dongle.queue_depth"] = queue.get("depth")
+    for ident, receiver in (fw_state.get("receivers") or {}).items():
+        status = (receiver or {}).get("status") or {}
+        lmt = status.get("lmt")
+        if not isinstance(lmt, (int, float)) or now_ms - lmt > HISTORY_RX_STALE_MS:
+            continue
+        values[f"rx.{ident}.lat"] = status.get("lat")
+        values[f"rx.{ident}.sp"] = status.get("successPercent")
+        values[f"rx.{ident}.batt"] = status.get("battery")
+    return values
+
+
+def _record_rf_scan(scan_ts_ms):
+    """Record the scan in last_scan.json as rf.* points. They land at the
+    time we noticed it, a second or so after the scan itself; the store
+    only appends."""
+    try:
+        with open(LAST_SCAN_FILE_PATH, "r") as f:
+            scan = json.load(f)
+    except (OSError, ValueError):
+        return
+    if scan.get("host_ts_ms") != scan_ts_ms:
+        return
+    hits = {r["ch"]: r["hits"] for r in scan.get("results") or [] if "ch" in r and "hits" in r}
+    if not hits:
+        return
+    HISTORY.record({
+        "rf.current_ch": scan.get("current_ch"),
+        "rf.recommended_ch": scan.get("recommended_ch"),
+        "rf.current_hits": hits.get(scan.get("current_ch")),
+        "rf.mean_hits": sum(hits.values()) / len(hits),
+        "rf.max_hits": max(hits.values()),
+    })
+
+
+async def history_recorder_loop():
+    """Append the latest host / receiver / dongle numbers to HISTORY once
+    a second, plus each new RF scan as it appears in fw_state."""
+    last_scan_ts = None
+    primed = False
+    while True:
+        await asyncio.sleep(HISTORY_INTERVAL_S)
+        fw_state = LATEST_FW_STATE or {}
+        now = time.time()
+        try:
+            # A stale snapshot (daemon down) contributes nothing but its
+            # age; the host numbers still count.
+            live_state = fw_state if fw_state.get("daemon_active") else {}
+            # In a thread: a /history query holds the store's lock for as
+            # long as it takes, and the loop mustn't wait on that.
+            await asyncio.to_thread(HISTORY.record, _history_values(live_state, SAMPLER.latest, now * 1000), now)
+            rf = (fw_state.get("settings") or {}).get("rf") or {}
+            scan_ts = (rf.get("last_scan") or {}).get("host_ts_ms")
+            if not primed:
+                # The scan on record in the first snapshot went in before
+                # a restart (or predates history); only newer ones count.
+                primed = bool(fw_state)
+                last_scan_ts = scan_ts
+            elif scan_ts and scan_ts != last_scan_ts:
+                last_scan_ts = scan_ts
+                await asyncio.to_thread(_record_rf_scan, scan_ts)
+        except Exception as e:
+            print(f"history record failed: {e}")
+
+
+def _history_response(query):
+    """JSON body for GET /history (range query) or /history/series."""
+    if HISTORY is None:
+        return None
+    if query is None:
+        return {"series": HISTORY.series()}
+    now_ms = int(time.time() * 1000)
+    try:
+        end_ms = int(query.get("to", [now_ms])[0])
+        start_ms = int(query.get("from", [end_ms - 3600 * 1000])[0])
+        points = max(1, min(5000, int(query.get("points", [600])[0])))
+    except ValueError:
+        return {"error": "from, to and points must be integers"}
+    patterns = [p for part in query.get("series", ["*"]) for p in part.split(",") if p]
+    return HISTORY.query(patterns, start_ms, end_ms, max_points=points)
+
+
 def _stable_signature(payload):
     """Hash the payload *excluding* the per-tick timestamp so we only treat
     it as 'changed' when something meaningful actually moved."""
@@ -421,51 +686,316 @@ def _stable_signature(payload):
     return hashlib.sha1(encoded).hexdigest()
 
 
-# M5: cross-client cache for the auxiliary inputs (CPU temp, error-log
-# tail, cursor/firing, system usage). _gather_aux_blocking does several
-# file reads + psutil sampling; with N WS clients each ticking at up to
-# 30Hz the old per-client-per-tick call multiplied that IO by N. We cache
+# M5: cross-client cache for the auxiliary inputs (error-log tail,
+# cursor/firing, system stats). With N WS clients each ticking at up to
+# 30Hz the old per-client-per-tick gather multiplied its IO by N. We cache
 # the result for a short TTL and serve all clients from it, so the cost is
 # bounded to ~1 gather per AUX_CACHE_TTL_S regardless of client count.
-# (Bonus: psutil.cpu_percent now samples on a single cadence instead of
-# resetting its delta baseline on every concurrent caller.)
+# The gather itself is cheap now that system stats come from the sampler
+# and the error log is only re-read when it changes; keeping the same
+# dict for the TTL also lets _topic_sections reuse its encoded slices.
 AUX_CACHE = None
 AUX_CACHE_TS = 0.0
-AUX_CACHE_LOCK = None  # asyncio.Lock, created in main()
 AUX_CACHE_TTL_S = 0.2
 
 
-async def _get_aux_shared():
+def _get_aux_shared():
     global AUX_CACHE, AUX_CACHE_TS
     now = time.time()
-    if AUX_CACHE is not None and (now - AUX_CACHE_TS) < AUX_CACHE_TTL_S:
-        return AUX_CACHE
-    # Serialize concurrent refreshes so a burst of clients triggers one
-    # gather, not N. No lock yet (pre-main) -> just gather directly.
-    if AUX_CACHE_LOCK is None:
-        aux = await asyncio.to_thread(_gather_aux_blocking)
-        AUX_CACHE = aux
-        AUX_CACHE_TS = time.time()
-        return aux
-    async with AUX_CACHE_LOCK:
-        now = time.time()
-        if AUX_CACHE is not None and (now - AUX_CACHE_TS) < AUX_CACHE_TTL_S:
-            return AUX_CACHE
-        aux = await asyncio.to_thread(_gather_aux_blocking)
-        AUX_CACHE = aux
-        AUX_CACHE_TS = time.time()
-        return aux
+    if AUX_CACHE is None or (now - AUX_CACHE_TS) >= AUX_CACHE_TTL_S:
+        AUX_CACHE = _gather_aux()
+        AUX_CACHE_TS = now
+    return AUX_CACHE
 
 
 async def _build_payload():
     """Combine the cached fw_state with the shared auxiliary inputs."""
-    aux = await _get_aux_shared()
+    aux = _get_aux_shared()
     payload = dict(aux)  # shallow copy so per-client keys don't mutate cache
     payload["fw_state"] = LATEST_FW_STATE or _read_fw_state_from_file()
     payload["fw_last_update"] = int(time.time() * 1000)
     return payload
 
 
+# Topic subscriptions. A client that connects with `?topics=show,cursor`
+# gets only those slices of the payload, and after the first frame only
+# the topics that actually changed since its last send. Clients that
+# don't ask for topics keep getting the full legacy payload every time.
+#
+# Topic frames look like the legacy payload restricted to the topic's
+# keys, plus `_topics` (what this client subscribed to) and `_full` on
+# the first frame and the HEARTBEAT_FORCE_SECONDS resend. Without
+# `_full`, fw_state holds only the changed keys and the client merges
+# it into what it has.
+TOPIC_STATE_KEYS = {
+    "show": frozenset({
+        "show_loaded", "loaded_show_name", "loaded_show_id", "show_running",
+        "show_paused", "proto_handler_status", "sst", "dstc", "waiting_for_client_start",
+        "show_load_progress", "last_show_run_id", "host_fire_jitter",
+    }),
+    "receivers": frozenset({"receivers"}),
+    "ota": frozenset({"ota", "dongle_ota", "dongle_fw_version"}),
+    "errors": frozenset({"proto_handler_errors", "fire_check_failures"}),
+    "system": frozenset(),
+    # fw_cursor / fw_firing, plus the _ev stream (_event_stream_loop).
+    "cursor": frozenset(),
+    # Nothing from the payload: the sampler window, then `_sys` deltas
+    # (_metrics_stream_loop). Subscribing speeds the sampler up.
+    "metrics": frozenset(),
+    # Everything else the daemon publishes: link/switch state, settings,
+    # queue depth, startup, fire latency.
+    "device": None,
+}
+TOPIC_AUX_KEYS = {
+    "system": ("fw_system",),
+    "errors": ("fw_error", "fw_d_error"),
+    "cursor": ("fw_cursor", "fw_firing"),
+}
+TOPICS = tuple(TOPIC_STATE_KEYS)
+# Liveness keys every topic frame carries; they move on every publish,
+# so they never count as a change on their own.
+ALWAYS_STATE_KEYS = ("daemon_lup", "daemon_active")
+_CLAIMED_STATE_KEYS = frozenset(ALWAYS_STATE_KEYS).union(
+    *(keys for keys in TOPIC_STATE_KEYS.values() if keys)
+)
+
+
+def _requested_topics(websocket):
+    """Topics from the connect URL's `topics` query parameter, or None for
+    a legacy full-payload client. websockets >= 13 exposes the handshake
+    as `websocket.request`; older releases as `websocket.path`."""
+    request = getattr(websocket, "request", None)
+    path = getattr(request, "path", None) or getattr(websocket, "path", None) or ""
+    query = urllib.parse.parse_qs(urllib.parse.urlsplit(path).query)
+    raw = query.get("topics")
+    if not raw:
+        return None
+    asked = {t.strip() for part in raw for t in part.split(",") if t.strip()}
+    unknown = asked.difference(TOPICS)
+    if unknown:
+        print(f"Ignoring unknown WS topics: {sorted(unknown)}")
+    return frozenset(asked.intersection(TOPICS)) or None
+
+
+def _encode_members(codec, obj, keys):
+    """Encoded map entries for the keys of `obj` present, in sorted key
+    order so equal content always encodes to the same pieces."""
+    return tuple(codec.member(k, obj[k]) for k in sorted(keys) if k in obj)
+
+
+# Per-topic encoded slices of the latest (fw_state, aux) pair, per codec.
+# Built once per new snapshot and shared by every topic client, so the
+# per-client cost of a send is comparing hashes and splicing the changed
+# slices together -- no per-client encode of the whole state.
+_TOPIC_SECTIONS = None
+
+
+def _topic_sections(fw_state, aux, codec):
+    global _TOPIC_SECTIONS
+    cached = _TOPIC_SECTIONS
+    if cached is None or cached[0] is not fw_state or cached[1] is not aux:
+        cached = _TOPIC_SECTIONS = (fw_state, aux, {})
+    sections = cached[2].get(codec.name)
+    if sections is not None:
+        return sections
+    sections = {"_always": _encode_members(codec, fw_state, ALWAYS_STATE_KEYS)}
+    for topic, keys in TOPIC_STATE_KEYS.items():
+        if keys is None:
+            keys = [k for k in fw_state if k not in _CLAIMED_STATE_KEYS]
+        sections[topic] = (
+            _encode_members(codec, fw_state, keys),
+            _encode_members(codec, aux, TOPIC_AUX_KEYS.get(topic, ())),
+        )
+    cached[2][codec.name] = sections
+    return sections
+
+
+def _topic_frame(codec, sections, topics, fw_last_update, full):
+    state_members = list(sections["_always"])
+    aux_members = []
+    for topic in sorted(topics):
+        state_part, aux_part = sections[topic]
+        state_members.extend(state_part)
+        aux_members.extend(aux_part)
+    members = [codec.member("_topics", sorted(topics))]
+    if full:
+        members.append(codec.member("_full", True))
+    members.append(codec.member("fw_last_update", fw_last_update))
+    members.append(codec.raw_member("fw_state", codec.join(state_members)))
+    members.extend(aux_members)
+    return codec.join(members)
+
+
+def _client_codec(websocket):
+    """The encoding this client negotiated via the WS subprotocol."""
+    if MSGPACK_CODEC is not None and getattr(websocket, "subprotocol", None) == SUBPROTOCOL_MSGPACK:
+        return MSGPACK_CODEC
+    return JSON_CODEC
+
+
+def _select_subprotocol(*args):
+    """Pick msgpack if the client offered it, otherwise no subprotocol.
+
+    websockets' own default rejects a handshake that offers none of the
+    server's subprotocols, which would lock out every JSON client. The new
+    asyncio API calls this as (connection, offered), the legacy one as
+    (offered, server_subprotocols)."""
+    offered = args[0] if isinstance(args[0], (list, tuple)) else args[1]
+    if MSGPACK_CODEC is not None and SUBPROTOCOL_MSGPACK in offered:
+        return SUBPROTOCOL_MSGPACK
+    return None
+
+
+async def _send(websocket, link, message):
+    """Send an already-encoded message, preceded by any key-dictionary
+    entries the client hasn't been sent yet (msgpack only). Serialized
+    per client: the event stream and the state loop share the socket,
+    and key definitions must land before the frame that uses them."""
+    async with link["send_lock"]:
+        defs, link["known_keys"] = link["codec"].pending_key_defs(link["known_keys"])
+        if defs is not None:
+            await websocket.send(defs)
+            WS_STATS["frames"] += 1
+            WS_STATS["bytes"] += len(defs)
+        await websocket.send(message)
+        WS_STATS["frames"] += 1
+        WS_STATS["bytes"] += len(message)
+
+
+async def _event_stream_loop(websocket, link):
+    """Forward cursor / fired events to a `cursor` topic client as they
+    arrive: `{"_ev": true, "fw_last_update": ms, "fw_cursor": t,
+    "fw_cursor_ts": ms, "fw_fired": [...]}`, with whichever of the cursor
+    (and the daemon time it was taken at) and fired moved. A stalled
+    client gets the latest cursor and the fired events it missed in one
+    frame once it has room again."""
+    codec = link["codec"]
+    while True:
+        await link["ev_flag"].wait()
+        await _wait_for_send_room(websocket)
+        link["ev_flag"].clear()
+        frame = {"_ev": True, "fw_last_update": int(time.time() * 1000)}
+        if link["ev_cursor"] is not None:
+            frame["fw_cursor"] = link["ev_cursor"]
+            frame["fw_cursor_ts"] = link["ev_cursor_ts"]
+            link["ev_cursor"] = None
+        if link["ev_fired"]:
+            frame["fw_fired"] = link["ev_fired"]
+            link["ev_fired"] = []
+        await _send(websocket, link, codec.encode(frame))
+
+
+async def _metrics_stream_loop(websocket, link):
+    """Stream system metrics to a `metrics` topic client: first
+    `{"_sys_window": [sample, ...], "_sys_interval_s": s}`, then a
+    `{"_sys": delta}` per sample with only the fields that moved since the
+    last sample this client was sent (so a stalled client's next delta
+    covers everything it missed)."""
+    codec = link["codec"]
+    last = SAMPLER.latest
+    await _send(websocket, link, codec.encode({
+        "_sys_window": SAMPLER.window(),
+        "_sys_interval_s": FAST_SAMPLE_INTERVAL_S,
+    }))
+    while True:
+        await link["sys_flag"].wait()
+        await _wait_for_send_room(websocket)
+        link["sys_flag"].clear()
+        sample = SAMPLER.latest
+        if sample is last:
+            continue
+        delta = sample_delta(last, sample)
+        last = sample
+        await _send(websocket, link, codec.encode({"_sys": delta}))
+
+
+def _send_backlog(websocket):
+    """Bytes sent to this client that it hasn't received yet: what's in
+    the asyncio transport's buffer plus, on Linux, the socket's unsent and
+    unacked bytes (TIOCOUTQ). 0 if this websockets release doesn't expose
+    a transport."""
+    transport = getattr(websocket, "transport", None)
+    if transport is None:
+        return 0
+    try:
+        backlog = transport.get_write_buffer_size()
+    except (AttributeError, RuntimeError):
+        return 0
+    if _TIOCOUTQ is not None:
+        sock = transport.get_extra_info("socket")
+        try:
+            backlog += struct.unpack("i", fcntl.ioctl(sock.fileno(), _TIOCOUTQ, b"\0\0\0\0"))[0]
+        except (AttributeError, OSError, ValueError):
+            pass
+    return backlog
+
+
+async def _wait_for_send_room(websocket):
+    """Hold this client's next frame while its backlog is over
+    WS_SEND_QUEUE_BYTES. Called before building a frame, so whatever
+    state arrives meanwhile collapses into the one frame built after."""
+    if _send_backlog(websocket) <= WS_SEND_QUEUE_BYTES:
+        return
+    WS_STATS["stalls"] += 1
+    start_version = STATE_VERSION
+    transport = getattr(websocket, "transport", None)
+    while _send_backlog(websocket) > WS_SEND_QUEUE_BYTES // 2:
+        if transport is not None and transport.is_closing():
+            break
+        await asyncio.sleep(WS_BACKLOG_POLL_S)
+    WS_STATS["coalesced_updates"] += STATE_VERSION - start_version
+
+
+
+async def _topic_update_loop(websocket, link, topics):
+    """file_update_server for a client that subscribed to `topics`."""
+    codec = link["codec"]
+    last_sent = {}
+    last_full_send_ts = 0.0
+    last_send_ts = 0.0
+    last_seen_version = -1
+    first = True
+    while True:
+        if not first:
+            try:
+                async with STATE_COND:
+                    if STATE_VERSION == last_seen_version:
+                        await asyncio.wait_for(
+                            STATE_COND.wait(),
+                            timeout=HEARTBEAT_FORCE_SECONDS,
+                        )
+            except asyncio.TimeoutError:
+                pass
+            since_last = time.time() - last_send_ts
+            if since_last < MIN_SEND_INTERVAL_S:
+                await asyncio.sleep(MIN_SEND_INTERVAL_S - since_last)
+            # last_sent only moves when a frame goes out, so the frame
+            # after a stall carries every topic that changed during it.
+            await _wait_for_send_room(websocket)
+
+        last_seen_version = STATE_VERSION
+        aux = _get_aux_shared()
+        fw_state = LATEST_FW_STATE or _read_fw_state_from_file()
+        sections = _topic_sections(fw_state, aux, codec)
+        now = time.time()
+        fw_last_update = int(now * 1000)
+        full = first or (now - last_full_send_ts) >= HEARTBEAT_FORCE_SECONDS
+        if full:
+            changed = topics
+        else:
+            changed = [t for t in topics if last_sent.get(t) != hash(sections[t])]
+        if changed:
+            for topic in changed:
+                last_sent[topic] = hash(sections[topic])
+            await _send(websocket, link, _topic_frame(codec, sections, changed, fw_last_update, full))
+            last_send_ts = now
+            if full:
+                last_full_send_ts = now
+        else:
+            await _send(websocket, link, codec.encode({"_hb": True, "fw_last_update": fw_last_update}))
+        first = False
+
+
 async def file_update_server(websocket):
     """
     Per-client task: send a fresh payload whenever STATE_COND fires (i.e.
@@ -473,20 +1003,42 @@ async def file_update_server(websocket):
     least every HEARTBEAT_FORCE_SECONDS so a just-connected client sees
     state even during a quiet period. Also rate-limits sends to
     MIN_SEND_INTERVAL_S so a chatty daemon can't drown the WS pipe.
+    Clients that subscribed to topics are handed to _topic_update_loop.
+    Frames go out in whatever encoding the client negotiated (ws_codec).
+    A client that can't keep up skips to the latest state rather than
+    queueing stale frames (_wait_for_send_room).
     """
     updateWebLEDState(WEB_ACT_STATE.RUNNING.value)
+    WS_STATS["clients"] += 1
+    topics = _requested_topics(websocket)
+    link = {"codec": _client_codec(websocket), "known_keys": 0, "send_lock": asyncio.Lock()}
+    stream_tasks = []
+    codec = link["codec"]
     last_signature = None
     last_full_send_ts = 0.0
     last_seen_version = -1
 
     try:
+        if topics is not None:
+            if "cursor" in topics:
+                link.update(ev_cursor=None, ev_cursor_ts=None, ev_fired=[], ev_flag=asyncio.Event())
+                EVENT_LINKS[id(link)] = link
+                stream_tasks.append(asyncio.create_task(_event_stream_loop(websocket, link)))
+            if "metrics" in topics:
+                link["sys_flag"] = asyncio.Event()
+                METRICS_LINKS[id(link)] = link
+                METRICS_WAKE.set()
+                stream_tasks.append(asyncio.create_task(_metrics_stream_loop(websocket, link)))
+            await _topic_update_loop(websocket, link, topics)
+            return
+
         # Send an initial snapshot immediately so the UI doesn't have to
         # wait for a state mutation to render.
         initial = await _build_payload()
         last_signature = _stable_signature(initial)
         last_full_send_ts = time.time()
         last_seen_version = STATE_VERSION
-        await websocket.send(json.dumps(initial))
+        await _send(websocket, link, codec.encode(initial))
 
         while True:
             # Wake on either a state-version bump or a heartbeat timeout.
@@ -508,6 +1060,7 @@ async def file_update_server(websocket):
             since_last = time.time() - last_full_send_ts
             if since_last < MIN_SEND_INTERVAL_S:
                 await asyncio.sleep(MIN_SEND_INTERVAL_S - since_last)
+            await _wait_for_send_room(websocket)
 
             payload = await _build_payload()
             sig = _stable_signature(payload)
@@ -519,11 +1072,11 @@ async def file_update_server(websocket):
                 # No meaningful change; send a tiny heartbeat so the
                 # client knows we're still here.
                 hb = {"_hb": True, "fw_last_update": payload["fw_last_update"]}
-                await websocket.send(json.dumps(hb))
+                await _send(websocket, link, codec.encode(hb))
             else:
                 last_signature = sig
                 last_full_send_ts = now
-                await websocket.send(json.dumps(payload))
+                await _send(websocket, link, codec.encode(payload))
 
             last_seen_version = STATE_VERSION
     except websockets.exceptions.ConnectionClosed:
@@ -532,13 +1085,129 @@ async def file_update_server(websocket):
     except Exception as e:
         updateWebLEDState(WEB_ACT_STATE.CRASHED.value)
         print(f"Error: {e}")
+    finally:
+        WS_STATS["clients"] -= 1
+        EVENT_LINKS.pop(id(link), None)
+        METRICS_LINKS.pop(id(link), None)
+        for task in stream_tasks:
+            task.cancel()
+
+
+def render_metrics(fw_state):
+    """Prometheus text exposition of the daemon's fire-path latency
+    histograms (fw_state["fire_latency"], see pc_daemon/latency_trace.py)."""
+    lines = []
+    latency = (fw_state or {}).get("fire_latency") or {}
+    bounds = latency.get("buckets_ms") or []
+    stages = latency.get("stages") or {}
+    if stages:
+        lines.append("# HELP byh_fire_latency_ms Manual fire latency per hop, milliseconds.")
+        lines.append("# TYPE byh_fire_latency_ms histogram")
+        for stage, h in stages.items():
+            cumulative = h.get("buckets") or []
+            for bound, count in zip(bounds, cumulative):
+                lines.append(f'byh_fire_latency_ms_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'byh_fire_latency_ms_bucket{{stage="{stage}",le="+Inf"}} {h.get("count", 0)}')
+            lines.append(f'byh_fire_latency_ms_sum{{stage="{stage}"}} {h.get("sum_ms", 0)}')
+            lines.append(f'byh_fire_latency_ms_count{{stage="{stage}"}} {h.get("count", 0)}')
+        lines.append("# HELP byh_fire_latency_quantile_ms Windowed fire latency percentiles, milliseconds.")
+        lines.append("# TYPE byh_fire_latency_quantile_ms gauge")
+        for stage, h in stages.items():
+            for q, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+                if h.get(key) is not None:
+                    lines.append(f'byh_fire_latency_quantile_ms{{stage="{stage}",quantile="{q}"}} {h[key]}')
+    lines.append("# HELP byh_ws_clients Connected WebSocket clients.")
+    lines.append("# TYPE byh_ws_clients gauge")
+    lines.append(f"byh_ws_clients {WS_STATS['clients']}")
+    lines.append("# HELP byh_ws_frames_total Frames sent to WebSocket clients.")
+    lines.append("# TYPE byh_ws_frames_total counter")
+    lines.append(f"byh_ws_frames_total {WS_STATS['frames']}")
+    lines.append("# HELP byh_ws_payload_bytes_total Frame bytes before compression.")
+    lines.append("# TYPE byh_ws_payload_bytes_total counter")
+    lines.append(f"byh_ws_payload_bytes_total {WS_STATS['bytes']}")
+    lines.append("# HELP byh_ws_deflate_bytes_total Bytes through permessage-deflate, before (raw) and after (wire).")
+    lines.append("# TYPE byh_ws_deflate_bytes_total counter")
+    lines.append(f'byh_ws_deflate_bytes_total{{side="raw"}} {ws_deflate.DEFLATE_STATS["compressed_raw_bytes"]}')
+    lines.append(f'byh_ws_deflate_bytes_total{{side="wire"}} {ws_deflate.DEFLATE_STATS["compressed_wire_bytes"]}')
+    lines.append("# HELP byh_ws_uncompressed_messages_total Messages sent plain (under the compression threshold).")
+    lines.append("# TYPE byh_ws_uncompressed_messages_total counter")
+    lines.append(f'byh_ws_uncompressed_messages_total {ws_deflate.DEFLATE_STATS["plain_messages"]}')
+    lines.append("# HELP byh_ws_send_stalls_total Times a client's send backlog hit the limit.")
+    lines.append("# TYPE byh_ws_send_stalls_total counter")
+    lines.append(f"byh_ws_send_stalls_total {WS_STATS['stalls']}")
+    lines.append("# HELP byh_ws_coalesced_updates_total State updates skipped for stalled clients.")
+    lines.append("# TYPE byh_ws_coalesced_updates_total counter")
+    lines.append(f"byh_ws_coalesced_updates_total {WS_STATS['coalesced_updates']}")
+    sample = SAMPLER.latest if SAMPLER is not None else None
+    if sample is not None:
+        lines.append("# HELP byh_system_cpu_percent Host CPU use, percent.")
+        lines.append("# TYPE byh_system_cpu_percent gauge")
+        lines.append(f"byh_system_cpu_percent {sample['cpu']}")
+        lines.append("# HELP byh_system_memory_percent Host memory use, percent.")
+        lines.append("# TYPE byh_system_memory_percent gauge")
+        lines.append(f"byh_system_memory_percent {sample['mem']}")
+        lines.append("# HELP byh_system_temp_f CPU temperature, degrees F (0 if unknown).")
+        lines.append("# TYPE byh_system_temp_f gauge")
+        lines.append(f"byh_system_temp_f {sample['temp']}")
+        procs = {name: p for name, p in sample["procs"].items() if p}
+        if procs:
+            lines.append("# HELP byh_process_rss_mb Resident memory per BYH process, MB.")
+            lines.append("# TYPE byh_process_rss_mb gauge")
+            for name, p in procs.items():
+                lines.append(f'byh_process_rss_mb{{process="{name}"}} {p["rss_mb"]}')
+            lines.append("# HELP byh_process_cpu_percent CPU use per BYH process, percent of one core.")
+            lines.append("# TYPE byh_process_cpu_percent gauge")
+            for name, p in procs.items():
+                lines.append(f'byh_process_cpu_percent{{process="{name}"}} {p["cpu"]}')
+    lines.append("# HELP byh_state_age_seconds Seconds since the last daemon snapshot.")
+    lines.append("# TYPE byh_state_age_seconds gauge")
+    age = time.time() - LATEST_FW_STATE_TS if LATEST_FW_STATE_TS else -1
+    lines.append(f"byh_state_age_seconds {age:.3f}")
+    return "\n".join(lines) + "\n"
+
+
+async def _serve_metrics_client(reader, writer):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Drain the headers; we don't need any of them.
+        while True:
+            header = await asyncio.wait_for(reader.readline(), timeout=5)
+            if header in (b"\r\n", b"\n", b""):
+                break
+        parts = request_line.decode("latin-1").split()
+        target = urllib.parse.urlsplit(parts[1]) if len(parts) >= 2 and parts[0] == "GET" else None
+        history = None
+        if target is not None and target.path in ("/history", "/history/series"):
+            query = urllib.parse.parse_qs(target.query) if target.path == "/history" else None
+            # A week-long range over many series is a lot of Python; keep
+            # it off the loop.
+            history = await asyncio.to_thread(_history_response, query)
+        if target is not None and target.path == "/metrics":
+            status, body = "200 OK", render_metrics(LATEST_FW_STATE).encode("utf-8")
+            ctype = "text/plain; version=0.0.4; charset=utf-8"
+        elif history is not None:
+            status = "400 Bad Request" if "error" in history else "200 OK"
+            body, ctype = json.dumps(history).encode("utf-8"), "application/json"
+        else:
+            status, body, ctype = "404 Not Found", b"not found\n", "text/plain"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {ctype}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1")
+            + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
 
 
 async def main():
     """Start the WebSocket server + the state pumps."""
-    global STATE_COND, AUX_CACHE_LOCK
+    global STATE_COND, SAMPLER, METRICS_WAKE, HISTORY
     STATE_COND = asyncio.Condition()
-    AUX_CACHE_LOCK = asyncio.Lock()
+    SAMPLER = SystemSampler()
+    METRICS_WAKE = asyncio.Event()
 
     # Spin up the state pumps before accepting clients so an
     # immediately-connected client doesn't see stale state.
@@ -546,15 +1215,47 @@ async def main():
         asyncio.create_task(state_socket_consumer(), name="state_socket"),
         asyncio.create_task(state_file_watcher(),    name="state_file"),
         asyncio.create_task(aux_watcher(),           name="aux_watch"),
+        asyncio.create_task(system_sampler_loop(),   name="sys_sampler"),
     ]
-
-    server = await websockets.serve(file_update_server, "0.0.0.0", 8090)
+    if HISTORY_ENABLED:
+        try:
+            HISTORY = MetricsStore(HISTORY_FILE_PATH)
+            pumps.append(asyncio.create_task(history_recorder_loop(), name="history"))
+        except (OSError, ValueError) as e:
+            print(f"Metrics history unavailable ({HISTORY_FILE_PATH}): {e}")
+
+    # Offering the msgpack subprotocol is harmless for JSON clients: one
+    # that doesn't ask for it gets no subprotocol and JSON frames.
+    subprotocols = [SUBPROTOCOL_MSGPACK] if MSGPACK_CODEC is not None else None
+    deflate = (
+        ws_deflate.server_factory(WS_COMPRESS_MIN_BYTES, level=WS_COMPRESS_LEVEL)
+        if WS_COMPRESSION else None
+    )
+    server = await websockets.serve(
+        file_update_server, "0.0.0.0", 8090, subprotocols=subprotocols,
+        select_subprotocol=_select_subprotocol if subprotocols else None,
+        # Our factory when we have one; otherwise the library's default
+        # deflate (or none, if turned off).
+        extensions=[deflate] if deflate is not None else None,
+        compression="deflate" if WS_COMPRESSION and deflate is None else None,
+        max_size=WS_MAX_INCOMING_BYTES,
+        write_limit=WS_SEND_QUEUE_BYTES,
+    )
     print("WebSocket server is running")
+    try:
+        metrics_server = await asyncio.start_server(_serve_metrics_client, "0.0.0.0", METRICS_PORT)
+    except OSError as e:
+        print(f"Metrics endpoint unavailable on :{METRICS_PORT}: {e}")
+        metrics_server = None
     try:
         await server.wait_closed()
     finally:
+        if metrics_server is not None:
+            metrics_server.close()
         for t in pumps:
             t.cancel()
+        if HISTORY is not None:
+            HISTORY.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,222 @@
+"""Replay a bridge capture into a daemon.
+
+Stands in for tcp_serial_bridge.py on the daemon's TCP port and plays the
+dongle side of a capture (see serial_capture.py) back to whatever daemon
+connects, so show-night traffic can be profiled or a timing bug
+reproduced offline:
+
+  * Acks the daemon's `config_serial` / `get_status` like the real bridge
+    (those replies are never captured), then starts the stream.
+  * Sends every to-host chunk and bridge event in capture order, paced by
+    the captured timestamps: 1x by default, `--speed N` for N times faster,
+    `--max` for as fast as the socket takes it. `--max-gap` squeezes long
+    idle stretches (a capture that spans setup and teardown) down to at
+    most that many seconds.
+  * Swallows what the daemon sends back and counts it (`--echo` prints it).
+
+Point the daemon at it the same way as at the mock bridge:
+
+    python replay_capture.py /data/log/bridge.cap --speed 4 --port 9100
+    BYH_BRIDGE_HOST=127.0.0.1 BYH_BRIDGE_PORT=9100 python pc_daemon.py
+
+A capture path picks up its rotated files too (bridge.cap.N .. .1 first).
+Timestamps inside the replayed frames are the captured ones; the daemon's
+own clock moves on, so anything it ages by wall time (receiver
+connectedness, status staleness) reads as it would have at 1x only.
+"""
+
+import argparse
+import json
+import socket
+import threading
+import time
+
+from serial_capture import DIR_EVENT, DIR_FROM_HOST, DIR_TO_HOST, capture_files, read_records
+
+CONFIG_WAIT_S = 30.0
+
+
+class ReplaySession:
+    def __init__(self, client, echo=False):
+        self.client = client
+        self.echo = echo
+        self.configured = threading.Event()
+        self.closed = threading.Event()
+        self.lines_from_host = 0
+        self._send_lock = threading.Lock()
+
+    def send(self, data):
+        with self._send_lock:
+            self.client.sendall(data)
+
+    def _reply(self, obj):
+        self.send((json.dumps(obj) + "\n").encode("utf-8"))
+
+    def reader_loop(self):
+        buffer = b""
+        try:
+            while True:
+                data = self.client.recv(4096)
+                if not data:
+                    break
+                buffer += data
+                while b"\n" in buffer:
+                    line, buffer = buffer.split(b"\n", 1)
+                    if line:
+                        self._handle_line(line)
+        except OSError:
+            pass
+        finally:
+            self.closed.set()
+
+    def _handle_line(self, line):
+        self.lines_from_host += 1
+        if self.echo:
+            print(f"<- {line.decode('utf-8', 'replace')}")
+        if not line.lstrip().startswith(b"{"):
+            return
+        try:
+            cmd = json.loads(line)
+        except ValueError:
+            return
+        if cmd.get("type") == "config_serial":
+            self._reply({
+                "tcpstatus": True,
+                "serial_config": {
+                    "port": cmd.get("port", "/dev/ttyREPLAY0"),
+                    "baud": int(cmd.get("baud", 115200)),
+                },
+            })
+            self.configured.set()
+        elif cmd.get("type") == "get_status":
+            self._reply({
+                "type": "status_response",
+                "connected": True,
+                "config": {"port": "/dev/ttyREPLAY0", "baud": 115200},
+            })
+
+
+def _expand(paths):
+    files = []
+    for path in paths:
+        files.extend(capture_files(path) or [path])
+    return files
+
+
+def replay(session, files, speed=1.0, max_gap=None, include_events=True):
+    """Stream the capture. Returns (records, bytes, wall seconds, worst lag
+    behind schedule in seconds)."""
+    wanted = (DIR_TO_HOST, DIR_EVENT) if include_events else (DIR_TO_HOST,)
+    records = sent_bytes = 0
+    worst_lag = 0.0
+    prev_ts = None
+    offset = 0.0          # capture seconds since the first record, gaps squeezed
+    start = time.monotonic()
+    for path in files:
+        for ts, direction, payload in read_records(path):
+            if direction not in wanted:
+                continue
+            if prev_ts is not None:
+                gap = max(0.0, ts - prev_ts)
+                if max_gap is not None:
+                    gap = min(gap, max_gap)
+                offset += gap
+            prev_ts = ts
+            if speed:
+                due = start + offset / speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    worst_lag = max(worst_lag, -delay)
+            if session.closed.is_set():
+                return records, sent_bytes, time.monotonic() - start, worst_lag
+            try:
+                session.send(payload)
+            except OSError:
+                return records, sent_bytes, time.monotonic() - start, worst_lag
+            records += 1
+            sent_bytes += len(payload)
+    return records, sent_bytes, time.monotonic() - start, worst_lag
+
+
+def summarize(files):
+    """Per-direction record/byte counts and the captured time span."""
+    counts = {DIR_TO_HOST: [0, 0], DIR_FROM_HOST: [0, 0], DIR_EVENT: [0, 0]}
+    first = last = None
+    for path in files:
+        for ts, direction, payload in read_records(path):
+            c = counts.setdefault(direction, [0, 0])
+            c[0] += 1
+            c[1] += len(payload)
+            first = ts if first is None else first
+            last = ts
+    span = (last - first) if first is not None else 0.0
+    return counts, span
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a bridge capture into a daemon.")
+    parser.add_argument("captures", nargs="+", help="capture file(s), oldest first")
+    pace = parser.add_mutually_exclusive_group()
+    pace.add_argument("--speed", type=float, default=1.0, help="playback rate (default 1x)")
+    pace.add_argument("--max", action="store_true", help="no pacing, as fast as possible")
+    parser.add_argument("--max-gap", type=float, default=None,
+                        help="cap idle gaps between records at this many capture seconds")
+    parser.add_argument("--no-events", action="store_true",
+                        help="skip bridge-generated serial_event frames")
+    parser.add_argument("--bind", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--hold", type=float, default=2.0,
+                        help="seconds to keep the connection open after the last record")
+    parser.add_argument("--echo", action="store_true", help="print what the daemon sends")
+    parser.add_argument("--info", action="store_true", help="describe the capture and exit")
+    args = parser.parse_args()
+
+    files = _expand(args.captures)
+    counts, span = summarize(files)
+    print(f"[replay] {len(files)} file(s), {span:.1f}s captured: "
+          f"to_host {counts[DIR_TO_HOST][0]} rec / {counts[DIR_TO_HOST][1]} B, "
+          f"from_host {counts[DIR_FROM_HOST][0]} rec / {counts[DIR_FROM_HOST][1]} B, "
+          f"events {counts[DIR_EVENT][0]}")
+    if args.info:
+        return
+    if args.speed <= 0 and not args.max:
+        parser.error("--speed must be > 0 (use --max for unpaced)")
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((args.bind, args.port))
+    server.listen(1)
+    print(f"[replay] waiting for the daemon on {args.bind}:{args.port}")
+    try:
+        client, addr = server.accept()
+    except KeyboardInterrupt:
+        server.close()
+        return
+    client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    session = ReplaySession(client, echo=args.echo)
+    threading.Thread(target=session.reader_loop, daemon=True).start()
+    print(f"[replay] daemon connected from {addr}")
+    if not session.configured.wait(CONFIG_WAIT_S):
+        print(f"[replay] no config_serial within {CONFIG_WAIT_S:.0f}s; replaying anyway")
+
+    speed = 0 if args.max else args.speed
+    try:
+        records, sent_bytes, wall, lag = replay(
+            session, files, speed=speed, max_gap=args.max_gap,
+            include_events=not args.no_events,
+        )
+        print(f"[replay] sent {records} records / {sent_bytes} B in {wall:.2f}s "
+              f"({sent_bytes / wall / 1024 if wall else 0:.1f} KiB/s, "
+              f"worst lag {lag * 1000:.1f} ms); daemon sent {session.lines_from_host} lines")
+        session.closed.wait(args.hold)
+    except KeyboardInterrupt:
+        print("[replay] interrupted")
+    finally:
+        client.close()
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
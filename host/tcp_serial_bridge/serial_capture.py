@@ -0,0 +1,125 @@
+"""Append-only capture of the bridge's serial traffic.
+
+When something goes wrong on show night the only evidence used to be the
+bridge's stdout. With BYH_BRIDGE_CAPTURE set to a file path the bridge tees
+both directions into a compact binary capture instead, which
+replay_capture.py can later feed back into a daemon with the original
+timing (or faster).
+
+File layout: an 8-byte magic (`BYHCAP1\\n`) followed by records of
+
+    <u32 payload length> <f64 wall-clock seconds> <u8 direction> <payload>
+
+all little-endian. Directions:
+
+    DIR_TO_HOST    bytes the bridge sent the daemon from the dongle, as read
+                   (chunks, not lines -- exactly what read_from_tcp saw)
+    DIR_FROM_HOST  one newline-stripped line the daemon sent the bridge
+                   (serial commands and bridge control JSON alike)
+    DIR_EVENT      a bridge-generated frame to the daemon (serial_event)
+
+Files rotate by size like logging's RotatingFileHandler: `capture` is
+always the live file, `capture.1` the newest finished one, up to
+`capture.<backups>`. Records are flushed one by one, so a bridge that
+dies mid-show leaves a readable capture up to its last record; a torn
+final record is ignored on read.
+
+Stdlib only, so the replay side runs without pyserial.
+"""
+
+import os
+import struct
+import threading
+
+MAGIC = b"BYHCAP1\n"
+RECORD_HEADER = struct.Struct("<IdB")
+
+DIR_TO_HOST = 0
+DIR_FROM_HOST = 1
+DIR_EVENT = 2
+DIRECTION_NAMES = {DIR_TO_HOST: "to_host", DIR_FROM_HOST: "from_host", DIR_EVENT: "event"}
+
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+
+
+class CaptureWriter:
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._open()
+
+    def _open(self):
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+        if self._size == 0:
+            self._file.write(MAGIC)
+            self._file.flush()
+            self._size = len(MAGIC)
+
+    def _rotate(self):
+        self._file.close()
+        for n in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{n}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{n + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def write(self, direction, payload, ts):
+        """Append one record. `ts` is time.time() at the moment the bytes
+        crossed the bridge."""
+        record = RECORD_HEADER.pack(len(payload), ts, direction) + payload
+        with self._lock:
+            if self._file is None:
+                return
+            if self._size > len(MAGIC) and self._size + len(record) > self.max_bytes:
+                self._rotate()
+            self._file.write(record)
+            self._file.flush()
+            self._size += len(record)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def capture_files(path):
+    """A capture's files oldest first: capture.N .. capture.1, capture."""
+    backups = []
+    n = 1
+    while os.path.exists(f"{path}.{n}"):
+        backups.append(f"{path}.{n}")
+        n += 1
+    files = list(reversed(backups))
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_records(path):
+    """Yield (ts, direction, payload) from one capture file."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a bridge capture")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            length, ts, direction = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            yield ts, direction, payload
@@ -7,6 +7,11 @@ import time
 import json
 from pathlib import Path
 
+from serial_capture import (
+    CaptureWriter, DEFAULT_BACKUPS, DEFAULT_MAX_BYTES,
+    DIR_EVENT, DIR_FROM_HOST, DIR_TO_HOST,
+)
+
 # The shared esptool/port helpers live in devices/utils (dongle_flasher.py).
 # Add it to sys.path so we can reuse resolve_dongle_port for VID-based
 # auto-reconnect. Import stays lazy (inside the helper) so a missing dep
@@ -119,6 +124,14 @@ SERIAL_CONFIG = _initial_serial_config()
 TCP_HOST = os.environ.get('BYH_BRIDGE_BIND', '127.0.0.1')
 TCP_PORT = 9000
 
+# Optional traffic capture (see serial_capture.py): set BYH_BRIDGE_CAPTURE to
+# a file path and the bridge tees both directions into it, rotated by size.
+# Off by default. replay_capture.py plays a capture back into a daemon.
+CAPTURE_PATH = os.environ.get('BYH_BRIDGE_CAPTURE', '')
+CAPTURE_MAX_BYTES = int(os.environ.get('BYH_BRIDGE_CAPTURE_MAX_BYTES', DEFAULT_MAX_BYTES))
+CAPTURE_BACKUPS = int(os.environ.get('BYH_BRIDGE_CAPTURE_BACKUPS', DEFAULT_BACKUPS))
+capture = None
+
 # Global serial connection
 serial_conn = None
 serial_lock = threading.Lock()
@@ -161,6 +174,32 @@ PORT_REDETECT_AFTER_FAILURES = 3
 SERIAL_SILENCE_TIMEOUT_S = 10.0
 
 
+def _capture(direction, payload):
+    """Tee `payload` into the capture file, if one is open. A capture that
+    can't be written (disk full, path gone) is dropped with one log line --
+    it must never take the forwarders down with it."""
+    global capture
+    if capture is None:
+        return
+    try:
+        capture.write(direction, payload, time.time())
+    except OSError as e:
+        print(f"capture: write failed ({e}); capture disabled")
+        capture = None
+
+
+def _open_capture():
+    global capture
+    if not CAPTURE_PATH:
+        return
+    try:
+        capture = CaptureWriter(CAPTURE_PATH, CAPTURE_MAX_BYTES, CAPTURE_BACKUPS)
+        print(f"capture: teeing serial traffic to {CAPTURE_PATH} "
+              f"({CAPTURE_MAX_BYTES} B x {CAPTURE_BACKUPS} backups)")
+    except OSError as e:
+        print(f"capture: could not open {CAPTURE_PATH}: {e}")
+
+
 def _resolve_dongle_port_safe(prefer=None, before=None):
     """Best-effort VID-based dongle port resolution. Returns None on any
     failure (missing pyserial, import error) so callers stay robust."""
@@ -369,7 +408,9 @@ def _notify_serial_reopened(client):
     try:
         msg = {'type': 'serial_event', 'event': 'reopened',
                'port': SERIAL_CONFIG.get('port')}
-        client.sendall(('\n' + json.dumps(msg) + '\n').encode('utf-8'))
+        data = ('\n' + json.dumps(msg) + '\n').encode('utf-8')
+        _capture(DIR_EVENT, data)
+        client.sendall(data)
     except Exception as e:
         print(f"_notify_serial_reopened: could not notify client: {e}")
 
@@ -453,6 +494,7 @@ def serial_to_tcp(client):
 
             if data:
                 last_rx = time.monotonic()
+                _capture(DIR_TO_HOST, data)
                 try:
                     client.sendall(data)
                 except OSError as e:
@@ -507,6 +549,7 @@ def tcp_to_serial(client):
                 line, buffer = buffer.split(b'\n', 1)
                 if not line:
                     continue
+                _capture(DIR_FROM_HOST, line)
 
                 # Bridge control command? (JSON object). Try to consume it
                 # locally; only fall through to serial if it's genuinely
@@ -668,6 +711,8 @@ def flash_set_port(port: str) -> None:
 
 
 if __name__ == '__main__':
+    _open_capture()
+
     # Establish initial serial connection
     reconnect_serial(False)
 